@@ -3,6 +3,7 @@
 整合SSN建模、数据采集、事件处理和大模型服务组合功能
 """
 
+import gc
 import sys
 import os
 import time
@@ -18,6 +19,7 @@ from src.data_collector import DataCollector
 from src.event_processor import EventProcessor
 from src.llm_composer import LLMServiceComposer
 from src.web_interface import WebInterface
+from src.replay import ReplayEngine, format_report
 
 class SmartHomeSystem:
     """智能家居监控系统主类"""
@@ -49,6 +51,11 @@ class SmartHomeSystem:
         # 设置事件订阅
         self._setup_event_subscriptions()
         print("✅ 事件订阅已配置")
+        
+        # 可选：将启动时创建的注册表、配置等长期对象移出垃圾回收跟踪，缩短完整回收造成的调度停顿
+        if self.data_collector.config.get('data_collection', {}).get('gc_freeze', False):
+            gc.freeze()
+            print("✅ 启动对象已冻结（gc.freeze）")
     
     def _setup_event_subscriptions(self):
         """设置事件订阅关系"""
@@ -79,6 +86,9 @@ class SmartHomeSystem:
         # 订阅事件
         self.data_collector.subscribe_to_events(on_semantic_event)
         self.event_processor.subscribe_to_complex_events(on_complex_event)
+        
+        # 共享传感器流式统计
+        self.event_processor.attach_sensor_statistics(self.data_collector.sensor_stats)
     
     def start_data_collection(self):
         """启动数据采集"""
@@ -331,16 +341,54 @@ class SmartHomeSystem:
         except Exception as e:
             print(f"Web界面启动失败: {e}")
 
+def run_replay(args):
+    """回放存储的历史数据"""
+    print("⏪ 历史数据回放模式")
+    collector = DataCollector()
+    processor = EventProcessor()
+    processor.attach_sensor_statistics(collector.sensor_stats)
+    
+    engine = ReplayEngine(collector, processor, data_dir=args.data_dir, speed=args.speed)
+    try:
+        report = engine.run(
+            source=args.source,
+            start=datetime.fromisoformat(args.start) if args.start else None,
+            end=datetime.fromisoformat(args.end) if args.end else None,
+            limit=args.limit
+        )
+    finally:
+        # 回放不启动采集，加载器的工作进程和SQLite连接需在此关闭
+        collector.loader.close()
+        if collector.database is not None:
+            collector.database.close()
+    print(format_report(report))
+    return report
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='智能家居监控系统')
-    parser.add_argument('--mode', choices=['demo', 'interactive', 'web'], 
+    parser.add_argument('--mode', choices=['demo', 'interactive', 'web', 'replay'], 
                        default='interactive', help='运行模式')
     parser.add_argument('--auto-start', action='store_true', 
                        help='自动启动数据采集')
+    parser.add_argument('--source', choices=['raw', 'events'], default='raw',
+                       help='回放数据源 (replay模式)')
+    parser.add_argument('--speed', type=float, default=0,
+                       help='回放倍速，1为原始节奏，0为不限速 (replay模式)')
+    parser.add_argument('--start', help='回放起始时间，ISO格式 (replay模式)')
+    parser.add_argument('--end', help='回放结束时间，ISO格式 (replay模式)')
+    parser.add_argument('--limit', type=int, help='最多回放的记录数 (replay模式)')
+    parser.add_argument('--data-dir', default='data', help='数据目录 (replay模式)')
     
     args = parser.parse_args()
     
+    if args.mode == 'replay':
+        try:
+            run_replay(args)
+        except KeyboardInterrupt:
+            print("\n回放已中断")
+        return
+    
     # 创建系统实例
     system = SmartHomeSystem()
     
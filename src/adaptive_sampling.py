@@ -0,0 +1,200 @@
+"""
+自适应采样模块
+根据读数与阈值的接近程度和数值变化速度调整各传感器的采样周期：
+接近阈值或快速变化时加快采样，数值稳定时逐步放慢，周期限制在每个传感器的上下限之间
+"""
+
+from typing import Dict, List, Any
+import numpy as np
+
+from threshold_engine import rule_matches, rule_specificity
+
+
+class AdaptiveSamplingPolicy:
+    """向量化自适应采样策略
+
+    调度器按各传感器允许的最短周期（最高采样率）触发，策略只放行当前周期已到期的传感器，
+    因此调整采样率不需要重建调度分组
+    """
+
+    def __init__(self, base_periods: np.ndarray, min_periods: np.ndarray, max_periods: np.ndarray,
+                 spans: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 proximity_band: float = 0.1, change_rate: float = 0.02, backoff: float = 1.5):
+        """
+        Args:
+            base_periods: 各传感器的基准采样周期（秒）
+            min_periods: 最短采样周期，即采样率上限
+            max_periods: 最长采样周期，即采样率下限
+            spans: 各传感器的量程宽度，用于归一化距离和变化速度
+            high: 上限阈值，NaN表示未配置
+            low: 下限阈值，NaN表示未配置
+            proximity_band: 距阈值小于该比例的量程时开始加速，越近越快
+            change_rate: 每秒变化达到该比例的量程时加速到最短周期
+            backoff: 数值稳定时每次采样后周期放大的倍数
+        """
+        self.base_periods = np.asarray(base_periods, dtype=np.float64)
+        self.min_periods = np.minimum(np.asarray(min_periods, dtype=np.float64), self.base_periods)
+        self.max_periods = np.maximum(np.asarray(max_periods, dtype=np.float64), self.base_periods)
+        self.spans = np.asarray(spans, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.proximity_band = proximity_band
+        self.change_rate = change_rate
+        self.backoff = backoff
+
+        n_sensors = len(self.base_periods)
+        self.periods = self.base_periods.copy()
+        self.next_due = np.full(n_sensors, -np.inf)
+        self.last_value = np.full(n_sensors, np.nan)
+        self.last_epoch = np.full(n_sensors, np.nan)
+
+        self.metrics = {
+            'ticks': 0,
+            'sampled': 0,
+            'skipped': 0
+        }
+
+    @classmethod
+    def from_config(cls, registry, base_periods: np.ndarray, threshold_engine,
+                    adaptive_config: Dict[str, Any], min_period: float = 0.1) -> 'AdaptiveSamplingPolicy':
+        """
+        根据配置为注册表中的传感器编译采样周期上下限
+
+        Args:
+            registry: SensorRegistry实例
+            base_periods: 各传感器的基准采样周期
+            threshold_engine: 提供上下限阈值的ThresholdEngine
+            adaptive_config: 形如 {"min_period_factor": 0.2, "max_period_factor": 4, "rules": [...]} 的配置
+            min_period: 调度器允许的最短周期，所有传感器的最短周期不低于该值
+        """
+        base_periods = np.asarray(base_periods, dtype=np.float64)
+        min_periods = base_periods * adaptive_config.get('min_period_factor', 0.2)
+        max_periods = base_periods * adaptive_config.get('max_period_factor', 4.0)
+
+        # 按精确度从低到高覆盖，规则中的min_period/max_period为绝对秒数
+        for rule in sorted(adaptive_config.get('rules', []), key=rule_specificity):
+            indices = [record.index for record in registry.records if rule_matches(rule, record)]
+            if not indices:
+                continue
+            if 'min_period' in rule:
+                min_periods[indices] = rule['min_period']
+            if 'max_period' in rule:
+                max_periods[indices] = rule['max_period']
+        min_periods = np.maximum(min_periods, min_period)
+
+        # 未声明量程的传感器（如人体感应0/1）按单位量程处理
+        spans = np.array([
+            record.range_max - record.range_min if record.range_min is not None else 1.0
+            for record in registry.records
+        ], dtype=np.float64)
+
+        return cls(base_periods, min_periods, max_periods, spans,
+                   threshold_engine.high, threshold_engine.low,
+                   proximity_band=adaptive_config.get('proximity_band', 0.1),
+                   change_rate=adaptive_config.get('change_rate', 0.02),
+                   backoff=adaptive_config.get('backoff', 1.5))
+
+    def due(self, indices: np.ndarray, now: float) -> np.ndarray:
+        """
+        从调度器本次触发的传感器中选出当前周期已到期的传感器
+
+        Args:
+            indices: 调度器触发的传感器下标
+            now: 当前单调时钟时间
+
+        Returns:
+            需要采样的传感器下标
+        """
+        indices = np.asarray(indices)
+        selected = indices[self.next_due[indices] <= now]
+        # 调度器按最短周期的整数倍触发，提前半个最短周期视为到期，避免周期被向上取整
+        self.next_due[selected] = now + self.periods[selected] - 0.5 * self.min_periods[selected]
+
+        self.metrics['ticks'] += len(indices)
+        self.metrics['sampled'] += len(selected)
+        self.metrics['skipped'] += len(indices) - len(selected)
+        return selected
+
+    def urgency(self, indices: np.ndarray, values: np.ndarray, epochs: np.ndarray) -> np.ndarray:
+        """
+        计算读数的紧迫程度（0-1）：取阈值接近程度和变化速度中的较大者
+
+        Args:
+            indices: 传感器下标
+            values: 读数数值
+            epochs: 读数时间戳
+        """
+        spans = self.spans[indices]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 到最近阈值的距离，越过阈值时为0；未配置阈值时为NaN
+            distance = np.fmin(self.high[indices] - values, values - self.low[indices])
+            proximity = 1 - np.maximum(distance, 0) / (self.proximity_band * spans)
+
+            elapsed = epochs - self.last_epoch[indices]
+            speed = np.abs(values - self.last_value[indices]) / np.where(elapsed > 0, elapsed, np.nan) / spans
+            change = speed / self.change_rate
+
+        proximity = np.nan_to_num(proximity, nan=0.0)
+        change = np.nan_to_num(change, nan=0.0, posinf=1.0)
+        return np.clip(np.maximum(proximity, change), 0.0, 1.0)
+
+    def update(self, indices: np.ndarray, values: np.ndarray, epochs: np.ndarray):
+        """
+        根据新读数调整采样周期
+
+        紧迫时在基准周期和最短周期之间按几何插值立即加速；
+        放慢时每次按backoff倍数逐步放大，稳定时最终回到最长周期
+
+        Args:
+            indices: 传感器下标
+            values: 读数数值
+            epochs: 读数时间戳
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        epochs = np.asarray(epochs, dtype=np.float64)
+        if len(indices) == 0:
+            return
+
+        urgency = self.urgency(indices, values, epochs)
+        base = self.base_periods[indices]
+        target = np.where(urgency > 0, base * (self.min_periods[indices] / base) ** urgency,
+                          self.max_periods[indices])
+        current = self.periods[indices]
+        periods = np.where(target < current, target, np.minimum(current * self.backoff, target))
+
+        self.periods[indices] = periods
+        # 已排定的下次采样不晚于新周期
+        self.next_due[indices] = np.minimum(self.next_due[indices], self.next_due[indices] - current + periods)
+        self.last_value[indices] = values
+        self.last_epoch[indices] = epochs
+
+    def rates(self, sensor_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        各传感器当前的有效采样周期和采样率
+
+        Args:
+            sensor_ids: 与下标一一对应的传感器ID
+        """
+        return {
+            sensor_id: {
+                'period_s': round(float(period), 3),
+                'rate_hz': round(1.0 / float(period), 4),
+                'base_period_s': float(base)
+            }
+            for sensor_id, period, base in zip(sensor_ids, self.periods, self.base_periods)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取自适应采样统计信息"""
+        ticks = self.metrics['ticks']
+        return {
+            "传感器数": len(self.periods),
+            "当前采样率Hz": round(float(np.sum(1.0 / self.periods)), 3),
+            "基准采样率Hz": round(float(np.sum(1.0 / self.base_periods)), 3),
+            "加速传感器数": int(np.sum(self.periods < self.base_periods)),
+            "降速传感器数": int(np.sum(self.periods > self.base_periods)),
+            "实际采样次数": self.metrics['sampled'],
+            "跳过触发次数": self.metrics['skipped'],
+            "采样比例": round(self.metrics['sampled'] / ticks, 4) if ticks else 0.0
+        }
@@ -0,0 +1,416 @@
+"""
+历史数据分析模块
+按时间范围分块将存储的读数载入DataFrame（已压缩为时序块的小时直接读取列式数据，其余小时读取原始分区），
+用向量化的groupby计算按位置的日/小时报表：舒适区间占比、烟雾峰值、活动热力图和异常率，
+报表结果缓存为 data/reports 下的JSON文件
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from segment_store import list_partitions, parse_partition_name
+from sensor_history import QUALITY_MASK, QUALITY_POOR, FLAG_ANOMALY
+from tsblock import TSBlockStore
+from partition_loader import PartitionLoader, concat_columns
+
+# 报表粒度：名称 -> 时间桶宽（秒）
+GRANULARITIES = {
+    'day': 86400,
+    'hour': 3600
+}
+
+DEFAULT_COMFORT_PROPERTIES = ('Temperature', 'Humidity')
+SMOKE_PROPERTY = 'SmokeLevel'
+MOTION_PROPERTY = 'Motion'
+
+
+def plan_hours(data_dir: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               block_dir: Optional[str] = None) -> List[Tuple[datetime, List[str]]]:
+    """
+    确定时间范围内每个小时要读取的文件，已生成时序块的小时只读取时序块
+
+    Args:
+        data_dir: 数据根目录
+        start: 起始时间（包含）
+        end: 结束时间（包含）
+        block_dir: 时序块目录，None表示只读取原始分区
+
+    Returns:
+        按时间排列的(小时, 文件路径列表)
+    """
+    sources: Dict[datetime, List[str]] = {}
+    for path in list_partitions(os.path.join(data_dir, 'raw'), 'sensor_data', start, end):
+        sources.setdefault(parse_partition_name(path)['hour'], []).append(path)
+    if block_dir:
+        for path in list_partitions(block_dir, TSBlockStore.PREFIX, start, end):
+            sources[parse_partition_name(path)['hour']] = [path]
+    return sorted(sources.items())
+
+
+def iter_reading_frames(data_dir: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        chunk_hours: int = 24, block_dir: Optional[str] = None,
+                        loader: Optional[PartitionLoader] = None,
+                        sensors: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    按时间顺序分块读取读数
+
+    Args:
+        data_dir: 数据根目录
+        start: 起始时间（包含）
+        end: 结束时间（包含）
+        chunk_hours: 每块包含的小时分区数
+        block_dir: 时序块目录
+        loader: 分区加载器，默认在当前线程中顺序读取
+        sensors: 只读取这些传感器，None表示全部
+
+    Yields:
+        列为sensor（分类）、epoch、value、flags的DataFrame
+    """
+    loader = loader or PartitionLoader(workers=0)
+    plan = plan_hours(data_dir, start, end, block_dir)
+    # 各文件所属的块，所有文件一次交给加载器，当前块聚合时后续块的文件已在并发解析
+    chunks = [position // chunk_hours for position, (_, paths) in enumerate(plan) for _ in paths]
+    loaded = loader.iter_columns([path for _, paths in plan for path in paths],
+                                 start.timestamp() if start else None, end.timestamp() if end else None, sensors)
+
+    def frame(parts):
+        names, epochs, values, flags = concat_columns(parts)
+        return pd.DataFrame({'sensor': pd.Categorical(names), 'epoch': epochs, 'value': values, 'flags': flags})
+
+    parts = []
+    current = 0
+    for chunk, columns in zip(chunks, loaded):
+        if chunk != current and parts:
+            yield frame(parts)
+            parts = []
+        current = chunk
+        if len(columns[1]):
+            parts.append(columns)
+    if parts:
+        yield frame(parts)
+
+
+def local_epochs(epochs: np.ndarray) -> np.ndarray:
+    """将时间戳平移为本地时间的"墙上时钟"秒数，按小时取时区偏移以正确处理夏令时切换"""
+    if len(epochs) == 0:
+        return epochs
+    hours, inverse = np.unique(np.floor(epochs / 3600).astype(np.int64), return_inverse=True)
+    offsets = np.asarray([time.localtime(int(hour) * 3600).tm_gmtoff for hour in hours.tolist()], dtype=np.float64)
+    return epochs + offsets[inverse]
+
+
+def _period_label(code: int, granularity: str) -> str:
+    moment = datetime(1970, 1, 1) + timedelta(seconds=int(code) * GRANULARITIES[granularity])
+    return moment.strftime('%Y-%m-%d') if granularity == 'day' else moment.strftime('%Y-%m-%dT%H:00')
+
+
+class ReportBuilder:
+    """按块累积报表的部分聚合结果，全部块处理完后合并为报表"""
+
+    def __init__(self, registry, granularity: str = 'day',
+                 comfort_properties: Sequence[str] = DEFAULT_COMFORT_PROPERTIES):
+        """
+        Args:
+            registry: SensorRegistry实例，提供传感器的位置、观测属性和解释区间
+            granularity: 报表粒度（day/hour）
+            comfort_properties: 统计舒适区间占比的观测属性
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"不支持的报表粒度: {granularity}")
+        self.registry = registry
+        self.granularity = granularity
+        self.comfort_properties = tuple(comfort_properties)
+        self.readings = 0
+        self.unknown_readings = 0
+        self._summary: List[pd.DataFrame] = []
+        self._comfort: List[pd.Series] = []
+        self._smoke: List[pd.DataFrame] = []
+        self._motion: List[pd.DataFrame] = []
+        # 各烟雾传感器上一块最后一条读数是否处于峰值，用于判定跨块的峰值起点
+        self._smoke_state: Dict[str, bool] = {}
+        self._labels = None
+
+    def add(self, frame: pd.DataFrame):
+        """
+        累积一块读数
+
+        Args:
+            frame: iter_reading_frames生成的DataFrame
+        """
+        # 传感器只有少量取值，先按分类映射注册表元数据，再按分类编码展开到每行
+        categories = frame['sensor'].cat.categories
+        records = [self.registry.get(sensor_id) for sensor_id in categories]
+        known = np.asarray([record is not None for record in records], dtype=bool)
+        codes = frame['sensor'].cat.codes.to_numpy()
+        rows = known[codes]
+        self.readings += int(rows.sum())
+        self.unknown_readings += int(len(rows) - rows.sum())
+        if not rows.any():
+            return
+        frame = frame[rows]
+        codes = codes[rows]
+
+        def expand(values, dtype=object):
+            return np.asarray([values(record) if record is not None else None for record in records],
+                              dtype=dtype)[codes]
+
+        indices = expand(lambda record: record.index, np.float64).astype(np.int64)
+        values = frame['value'].to_numpy()
+        flags = frame['flags'].to_numpy()
+        local = local_epochs(frame['epoch'].to_numpy())
+        bucket = GRANULARITIES[self.granularity]
+        data = pd.DataFrame({
+            'period': np.floor(local / bucket).astype(np.int64),
+            'day': np.floor(local / 86400).astype(np.int64),
+            'hour': (np.floor(local / 3600).astype(np.int64) % 24),
+            'sensor': frame['sensor'].to_numpy(),
+            'location': pd.Categorical(expand(lambda record: record.location)),
+            'property': pd.Categorical(expand(lambda record: record.property_type)),
+            'epoch': frame['epoch'].to_numpy(),
+            'value': values,
+            'anomaly': (flags & FLAG_ANOMALY) != 0,
+            'poor': (flags & QUALITY_MASK) == QUALITY_POOR
+        })
+
+        self._summary.append(data.groupby(['period', 'location'], observed=True).agg(
+            readings=('value', 'size'), anomalies=('anomaly', 'sum'), poor=('poor', 'sum')))
+
+        comfort = data['property'].isin(self.comfort_properties).to_numpy()
+        if comfort.any():
+            label_codes, self._labels = self.registry.interpret_codes(indices[comfort], values[comfort])
+            self._comfort.append(data.loc[comfort, ['period', 'location', 'property']].assign(label=label_codes)
+                                 .groupby(['period', 'location', 'property', 'label'], observed=True).size())
+
+        smoke = (data['property'] == SMOKE_PROPERTY).to_numpy()
+        if smoke.any():
+            # 落在最低一档解释区间之外的读数视为峰值，峰值从无到有记为一次峰值事件
+            limits = expand(lambda record: record.interpretation.edges[0] if record.interpretation.edges else np.inf,
+                            np.float64)
+            part = data.loc[smoke, ['period', 'location', 'sensor', 'epoch', 'value']].assign(
+                spike=values[smoke] >= limits[smoke]).sort_values(['sensor', 'epoch'], kind='stable')
+            previous = part.groupby('sensor', sort=False)['spike'].shift(1)
+            first = previous.isna()
+            previous = previous.where(~first, part['sensor'].map(self._smoke_state)).fillna(False).astype(bool)
+            part['episode'] = part['spike'] & ~previous
+            self._smoke_state.update(part.groupby('sensor', sort=False)['spike'].last().to_dict())
+            self._smoke.append(part.groupby(['period', 'location', 'sensor'], observed=True).agg(
+                readings=('value', 'size'), spike_readings=('spike', 'sum'), episodes=('episode', 'sum'),
+                peak=('value', 'max')))
+
+        motion = (data['property'] == MOTION_PROPERTY).to_numpy()
+        if motion.any():
+            part = data.loc[motion, ['location', 'day', 'hour']].assign(active=values[motion] > 0)
+            self._motion.append(part.groupby(['location', 'day', 'hour'], observed=True).agg(
+                readings=('active', 'size'), active=('active', 'sum')))
+
+    def result(self) -> Dict[str, Any]:
+        """合并各块的部分聚合结果，生成报表"""
+        granularity = self.granularity
+        report = {
+            'granularity': granularity,
+            'readings': self.readings,
+            'unknown_sensor_readings': self.unknown_readings,
+            'summary': [],
+            'comfort': [],
+            'smoke': [],
+            'motion_heatmap': {}
+        }
+
+        if self._summary:
+            summary = pd.concat(self._summary).groupby(level=[0, 1], observed=True).sum()
+            for (period, location), row in summary.iterrows():
+                readings = int(row['readings'])
+                report['summary'].append({
+                    'period': _period_label(period, granularity),
+                    'location': str(location),
+                    'readings': readings,
+                    'anomalies': int(row['anomalies']),
+                    'anomaly_rate': round(float(row['anomalies']) / readings, 4),
+                    'poor_quality_rate': round(float(row['poor']) / readings, 4)
+                })
+
+        if self._comfort:
+            counts = pd.concat(self._comfort).groupby(level=[0, 1, 2, 3], observed=True).sum()
+            totals = counts.groupby(level=[0, 1, 2], observed=True).transform('sum')
+            for (period, location, prop, label), count in counts.items():
+                report['comfort'].append({
+                    'period': _period_label(period, granularity),
+                    'location': str(location),
+                    'property': str(prop),
+                    'label': str(self._labels[label]),
+                    'readings': int(count),
+                    'share': round(float(count) / float(totals[(period, location, prop, label)]), 4)
+                })
+
+        if self._smoke:
+            smoke = pd.concat(self._smoke).groupby(level=[0, 1, 2], observed=True).agg(
+                {'readings': 'sum', 'spike_readings': 'sum', 'episodes': 'sum', 'peak': 'max'})
+            for (period, location, sensor), row in smoke.iterrows():
+                report['smoke'].append({
+                    'period': _period_label(period, granularity),
+                    'location': str(location),
+                    'sensor': str(sensor),
+                    'readings': int(row['readings']),
+                    'spike_readings': int(row['spike_readings']),
+                    'episodes': int(row['episodes']),
+                    'peak': float(row['peak'])
+                })
+
+        if self._motion:
+            motion = pd.concat(self._motion).groupby(level=[0, 1, 2], observed=True).sum()
+            share = (motion['active'] / motion['readings']).round(4)
+            for location, grid in share.groupby(level=0, observed=True):
+                # 行为日期、列为一天中的小时，没有读数的格为None
+                grid = grid.droplevel(0).unstack('hour').reindex(columns=range(24))
+                report['motion_heatmap'][str(location)] = {
+                    'days': [_period_label(day, 'day') for day in grid.index],
+                    'hours': list(range(24)),
+                    'activity': [[None if np.isnan(value) else float(value) for value in row]
+                                 for row in grid.to_numpy(dtype=np.float64)]
+                }
+
+        return report
+
+
+def build_report(frames, registry, granularity: str = 'day',
+                 comfort_properties: Sequence[str] = DEFAULT_COMFORT_PROPERTIES) -> Dict[str, Any]:
+    """
+    由读数块生成报表
+
+    Args:
+        frames: DataFrame的可迭代对象，例如iter_reading_frames的结果
+        registry: SensorRegistry实例
+        granularity: 报表粒度（day/hour）
+        comfort_properties: 统计舒适区间占比的观测属性
+
+    Returns:
+        报表字典
+    """
+    builder = ReportBuilder(registry, granularity, comfort_properties)
+    for frame in frames:
+        builder.add(frame)
+    return builder.result()
+
+
+class ReportService:
+    """按需生成并缓存分析报表"""
+
+    def __init__(self, data_dir: str = "data", cache_dir: Optional[str] = None,
+                 block_dir: Optional[str] = None, chunk_hours: int = 24, max_cached: int = 32,
+                 comfort_properties: Sequence[str] = DEFAULT_COMFORT_PROPERTIES, clock=datetime.now,
+                 loader: Optional[PartitionLoader] = None):
+        """
+        Args:
+            data_dir: 数据根目录
+            cache_dir: 报表缓存目录，默认 data/reports
+            block_dir: 时序块目录，None表示只读取原始分区
+            chunk_hours: 每次载入的小时分区数，限制内存占用
+            max_cached: 最多保留的缓存报表数，超出时删除最早生成的
+            comfort_properties: 统计舒适区间占比的观测属性
+            clock: 当前时间函数
+            loader: 分区加载器，默认在当前线程中顺序读取
+        """
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir or os.path.join(data_dir, 'reports')
+        self.block_dir = block_dir
+        self.chunk_hours = chunk_hours
+        self.max_cached = max_cached
+        self.comfort_properties = tuple(comfort_properties)
+        self.clock = clock
+        self.loader = loader or PartitionLoader(workers=0)
+        self.metrics = {'generated': 0, 'cache_hits': 0, 'total_ms': 0.0}
+
+    def _cache_path(self, granularity: str, start: datetime, end: datetime) -> str:
+        return os.path.join(self.cache_dir,
+                            f"report_{granularity}_{start.strftime('%Y%m%d%H%M%S')}_{end.strftime('%Y%m%d%H%M%S')}.json")
+
+    def _read_cache(self, path: str, end: datetime) -> Optional[Dict[str, Any]]:
+        """缓存的报表生成于时间范围结束之后时，其数据已完整，可直接复用"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            if datetime.fromisoformat(report['generated_at']) > end:
+                return report
+        except (KeyError, TypeError, ValueError):
+            pass
+        return None
+
+    def _write_cache(self, path: str, report: Dict[str, Any]):
+        """先写临时文件再替换，并删除超出数量上限的旧报表"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+        cached = sorted((os.path.getmtime(os.path.join(self.cache_dir, name)), os.path.join(self.cache_dir, name))
+                        for name in os.listdir(self.cache_dir)
+                        if name.startswith('report_') and name.endswith('.json'))
+        for _, stale in cached[:max(0, len(cached) - self.max_cached)]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    def report(self, registry, granularity: str = 'day', start: Optional[datetime] = None,
+               end: Optional[datetime] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        获取报表
+
+        Args:
+            registry: SensorRegistry实例
+            granularity: 报表粒度（day/hour）
+            start: 起始时间（包含），默认为结束时间前7天
+            end: 结束时间（包含），默认为当前小时开始前的最后一刻，使缓存在一小时内有效
+            use_cache: 是否复用已完整的缓存报表
+
+        Returns:
+            报表字典
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"不支持的报表粒度: {granularity}")
+        if end is None:
+            end = self.clock().replace(minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
+        if start is None:
+            start = end - timedelta(days=7)
+        if start > end:
+            raise ValueError("起始时间不能晚于结束时间")
+
+        path = self._cache_path(granularity, start, end)
+        if use_cache:
+            cached = self._read_cache(path, end)
+            if cached is not None:
+                self.metrics['cache_hits'] += 1
+                return cached
+
+        started = time.perf_counter()
+        frames = iter_reading_frames(self.data_dir, start, end, self.chunk_hours, self.block_dir, self.loader)
+        report = build_report(frames, registry, granularity, self.comfort_properties)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        report.update({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'generated_at': self.clock().isoformat(),
+            'elapsed_ms': round(elapsed_ms, 1)
+        })
+        self.metrics['generated'] += 1
+        self.metrics['total_ms'] += elapsed_ms
+        self._write_cache(path, report)
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取报表服务统计信息"""
+        generated = self.metrics['generated']
+        return {
+            "生成报表数": generated,
+            "缓存命中数": self.metrics['cache_hits'],
+            "平均生成耗时ms": round(self.metrics['total_ms'] / generated, 1) if generated else 0.0
+        }
@@ -3,56 +3,451 @@
 实现传感器数据采集、语义事件生成和实时数据流处理
 """
 
+import asyncio
+import heapq
 import json
-import random
+import math
 import time
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Callable, Optional
-from queue import Queue
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from collections import deque
 import os
-import pandas as pd
+import numpy as np
 from ssn_modeling import SSNModeling
+from sensor_registry import CONFIG_DIR
+from segment_store import SegmentWriter, EncodedBatch, expand_batches, query_records
+from sensor_history import SensorHistory, encode_flags, summarize
+from reading_index import ReadingIndex
+from streaming_stats import SensorStatistics
+from fleet_simulator import FleetSimulator
+from threshold_engine import ThresholdEngine
+from deadband_filter import DeadbandFilter
+from adaptive_sampling import AdaptiveSamplingPolicy
+from pipeline_queue import BoundedQueue
+from retention import RetentionManager
+from tsblock import TSBlockStore
+from sqlite_store import SQLiteStore
+from reading_wal import ReadingWAL
+from sharded_collection import ShardedCollection
+from liveness_monitor import LivenessMonitor
+from analytics import ReportService, DEFAULT_COMFORT_PROPERTIES
+from partition_loader import PartitionLoader
+from semantic_records import Observation, ProcessedObservation, SemanticEvent
 
-class DataCollector:
-    """数据采集服务类"""
+class WriteBehindSink:
+    """写后持久化组件：有界内存缓冲 + 专用线程成组提交"""
     
-    def __init__(self, config_path: str = "config/service_config.json"):
+    def __init__(self, writers: Dict[str, SegmentWriter], max_buffer: int = 10000,
+                 flush_interval: float = 1.0, flush_batch: int = 500,
+                 database: Optional[SQLiteStore] = None, wal: Optional[ReadingWAL] = None,
+                 max_retry_interval: float = 30.0, block_timeout: float = 5.0):
         """
-        初始化数据采集器
+        初始化写后持久化组件
         
         Args:
-            config_path: 服务配置文件路径
+            writers: 数据流名称到分段写入器的映射
+            max_buffer: 缓冲区最多容纳的记录数，超出时丢弃最旧记录；启用预写日志时先阻塞等待刷写
+            flush_interval: 两次刷写之间的最长间隔（秒）
+            flush_batch: 缓冲记录数达到该值时立即刷写
+            database: 可选的SQLite存储，每次刷写的记录在一个事务中批量入库
+            wal: 可选的读数预写日志，wal数据流中的序号随同批记录落盘后推进其检查点
+            max_retry_interval: 刷写失败后重试间隔的上限（秒），间隔从flush_interval起按失败次数倍增
+            block_timeout: 启用预写日志时缓冲满后提交方最长等待秒数，超时仍按溢出丢弃
         """
-        self.config = self._load_config(config_path)
-        self.ssn_model = SSNModeling()
-        self.is_running = False
-        self.data_queue = Queue()
-        self.event_queue = Queue()
-        self.subscribers = []
-        self.collected_data = []
+        self.writers = writers
+        self.database = database
+        self.wal = wal
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_retry_interval = max_retry_interval
+        self.block_timeout = block_timeout
         
-        # 数据采集配置
-        self.sampling_interval = self.config.get('data_collection', {}).get('sampling_interval', 5)
-        self.batch_size = self.config.get('data_collection', {}).get('batch_size', 10)
-        self.real_time_processing = self.config.get('data_collection', {}).get('real_time_processing', True)
+        self._buffer = deque()
+        lock = threading.Lock()
+        # _condition唤醒刷写线程，_space唤醒等待缓冲空间的提交方
+        self._condition = threading.Condition(lock)
+        self._space = threading.Condition(lock)
+        # 已提交、尚未随刷写推进的预写日志序号，不占用缓冲容量，刷写时与当时的缓冲一起取走
+        self._checkpoint = None
+        # 丢弃过记录后检查点可能越过未落盘的读数，直到下次启动重放预写日志之前不再推进检查点
+        self._checkpoint_pinned = False
+        self._thread = None
+        self._running = False
+        # 刷写失败的批次及其已写入的目标，下次刷写时先重试，已写入的数据流不再重复写入
+        self._retry = None
+        self._failures = 0
+        self._retry_at = 0.0
         
-        # 创建数据存储目录
-        self._ensure_data_directories()
+        # 运行指标
+        self.metrics = {
+            'flush_count': 0,
+            'records_flushed': 0,
+            'records_dropped': 0,
+            'flush_errors': 0,
+            'retried_records': 0,
+            'blocked_submits': 0,
+            'peak_depth': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
     
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """加载配置文件"""
+    def submit(self, stream: str, records: List[Dict[str, Any]]):
+        """
+        提交待持久化记录
+        
+        未启用预写日志时不会阻塞调用方；启用时缓冲满则等待刷写腾出空间，
+        因为丢弃的读数只剩预写日志中的副本
+        
+        Args:
+            stream: 数据流名称（raw/processed/events/wal）
+            records: 记录列表，已编码批次（EncodedBatch）在缓冲中按一条计；wal数据流为预写日志序号
+        """
+        if not records:
+            return
+        
+        with self._condition:
+            if stream == 'wal':
+                lsn = max(records)
+                self._checkpoint = lsn if self._checkpoint is None else max(self._checkpoint, lsn)
+                return
+            
+            if self.wal is not None and self._running:
+                deadline = None
+                while self._buffer and len(self._buffer) + len(records) > self.max_buffer and self._running:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.block_timeout
+                        self.metrics['blocked_submits'] += 1
+                        self._condition.notify()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._space.wait(remaining)
+            
+            for record in records:
+                self._buffer.append((stream, record))
+            
+            overflow = len(self._buffer) - self.max_buffer
+            for _ in range(max(0, overflow)):
+                self._buffer.popleft()
+            if overflow > 0:
+                self.metrics['records_dropped'] += overflow
+                if self.wal is not None and not self._checkpoint_pinned:
+                    self._checkpoint_pinned = True
+                    print("持久化缓冲溢出，预写日志检查点暂停推进，下次启动时重放")
+            
+            depth = len(self._buffer)
+            if depth > self.metrics['peak_depth']:
+                self.metrics['peak_depth'] = depth
+            if depth >= self.flush_batch:
+                self._condition.notify()
+    
+    def start(self):
+        """启动刷写线程"""
+        if self._running:
+            return
+        self._running = True
+        # 启动后重放预写日志会重新采集检查点之后的全部读数，之前丢弃的记录由重放补齐
+        self._checkpoint_pinned = False
+        self._thread = threading.Thread(target=self._flush_loop)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """停止刷写线程，并刷写剩余数据"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+            self._space.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # 先重试失败的批次再刷写剩余数据，仍然失败时放弃
+        while self.flush() and (self._buffer or self._checkpoint is not None):
+            pass
+        if self._retry is not None:
+            self.metrics['records_dropped'] += len(self._retry[0])
+            self._retry = None
+        for writer in self.writers.values():
+            writer.close()
+        if self.database is not None:
+            self.database.close()
+    
+    def _flush_loop(self):
+        """刷写循环：按时间或数量触发成组提交，失败后按退避间隔重试"""
+        while True:
+            with self._condition:
+                if self._running:
+                    if self._retry is not None:
+                        self._condition.wait(max(0.0, self._retry_at - time.monotonic()))
+                    elif len(self._buffer) < self.flush_batch:
+                        self._condition.wait(self.flush_interval)
+                if not self._running:
+                    return
+                if self._retry is not None and time.monotonic() < self._retry_at:
+                    continue
+            self.flush()
+    
+    def flush(self) -> bool:
+        """
+        将缓冲区中的记录成组写入各数据流，上次失败的批次优先重试
+        
+        Returns:
+            是否成功，失败的批次保留到下次刷写
+        """
+        with self._condition:
+            if self._retry is not None:
+                pending, done, checkpoint = self._retry
+                self._retry = None
+                self.metrics['retried_records'] += len(pending)
+            elif self._buffer or self._checkpoint is not None:
+                pending, done, checkpoint = self._buffer, set(), self._checkpoint
+                self._buffer = deque()
+                self._checkpoint = None
+                self._space.notify_all()
+            else:
+                return True
+        
+        grouped = {}
+        for stream, record in pending:
+            grouped.setdefault(stream, []).append(record)
+        
+        start = time.perf_counter()
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+            for stream, records in grouped.items():
+                if stream in self.writers and stream not in done:
+                    self.writers[stream].append(records)
+                    done.add(stream)
+            if self.database is not None and 'database' not in done:
+                # 分片采集回传的已编码批次以其记录对象入库
+                self.database.append({stream: expand_batches(records) for stream, records in grouped.items()})
+                done.add('database')
+            # 序号之前的读数及其事件都已在本次或更早的刷写中写入，落盘后推进检查点
+            if checkpoint is not None and self.wal is not None and not self._checkpoint_pinned:
+                for writer in self.writers.values():
+                    writer.sync()
+                self.wal.checkpoint(checkpoint)
+        except Exception as e:
+            with self._condition:
+                self._retry = (pending, done, checkpoint)
+                self._failures += 1
+                delay = min(self.flush_interval * 2 ** (self._failures - 1), self.max_retry_interval)
+                self._retry_at = time.monotonic() + delay
+            self.metrics['flush_errors'] += 1
+            print(f"数据持久化错误，{delay:.1f}秒后重试: {e}")
+            return False
+        self._failures = 0
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        self.metrics['flush_count'] += 1
+        self.metrics['records_flushed'] += len(pending)
+        self.metrics['last_flush_ms'] = elapsed_ms
+        self.metrics['total_flush_ms'] += elapsed_ms
+        self.metrics['max_flush_ms'] = max(self.metrics['max_flush_ms'], elapsed_ms)
+        return True
     
-    def _ensure_data_directories(self):
-        """确保数据目录存在"""
-        directories = ['data/raw', 'data/processed', 'data/events']
-        for directory in directories:
-            os.makedirs(directory, exist_ok=True)
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取持久化指标"""
+        flush_count = self.metrics['flush_count']
+        return {
+            "缓冲区深度": len(self._buffer),
+            "缓冲区峰值": self.metrics['peak_depth'],
+            "缓冲区容量": self.max_buffer,
+            "刷写次数": flush_count,
+            "已刷写记录数": self.metrics['records_flushed'],
+            "丢弃记录数": self.metrics['records_dropped'],
+            "阻塞提交数": self.metrics['blocked_submits'],
+            "检查点暂停": self._checkpoint_pinned,
+            "刷写错误数": self.metrics['flush_errors'],
+            "重试记录数": self.metrics['retried_records'],
+            "待重试记录数": len(self._retry[0]) if self._retry is not None else 0,
+            "最近刷写耗时ms": round(self.metrics['last_flush_ms'], 3),
+            "平均刷写耗时ms": round(self.metrics['total_flush_ms'] / flush_count, 3) if flush_count else 0.0,
+            "最大刷写耗时ms": round(self.metrics['max_flush_ms'], 3)
+        }
+
+class SamplingScheduler:
+    """按传感器采样周期调度的asyncio调度器
+    
+    周期和启动相位相同的传感器归为一组，组按下次到期时间放入小顶堆，
+    每次唤醒取出所有到期的组一起交给回调，单线程即可调度数万个传感器
+    """
+    
+    def __init__(self, periods: np.ndarray, callback: Callable[[np.ndarray], None],
+                 jitter: bool = True, slot: float = 0.01, max_sleep: float = 0.5,
+                 seed: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化调度器
+        
+        Args:
+            periods: 每个传感器的采样周期（秒），下标与注册表记录序号一致
+            callback: 到期回调，参数为本次到期的传感器下标数组
+            jitter: 是否在一个周期内随机错开各传感器的启动时间，避免同时唤醒
+            slot: 启动相位的量化粒度（秒），粒度越大分组越少、每次唤醒批量越大
+            max_sleep: 单次最长休眠秒数，决定停止请求的响应速度
+            seed: 随机种子
+            clock: 单调时钟
+        """
+        self.callback = callback
+        self.max_sleep = max_sleep
+        self.clock = clock
+        self.metrics = {
+            'wakeups': 0,
+            'samples': 0,
+            'missed': 0,
+            'max_error_ms': 0.0
+        }
+        self._errors = deque(maxlen=10000)
+        
+        periods = np.asarray(periods, dtype=np.float64)
+        rng = np.random.default_rng(seed)
+        if jitter:
+            phases = np.floor(rng.uniform(0, periods) / slot) * slot
+        else:
+            phases = np.zeros(len(periods))
+        
+        # 按(周期, 相位)分组
+        keys = np.stack([periods, phases], axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique_keys) + 1))
+        
+        start = clock()
+        self._heap = []
+        for group, (period, phase) in enumerate(unique_keys):
+            indices = order[bounds[group]:bounds[group + 1]]
+            self._heap.append((start + float(phase), group, float(period), indices))
+        heapq.heapify(self._heap)
+    
+    @property
+    def group_count(self) -> int:
+        return len(self._heap)
+    
+    def poll(self) -> Optional[float]:
+        """
+        执行所有已到期的采样组
+        
+        Returns:
+            距下一组到期的秒数，没有任何传感器时为None
+        """
+        if not self._heap:
+            return None
+        
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        
+        if due:
+            self.metrics['wakeups'] += 1
+            batches = []
+            for scheduled, group, period, indices in due:
+                error = float(now - scheduled) * 1000
+                self._errors.append(error)
+                if error > self.metrics['max_error_ms']:
+                    self.metrics['max_error_ms'] = error
+                batches.append(indices)
+                
+                # 落后超过一个周期时跳过错过的采样，保持原有相位
+                next_due = scheduled + period
+                if next_due <= now:
+                    skipped = int((now - scheduled) // period)
+                    self.metrics['missed'] += skipped * len(indices)
+                    next_due = scheduled + (skipped + 1) * period
+                heapq.heappush(self._heap, (next_due, group, period, indices))
+            
+            indices = batches[0] if len(batches) == 1 else np.concatenate(batches)
+            self.metrics['samples'] += len(indices)
+            self.callback(indices)
+        
+        return max(0.0, self._heap[0][0] - self.clock())
+    
+    async def run(self, should_continue: Callable[[], bool]):
+        """
+        调度主循环
+        
+        Args:
+            should_continue: 返回False时退出循环
+        """
+        while should_continue():
+            delay = self.poll()
+            await asyncio.sleep(self.max_sleep if delay is None else min(delay, self.max_sleep))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计信息"""
+        stats = {
+            "调度组数": len(self._heap),
+            "唤醒次数": self.metrics['wakeups'],
+            "采样次数": self.metrics['samples'],
+            "错过采样数": self.metrics['missed'],
+            "最大调度误差ms": round(self.metrics['max_error_ms'], 3)
+        }
+        if self._errors:
+            p50, p99 = np.percentile(np.asarray(self._errors), [50, 99])
+            stats["调度误差p50ms"] = round(float(p50), 3)
+            stats["调度误差p99ms"] = round(float(p99), 3)
+        return stats
+
+class CollectionStage:
+    """采集与语义事件阶段
+    
+    负责模拟采样、有效性与质量评估、异常检测、阈值判定和死区过滤，不涉及队列、存储和订阅者；
+    数据采集器在本进程中使用，分片采集的各工作进程各自持有一份
+    """
+    
+    def __init__(self, config: Dict[str, Any], registry, simulation_seed: Optional[int] = None):
+        """
+        初始化采集阶段
+        
+        Args:
+            config: 服务配置
+            registry: SensorRegistry实例
+            simulation_seed: 模拟器随机种子，默认取配置中的simulation_seed
+        """
+        collection_config = config.get('data_collection', {})
+        self.config = config
+        self.sampling_interval = collection_config.get('sampling_interval', 5)
+        
+        # 调度模式：lockstep按统一采样间隔整轮采集，per_sensor按各传感器responseTime独立调度
+        self.scheduling_mode = collection_config.get('scheduling_mode', 'lockstep')
+        self.scheduler_config = collection_config.get('scheduler', {})
+        
+        # 按传感器的流式统计，用于异常检测
+        anomaly_config = dict(collection_config.get('anomaly_detection', {}))
+        self.sensor_stats = SensorStatistics(**anomaly_config)
+        
+        # 传感器注册表与向量化模拟器
+        self.simulation_seed = simulation_seed if simulation_seed is not None else collection_config.get('simulation_seed')
+        self.use_fleet(registry)
+    
+    def use_fleet(self, registry):
+        """
+        切换采集的传感器群，例如负载测试时使用合成的大规模注册表
+        
+        Args:
+            registry: SensorRegistry实例
+        """
+        self.registry = registry
+        self.simulator = FleetSimulator.from_registry(registry, self.simulation_seed)
+        self.threshold_engine = ThresholdEngine.from_config(
+            registry, self.config.get('data_collection', {}).get('thresholds', {})
+        )
+        
+        # 可选的死区过滤：数值无明显变化的读数不生成读数事件
+        deadband_config = self.config.get('data_collection', {}).get('deadband', {})
+        self.deadband = DeadbandFilter.from_config(registry, deadband_config) if deadband_config.get('enabled', False) else None
+        
+        # 可选的自适应采样（仅按传感器调度时生效）：接近阈值或快速变化时加快采样
+        adaptive_config = self.config.get('data_collection', {}).get('adaptive_sampling', {})
+        self.adaptive_sampling = None
+        if adaptive_config.get('enabled', False):
+            self.adaptive_sampling = AdaptiveSamplingPolicy.from_config(
+                registry, self.sampling_periods(), self.threshold_engine, adaptive_config,
+                min_period=self.scheduler_config.get('min_period', 0.1)
+            )
     
     def simulate_sensor_data(self, sensor_id: str) -> Optional[float]:
         """
@@ -64,59 +459,17 @@ class DataCollector:
         Returns:
             模拟的传感器值
         """
-        sensor_info = self.ssn_model.get_sensor_info(sensor_id)
-        if not sensor_info:
+        record = self.registry.get(sensor_id)
+        if not record:
             return None
-        
-        # 根据传感器类型生成模拟数据
-        if 'Temperature' in sensor_id:
-            # 温度传感器：20-30°C之间，有一定波动
-            base_temp = 25.0
-            variation = random.uniform(-3.0, 5.0)
-            # 添加时间因素（夜晚温度稍低）
-            hour = datetime.now().hour
-            if 22 <= hour or hour <= 6:
-                variation -= 2.0
-            return round(base_temp + variation, 1)
-            
-        elif 'Humidity' in sensor_id:
-            # 湿度传感器：40-80%之间
-            base_humidity = 60.0
-            variation = random.uniform(-15.0, 20.0)
-            return max(0, min(100, round(base_humidity + variation, 1)))
-            
-        elif 'Smoke' in sensor_id:
-            # 烟雾传感器：通常很低，偶尔有峰值
-            if random.random() < 0.05:  # 5%概率产生烟雾事件
-                return random.uniform(150, 300)
-            else:
-                return random.uniform(0, 50)
-                
-        elif 'Motion' in sensor_id:
-            # 人体感应器：0或1
-            # 白天活动概率高，夜晚低
-            hour = datetime.now().hour
-            if 7 <= hour <= 22:
-                return 1 if random.random() < 0.3 else 0
-            else:
-                return 1 if random.random() < 0.1 else 0
-                
-        elif 'Light' in sensor_id:
-            # 光照传感器：根据时间模拟
-            hour = datetime.now().hour
-            if 6 <= hour <= 18:
-                # 白天：300-1000 lux
-                return random.uniform(300, 1000)
-            elif 19 <= hour <= 22:
-                # 傍晚：50-300 lux
-                return random.uniform(50, 300)
-            else:
-                # 夜晚：1-50 lux
-                return random.uniform(1, 50)
-        
-        return random.uniform(0, 100)  # 默认值
+        return self._to_reading_value(record, self.simulator.sample(indices=[record.index])[0])
+    
+    @staticmethod
+    def _to_reading_value(record, value: float):
+        """人体感应器读数保持0/1整数"""
+        return int(value) if record.kind == 'motion' else float(value)
     
-    def collect_single_reading(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+    def collect_single_reading(self, sensor_id: str) -> Optional[Observation]:
         """
         采集单个传感器读数
         
@@ -126,90 +479,85 @@ class DataCollector:
         Returns:
             传感器读数数据
         """
-        value = self.simulate_sensor_data(sensor_id)
-        if value is None:
+        record = self.registry.get(sensor_id)
+        if not record:
             return None
+        value = self.simulator.sample(indices=[record.index])[0]
+        timestamp = datetime.now()
+        return self._make_reading(record, value, timestamp.isoformat(), timestamp.timestamp())
+    
+    def _make_reading(self, record, value: float, time_text: str, epoch: float) -> Observation:
+        """
+        根据传感器记录和数值构造读数
         
-        # 验证数据有效性
-        if not self.ssn_model.validate_sensor_value(sensor_id, value):
-            print(f"警告: 传感器 {sensor_id} 的值 {value} 超出有效范围")
-        
-        # 创建观测记录
-        observation = self.ssn_model.create_observation(sensor_id, value)
-        
-        # 添加额外信息
-        reading = {
-            **observation,
-            "quality": self._assess_data_quality(sensor_id, value),
-            "anomaly": self._detect_anomaly(sensor_id, value),
-            "collected_at": datetime.now().isoformat()
-        }
+        Args:
+            record: 传感器注册表中的SensorRecord
+            value: 观测值
+            time_text: ISO格式的观测时间，同一批读数共用
+            epoch: 观测时间戳
+        """
+        value = self._to_reading_value(record, value)
         
-        return reading
+        # 超出量程的读数照常保留，质量评为poor，由写入历史时计数
+        return Observation(record, value, time_text, epoch,
+                           record.assess_quality(value), self._detect_anomaly(record.id, value))
     
     def _assess_data_quality(self, sensor_id: str, value: float) -> str:
         """评估数据质量"""
-        if not self.ssn_model.validate_sensor_value(sensor_id, value):
+        record = self.registry.get(sensor_id)
+        if not record:
             return "poor"
-        
-        # 简单的质量评估逻辑
-        sensor_info = self.ssn_model.get_sensor_info(sensor_id)
-        properties = sensor_info.get('properties', {})
-        range_info = properties.get('range', {})
-        
-        if 'min' in range_info and 'max' in range_info:
-            range_size = range_info['max'] - range_info['min']
-            # 如果值在中间80%范围内，认为质量好
-            middle_min = range_info['min'] + 0.1 * range_size
-            middle_max = range_info['max'] - 0.1 * range_size
-            
-            if middle_min <= value <= middle_max:
-                return "good"
-            else:
-                return "fair"
-        
-        return "good"
+        return record.assess_quality(value)
     
     def _detect_anomaly(self, sensor_id: str, value: float) -> bool:
         """检测异常值"""
-        # 简单的异常检测：基于历史数据的统计分析
-        if len(self.collected_data) < 10:
-            return False
+        # 基于该传感器流式统计量的3-sigma规则检测，并将当前值计入统计
+        return self.sensor_stats.observe(sensor_id, value)
+    
+    def collect_all_sensors(self) -> List[Observation]:
+        """采集所有传感器数据"""
+        # 一次向量化调用生成整轮采样数据
+        values = self.simulator.sample().tolist()
+        timestamp = datetime.now()
+        time_text = timestamp.isoformat()
+        epoch = timestamp.timestamp()
         
-        # 获取该传感器的历史数据
-        sensor_data = [
-            reading for reading in self.collected_data[-50:]
-            if reading.get('madeBySensor') == sensor_id
+        return [
+            self._make_reading(record, value, time_text, epoch)
+            for record, value in zip(self.registry.records, values)
         ]
-        
-        if len(sensor_data) < 5:
-            return False
-        
-        # 计算统计参数
-        values = [reading['hasResult']['value'] for reading in sensor_data]
-        mean_val = sum(values) / len(values)
-        variance = sum((x - mean_val) ** 2 for x in values) / len(values)
-        std_dev = variance ** 0.5
-        
-        # 3-sigma规则检测异常
-        if abs(value - mean_val) > 3 * std_dev:
-            return True
-        
-        return False
     
-    def collect_all_sensors(self) -> List[Dict[str, Any]]:
-        """采集所有传感器数据"""
-        readings = []
-        sensors = self.ssn_model.ssn_config.get('sensors', [])
+    def collect_sensors(self, indices: np.ndarray) -> List[Observation]:
+        """
+        采集指定传感器的数据
         
-        for sensor in sensors:
-            reading = self.collect_single_reading(sensor['id'])
-            if reading:
-                readings.append(reading)
+        Args:
+            indices: 传感器在注册表中的序号数组
+            
+        Returns:
+            传感器读数列表
+        """
+        values = self.simulator.sample(indices=indices).tolist()
+        timestamp = datetime.now()
+        time_text = timestamp.isoformat()
+        epoch = timestamp.timestamp()
+        records = self.registry.records
         
-        return readings
+        return [
+            self._make_reading(records[index], value, time_text, epoch)
+            for index, value in zip(indices.tolist(), values)
+        ]
+    
+    def sampling_periods(self) -> np.ndarray:
+        """各传感器的采样周期：取responseTime，未声明时使用统一采样间隔"""
+        min_period = self.scheduler_config.get('min_period', 0.1)
+        periods = [
+            record.response_time if record.response_time else self.sampling_interval
+            for record in self.registry.records
+        ]
+        return np.maximum(np.asarray(periods, dtype=np.float64), min_period)
     
-    def generate_semantic_events(self, readings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def generate_semantic_events(self, readings: List[Observation]) -> List[SemanticEvent]:
         """
         生成语义事件
         
@@ -220,144 +568,320 @@ class DataCollector:
             语义事件列表
         """
         events = []
+        if not readings:
+            return events
         
-        for reading in readings:
-            # 基础语义事件
-            base_event = {
-                "id": f"event_{reading['id']}",
-                "type": "SemanticEvent",
-                "eventType": "SensorReading",
-                "source": reading['madeBySensor'],
-                "timestamp": reading['resultTime'],
-                "data": reading,
-                "semantics": {
-                    "property": reading['observedProperty'].split(':')[-1],
-                    "location": self._get_sensor_location(reading['madeBySensor']),
-                    "value_interpretation": self._interpret_value(reading)
-                }
-            }
-            events.append(base_event)
+        # 整批读数一次性做阈值判定、死区过滤和数值解释
+        indices = np.fromiter((reading.record.index for reading in readings), dtype=np.int64, count=len(readings))
+        values = np.fromiter((reading.value for reading in readings), dtype=np.float64, count=len(readings))
+        threshold_events = self._check_thresholds(readings, indices, values)
+        forwarded = self._apply_deadband(readings, indices, values, threshold_events)
+        interpretations = self.registry.interpret_batch(indices, values)
+        
+        for position, reading in enumerate(readings):
+            # 基础语义事件，引用读数本身而不复制；死区内的读数不生成
+            if forwarded is None or forwarded[position]:
+                events.append(SemanticEvent.sensor_reading(reading, reading.record.location,
+                                                           interpretations[position]))
             
             # 特殊条件下的语义事件
-            special_events = self._generate_special_events(reading)
-            events.extend(special_events)
+            events.extend(self._generate_special_events(reading))
+            events.extend(threshold_events.get(position, []))
         
         return events
     
-    def _get_sensor_location(self, sensor_id: str) -> str:
-        """获取传感器位置"""
-        sensor_info = self.ssn_model.get_sensor_info(sensor_id)
-        return sensor_info.get('location', '未知')
-    
-    def _interpret_value(self, reading: Dict[str, Any]) -> str:
-        """解释传感器值"""
-        value = reading['hasResult']['value']
-        sensor_id = reading['madeBySensor']
-        
-        if 'Temperature' in sensor_id:
-            if value < 18:
-                return "偏冷"
-            elif value > 28:
-                return "偏热"
-            else:
-                return "适宜"
-                
-        elif 'Humidity' in sensor_id:
-            if value < 40:
-                return "干燥"
-            elif value > 70:
-                return "潮湿"
-            else:
-                return "适宜"
-                
-        elif 'Smoke' in sensor_id:
-            if value > 200:
-                return "高浓度"
-            elif value > 100:
-                return "中等浓度"
-            else:
-                return "正常"
-                
-        elif 'Motion' in sensor_id:
-            return "有人活动" if value > 0 else "无人活动"
+    def processed_readings(self, readings: List[Observation], events: List[SemanticEvent]) -> List[Observation]:
+        """需要保存为处理后数据的读数，被死区过滤的读数只保留在原始数据中"""
+        if self.deadband is None:
+            return readings
+        return [event.reading for event in events if event.event_type == 'SensorReading']
+    
+    def _apply_deadband(self, readings: List[Observation], indices: np.ndarray, values: np.ndarray,
+                        threshold_events: Dict[int, List[SemanticEvent]]) -> Optional[np.ndarray]:
+        """
+        死区过滤：判定哪些读数需要生成读数事件
+        
+        Args:
+            readings: 传感器读数列表
+            indices: 读数对应的传感器序号
+            values: 读数数值
+            threshold_events: 读数位置到阈值事件的映射，越限和异常读数总会转发
             
-        elif 'Light' in sensor_id:
-            if value < 50:
-                return "昏暗"
-            elif value > 500:
-                return "明亮"
-            else:
-                return "适中"
+        Returns:
+            与读数一一对应的布尔数组，未启用死区过滤时返回None
+        """
+        if self.deadband is None or not readings:
+            return None
         
-        return "正常"
+        count = len(readings)
+        epochs = np.fromiter((reading.epoch for reading in readings), dtype=np.float64, count=count)
+        force = np.fromiter((reading.anomaly for reading in readings), dtype=bool, count=count)
+        force[list(threshold_events)] = True
+        return self.deadband.evaluate(indices, values, epochs, force)
     
-    def _generate_special_events(self, reading: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_special_events(self, reading: Observation) -> List[SemanticEvent]:
         """生成特殊语义事件"""
         events = []
-        value = reading['hasResult']['value']
-        sensor_id = reading['madeBySensor']
         
         # 异常值事件
-        if reading.get('anomaly', False):
-            events.append({
-                "id": f"anomaly_{reading['id']}",
-                "type": "SemanticEvent",
-                "eventType": "AnomalyDetected",
-                "source": sensor_id,
-                "timestamp": reading['resultTime'],
-                "severity": "medium",
-                "description": f"检测到异常值: {value}"
-            })
-        
-        # 阈值事件
-        threshold_events = self._check_thresholds(sensor_id, value, reading['resultTime'])
-        events.extend(threshold_events)
+        if reading.anomaly:
+            events.append(SemanticEvent.anomaly(reading))
         
         return events
     
-    def _check_thresholds(self, sensor_id: str, value: float, timestamp: str) -> List[Dict[str, Any]]:
-        """检查阈值并生成事件"""
-        events = []
-        
-        # 定义阈值规则
-        thresholds = {
-            'temperatureSensor_001': {'high': 30, 'low': 15},
-            'humiditySensor_001': {'high': 80, 'low': 30},
-            'smokeSensor_001': {'high': 200, 'low': None},
-            'lightSensor_001': {'high': 1000, 'low': 10}
-        }
+    def _check_thresholds(self, readings: List[Observation], indices: np.ndarray,
+                          values: np.ndarray) -> Dict[int, List[SemanticEvent]]:
+        """
+        检查阈值并生成事件
         
-        sensor_key = sensor_id.split(':')[-1]
-        if sensor_key in thresholds:
-            threshold_config = thresholds[sensor_key]
-            
-            if threshold_config.get('high') and value > threshold_config['high']:
-                events.append({
-                    "id": f"threshold_high_{sensor_id}_{int(datetime.fromisoformat(timestamp).timestamp())}",
-                    "type": "SemanticEvent",
-                    "eventType": "ThresholdExceeded",
-                    "source": sensor_id,
-                    "timestamp": timestamp,
-                    "threshold_type": "high",
-                    "threshold_value": threshold_config['high'],
-                    "actual_value": value,
-                    "severity": "high" if 'smoke' in sensor_id.lower() else "medium"
-                })
+        Args:
+            readings: 传感器读数列表
+            indices: 读数对应的传感器序号
+            values: 读数数值
             
-            if threshold_config.get('low') and value < threshold_config['low']:
-                events.append({
-                    "id": f"threshold_low_{sensor_id}_{int(datetime.fromisoformat(timestamp).timestamp())}",
-                    "type": "SemanticEvent",
-                    "eventType": "ThresholdExceeded",
-                    "source": sensor_id,
-                    "timestamp": timestamp,
-                    "threshold_type": "low",
-                    "threshold_value": threshold_config['low'],
-                    "actual_value": value,
-                    "severity": "medium"
-                })
+        Returns:
+            读数位置到该读数触发的阈值事件列表的映射
+        """
+        high_positions, low_positions = self.threshold_engine.evaluate(indices, values)
+        
+        events = {}
+        for threshold_type, positions in (('high', high_positions), ('low', low_positions)):
+            for position in positions.tolist():
+                index = indices[position]
+                low, high = self.threshold_engine.limits(index)
+                events.setdefault(position, []).append(SemanticEvent.threshold(
+                    readings[position],
+                    threshold_type,
+                    high if threshold_type == 'high' else low,
+                    self.threshold_engine.severity(index, threshold_type)
+                ))
         
         return events
+
+class DataCollector(CollectionStage):
+    """数据采集服务类"""
+    
+    def __init__(self, config_path: str = os.path.join(CONFIG_DIR, 'service_config.json'),
+                 data_dir: str = 'data'):
+        """
+        初始化数据采集器
+        
+        Args:
+            config_path: 服务配置文件路径
+            data_dir: 分段、汇总、时序块和报表缓存的数据根目录
+        """
+        self.data_dir = data_dir
+        self.ssn_model = SSNModeling()
+        super().__init__(self._load_config(config_path), self.ssn_model.registry)
+        self.is_running = False
+        self.subscribers = []
+        
+        # 有界流水线队列：采集线程 -> 处理线程，语义事件由处理线程直接通知订阅者
+        queue_config = self.config.get('data_collection', {}).get('queue', {})
+        self.batch_timeout = queue_config.get('batch_timeout', 0.5)
+        self.data_queue = BoundedQueue(
+            queue_config.get('data_capacity', 10000),
+            policy=queue_config.get('data_overflow_policy', 'block'),
+            is_important=self._is_important_reading,
+            block_timeout=queue_config.get('block_timeout')
+        )
+        
+        # 数据采集配置
+        self.batch_size = self.config.get('data_collection', {}).get('batch_size', 10)
+        self.real_time_processing = self.config.get('data_collection', {}).get('real_time_processing', True)
+        
+        self.scheduler = None
+        
+        # 调度器、定时采集与外部接入可能并发写入索引和统计量
+        self._ingest_lock = threading.Lock()
+        self.external_readings = 0
+        # 超出传感器量程的读数数量（不逐条打印，避免拖慢采集和接入）
+        self.out_of_range_readings = 0
+        self.external_unknown = 0
+        self.external_invalid = 0
+        
+        # 最近读数（供接口展示）与按传感器的数值历史
+        self.collected_data = ReadingIndex(
+            self.config.get('data_collection', {}).get('recent_capacity', 50000),
+            self.config.get('data_collection', {}).get('recent_per_sensor_capacity'),
+            len(self.registry.records)
+        )
+        self.history = SensorHistory(self.config.get('data_collection', {}).get('history_capacity', 100000))
+        
+        # 创建数据存储目录
+        self._ensure_data_directories()
+        
+        # 追加写入的分段存储
+        storage_config = self.config.get('data_collection', {}).get('storage', {})
+        writer_options = {
+            'max_segment_bytes': storage_config.get('segment_max_bytes', 64 * 1024 * 1024),
+            'fsync_interval': storage_config.get('fsync_interval', 1.0),
+            'fsync_bytes': storage_config.get('fsync_bytes', 1024 * 1024)
+        }
+        # 读数按观测时间分区，迟到、重放和外部上报的读数写入其所属小时
+        self.raw_writer = SegmentWriter(os.path.join(data_dir, 'raw'), 'sensor_data', time_field='resultTime',
+                                        **writer_options)
+        self.processed_writer = SegmentWriter(os.path.join(data_dir, 'processed'), 'processed_data',
+                                              time_field='resultTime', **writer_options)
+        # 事件分段随写入维护按分钟、事件类型和严重程度的稀疏索引
+        self.event_writer = SegmentWriter(os.path.join(data_dir, 'events'), 'events',
+                                          index_fields=('eventType', 'severity'), **writer_options)
+        
+        # 可选的SQLite存储，提供按传感器/位置和时间的索引查询
+        sqlite_config = self.config.get('data_collection', {}).get('sqlite', {})
+        self.database = None
+        if sqlite_config.get('enabled', False):
+            self.database = SQLiteStore(
+                sqlite_config.get('path', os.path.join(data_dir, 'smart_home.db')),
+                synchronous=sqlite_config.get('synchronous', 'NORMAL')
+            )
+        
+        # 可选的读数预写日志：读数先追加到日志再进入队列，持久化后推进检查点，重启时重放
+        wal_config = self.config.get('data_collection', {}).get('wal', {})
+        self.wal = None
+        if wal_config.get('enabled', False):
+            self.wal = ReadingWAL(
+                wal_config.get('directory', os.path.join(data_dir, 'wal')),
+                sync_interval=wal_config.get('sync_interval', 0.05),
+                segment_bytes=wal_config.get('segment_bytes', 4 * 1024 * 1024)
+            )
+        self.wal_checkpoint_interval = wal_config.get('checkpoint_interval', 1.0)
+        self.wal_durable_ack = wal_config.get('durable_ack', True)
+        # 处理线程按标记确认已处理的读数: (本批最后一条读数, 序号)，分片批次的确认标记读数为None
+        self._wal_marks = deque()
+        self._wal_marks_lock = threading.Lock()
+        self._last_wal_checkpoint = 0.0
+        self._processing_thread = None
+        
+        # 可选的分片采集：按传感器或平台将采集和语义事件生成分布到多个工作进程
+        sharding_config = self.config.get('data_collection', {}).get('sharding', {})
+        self.sharding = None
+        if sharding_config.get('enabled', False):
+            self.sharding = ShardedCollection(
+                self.config,
+                self._ingest_processed,
+                statistics=self.sensor_stats,
+                shards=sharding_config.get('shards', 0),
+                key=sharding_config.get('key', 'sensor'),
+                stats_interval=sharding_config.get('stats_interval', 5.0),
+                queue_capacity=sharding_config.get('queue_capacity', 64)
+            )
+        
+        # 传感器在线监测：按预期上报周期在时间轮中跟踪截止时间，生成离线/恢复事件
+        liveness_config = self.config.get('data_collection', {}).get('liveness', {})
+        self.liveness = None
+        if liveness_config.get('enabled', False):
+            self.liveness = LivenessMonitor(
+                self.expected_periods(),
+                timeout_factor=liveness_config.get('timeout_factor', 3.0),
+                min_timeout=liveness_config.get('min_timeout', 5.0),
+                tick=liveness_config.get('tick', 0.5),
+                severity=liveness_config.get('severity', 'high')
+            )
+        
+        # 写后持久化，采集与处理线程不直接访问磁盘
+        write_behind_config = self.config.get('data_collection', {}).get('write_behind', {})
+        self.persistence = WriteBehindSink(
+            {'raw': self.raw_writer, 'processed': self.processed_writer, 'events': self.event_writer},
+            max_buffer=write_behind_config.get('max_buffer', 10000),
+            flush_interval=write_behind_config.get('flush_interval', 1.0),
+            flush_batch=write_behind_config.get('flush_batch', 500),
+            database=self.database,
+            wal=self.wal,
+            max_retry_interval=write_behind_config.get('max_retry_interval', 30.0),
+            block_timeout=write_behind_config.get('block_timeout', 5.0)
+        )
+        
+        # 历史分区的并行加载器，汇总回填、分析报表和回放共用
+        loader_config = self.config.get('data_collection', {}).get('loader', {})
+        self.loader = PartitionLoader(loader_config.get('workers'), loader_config.get('prefetch'))
+        
+        # 过期分区清理与分层汇总，可选地将已结束小时的原始读数压缩为时序块
+        retention_config = self.config.get('data_collection', {}).get('retention', {})
+        tsblock_config = retention_config.get('tsblock', {})
+        self.block_store = None
+        if tsblock_config.get('enabled', False):
+            self.block_store = TSBlockStore(
+                os.path.join(data_dir, 'tsblocks'),
+                resolutions={record.id: record.resolution for record in self.registry.records if record.resolution},
+                block_size=tsblock_config.get('block_size', 4096)
+            )
+        self.retention = RetentionManager(
+            data_dir,
+            retention_days=self.config.get('data_collection', {}).get('data_retention_days', 30),
+            rollup_retention_days=retention_config.get('rollup_retention_days'),
+            interval=retention_config.get('interval', 3600),
+            block_store=self.block_store,
+            block_retention_days=tsblock_config.get('retention_days', 365),
+            database=self.database,
+            loader=self.loader
+        )
+        
+        # 基于已存储历史数据的分析报表，已压缩的小时直接读取时序块
+        analytics_config = self.config.get('data_collection', {}).get('analytics', {})
+        self.analytics = ReportService(
+            data_dir,
+            block_dir=self.block_store.directory if self.block_store else None,
+            chunk_hours=analytics_config.get('chunk_hours', 24),
+            max_cached=analytics_config.get('max_cached', 32),
+            comfort_properties=analytics_config.get('comfort_properties', DEFAULT_COMFORT_PROPERTIES),
+            loader=self.loader
+        )
+    
+    def _load_config(self, config_path: str) -> Dict[str, Any]:
+        """加载配置文件"""
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def use_fleet(self, registry):
+        """
+        切换采集的传感器群，在线监测按新的注册表重建
+        
+        Args:
+            registry: SensorRegistry实例
+        """
+        super().use_fleet(registry)
+        # 初始化时父类先于在线监测调用本方法
+        if getattr(self, 'liveness', None) is not None:
+            self.liveness.reset(self.expected_periods())
+    
+    def expected_periods(self) -> np.ndarray:
+        """各传感器的预期上报周期：整轮采集为采样间隔，按传感器调度为采样周期，启用自适应采样时取最长周期"""
+        if self.scheduling_mode != 'per_sensor':
+            return np.full(len(self.registry), float(self.sampling_interval))
+        if self.adaptive_sampling is not None:
+            return self.adaptive_sampling.max_periods
+        return self.sampling_periods()
+    
+    def _ensure_data_directories(self):
+        """确保数据目录存在"""
+        for subdir in ('raw', 'processed', 'events'):
+            os.makedirs(os.path.join(self.data_dir, subdir), exist_ok=True)
+    
+    def _record_history(self, readings: List[Observation]):
+        """
+        将读数写入最近读数索引和数值历史
+        
+        Args:
+            readings: 传感器读数列表
+        """
+        for reading in readings:
+            sensor_id = reading.record.id
+            self.collected_data.add(sensor_id, reading.epoch, reading)
+            self.history.record(sensor_id, reading.epoch, reading.value,
+                                encode_flags(reading.quality, reading.anomaly))
+            if reading.quality == 'poor':
+                self.out_of_range_readings += 1
+        if self.liveness is not None:
+            self.liveness.observe(readings)
+    
+    @staticmethod
+    def _is_important_reading(reading: Observation) -> bool:
+        """异常或质量不佳的读数在队列溢出时优先保留"""
+        return reading.anomaly or reading.quality != 'good'
     
     def subscribe_to_events(self, callback: Callable[[Dict[str, Any]], None]):
         """
@@ -383,171 +907,493 @@ class DataCollector:
             return
         
         self.is_running = True
+        self.data_queue.reopen()
+        if self.wal is not None:
+            self.wal.start()
+        self.persistence.start()
+        self.retention.start()
+        
+        if self.real_time_processing:
+            self._processing_thread = threading.Thread(target=self._processing_loop)
+            self._processing_thread.daemon = True
+            self._processing_thread.start()
+        
+        # 处理线程就绪后重放上次运行未完成持久化的读数，再开始新的采集
+        self._replay_wal()
+        if self.liveness is not None:
+            self.liveness.start(self._dispatch_liveness_events)
+        
+        if self.sharding is not None:
+            self.sharding.start(self.registry)
+            print(f"数据采集已启动，{self.sharding.shards}个分片工作进程（按{self.sharding.key}分片）")
+            return
+        
         collection_thread = threading.Thread(target=self._collection_loop)
         collection_thread.daemon = True
         collection_thread.start()
         
-        if self.real_time_processing:
-            processing_thread = threading.Thread(target=self._processing_loop)
-            processing_thread.daemon = True
-            processing_thread.start()
-        
-        print(f"数据采集已启动，采样间隔: {self.sampling_interval}秒")
+        if self.scheduling_mode == 'per_sensor':
+            print("数据采集已启动，按传感器采样周期调度")
+        else:
+            print(f"数据采集已启动，采样间隔: {self.sampling_interval}秒")
     
     def _collection_loop(self):
         """数据采集循环"""
+        if self.scheduling_mode == 'per_sensor':
+            self._scheduled_collection_loop()
+            return
+        
         while self.is_running:
             try:
                 # 采集所有传感器数据
-                readings = self.collect_all_sensors()
-                
-                # 存储数据
-                self.collected_data.extend(readings)
-                
-                # 限制内存中数据量
-                if len(self.collected_data) > 1000:
-                    self.collected_data = self.collected_data[-500:]
-                
-                # 将数据加入队列进行处理
-                for reading in readings:
-                    self.data_queue.put(reading)
-                
-                # 批量保存数据
-                if len(readings) > 0:
-                    self._save_raw_data(readings)
-                
+                with self._ingest_lock:
+                    self._ingest(self.collect_all_sensors())
                 time.sleep(self.sampling_interval)
                 
             except Exception as e:
                 print(f"数据采集错误: {e}")
                 time.sleep(self.sampling_interval)
     
+    def _scheduled_collection_loop(self):
+        """按传感器采样周期调度的采集循环，在采集线程中运行独立的事件循环"""
+        # 启用自适应采样时调度器按最短周期触发，由策略决定实际采样的传感器
+        periods = self.adaptive_sampling.min_periods if self.adaptive_sampling else self.sampling_periods()
+        self.scheduler = SamplingScheduler(
+            periods,
+            self._collect_due,
+            jitter=self.scheduler_config.get('jitter', True),
+            slot=self.scheduler_config.get('slot', 0.01),
+            seed=self.simulation_seed
+        )
+        asyncio.run(self.scheduler.run(lambda: self.is_running))
+    
+    def _collect_due(self, indices: np.ndarray):
+        """调度器回调：采集本次到期的传感器"""
+        try:
+            if self.adaptive_sampling is not None:
+                indices = self.adaptive_sampling.due(indices, time.monotonic())
+                if len(indices) == 0:
+                    return
+            with self._ingest_lock:
+                readings = self.collect_sensors(indices)
+                self._ingest(readings)
+            if self.adaptive_sampling is not None:
+                self.adaptive_sampling.update(indices, [reading.value for reading in readings],
+                                              [reading.epoch for reading in readings])
+        except Exception as e:
+            print(f"数据采集错误: {e}")
+    
+    def ingest_external(self, sensor_ids: List[str], values: List[float],
+                        epochs: List[float]) -> Tuple[int, int]:
+        """
+        接收外部上报的一批读数（例如网络接入服务解码后的数据）
+        
+        Args:
+            sensor_ids: 传感器ID列表，支持不带命名空间前缀的ID
+            values: 观测值列表
+            epochs: 观测时间戳列表
+            
+        Returns:
+            (接收的读数数量, 拒绝的读数数量)，未登记的传感器、非有限数值和无法表示的时间戳计为拒绝
+        """
+        resolve = self.registry.resolve
+        fromtimestamp = datetime.fromtimestamp
+        isfinite = math.isfinite
+        with self._ingest_lock:
+            readings = []
+            unknown = 0
+            for sensor_id, value, epoch in zip(sensor_ids, values, epochs):
+                record = resolve(sensor_id)
+                if record is None:
+                    unknown += 1
+                    continue
+                if not isfinite(value):
+                    continue
+                # 逐条校验时间戳，单条读数越界不影响同批其他读数
+                try:
+                    time_text = fromtimestamp(epoch).isoformat()
+                except (OverflowError, OSError, ValueError, TypeError):
+                    continue
+                readings.append(self._make_reading(record, value, time_text, epoch))
+            lsn = self._ingest(readings)
+            self.external_readings += len(readings)
+            self.external_unknown += unknown
+            self.external_invalid += len(sensor_ids) - len(readings) - unknown
+        # 在锁外等待成组fsync，并发上报的多个批次共享一次落盘
+        if lsn is not None and self.wal_durable_ack:
+            self.wal.wait_durable(lsn)
+        return len(readings), len(sensor_ids) - len(readings)
+    
+    def _ingest(self, readings: List[Observation]) -> Optional[int]:
+        """
+        接收一批读数：追加预写日志、写入索引和历史、持久化原始数据并送入处理队列
+        
+        Args:
+            readings: 传感器读数列表
+            
+        Returns:
+            本批在预写日志中的最大序号，未启用预写日志时为None
+        """
+        if not readings:
+            return None
+        
+        lsn = self.wal.append(readings) if self.wal is not None else None
+        
+        # 存储数据
+        self._record_history(readings)
+        
+        # 批量保存数据，先于入队提交，保证检查点标记不会早于本批原始数据进入持久化缓冲
+        self._save_raw_data(readings)
+        
+        # 将数据加入队列进行处理，队列满时按溢出策略阻塞或丢弃
+        if self.real_time_processing and self.is_running:
+            self._mark_wal(readings[-1], lsn)
+            self.data_queue.put_many(readings)
+        elif lsn is not None:
+            # 不经过处理线程的读数，原始数据落盘即可推进检查点
+            self._submit_wal_checkpoint(lsn)
+        return lsn
+    
+    def _ingest_processed(self, readings: List[Observation], events: List[SemanticEvent],
+                          encoded: Dict[str, EncodedBatch]):
+        """
+        接收分片工作进程已生成语义事件的一批读数：追加预写日志、写入索引和历史，持久化并分发事件
+        
+        Args:
+            readings: 传感器读数列表
+            events: 由这些读数生成的语义事件
+            encoded: 工作进程已编码的raw/processed/events数据流
+        """
+        if not readings:
+            return
+        
+        with self._ingest_lock:
+            lsn = self.wal.append(readings) if self.wal is not None else None
+            self._record_history(readings)
+            self.persistence.submit('raw', [encoded['raw']])
+        
+        self._dispatch_events(readings, events, encoded)
+        self._confirm_wal(lsn)
+    
+    def _mark_wal(self, reading: Observation, lsn: Optional[int]):
+        """为入队的一批读数记录标记，处理线程处理到该读数时确认序号之前的读数均已处理"""
+        if lsn is None:
+            return
+        with self._wal_marks_lock:
+            self._wal_marks.append((reading, lsn))
+    
+    def _submit_wal_checkpoint(self, lsn: int):
+        """按检查点间隔将已确认的序号送入持久化，随同批记录落盘后推进检查点；间隔内的序号由下一次确认覆盖"""
+        now = time.monotonic()
+        if now - self._last_wal_checkpoint < self.wal_checkpoint_interval:
+            return
+        self._last_wal_checkpoint = now
+        self.persistence.submit('wal', [lsn])
+    
+    def _confirm_wal(self, lsn: Optional[int]):
+        """
+        确认已提交持久化的分片批次
+        
+        处理队列中仍有未确认的标记时排在其后，由处理线程释放，避免检查点越过尚未处理的读数
+        """
+        if lsn is None:
+            return
+        with self._wal_marks_lock:
+            if self._wal_marks:
+                self._wal_marks.append((None, lsn))
+                return
+        self._submit_wal_checkpoint(lsn)
+    
+    def _release_wal_marks(self, batch: List[Observation]):
+        """
+        确认本批处理完成的标记，并将其序号随已提交的事件一起送入持久化
+        
+        队列整体先进先出，标记读数出现在批次中时之前的读数都已处理或被溢出策略丢弃
+        """
+        with self._wal_marks_lock:
+            if not self._wal_marks:
+                return
+            ids = {id(reading) for reading in batch}
+            released = None
+            for position, (reading, lsn) in enumerate(self._wal_marks):
+                if id(reading) in ids:
+                    released = position
+            if released is None:
+                return
+            lsn = self._wal_marks[released][1]
+            for _ in range(released + 1):
+                self._wal_marks.popleft()
+            # 紧随其后、已由分片批次确认的标记一并释放
+            while self._wal_marks and self._wal_marks[0][0] is None:
+                lsn = max(lsn, self._wal_marks.popleft()[1])
+        self._submit_wal_checkpoint(lsn)
+    
+    def _replay_wal(self) -> int:
+        """
+        重放预写日志中检查点之后的读数
+        
+        重放的读数重新追加到日志，落盘后即可推进旧记录的检查点
+        
+        Returns:
+            重放的读数数量
+        """
+        if self.wal is None:
+            return 0
+        entries = self.wal.pending()
+        if not entries:
+            return 0
+        
+        readings = []
+        for _, sensor_id, value, epoch, quality, anomaly in entries:
+            record = self.registry.get(sensor_id)
+            if record is None:
+                continue
+            readings.append(Observation(record, value, datetime.fromtimestamp(epoch).isoformat(),
+                                        epoch, quality, anomaly))
+        with self._ingest_lock:
+            for start in range(0, len(readings), 1000):
+                self._ingest(readings[start:start + 1000])
+        self.wal.sync()
+        self.wal.checkpoint(entries[-1][0])
+        print(f"已从预写日志重放 {len(readings)} 条读数")
+        return len(readings)
+    
     def _processing_loop(self):
         """数据处理循环"""
-        batch = []
         while self.is_running:
             try:
-                # 收集批量数据
-                while len(batch) < self.batch_size and not self.data_queue.empty():
-                    batch.append(self.data_queue.get())
+                # 阻塞等待，攒满一批或超时后立即处理
+                batch = self.data_queue.get_batch(self.batch_size, self.batch_timeout)
+                if not batch:
+                    continue
                 
-                if batch:
-                    # 生成语义事件
-                    events = self.generate_semantic_events(batch)
-                    
-                    # 处理事件
-                    for event in events:
-                        self.event_queue.put(event)
-                        self._notify_subscribers(event)
-                    
-                    # 保存处理后的数据和事件
-                    self._save_processed_data(batch)
-                    self._save_events(events)
-                    
-                    batch = []
-                
-                time.sleep(1)  # 短暂等待
+                # 生成语义事件
+                events = self.generate_semantic_events(batch)
+                self._dispatch_events(batch, events)
+                self._release_wal_marks(batch)
                 
             except Exception as e:
                 print(f"数据处理错误: {e}")
-                time.sleep(1)
+    
+    def _dispatch_events(self, batch: List[Observation], events: List[SemanticEvent],
+                         encoded: Optional[Dict[str, EncodedBatch]] = None):
+        """
+        分发语义事件并保存处理后的数据和事件
+        
+        Args:
+            batch: 已处理的读数
+            events: 由这些读数生成的语义事件
+            encoded: 分片工作进程已编码的数据流，提供时直接提交而不再逐条序列化
+        """
+        for event in events:
+            self._notify_subscribers(event)
+        
+        if encoded is not None:
+            self.persistence.submit('processed', [encoded['processed']])
+            self.persistence.submit('events', [encoded['events']])
+            return
+        self._save_processed_data(self.processed_readings(batch, events))
+        self._save_events(events)
+    
+    def _dispatch_liveness_events(self, events: List[SemanticEvent]):
+        """在线监测回调：分发并保存离线/恢复事件"""
+        self._dispatch_events([], events)
+    
+    def get_offline_sensors(self) -> Dict[str, str]:
+        """获取当前离线的传感器及判定离线的时间"""
+        return self.liveness.offline_sensors() if self.liveness else {}
     
     def stop_continuous_collection(self):
         """停止连续数据采集"""
         self.is_running = False
+        # 在线监测最先停止，停止过程中不再上报的传感器不应判定为离线
+        if self.liveness is not None:
+            self.liveness.stop()
+        # 先停止分片工作进程，已回传的批次仍会处理和持久化
+        if self.sharding is not None:
+            self.sharding.stop()
+        # 唤醒阻塞在队列上的采集和处理线程
+        self.data_queue.close()
+        if self._processing_thread is not None:
+            self._processing_thread.join(5.0)
+            self._processing_thread = None
+        # 处理线程退出后，已接收的读数都已提交持久化（队列中未处理的只保存原始数据），随最后一次刷写推进检查点
+        if self.wal is not None:
+            with self._ingest_lock:
+                self.persistence.submit('wal', [self.wal.last_lsn])
+        self.retention.stop()
+        self.loader.close()
+        self.persistence.stop()
+        if self.wal is not None:
+            self.wal.stop()
         print("数据采集已停止")
     
     def _save_raw_data(self, readings: List[Dict[str, Any]]):
         """保存原始数据"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H")
-        filename = f"data/raw/sensor_data_{timestamp}.json"
-        
-        # 读取现有数据
-        existing_data = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except:
-                existing_data = []
-        
-        # 添加新数据
-        existing_data.extend(readings)
-        
-        # 保存数据
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
+        self.persistence.submit('raw', readings)
     
-    def _save_processed_data(self, readings: List[Dict[str, Any]]):
+    def _save_processed_data(self, readings: List[Observation]):
         """保存处理后的数据"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H")
-        filename = f"data/processed/processed_data_{timestamp}.json"
-        
-        # 添加处理信息
-        processed_readings = []
-        for reading in readings:
-            processed_reading = {
-                **reading,
-                "processed_at": datetime.now().isoformat(),
-                "processing_version": "1.0"
-            }
-            processed_readings.append(processed_reading)
-        
-        # 读取现有数据并追加
-        existing_data = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except:
-                existing_data = []
-        
-        existing_data.extend(processed_readings)
+        processed_at = datetime.now().isoformat()
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
+        # 添加处理信息，只包装不复制，序列化时才展开
+        self.persistence.submit('processed', [ProcessedObservation(reading, processed_at) for reading in readings])
     
     def _save_events(self, events: List[Dict[str, Any]]):
         """保存事件数据"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H")
-        filename = f"data/events/events_{timestamp}.json"
+        self.persistence.submit('events', events)
+    
+    def save_complex_events(self, events: List[Dict[str, Any]]):
+        """保存事件处理器生成的复杂事件（仅写入SQLite存储）"""
+        if self.database is not None:
+            self.persistence.submit('complex', events)
+    
+    def get_recent_data(self, hours: float = 1, sensor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取最近的数据
         
-        # 读取现有事件并追加
-        existing_events = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    existing_events = json.load(f)
-            except:
-                existing_events = []
+        Args:
+            hours: 时间范围（小时）
+            sensor_id: 只返回该传感器的数据，None表示全部
+        """
+        return self.collected_data.range(time.time() - hours * 3600, sensor_id=sensor_id)
+    
+    def get_sensor_history(self, sensor_id: str, hours: float = 1) -> Dict[str, Any]:
+        """
+        获取传感器的数值历史及统计量
         
-        existing_events.extend(events)
+        内存历史未覆盖的较早部分从时序块文件读取
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(existing_events, f, ensure_ascii=False, indent=2)
+        Args:
+            sensor_id: 传感器ID
+            hours: 时间范围（小时）
+            
+        Returns:
+            包含时间戳、数值和统计量的字典
+        """
+        start = time.time() - hours * 3600
+        timestamps, values, flags = self.history.range(sensor_id, start)
+        
+        if self.block_store is not None:
+            # 内存中最早的数据点之前的部分来自时序块
+            covered_from = float(timestamps[0]) if len(timestamps) else None
+            older = self.block_store.query(sensor_id, start, covered_from)
+            if covered_from is not None:
+                keep = older[0] < covered_from
+                older = tuple(column[keep] for column in older)
+            if len(older[0]):
+                timestamps, values, flags = (np.concatenate([old, new]) for old, new in
+                                             zip(older, (timestamps, values, flags)))
+        
+        return {
+            "sensor_id": sensor_id,
+            "timestamps": timestamps.tolist(),
+            "values": values.tolist(),
+            "stats": summarize(values, flags)
+        }
     
-    def get_recent_data(self, hours: int = 1) -> List[Dict[str, Any]]:
-        """获取最近的数据"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+    def get_stored_events(self, minutes: float = 10, event_type: Optional[str] = None,
+                          severity: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        从事件分段中读取最近一段时间的事件，按稀疏索引只读取匹配的记录
         
-        recent_data = []
-        for reading in self.collected_data:
-            reading_time = datetime.fromisoformat(reading['resultTime'])
-            if reading_time >= cutoff_time:
-                recent_data.append(reading)
+        Args:
+            minutes: 时间范围（分钟）
+            event_type: 只返回该类型的事件
+            severity: 只返回该严重程度的事件
+            limit: 最多返回的事件数，超出时保留最近的事件
+            
+        Returns:
+            按写入顺序排列的事件列表
+        """
+        tags = {}
+        if event_type is not None:
+            tags['eventType'] = event_type
+        if severity is not None:
+            tags['severity'] = severity
+        # 写后持久化缓冲中尚未刷写的事件不在结果中
+        events = deque(query_records(os.path.join(self.data_dir, 'events'), 'events', datetime.now() - timedelta(minutes=minutes),
+                                     tags=tags), maxlen=limit)
+        return list(events)
+    
+    def get_sensor_rollups(self, sensor_id: str, hours: float = 24,
+                           tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取传感器的降采样汇总数据，用于长时间范围的查询
         
-        return recent_data
+        Args:
+            sensor_id: 传感器ID
+            hours: 时间范围（小时）
+            tier: 汇总层级（1m/1h），默认按时间跨度选择
+            
+        Returns:
+            包含层级和汇总点列表的字典
+        """
+        return self.retention.query(sensor_id, datetime.now() - timedelta(hours=hours), tier=tier)
+    
+    def get_analytics_report(self, days: float = 7, granularity: str = 'day',
+                             start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        获取按位置的日/小时分析报表，写后持久化缓冲中尚未刷写的读数不在统计范围内
+        
+        Args:
+            days: 未指定起始时间时统计的天数
+            granularity: 报表粒度（day/hour）
+            start: 起始时间
+            end: 结束时间，默认为当前小时开始前
+            
+        Returns:
+            报表字典
+        """
+        if start is None and end is not None:
+            start = end - timedelta(days=days)
+        elif start is None:
+            end = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
+            start = end - timedelta(days=days)
+        return self.analytics.report(self.registry, granularity, start, end)
+    
+    def get_sampling_rates(self) -> Dict[str, Dict[str, float]]:
+        """获取各传感器当前的有效采样周期和采样率"""
+        if self.adaptive_sampling is not None:
+            return self.adaptive_sampling.rates([record.id for record in self.registry.records])
+        return {
+            record.id: {'period_s': float(period), 'rate_hz': round(1.0 / float(period), 4), 'base_period_s': float(period)}
+            for record, period in zip(self.registry.records, self.sampling_periods())
+        }
+    
+    def get_sensor_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有传感器的流式统计量"""
+        return self.sensor_stats.snapshot()
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取采集统计信息"""
         return {
             "总采集数据量": len(self.collected_data),
+            "历史数据点数": len(self.history),
+            "历史内存占用KB": round(self.history.nbytes / 1024, 1),
+            "历史迟到数据": self.history.get_stats(),
             "队列中数据量": self.data_queue.qsize(),
-            "队列中事件量": self.event_queue.qsize(),
+            "数据队列": self.data_queue.get_stats(),
             "是否运行中": self.is_running,
             "订阅者数量": len(self.subscribers),
             "采样间隔": self.sampling_interval,
-            "批处理大小": self.batch_size
+            "调度模式": self.scheduling_mode,
+            "调度器": self.scheduler.get_stats() if self.scheduler else None,
+            "死区过滤": self.deadband.get_stats() if self.deadband else None,
+            "自适应采样": self.adaptive_sampling.get_stats() if self.adaptive_sampling else None,
+            "外部接入读数": self.external_readings,
+            "外部接入未知传感器读数": self.external_unknown,
+            "外部接入无效读数": self.external_invalid,
+            "超出量程读数": self.out_of_range_readings,
+            "批处理大小": self.batch_size,
+            "持久化指标": self.persistence.get_metrics(),
+            "数据保留": self.retention.get_stats(),
+            "SQLite存储": self.database.get_stats() if self.database else None,
+            "预写日志": self.wal.get_stats() if self.wal else None,
+            "分片采集": self.sharding.get_stats() if self.sharding else None,
+            "在线监测": self.liveness.get_stats() if self.liveness else None,
+            "分析报表": self.analytics.get_stats(),
+            "分区加载": self.loader.get_stats()
         }
 
 # 使用示例
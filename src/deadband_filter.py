@@ -0,0 +1,140 @@
+"""
+死区过滤模块
+按传感器的精度/分辨率或配置的变化量判定读数是否有意义的变化，
+数值变化未超过死区且未到心跳时间的读数不再生成读数事件，降低下游事件处理和存储量
+"""
+
+from typing import Dict, Any, Optional
+import numpy as np
+
+from threshold_engine import rule_matches, rule_specificity, occurrence_rank
+
+
+class DeadbandFilter:
+    """向量化死区过滤器"""
+
+    def __init__(self, n_sensors: int):
+        """
+        Args:
+            n_sensors: 传感器数量，数组下标与注册表记录序号一致
+        """
+        # 死区宽度，NaN或0表示不过滤
+        self.delta = np.full(n_sensors, np.nan)
+        # 最长静默时间（秒），超过后即使数值未变也转发一次作为心跳
+        self.max_silence = np.full(n_sensors, np.inf)
+
+        # 上次转发的数值和时间
+        self.last_value = np.full(n_sensors, np.nan)
+        self.last_epoch = np.full(n_sensors, -np.inf)
+
+        self.metrics = {
+            'evaluated': 0,
+            'forwarded': 0,
+            'heartbeats': 0,
+            'forced': 0
+        }
+
+    @classmethod
+    def from_config(cls, registry, deadband_config: Dict[str, Any]) -> 'DeadbandFilter':
+        """
+        根据死区配置为注册表中的传感器编译死区宽度
+
+        未被规则指定delta的传感器，死区取精度与分辨率中的较大值乘以resolution_multiple，
+        即小于传感器自身精度的变化视为噪声
+
+        Args:
+            registry: SensorRegistry实例
+            deadband_config: 形如 {"resolution_multiple": 1, "max_silence": 60, "rules": [...]} 的配置
+        """
+        engine = cls(len(registry))
+        multiple = deadband_config.get('resolution_multiple', 1.0)
+        engine.max_silence[:] = deadband_config.get('max_silence', np.inf)
+
+        for record in registry.records:
+            precision = max(record.accuracy or 0, record.resolution or 0)
+            if precision > 0:
+                engine.delta[record.index] = precision * multiple
+
+        # 按精确度从低到高覆盖，最精确的规则最终生效
+        for rule in sorted(deadband_config.get('rules', []), key=rule_specificity):
+            indices = [record.index for record in registry.records if rule_matches(rule, record)]
+            if not indices:
+                continue
+            if 'delta' in rule:
+                engine.delta[indices] = np.nan if rule['delta'] is None else rule['delta']
+            if 'max_silence' in rule:
+                engine.max_silence[indices] = np.inf if rule['max_silence'] is None else rule['max_silence']
+
+        return engine
+
+    def evaluate(self, indices: np.ndarray, values: np.ndarray, epochs: np.ndarray,
+                 force: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        判定一批读数是否转发，并更新各传感器上次转发的状态
+
+        Args:
+            indices: 每条读数对应的传感器下标，-1表示未登记的传感器（总是转发）
+            values: 每条读数的数值
+            epochs: 每条读数的时间戳
+            force: 必须转发的读数（例如异常或越限），默认无
+
+        Returns:
+            与读数一一对应的布尔数组，True表示转发
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        epochs = np.asarray(epochs, dtype=np.float64)
+        forward = indices < 0
+        if force is not None:
+            forward |= force
+
+        known = np.flatnonzero(indices >= 0)
+        if len(known):
+            # 同一传感器在一批中出现多次时按出现顺序分轮判定，后一条与前一条转发的数值比较
+            ranks = occurrence_rank(indices[known])
+            for rank in range(int(ranks.max()) + 1):
+                positions = known[ranks == rank]
+                forward[positions] = self._evaluate_unique(indices[positions], values[positions],
+                                                           epochs[positions], forward[positions])
+
+        self.metrics['evaluated'] += len(indices)
+        self.metrics['forwarded'] += int(forward.sum())
+        if force is not None:
+            self.metrics['forced'] += int(force.sum())
+        return forward
+
+    def _evaluate_unique(self, sensors: np.ndarray, values: np.ndarray, epochs: np.ndarray,
+                         forced: np.ndarray) -> np.ndarray:
+        """判定传感器互不重复的一组读数"""
+        delta = self.delta[sensors]
+        last_value = self.last_value[sensors]
+
+        # 首条读数（上次数值为NaN）或未配置死区的传感器比较结果为NaN，按变化处理
+        with np.errstate(invalid='ignore'):
+            unchanged = np.abs(values - last_value) < delta
+        heartbeat = unchanged & (epochs - self.last_epoch[sensors] >= self.max_silence[sensors])
+        forward = forced | ~unchanged | heartbeat
+
+        self.metrics['heartbeats'] += int((heartbeat & ~forced).sum())
+        forwarded = sensors[forward]
+        self.last_value[forwarded] = values[forward]
+        self.last_epoch[forwarded] = epochs[forward]
+        return forward
+
+    def reset(self):
+        """清除转发状态，下一条读数总会被转发"""
+        self.last_value[:] = np.nan
+        self.last_epoch[:] = -np.inf
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取过滤统计信息"""
+        evaluated = self.metrics['evaluated']
+        suppressed = evaluated - self.metrics['forwarded']
+        return {
+            "判定读数": evaluated,
+            "转发读数": self.metrics['forwarded'],
+            "抑制读数": suppressed,
+            "心跳转发": self.metrics['heartbeats'],
+            "强制转发": self.metrics['forced'],
+            "抑制比例": round(suppressed / evaluated, 4) if evaluated else 0.0
+        }
@@ -11,6 +11,8 @@ from collections import defaultdict, deque
 import threading
 from queue import Queue
 
+from semantic_records import ComplexEvent
+
 class EventProcessor:
     """事件处理器类"""
     
@@ -42,6 +44,12 @@ class EventProcessor:
         # 处理线程控制
         self.is_running = False
         self.event_queue = Queue()
+        
+        # 传感器流式统计（由数据采集器共享）
+        self.sensor_statistics = None
+        
+        # 可选的SQLite存储（由数据采集器共享），内存事件历史未覆盖的时间窗口从中查询
+        self.database = None
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """加载配置文件"""
@@ -100,8 +108,21 @@ class EventProcessor:
                     'last_value': value,
                     'last_update': timestamp,
                     'trend': self._calculate_trend(sensor_id, value),
-                    'status': 'normal'  # normal, warning, critical
+                    'status': 'normal'  # normal, warning, critical, offline
                 }
+        
+        # 在线监测判定的离线与恢复，last_update保持为最后一次上报的时间
+        elif event.get('eventType') == 'SensorOffline':
+            sensor_id = event.get('source', '')
+            state = self.sensor_states.setdefault(sensor_id, {'last_update': event.get('last_seen', '')})
+            state['status'] = 'offline'
+            state['offline_since'] = event.get('timestamp', '')
+        
+        elif event.get('eventType') == 'SensorRecovered':
+            state = self.sensor_states.get(event.get('source', ''))
+            if state is not None:
+                state['status'] = 'normal'
+                state.pop('offline_since', None)
     
     def _calculate_trend(self, sensor_id: str, current_value: float) -> str:
         """计算传感器数值趋势"""
@@ -141,36 +162,36 @@ class EventProcessor:
         
         # 阈值突破事件
         if event.get('eventType') == 'ThresholdExceeded':
-            atomic_event = {
-                'id': f"atomic_{event['id']}",
-                'type': 'AtomicSemanticEvent',
-                'eventType': 'ThresholdBreached',
-                'source': event.get('source', ''),
-                'timestamp': event.get('timestamp', ''),
-                'severity': event.get('severity', 'medium'),
-                'details': {
+            atomic_event = ComplexEvent(
+                id=f"atomic_{event['id']}",
+                type='AtomicSemanticEvent',
+                event_type='ThresholdBreached',
+                source=event.get('source', ''),
+                timestamp=event.get('timestamp', ''),
+                severity=event.get('severity', 'medium'),
+                details={
                     'threshold_type': event.get('threshold_type', ''),
                     'threshold_value': event.get('threshold_value', 0),
                     'actual_value': event.get('actual_value', 0),
                     'deviation': abs(event.get('actual_value', 0) - event.get('threshold_value', 0))
                 }
-            }
+            )
             atomic_events.append(atomic_event)
         
         # 异常检测事件  
         elif event.get('eventType') == 'AnomalyDetected':
-            atomic_event = {
-                'id': f"atomic_{event['id']}",
-                'type': 'AtomicSemanticEvent',
-                'eventType': 'AnomalyIdentified',
-                'source': event.get('source', ''),
-                'timestamp': event.get('timestamp', ''),
-                'severity': event.get('severity', 'medium'),
-                'details': {
+            atomic_event = ComplexEvent(
+                id=f"atomic_{event['id']}",
+                type='AtomicSemanticEvent',
+                event_type='AnomalyIdentified',
+                source=event.get('source', ''),
+                timestamp=event.get('timestamp', ''),
+                severity=event.get('severity', 'medium'),
+                details={
                     'anomaly_type': 'statistical',
                     'description': event.get('description', '')
                 }
-            }
+            )
             atomic_events.append(atomic_event)
         
         # 状态变化事件
@@ -181,7 +202,7 @@ class EventProcessor:
         
         return atomic_events
     
-    def _detect_state_change(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _detect_state_change(self, event: Dict[str, Any]) -> Optional[ComplexEvent]:
         """检测状态变化"""
         sensor_id = event.get('source', '')
         if 'semantics' in event and 'value_interpretation' in event['semantics']:
@@ -191,19 +212,19 @@ class EventProcessor:
             if sensor_id in self.sensor_states:
                 last_state = self.sensor_states[sensor_id].get('last_interpretation', '')
                 if last_state and last_state != current_interpretation:
-                    return {
-                        'id': f"state_change_{sensor_id}_{int(time.time())}",
-                        'type': 'AtomicSemanticEvent',
-                        'eventType': 'StateChange',
-                        'source': sensor_id,
-                        'timestamp': event.get('timestamp', ''),
-                        'severity': 'low',
-                        'details': {
+                    return ComplexEvent(
+                        id=f"state_change_{sensor_id}_{int(time.time())}",
+                        type='AtomicSemanticEvent',
+                        event_type='StateChange',
+                        source=sensor_id,
+                        timestamp=event.get('timestamp', ''),
+                        severity='low',
+                        details={
                             'from_state': last_state,
                             'to_state': current_interpretation,
                             'location': event.get('semantics', {}).get('location', '')
                         }
-                    }
+                    )
             
             # 更新解释状态
             if sensor_id in self.sensor_states:
@@ -298,27 +319,37 @@ class EventProcessor:
             
             event_time = datetime.fromisoformat(historical_event.get('timestamp', ''))
             if event_time < cutoff_time:
-                break
+                return False
             
             if 'data' in historical_event and 'hasResult' in historical_event['data']:
                 value = historical_event['data']['hasResult']['value']
                 if self._evaluate_condition(value, operator, threshold):
                     return True
         
+        # 事件历史有长度上限且不跨越重启，可能不足以覆盖整个时间窗口，较早的部分按索引查询SQLite存储
+        if self.database is not None:
+            covered_from = None
+            if self.event_history:
+                covered_from = datetime.fromisoformat(self.event_history[0].get('timestamp', '')).timestamp()
+                if covered_from <= cutoff_time.timestamp():
+                    return False
+            return self.database.any_observation(self.database.sensors_matching(sensor_key), operator,
+                                                 threshold, cutoff_time.timestamp(), covered_from)
+        
         return False
     
-    def _generate_fire_alarm_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_fire_alarm_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> ComplexEvent:
         """生成火灾报警复杂事件"""
-        return {
-            'id': f"fire_alarm_{int(time.time())}",
-            'type': 'ComplexEvent',
-            'eventType': 'FireAlarmTriggered',
-            'priority': rule.get('priority', 'high'),
-            'severity': 'critical',
-            'timestamp': datetime.now().isoformat(),
-            'source': 'EventProcessor',
-            'trigger_event': event['id'],
-            'details': {
+        return ComplexEvent(
+            id=f"fire_alarm_{int(time.time())}",
+            type='ComplexEvent',
+            event_type='FireAlarmTriggered',
+            priority=rule.get('priority', 'high'),
+            severity='critical',
+            timestamp=datetime.now().isoformat(),
+            source='EventProcessor',
+            trigger_event=event['id'],
+            details={
                 'description': '检测到火灾风险：烟雾和温度同时超标',
                 'location': event.get('semantics', {}).get('location', ''),
                 'recommended_actions': [
@@ -329,20 +360,20 @@ class EventProcessor:
                 ],
                 'affected_sensors': self._get_affected_sensors(event, 'fire')
             }
-        }
+        )
     
-    def _generate_comfort_control_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_comfort_control_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> ComplexEvent:
         """生成舒适度控制复杂事件"""
-        return {
-            'id': f"comfort_control_{int(time.time())}",
-            'type': 'ComplexEvent',
-            'eventType': 'ComfortControlNeeded',
-            'priority': rule.get('priority', 'medium'),
-            'severity': 'medium',
-            'timestamp': datetime.now().isoformat(),
-            'source': 'EventProcessor',
-            'trigger_event': event['id'],
-            'details': {
+        return ComplexEvent(
+            id=f"comfort_control_{int(time.time())}",
+            type='ComplexEvent',
+            event_type='ComfortControlNeeded',
+            priority=rule.get('priority', 'medium'),
+            severity='medium',
+            timestamp=datetime.now().isoformat(),
+            source='EventProcessor',
+            trigger_event=event['id'],
+            details={
                 'description': '环境舒适度需要调节：温度和湿度不适宜',
                 'location': event.get('semantics', {}).get('location', ''),
                 'recommended_actions': [
@@ -355,20 +386,20 @@ class EventProcessor:
                     'humidity': '40-60%RH'
                 }
             }
-        }
+        )
     
-    def _generate_energy_saving_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_energy_saving_event(self, event: Dict[str, Any], rule: Dict[str, Any]) -> ComplexEvent:
         """生成节能模式复杂事件"""
-        return {
-            'id': f"energy_saving_{int(time.time())}",
-            'type': 'ComplexEvent',
-            'eventType': 'EnergySavingTriggered',
-            'priority': rule.get('priority', 'low'),
-            'severity': 'low',
-            'timestamp': datetime.now().isoformat(),
-            'source': 'EventProcessor',
-            'trigger_event': event['id'],
-            'details': {
+        return ComplexEvent(
+            id=f"energy_saving_{int(time.time())}",
+            type='ComplexEvent',
+            event_type='EnergySavingTriggered',
+            priority=rule.get('priority', 'low'),
+            severity='low',
+            timestamp=datetime.now().isoformat(),
+            source='EventProcessor',
+            trigger_event=event['id'],
+            details={
                 'description': '长时间无人活动，建议启动节能模式',
                 'location': event.get('semantics', {}).get('location', ''),
                 'recommended_actions': [
@@ -379,7 +410,7 @@ class EventProcessor:
                 ],
                 'estimated_savings': '15-30%'
             }
-        }
+        )
     
     def _get_affected_sensors(self, event: Dict[str, Any], event_type: str) -> List[str]:
         """获取受影响的传感器列表"""
@@ -434,20 +465,20 @@ class EventProcessor:
         
         # 如果找到多个相关事件，生成关联事件
         if len(related_events) >= 2:
-            correlations.append({
-                'id': f"temporal_correlation_{int(time.time())}",
-                'type': 'CorrelationEvent',
-                'eventType': 'TemporalCorrelation',
-                'timestamp': datetime.now().isoformat(),
-                'source': 'EventProcessor',
-                'details': {
+            correlations.append(ComplexEvent(
+                id=f"temporal_correlation_{int(time.time())}",
+                type='CorrelationEvent',
+                event_type='TemporalCorrelation',
+                timestamp=datetime.now().isoformat(),
+                source='EventProcessor',
+                details={
                     'correlation_type': 'temporal',
                     'trigger_event': event['id'],
                     'related_events': [e['id'] for e in related_events],
                     'time_window': f"{time_window.seconds}秒",
                     'pattern': f"在{time_window.seconds}秒内发生{len(related_events)+1}次相同类型事件"
                 }
-            })
+            ))
         
         return correlations
     
@@ -469,20 +500,20 @@ class EventProcessor:
                 location_events.append(historical_event)
         
         if len(location_events) >= 3:
-            correlations.append({
-                'id': f"spatial_correlation_{int(time.time())}",
-                'type': 'CorrelationEvent',
-                'eventType': 'SpatialCorrelation',
-                'timestamp': datetime.now().isoformat(),
-                'source': 'EventProcessor',
-                'details': {
+            correlations.append(ComplexEvent(
+                id=f"spatial_correlation_{int(time.time())}",
+                type='CorrelationEvent',
+                event_type='SpatialCorrelation',
+                timestamp=datetime.now().isoformat(),
+                source='EventProcessor',
+                details={
                     'correlation_type': 'spatial',
                     'location': event_location,
                     'trigger_event': event['id'],
                     'related_events': [e['id'] for e in location_events],
                     'pattern': f"{event_location}位置活动频繁，发生{len(location_events)+1}个事件"
                 }
-            })
+            ))
         
         return correlations
     
@@ -501,23 +532,41 @@ class EventProcessor:
                 for historical_event in recent_events:
                     if (historical_event.get('eventType') == 'SensorReading' and
                         'humidity' in historical_event.get('source', '').lower()):
-                        correlations.append({
-                            'id': f"causal_correlation_{int(time.time())}",
-                            'type': 'CorrelationEvent',
-                            'eventType': 'CausalCorrelation',
-                            'timestamp': datetime.now().isoformat(),
-                            'source': 'EventProcessor',
-                            'details': {
+                        correlations.append(ComplexEvent(
+                            id=f"causal_correlation_{int(time.time())}",
+                            type='CorrelationEvent',
+                            event_type='CausalCorrelation',
+                            timestamp=datetime.now().isoformat(),
+                            source='EventProcessor',
+                            details={
                                 'correlation_type': 'causal',
                                 'cause_event': event['id'],
                                 'effect_hypothesis': '温度异常可能影响整体舒适度',
                                 'confidence': 0.7
                             }
-                        })
+                        ))
                         break
         
         return correlations
     
+    def attach_sensor_statistics(self, sensor_statistics):
+        """
+        关联传感器流式统计
+        
+        Args:
+            sensor_statistics: 数据采集器维护的SensorStatistics实例
+        """
+        self.sensor_statistics = sensor_statistics
+    
+    def attach_database(self, database):
+        """
+        关联SQLite存储
+        
+        Args:
+            database: 数据采集器使用的SQLiteStore实例
+        """
+        self.database = database
+    
     def subscribe_to_complex_events(self, callback: Callable[[Dict[str, Any]], None]):
         """
         订阅复杂事件通知
@@ -556,15 +605,21 @@ class EventProcessor:
     
     def get_sensor_status_summary(self) -> Dict[str, Any]:
         """获取传感器状态摘要"""
-        return {
-            sensor_id: {
+        summary = {}
+        for sensor_id, state in self.sensor_states.items():
+            summary[sensor_id] = {
                 '最新值': state.get('last_value', 'N/A'),
                 '更新时间': state.get('last_update', 'N/A'),
                 '趋势': state.get('trend', 'unknown'),
                 '状态': state.get('status', 'unknown')
             }
-            for sensor_id, state in self.sensor_states.items()
-        }
+            
+            stats = self.sensor_statistics.get(sensor_id) if self.sensor_statistics else None
+            if stats:
+                summary[sensor_id]['均值'] = round(stats['mean'], 3)
+                summary[sensor_id]['标准差'] = round(stats['std'], 3)
+        
+        return summary
     
     def clear_history(self, older_than_hours: int = 24):
         """清理历史数据"""
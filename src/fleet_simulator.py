@@ -0,0 +1,203 @@
+"""
+传感器群仿真模块
+基于NumPy的批量数据模拟，一次向量化调用生成整轮采样数据，用于大规模负载测试
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+
+from sensor_registry import get_registry
+
+# 传感器类别编码
+KIND_CODES = {
+    'generic': 0,
+    'temperature': 1,
+    'humidity': 2,
+    'smoke': 3,
+    'motion': 4,
+    'light': 5
+}
+
+# 合成传感器群使用的类别模板：(观测属性, 传感器名前缀, 量程)
+SYNTHETIC_TEMPLATES = [
+    ('home:Temperature', 'temperatureSensor', {"min": -20, "max": 50, "unit": "°C"}),
+    ('home:Humidity', 'humiditySensor', {"min": 0, "max": 100, "unit": "%RH"}),
+    ('home:SmokeLevel', 'smokeSensor', {"min": 0, "max": 1000, "unit": "ppm"}),
+    ('home:Motion', 'motionSensor', None),
+    ('home:Illuminance', 'lightSensor', {"min": 1, "max": 65535, "unit": "lux"})
+]
+SYNTHETIC_LOCATIONS = ['客厅', '卧室', '厨房', '书房', '玄关', '卫生间']
+
+
+class FleetSimulator:
+    """向量化传感器群数据模拟器"""
+
+    def __init__(self, kinds: Sequence[str], seed: Optional[int] = None):
+        """
+        初始化模拟器
+
+        Args:
+            kinds: 每个传感器的类别（temperature/humidity/smoke/motion/light/generic）
+            seed: 随机种子，指定后结果可复现
+        """
+        self.kind_codes = np.array([KIND_CODES.get(kind, 0) for kind in kinds], dtype=np.int8)
+        self.rng = np.random.default_rng(seed)
+        # 预先按类别分组传感器下标，每轮采样只做向量化填充
+        self.groups = {
+            code: np.flatnonzero(self.kind_codes == code)
+            for code in KIND_CODES.values()
+        }
+
+    @classmethod
+    def from_registry(cls, registry, seed: Optional[int] = None) -> 'FleetSimulator':
+        """根据传感器注册表创建模拟器，下标与注册表记录序号一致"""
+        return cls([record.kind for record in registry.records], seed)
+
+    def __len__(self) -> int:
+        return len(self.kind_codes)
+
+    def sample(self, hour: Optional[int] = None,
+               indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        生成一轮采样数据
+
+        Args:
+            hour: 模拟的小时（0-23），默认取当前时间
+            indices: 只为这些下标的传感器生成数据，默认全部
+
+        Returns:
+            与传感器（或indices）一一对应的数值数组
+        """
+        if hour is None:
+            hour = datetime.now().hour
+
+        if indices is None:
+            groups = self.groups
+            values = np.empty(len(self.kind_codes), dtype=np.float64)
+        else:
+            indices = np.asarray(indices)
+            codes = self.kind_codes[indices]
+            groups = {code: np.flatnonzero(codes == code) for code in KIND_CODES.values()}
+            values = np.empty(len(indices), dtype=np.float64)
+
+        rng = self.rng
+
+        # 温度传感器：20-30°C之间，夜晚温度稍低
+        idx = groups[KIND_CODES['temperature']]
+        if len(idx):
+            variation = rng.uniform(-3.0, 5.0, len(idx))
+            if 22 <= hour or hour <= 6:
+                variation -= 2.0
+            values[idx] = np.round(25.0 + variation, 1)
+
+        # 湿度传感器：40-80%之间
+        idx = groups[KIND_CODES['humidity']]
+        if len(idx):
+            values[idx] = np.clip(np.round(60.0 + rng.uniform(-15.0, 20.0, len(idx)), 1), 0, 100)
+
+        # 烟雾传感器：通常很低，5%概率产生峰值
+        idx = groups[KIND_CODES['smoke']]
+        if len(idx):
+            spikes = rng.random(len(idx)) < 0.05
+            values[idx] = np.where(spikes,
+                                   rng.uniform(150, 300, len(idx)),
+                                   rng.uniform(0, 50, len(idx)))
+
+        # 人体感应器：白天活动概率高，夜晚低
+        idx = groups[KIND_CODES['motion']]
+        if len(idx):
+            probability = 0.3 if 7 <= hour <= 22 else 0.1
+            values[idx] = (rng.random(len(idx)) < probability).astype(np.float64)
+
+        # 光照传感器：根据时间模拟
+        idx = groups[KIND_CODES['light']]
+        if len(idx):
+            if 6 <= hour <= 18:
+                low, high = 300, 1000
+            elif 19 <= hour <= 22:
+                low, high = 50, 300
+            else:
+                low, high = 1, 50
+            values[idx] = rng.uniform(low, high, len(idx))
+
+        # 其他传感器：默认值
+        idx = groups[KIND_CODES['generic']]
+        if len(idx):
+            values[idx] = rng.uniform(0, 100, len(idx))
+
+        return values
+
+
+def build_synthetic_fleet(n_sensors: int, seed: Optional[int] = None,
+                          sensors_per_platform: int = 50,
+                          observable_properties: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    构造合成的大规模SSN配置，用于负载测试
+
+    Args:
+        n_sensors: 传感器数量
+        seed: 随机种子，决定类别和位置的分配
+        sensors_per_platform: 每个平台托管的传感器数
+        observable_properties: 观测属性声明（含数值解释区间），默认沿用ssn_model.json中的声明
+
+    Returns:
+        与ssn_model.json结构一致的配置字典
+    """
+    if observable_properties is None:
+        observable_properties = get_registry().config.get('observableProperties', [])
+    rng = np.random.default_rng(seed)
+    template_ids = rng.integers(0, len(SYNTHETIC_TEMPLATES), n_sensors)
+    location_ids = rng.integers(0, len(SYNTHETIC_LOCATIONS), n_sensors)
+
+    sensors = []
+    platforms = []
+    for i in range(n_sensors):
+        prop, prefix, range_info = SYNTHETIC_TEMPLATES[template_ids[i]]
+        sensor = {
+            "id": f"home:{prefix}_{i:06d}",
+            "type": "ssn:Sensor",
+            "name": f"合成{prefix}_{i:06d}",
+            "location": SYNTHETIC_LOCATIONS[location_ids[i]],
+            "observes": prop,
+            "properties": {"responseTime": "5s"}
+        }
+        if range_info:
+            sensor["properties"]["range"] = dict(range_info)
+        sensors.append(sensor)
+
+        if i % sensors_per_platform == 0:
+            platforms.append({
+                "id": f"home:syntheticPlatform_{len(platforms):05d}",
+                "type": "sosa:Platform",
+                "name": f"合成平台{len(platforms)}",
+                "location": sensor["location"],
+                "hosts": []
+            })
+        platforms[-1]["hosts"].append(sensor["id"])
+
+    return {"sensors": sensors, "observableProperties": list(observable_properties), "platforms": platforms}
+
+
+# 使用示例
+if __name__ == "__main__":
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    from sensor_registry import SensorRegistry
+
+    n_sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registry = SensorRegistry(build_synthetic_fleet(n_sensors, seed=42))
+    simulator = FleetSimulator.from_registry(registry, seed=42)
+
+    rounds = 10
+    start = time.perf_counter()
+    for _ in range(rounds):
+        values = simulator.sample()
+    elapsed = time.perf_counter() - start
+
+    print(f"传感器数量: {len(simulator)}")
+    print(f"每轮采样耗时: {elapsed / rounds * 1000:.2f} ms")
+    print(f"吞吐量: {len(simulator) * rounds / elapsed:,.0f} 读数/秒")
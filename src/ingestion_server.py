@@ -0,0 +1,233 @@
+"""
+网络接入服务模块
+通过本地TCP/UDP套接字接收真实传感器批量上报的读数，整批解码后直接送入数据采集器
+
+报文格式为按行分隔的文本，每行一条读数：
+    sensor_id,timestamp,value
+timestamp为秒级时间戳（可带小数），留空表示使用接收时间
+"""
+
+import math
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+# TCP连接单次读取的字节数
+RECV_BUFFER = 256 * 1024
+
+
+def decode_lines(data: bytes, received_at: Optional[float] = None) -> Tuple[List[str], List[float], List[float], int]:
+    """
+    整批解码按行分隔的读数
+
+    Args:
+        data: 若干完整行组成的报文
+        received_at: 时间戳留空时使用的接收时间，默认取当前时间
+
+    Returns:
+        (传感器ID列表, 数值列表, 时间戳列表, 格式错误的行数)
+    """
+    if received_at is None:
+        received_at = time.time()
+
+    sensor_ids = []
+    values = []
+    epochs = []
+    errors = 0
+    for line in data.split(b'\n'):
+        if not line or line.isspace():
+            continue
+        parts = line.split(b',')
+        if len(parts) != 3:
+            errors += 1
+            continue
+        try:
+            value = float(parts[2])
+            epoch = float(parts[1]) if parts[1].strip() else received_at
+        except ValueError:
+            errors += 1
+            continue
+        # nan/inf 可以被float解析，但不是有效读数
+        if not (math.isfinite(value) and math.isfinite(epoch)):
+            errors += 1
+            continue
+        sensor_ids.append(parts[0].strip().decode('utf-8', 'replace'))
+        values.append(value)
+        epochs.append(epoch)
+
+    return sensor_ids, values, epochs, errors
+
+
+def encode_lines(readings: List[Tuple[str, Optional[float], float]]) -> bytes:
+    """将(传感器ID, 时间戳, 数值)编码为按行分隔的报文，时间戳为None时留空"""
+    return ''.join(
+        f"{sensor_id},{'' if epoch is None else f'{epoch:.3f}'},{value}\n"
+        for sensor_id, epoch, value in readings
+    ).encode('utf-8')
+
+
+class _TCPHandler(socketserver.BaseRequestHandler):
+    """TCP连接处理：按块读取，只解码完整的行，残余部分留待下一块"""
+
+    def handle(self):
+        ingestion = self.server.ingestion
+        ingestion.count_connection()
+        pending = b''
+        while True:
+            try:
+                chunk = self.request.recv(RECV_BUFFER)
+            except OSError:
+                break
+            if not chunk:
+                break
+            data = pending + chunk
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                pending = data
+                continue
+            pending = data[cut + 1:]
+            ingestion.feed(data[:cut + 1])
+
+        if pending.strip():
+            ingestion.feed(pending)
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    """UDP数据报处理：每个数据报包含若干完整的行"""
+
+    def handle(self):
+        self.server.ingestion.feed(self.request[0])
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UDPServer(socketserver.UDPServer):
+    # 默认8192字节会截断批量数据报
+    max_packet_size = 65507
+
+
+class IngestionServer:
+    """传感器读数网络接入服务"""
+
+    def __init__(self, collector, host: str = '127.0.0.1',
+                 tcp_port: Optional[int] = 9500, udp_port: Optional[int] = 9501):
+        """
+        初始化接入服务
+
+        Args:
+            collector: DataCollector实例
+            host: 监听地址
+            tcp_port: TCP监听端口，None表示不启用，0表示由系统分配
+            udp_port: UDP监听端口，None表示不启用，0表示由系统分配
+        """
+        self.collector = collector
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self._servers = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self.metrics = {
+            'connections': 0,
+            'batches': 0,
+            'bytes': 0,
+            'accepted': 0,
+            'rejected': 0,
+            'malformed': 0,
+            'first_at': None,
+            'last_at': None
+        }
+
+    @property
+    def tcp_address(self) -> Optional[Tuple[str, int]]:
+        for server in self._servers:
+            if server.socket_type == socket.SOCK_STREAM:
+                return server.server_address
+        return None
+
+    @property
+    def udp_address(self) -> Optional[Tuple[str, int]]:
+        for server in self._servers:
+            if server.socket_type == socket.SOCK_DGRAM:
+                return server.server_address
+        return None
+
+    def count_connection(self):
+        with self._lock:
+            self.metrics['connections'] += 1
+
+    def feed(self, data: bytes) -> Dict[str, int]:
+        """
+        解码一批报文并送入采集器
+
+        Args:
+            data: 按行分隔的读数报文
+
+        Returns:
+            本批接收、拒绝和格式错误的读数数量
+        """
+        started = time.perf_counter()
+        sensor_ids, values, epochs, malformed = decode_lines(data)
+        accepted, rejected = self.collector.ingest_external(sensor_ids, values, epochs)
+        with self._lock:
+            if self.metrics['first_at'] is None:
+                self.metrics['first_at'] = started
+            self.metrics['last_at'] = time.perf_counter()
+            self.metrics['batches'] += 1
+            self.metrics['bytes'] += len(data)
+            self.metrics['accepted'] += accepted
+            self.metrics['rejected'] += rejected
+            self.metrics['malformed'] += malformed
+        return {'accepted': accepted, 'rejected': rejected, 'malformed': malformed}
+
+    def start(self):
+        """启动TCP/UDP监听线程"""
+        if self._servers:
+            return
+        if self.tcp_port is not None:
+            self._servers.append(_ThreadingTCPServer((self.host, self.tcp_port), _TCPHandler))
+        if self.udp_port is not None:
+            server = _UDPServer((self.host, self.udp_port), _UDPHandler)
+            server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            self._servers.append(server)
+
+        for server in self._servers:
+            server.ingestion = self
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        addresses = [f"{'TCP' if s.socket_type == socket.SOCK_STREAM else 'UDP'} {s.server_address[0]}:{s.server_address[1]}"
+                     for s in self._servers]
+        print(f"网络接入服务已启动: {', '.join(addresses)}")
+
+    def stop(self):
+        """停止监听"""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._servers = []
+        self._threads = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取接入统计信息"""
+        with self._lock:
+            rate = None
+            if self.metrics['first_at'] is not None and self.metrics['last_at'] > self.metrics['first_at']:
+                rate = round(self.metrics['accepted'] / (self.metrics['last_at'] - self.metrics['first_at']), 1)
+            return {
+                "连接数": self.metrics['connections'],
+                "接收批次": self.metrics['batches'],
+                "接收字节数": self.metrics['bytes'],
+                "接收读数": self.metrics['accepted'],
+                "拒绝读数": self.metrics['rejected'],
+                "格式错误行数": self.metrics['malformed'],
+                "接收速率": rate
+            }
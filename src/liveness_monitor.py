@@ -0,0 +1,323 @@
+"""
+传感器在线监测模块
+为每个已上报的传感器维护"下一次上报的最晚时间"，截止时间放在分层时间轮中，
+到期未上报时生成SensorOffline语义事件，离线后重新上报时生成SensorRecovered语义事件；
+每条读数和每次到期的开销与传感器总数无关，不需要周期性地全量扫描
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+
+from semantic_records import SemanticEvent
+
+
+class TimerWheel:
+    """分层时间轮
+
+    第0层每格一个tick，第l层每格覆盖slots**l个tick；定时器按剩余tick数放入能容纳它的最低层，
+    每当低一层转完一圈，高一层对应格中的定时器下放到低层，第0层的格到期时取出其中的定时器。
+    每格保存(键数组, 到期tick数组)块，同一时刻批量设置的定时器只追加一个块
+    """
+
+    def __init__(self, tick: float, slot_bits: int = 6, levels: int = 4, start: float = 0.0):
+        """
+        Args:
+            tick: 时间分辨率（秒），到期判定最多延迟一个tick
+            slot_bits: 每层格数的二进制位数，每层2**slot_bits格
+            levels: 层数，可容纳的最长定时为tick * 2**(slot_bits*levels)
+            start: 起始时间戳
+        """
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.slots = 1 << slot_bits
+        self.mask = self.slots - 1
+        self.levels = levels
+        self.span = 1 << (slot_bits * levels)
+        # 已处理到的tick，截止时间不晚于 current * tick 的定时器均已取出
+        self.current = int(np.floor(start / tick))
+        self._wheel = [[[] for _ in range(self.slots)] for _ in range(levels)]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, keys: np.ndarray, deadlines: np.ndarray):
+        """
+        批量设置定时器
+
+        Args:
+            keys: 定时器键（整数数组）
+            deadlines: 对应的截止时间戳，已过期的在下一个tick到期
+        """
+        if len(keys) == 0:
+            return
+        ticks = np.ceil(np.asarray(deadlines, dtype=np.float64) / self.tick).astype(np.int64)
+        self._insert(np.asarray(keys, dtype=np.int64), ticks, self.current + 1)
+
+    def _insert(self, keys: np.ndarray, ticks: np.ndarray, earliest: int):
+        """earliest为可放入的最早tick：新设置的定时器不早于下一个tick，下放时可落在当前tick"""
+        ticks = np.clip(ticks, earliest, self.current + self.span - 1)
+        delta = ticks - self.current
+        level = np.zeros(len(ticks), dtype=np.int64)
+        for l in range(1, self.levels):
+            level[delta >= (1 << (self.slot_bits * l))] = l
+        slot = (ticks >> (self.slot_bits * level)) & self.mask
+
+        # 按(层, 格)分组，每组追加一个块
+        codes = level * self.slots + slot
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        for start, end in zip(np.concatenate(([0], bounds)).tolist(), np.concatenate((bounds, [len(codes)])).tolist()):
+            code = int(codes[start])
+            selected = order[start:end]
+            self._wheel[code // self.slots][code % self.slots].append((keys[selected], ticks[selected]))
+        self._count += len(keys)
+
+    def _take(self, level: int, index: int) -> List[tuple]:
+        chunks = self._wheel[level][index]
+        if chunks:
+            self._wheel[level][index] = []
+            self._count -= sum(len(keys) for keys, _ in chunks)
+        return chunks
+
+    def advance(self, now: float) -> np.ndarray:
+        """
+        推进到当前时间，取出截止时间已过的定时器
+
+        Args:
+            now: 当前时间戳
+
+        Returns:
+            到期定时器的键
+        """
+        target = int(np.floor(now / self.tick))
+        if target <= self.current:
+            return np.empty(0, dtype=np.int64)
+
+        expired = []
+        while self.current < target:
+            if self._count == 0:
+                self.current = target
+                break
+            self.current += 1
+            t = self.current
+            # 低层转完一圈时，从低到高依次下放高层当前格中的定时器
+            for l in range(1, self.levels):
+                if t & ((1 << (self.slot_bits * l)) - 1):
+                    break
+                for keys, ticks in self._take(l, (t >> (self.slot_bits * l)) & self.mask):
+                    self._insert(keys, ticks, t)
+            expired.extend(keys for keys, _ in self._take(0, t & self.mask))
+
+        if not expired:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(expired)
+
+
+class LivenessMonitor:
+    """传感器在线监测
+
+    读数只更新截止时间数组，时间轮中的定时器到期时再与实际截止时间比较，
+    仍在上报的传感器按新的截止时间重新放入时间轮；因此每个传感器在时间轮中最多一个定时器，
+    重新排程的次数取决于超时时长而不是上报频率
+    """
+
+    def __init__(self, periods: np.ndarray, timeout_factor: float = 3.0, min_timeout: float = 5.0,
+                 tick: float = 0.5, severity: str = 'high', clock: Callable[[], float] = time.time):
+        """
+        Args:
+            periods: 各传感器的预期上报周期（按注册表序号排列）
+            timeout_factor: 超过预期周期的多少倍未上报判定为离线
+            min_timeout: 最短超时秒数
+            tick: 时间轮分辨率（秒），也是后台线程的检查间隔
+            severity: 离线事件的严重程度
+            clock: 时间函数，读数到达和到期判定都使用它
+        """
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.tick = tick
+        self.severity = severity
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._stop_event = threading.Event()
+        self.reset(periods)
+
+        self.metrics = {
+            'observed': 0,
+            'offline_events': 0,
+            'recovered_events': 0,
+            'rescheduled': 0,
+            'polls': 0,
+            'total_poll_ms': 0.0,
+            'max_poll_ms': 0.0
+        }
+
+    def reset(self, periods: np.ndarray):
+        """
+        按新的传感器群重建监测状态，例如切换注册表之后
+
+        Args:
+            periods: 各传感器的预期上报周期
+        """
+        periods = np.asarray(periods, dtype=np.float64)
+        size = len(periods)
+        with self._lock:
+            self.timeouts = np.maximum(periods * self.timeout_factor, self.min_timeout)
+            self.deadlines = np.zeros(size, dtype=np.float64)
+            # armed: 时间轮中有该传感器的定时器；offline: 已判定离线，等待重新上报
+            self.armed = np.zeros(size, dtype=bool)
+            self.offline = np.zeros(size, dtype=bool)
+            self.offline_at = np.zeros(size, dtype=np.float64)
+            self._last_readings = [None] * size
+            self._pending = []
+            self.wheel = TimerWheel(self.tick, start=self.clock())
+
+    def observe(self, readings: List[Any], now: Optional[float] = None):
+        """
+        记录一批到达的读数，推迟这些传感器的截止时间
+
+        Args:
+            readings: Observation列表
+            now: 到达时间，默认取当前时间
+        """
+        if not readings:
+            return
+        if now is None:
+            now = self.clock()
+
+        with self._lock:
+            last_readings = self._last_readings
+            positions = []
+            for reading in readings:
+                index = reading.record.index
+                last_readings[index] = reading
+                positions.append(index)
+            indices = np.asarray(positions, dtype=np.int64)
+            self.deadlines[indices] = now + self.timeouts[indices]
+            self.metrics['observed'] += len(readings)
+
+            recovering = indices[self.offline[indices]]
+            if len(recovering):
+                recovering = np.unique(recovering)
+                self.offline[recovering] = False
+                for index in recovering.tolist():
+                    self._pending.append(SemanticEvent.recovered(last_readings[index], float(self.offline_at[index])))
+                self.metrics['recovered_events'] += len(recovering)
+
+            unarmed = indices[~self.armed[indices]]
+            if len(unarmed):
+                unarmed = np.unique(unarmed)
+                self.armed[unarmed] = True
+                self.wheel.schedule(unarmed, self.deadlines[unarmed])
+
+    def poll(self, now: Optional[float] = None) -> List[SemanticEvent]:
+        """
+        推进时间轮，返回新判定的离线事件和自上次检查以来的恢复事件
+
+        Args:
+            now: 当前时间，默认取当前时间
+
+        Returns:
+            SensorOffline/SensorRecovered语义事件列表
+        """
+        if now is None:
+            now = self.clock()
+        start = time.perf_counter()
+
+        with self._lock:
+            events = self._pending
+            self._pending = []
+            candidates = self.wheel.advance(now)
+            if len(candidates):
+                deadlines = self.deadlines[candidates]
+                due = deadlines <= now
+                # 到期前有新读数的传感器按实际截止时间重新排程
+                alive = ~due
+                self.wheel.schedule(candidates[alive], deadlines[alive])
+                self.metrics['rescheduled'] += int(alive.sum())
+
+                expired = candidates[due]
+                self.armed[expired] = False
+                self.offline[expired] = True
+                self.offline_at[expired] = now
+                for index in expired.tolist():
+                    events.append(SemanticEvent.offline(self._last_readings[index], now, self.severity))
+                self.metrics['offline_events'] += len(expired)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.metrics['polls'] += 1
+        self.metrics['total_poll_ms'] += elapsed_ms
+        self.metrics['max_poll_ms'] = max(self.metrics['max_poll_ms'], elapsed_ms)
+        return events
+
+    def offline_sensors(self) -> Dict[str, str]:
+        """
+        获取当前离线的传感器
+
+        Returns:
+            传感器ID到判定离线时间（ISO格式）的映射
+        """
+        with self._lock:
+            return {self._last_readings[index].record.id: datetime.fromtimestamp(self.offline_at[index]).isoformat()
+                    for index in np.flatnonzero(self.offline).tolist()}
+
+    def start(self, on_events: Callable[[List[SemanticEvent]], None]):
+        """
+        启动后台检查线程
+
+        停止期间没有读数到达，启动时将仍在监测的传感器的截止时间顺延一个超时，避免重启后立即误判离线
+
+        Args:
+            on_events: 接收离线/恢复事件的回调
+        """
+        if self._running:
+            return
+        now = self.clock()
+        with self._lock:
+            armed = np.flatnonzero(self.armed)
+            self.deadlines[armed] = np.maximum(self.deadlines[armed], now + self.timeouts[armed])
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_events,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, on_events: Callable[[List[SemanticEvent]], None]):
+        while not self._stop_event.wait(self.tick):
+            try:
+                events = self.poll()
+                if events:
+                    on_events(events)
+            except Exception as e:
+                print(f"在线监测错误: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """停止后台检查线程"""
+        self._running = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取在线监测统计信息"""
+        polls = self.metrics['polls']
+        return {
+            "监测传感器数": int(np.count_nonzero(self.armed | self.offline)),
+            "离线传感器数": int(np.count_nonzero(self.offline)),
+            "时间轮定时器数": len(self.wheel),
+            "接收读数": self.metrics['observed'],
+            "离线事件数": self.metrics['offline_events'],
+            "恢复事件数": self.metrics['recovered_events'],
+            "重新排程数": self.metrics['rescheduled'],
+            "平均检查耗时ms": round(self.metrics['total_poll_ms'] / polls, 3) if polls else 0.0,
+            "最大检查耗时ms": round(self.metrics['max_poll_ms'], 3)
+        }
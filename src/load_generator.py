@@ -0,0 +1,208 @@
+"""
+接入负载生成模块
+按指定速率向网络接入服务发送批量读数，无需真实设备即可测试接入吞吐量
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import time
+from typing import Dict, List, Any, Optional, Callable
+import numpy as np
+
+from ingestion_server import encode_lines
+
+# UDP单个数据报的最大读数条数，保证报文不超过常见的64KB上限
+UDP_MAX_LINES = 1000
+
+
+class LoadGenerator:
+    """接入负载生成器"""
+
+    def __init__(self, sensor_ids: List[str], host: str = '127.0.0.1', port: int = 9500,
+                 protocol: str = 'tcp', batch_size: int = 1000, seed: Optional[int] = None,
+                 value_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        """
+        初始化负载生成器
+
+        Args:
+            sensor_ids: 模拟上报的传感器ID
+            host: 接入服务地址
+            port: 接入服务端口
+            protocol: tcp或udp
+            batch_size: 每次发送的读数条数
+            seed: 随机种子
+            value_fn: 根据传感器下标数组生成数值的函数，默认生成0-100之间的随机数
+        """
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError(f"不支持的协议: {protocol}")
+        self.sensor_ids = sensor_ids
+        self.address = (host, port)
+        self.protocol = protocol
+        self.batch_size = min(batch_size, UDP_MAX_LINES) if protocol == 'udp' else batch_size
+        self.rng = np.random.default_rng(seed)
+        self.value_fn = value_fn or (lambda indices: self.rng.uniform(0, 100, len(indices)))
+
+    def make_batch(self) -> bytes:
+        """生成一批随机读数报文，时间戳留空由接入服务按接收时间补齐"""
+        chosen = self.rng.integers(0, len(self.sensor_ids), self.batch_size)
+        values = np.round(self.value_fn(chosen), 2)
+        return encode_lines([(self.sensor_ids[i], None, value)
+                             for i, value in zip(chosen.tolist(), values.tolist())])
+
+    def run(self, duration: float = 10.0, rate: Optional[float] = None,
+            total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        发送负载
+
+        Args:
+            duration: 最长发送秒数
+            rate: 目标速率（读数/秒），None表示尽可能快
+            total: 最多发送的读数条数
+
+        Returns:
+            发送报告
+        """
+        if self.protocol == 'tcp':
+            sock = socket.create_connection(self.address)
+            send = sock.sendall
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            send = lambda data: sock.sendto(data, self.address)
+
+        # 预先生成若干批报文循环使用，避免生成开销影响发送速率
+        batches = [self.make_batch() for _ in range(16)]
+        sent = 0
+        sent_bytes = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                elapsed = time.perf_counter() - start
+                if elapsed >= duration or (total is not None and sent >= total):
+                    break
+                if rate:
+                    ahead = sent / rate - elapsed
+                    if ahead > 0:
+                        time.sleep(ahead)
+                data = batches[(sent // self.batch_size) % len(batches)]
+                send(data)
+                sent += self.batch_size
+                sent_bytes += len(data)
+        finally:
+            sock.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'protocol': self.protocol,
+            'sent': sent,
+            'bytes': sent_bytes,
+            'elapsed_s': round(elapsed, 3),
+            'readings_per_s': round(sent / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def _generate(address, protocol, batch_size, duration, rate, results):
+    """子进程中运行的负载生成器，数值由向量化模拟器生成以保证落在量程内"""
+    from ssn_modeling import SSNModeling
+    from fleet_simulator import FleetSimulator
+
+    registry = SSNModeling().registry
+    simulator = FleetSimulator.from_registry(registry, seed=0)
+    generator = LoadGenerator([record.id for record in registry.records], address[0], address[1],
+                              protocol, batch_size, seed=0,
+                              value_fn=lambda indices: simulator.sample(indices=indices))
+    results.put(generator.run(duration=duration, rate=rate))
+
+
+def run_self_test(protocol: str = 'tcp', duration: float = 5.0, batch_size: int = 1000,
+                  rate: Optional[float] = None) -> Dict[str, Any]:
+    """
+    在本进程启动采集器和接入服务，在子进程中施加负载，统计服务端实际接收吞吐量
+
+    采集器使用临时数据目录，并关闭预写日志、SQLite、分片和时序块，自测数据不会进入生产数据目录
+
+    Args:
+        protocol: tcp或udp
+        duration: 发送秒数
+        batch_size: 每批读数条数
+        rate: 目标速率（读数/秒），UDP不限速时大部分数据报会被丢弃
+
+    Returns:
+        包含发送端和接收端统计的报告
+    """
+    from data_collector import DataCollector
+    from ingestion_server import IngestionServer
+    from sensor_registry import CONFIG_DIR
+
+    with open(os.path.join(CONFIG_DIR, 'service_config.json'), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    collection_config = config.setdefault('data_collection', {})
+    for section in ('wal', 'sqlite', 'sharding'):
+        collection_config.setdefault(section, {})['enabled'] = False
+    collection_config.setdefault('retention', {}).setdefault('tsblock', {})['enabled'] = False
+
+    data_dir = tempfile.mkdtemp(prefix='ingest_self_test_')
+    try:
+        config_path = os.path.join(data_dir, 'service_config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False)
+        collector = DataCollector(config_path, data_dir=data_dir)
+        collector.persistence.start()
+        server = IngestionServer(collector, tcp_port=0, udp_port=0)
+        server.start()
+        try:
+            address = server.tcp_address if protocol == 'tcp' else server.udp_address
+
+            # 本进程已有接入和持久化线程，负载进程从全新解释器启动
+            context = multiprocessing.get_context('spawn')
+            results = context.Queue()
+            process = context.Process(target=_generate,
+                                      args=(address, protocol, batch_size, duration, rate, results))
+            process.start()
+            report = results.get()
+            process.join()
+
+            # 等待服务端处理完已发送的数据（UDP可能丢包，最多等待数秒）
+            deadline = time.perf_counter() + 5
+            while time.perf_counter() < deadline:
+                stats = server.get_stats()
+                if stats['接收读数'] + stats['拒绝读数'] >= report['sent']:
+                    break
+                time.sleep(0.05)
+        finally:
+            server.stop()
+            collector.persistence.stop()
+            collector.loader.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    stats = server.get_stats()
+    report['received'] = stats['接收读数']
+    report['received_per_s'] = stats['接收速率']
+    return report
+
+
+# 使用示例
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='接入负载生成器')
+    parser.add_argument('--host', default='127.0.0.1', help='接入服务地址')
+    parser.add_argument('--port', type=int, default=9500, help='接入服务端口')
+    parser.add_argument('--protocol', choices=['tcp', 'udp'], default='tcp', help='发送协议')
+    parser.add_argument('--rate', type=float, help='目标速率（读数/秒），默认不限速')
+    parser.add_argument('--duration', type=float, default=10, help='发送秒数')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批读数条数')
+    parser.add_argument('--sensors', default='temperatureSensor_001,humiditySensor_001,smokeSensor_001,lightSensor_001',
+                        help='逗号分隔的传感器ID')
+    parser.add_argument('--self-test', action='store_true', help='在本进程启动接入服务，子进程施加负载并测量吞吐量')
+    args = parser.parse_args()
+
+    if args.self_test:
+        result = run_self_test(args.protocol, args.duration, args.batch_size, args.rate)
+    else:
+        result = LoadGenerator(args.sensors.split(','), args.host, args.port,
+                               args.protocol, args.batch_size).run(args.duration, args.rate)
+    print(result)
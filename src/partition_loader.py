@@ -0,0 +1,317 @@
+"""
+历史分区并行加载模块
+按小时分区的文件名先做时间范围过滤，再将各文件交给进程池并发解析；传感器条件下推到解析过程中：
+原始分段在json解析前按行筛掉不含目标传感器ID的行，时序块只解压目标传感器的块。
+结果按分区顺序以流的形式返回，并限制已提交但未取走的文件数，内存占用与数据总量无关；
+分析报表、回放和汇总/时序块回填共用同一个加载器
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple, Collection, Callable
+
+import numpy as np
+
+from segment_store import list_partitions, iter_partition, iter_indexed
+from sensor_history import encode_flags, empty_series
+from tsblock import read_columns as read_block_columns
+
+# 传感器集合不超过该大小时，解析前按行匹配传感器ID；更大的集合逐行匹配的开销超过节省的解析开销
+PREFILTER_MAX_SENSORS = 32
+
+
+def empty_columns() -> Tuple[np.ndarray, ...]:
+    """返回空的(传感器, 时间戳, 数值, 标志位)列"""
+    return (np.empty(0, dtype=object),) + empty_series()
+
+
+def concat_columns(parts: Sequence[Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+    """按顺序拼接多组(传感器, 时间戳, 数值, 标志位)列"""
+    if not parts:
+        return empty_columns()
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(4))
+
+
+def _line_filter(sensors: Optional[Collection[str]]) -> Optional[Callable[[bytes], bool]]:
+    """生成按行预筛选函数：行中必须出现某个目标传感器ID的JSON字符串，解析后仍按字段精确匹配"""
+    if sensors is None or len(sensors) > PREFILTER_MAX_SENSORS:
+        return None
+    needles = [json.dumps(sensor, ensure_ascii=False).encode('utf-8') for sensor in sensors]
+    return lambda line: any(needle in line for needle in needles)
+
+
+def _iter_lines(path: str, sensors: Optional[Collection[str]]) -> Iterator[Dict[str, Any]]:
+    """逐条读取分区记录，NDJSON分段在解析前按传感器预筛选行"""
+    keep = _line_filter(sensors)
+    if keep is None or not path.endswith('.jsonl'):
+        yield from iter_partition(path)
+        return
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if not keep(line):
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+    except OSError:
+        return
+
+
+def load_records(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 time_field: str = 'timestamp', sensor_field: str = 'madeBySensor',
+                 sensors: Optional[Collection[str]] = None) -> List[Dict[str, Any]]:
+    """
+    读取单个分区中满足条件的记录，可在工作进程中执行
+
+    有稀疏索引的分段（如事件）按索引只读取时间范围内的字节区间
+
+    Args:
+        path: 分区文件路径
+        start: 起始时间（包含）
+        end: 结束时间（包含）
+        time_field: ISO时间字段名
+        sensor_field: 传感器ID字段名
+        sensors: 只保留这些传感器的记录，None表示全部
+
+    Returns:
+        按写入顺序排列的记录列表
+    """
+    if sensors is None:
+        return list(iter_indexed(path, start, end, time_field))
+
+    records = []
+    for record in _iter_lines(path, sensors):
+        if record.get(sensor_field) not in sensors:
+            continue
+        if start is not None or end is not None:
+            try:
+                moment = datetime.fromisoformat(record[time_field])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if (start is not None and moment < start) or (end is not None and moment > end):
+                continue
+        records.append(record)
+    return records
+
+
+def load_columns(path: str, start: Optional[float] = None, end: Optional[float] = None,
+                 sensors: Optional[Collection[str]] = None) -> Tuple[np.ndarray, ...]:
+    """
+    读取单个原始读数分区或时序块文件，返回列式数据，可在工作进程中执行
+
+    Args:
+        path: 原始读数分区（.json/.jsonl）或时序块文件（.tsb）路径
+        start: 起始时间戳（包含）
+        end: 结束时间戳（包含）
+        sensors: 只读取这些传感器，None表示全部
+
+    Returns:
+        (传感器ID, 时间戳, 数值, 标志位)列
+    """
+    if path.endswith('.tsb'):
+        return read_block_columns(path, start, end, sensors)
+
+    names = []
+    epochs = []
+    values = []
+    flags = []
+    for record in _iter_lines(path, sensors):
+        try:
+            sensor = record['madeBySensor']
+            if sensors is not None and sensor not in sensors:
+                continue
+            epoch = datetime.fromisoformat(record['resultTime']).timestamp()
+            value = float(record['hasResult']['value'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        names.append(sensor)
+        epochs.append(epoch)
+        values.append(value)
+        flags.append(encode_flags(record.get('quality', 'good'), record.get('anomaly', False)))
+
+    columns = (np.asarray(names, dtype=object), np.asarray(epochs, dtype=np.float64),
+               np.asarray(values, dtype=np.float64), np.asarray(flags, dtype=np.uint8))
+    if start is None and end is None:
+        return columns
+    mask = np.ones(len(columns[1]), dtype=bool)
+    if start is not None:
+        mask &= columns[1] >= start
+    if end is not None:
+        mask &= columns[1] <= end
+    return tuple(column[mask] for column in columns)
+
+
+class PartitionLoader:
+    """历史分区并行加载器
+
+    进程池在首次需要并行时创建，文件数不超过1或workers不超过1时在调用线程中顺序解析；
+    结果始终按提交顺序返回。多个线程可同时使用同一个加载器，close()时仍在进行的读取
+    继续使用原进程池，最后一个读取结束后进程池才关闭
+    """
+
+    def __init__(self, workers: Optional[int] = None, prefetch: Optional[int] = None):
+        """
+        Args:
+            workers: 工作进程数，None取CPU核数（最多4个），0或1表示不使用进程池
+            prefetch: 最多同时提交的文件数，默认为工作进程数的2倍
+        """
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.workers = max(0, workers)
+        self.prefetch = prefetch or max(2, self.workers * 2)
+
+        self._pool = None
+        # 各进程池正在进行的map调用数，保护进程池切换和统计信息
+        self._users: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            'files': 0,
+            'parallel_files': 0,
+            'rows': 0,
+            'total_ms': 0.0
+        }
+
+    def _acquire_pool(self):
+        """取得当前进程池并登记一次使用"""
+        with self._lock:
+            if self._pool is None:
+                # 调用方可能是多线程进程（Web、接入、持久化线程），工作进程从全新解释器启动，避免fork复制持有中的锁
+                self._pool = multiprocessing.get_context('spawn').Pool(self.workers)
+            pool = self._pool
+            self._users[pool] = self._users.get(pool, 0) + 1
+            return pool
+
+    def _release_pool(self, pool):
+        """结束一次使用，已被close()替换下来的进程池在最后一个使用者结束后关闭"""
+        with self._lock:
+            remaining = self._users[pool] - 1
+            if remaining:
+                self._users[pool] = remaining
+                return
+            del self._users[pool]
+            if pool is self._pool:
+                return
+        pool.close()
+        pool.join()
+
+    def map(self, function: Callable, tasks: Sequence[tuple]) -> Iterator[Any]:
+        """
+        按顺序返回各任务的结果，并行时最多同时提交prefetch个任务
+
+        Args:
+            function: 模块级函数，如load_records、load_columns
+            tasks: 各任务的参数元组
+
+        Yields:
+            与任务一一对应的结果
+        """
+        if self.workers <= 1 or len(tasks) <= 1:
+            for args in tasks:
+                started = time.perf_counter()
+                result = function(*args)
+                self._record(result, started, parallel=False)
+                yield result
+            return
+
+        pool = self._acquire_pool()
+        try:
+            pending = deque()
+            position = 0
+            while position < len(tasks) or pending:
+                while position < len(tasks) and len(pending) < self.prefetch:
+                    pending.append((pool.apply_async(function, tasks[position]), time.perf_counter()))
+                    position += 1
+                future, started = pending.popleft()
+                result = future.get()
+                self._record(result, started, parallel=True)
+                yield result
+        finally:
+            self._release_pool(pool)
+
+    def _record(self, result: Any, started: float, parallel: bool):
+        rows = len(result[1]) if isinstance(result, tuple) else len(result)
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.metrics['files'] += 1
+            if parallel:
+                self.metrics['parallel_files'] += 1
+            self.metrics['rows'] += rows
+            self.metrics['total_ms'] += elapsed
+
+    def iter_records(self, directory: str, prefix: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, time_field: str = 'timestamp',
+                     sensors: Optional[Collection[str]] = None,
+                     sensor_field: str = 'madeBySensor') -> Iterator[Dict[str, Any]]:
+        """
+        按分区顺序流式读取目录下满足条件的记录
+
+        Args:
+            directory: 数据目录
+            prefix: 文件名前缀
+            start: 起始时间（包含），同时按小时分区跳过文件
+            end: 结束时间（包含），同时按小时分区跳过文件
+            time_field: ISO时间字段名
+            sensors: 只读取这些传感器的记录
+            sensor_field: 传感器ID字段名
+
+        Yields:
+            记录
+        """
+        sensors = frozenset(sensors) if sensors is not None else None
+        tasks = [(path, start, end, time_field, sensor_field, sensors)
+                 for path in list_partitions(directory, prefix, start, end)]
+        for records in self.map(load_records, tasks):
+            yield from records
+
+    def iter_columns(self, paths: Sequence[str], start: Optional[float] = None, end: Optional[float] = None,
+                     sensors: Optional[Collection[str]] = None) -> Iterator[Tuple[np.ndarray, ...]]:
+        """
+        按顺序流式读取各文件的列式数据
+
+        Args:
+            paths: 原始读数分区或时序块文件路径
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+            sensors: 只读取这些传感器
+
+        Yields:
+            与文件一一对应的(传感器ID, 时间戳, 数值, 标志位)列
+        """
+        sensors = frozenset(sensors) if sensors is not None else None
+        return self.map(load_columns, [(path, start, end, sensors) for path in paths])
+
+    def read_columns(self, paths: Sequence[str], start: Optional[float] = None, end: Optional[float] = None,
+                     sensors: Optional[Collection[str]] = None) -> Tuple[np.ndarray, ...]:
+        """读取多个文件并拼接为一组列，参数同iter_columns"""
+        return concat_columns(list(self.iter_columns(paths, start, end, sensors)))
+
+    def close(self):
+        """关闭进程池，之后需要并行时会重新创建；仍有读取在进行时由最后一个读取结束后关闭"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            if pool is None or pool in self._users:
+                return
+        pool.close()
+        pool.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取加载器统计信息"""
+        with self._lock:
+            metrics = dict(self.metrics)
+        files = metrics['files']
+        return {
+            "工作进程数": self.workers,
+            "加载文件数": files,
+            "并行加载文件数": metrics['parallel_files'],
+            "加载记录数": metrics['rows'],
+            "平均每文件耗时ms": round(metrics['total_ms'] / files, 2) if files else 0.0
+        }
@@ -0,0 +1,204 @@
+"""
+流水线队列模块
+实现带容量上限的阻塞队列，支持按批量或超时取出，
+以及可配置的溢出策略（阻塞、丢弃最旧、优先丢弃低优先级）
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_low_priority')
+
+
+class BoundedQueue:
+    """有界阻塞队列"""
+
+    def __init__(self, capacity: int, policy: str = 'block',
+                 is_important: Optional[Callable[[Any], bool]] = None,
+                 block_timeout: Optional[float] = None):
+        """
+        初始化有界队列
+
+        Args:
+            capacity: 队列容量
+            policy: 溢出策略
+                block - 阻塞生产者直到有空位（超过block_timeout则丢弃新元素）
+                drop_oldest - 丢弃队列中最旧的元素
+                drop_low_priority - 优先丢弃最旧的低优先级元素，没有低优先级元素时丢弃最旧元素
+            is_important: 判断元素是否为高优先级的函数，仅drop_low_priority策略使用
+            block_timeout: block策略下生产者最长等待秒数，None表示一直等待
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的溢出策略: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.is_important = is_important or (lambda item: True)
+        self.block_timeout = block_timeout
+
+        # 高/低优先级分开存放，序号保证整体先进先出
+        self._high = deque()
+        self._low = deque()
+        self._sequence = 0
+        self._closed = False
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.counters = {
+            'put': 0,
+            'got': 0,
+            'dropped': 0,
+            'dropped_low_priority': 0,
+            'blocked_puts': 0,
+            'peak_depth': 0
+        }
+
+    def _size(self) -> int:
+        return len(self._high) + len(self._low)
+
+    def qsize(self) -> int:
+        """当前队列深度"""
+        with self._lock:
+            return self._size()
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def put(self, item: Any) -> bool:
+        """
+        放入元素
+
+        Returns:
+            元素是否入队
+        """
+        important = True
+        if self.policy == 'drop_low_priority':
+            important = bool(self.is_important(item))
+
+        with self._lock:
+            if self._closed:
+                return False
+
+            if self._size() >= self.capacity:
+                if not self._make_room(important):
+                    self.counters['dropped'] += 1
+                    return False
+
+            self._sequence += 1
+            (self._high if important else self._low).append((self._sequence, item))
+            self.counters['put'] += 1
+            depth = self._size()
+            if depth > self.counters['peak_depth']:
+                self.counters['peak_depth'] = depth
+            self._not_empty.notify()
+            return True
+
+    def put_many(self, items: List[Any]) -> int:
+        """批量放入元素，返回入队数量"""
+        return sum(1 for item in items if self.put(item))
+
+    def _make_room(self, important: bool) -> bool:
+        """队列已满时按策略腾出空位，返回是否可以入队"""
+        if self.policy == 'block':
+            self.counters['blocked_puts'] += 1
+            deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+            while self._size() >= self.capacity and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._not_full.wait(remaining)
+            return not self._closed
+
+        if self.policy == 'drop_low_priority':
+            if self._low:
+                self._low.popleft()
+                self.counters['dropped'] += 1
+                self.counters['dropped_low_priority'] += 1
+                return True
+            if not important:
+                # 队列已被高优先级元素占满，丢弃新来的低优先级元素
+                self.counters['dropped_low_priority'] += 1
+                return False
+
+        # drop_oldest，或低优先级元素已丢尽
+        self._pop_oldest()
+        self.counters['dropped'] += 1
+        return True
+
+    def _pop_oldest(self) -> Any:
+        """取出整体最旧的元素"""
+        if not self._low or (self._high and self._high[0][0] < self._low[0][0]):
+            return self._high.popleft()[1]
+        return self._low.popleft()[1]
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        阻塞取出一个元素
+
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
+
+        Returns:
+            元素，超时或队列关闭时返回None
+        """
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def get_batch(self, max_items: int, timeout: Optional[float] = None) -> List[Any]:
+        """
+        按批量或超时取出元素
+
+        等待直到攒够max_items个元素或超时，然后取出最多max_items个元素
+
+        Args:
+            max_items: 单批最多取出的元素数
+            timeout: 最长等待秒数，None表示一直等待到批量攒满
+
+        Returns:
+            元素列表，超时且队列为空时为空列表
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._size() < max_items and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._not_empty.wait(remaining)
+
+            batch = []
+            while self._size() and len(batch) < max_items:
+                batch.append(self._pop_oldest())
+            if batch:
+                self.counters['got'] += len(batch)
+                self._not_full.notify(len(batch))
+            return batch
+
+    def close(self):
+        """关闭队列，唤醒所有等待中的生产者和消费者"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def reopen(self):
+        """重新打开已关闭的队列"""
+        with self._lock:
+            self._closed = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        with self._lock:
+            return {
+                "队列深度": self._size(),
+                "队列容量": self.capacity,
+                "峰值深度": self.counters['peak_depth'],
+                "溢出策略": self.policy,
+                "入队总数": self.counters['put'],
+                "出队总数": self.counters['got'],
+                "丢弃总数": self.counters['dropped'],
+                "丢弃低优先级数": self.counters['dropped_low_priority'],
+                "阻塞入队次数": self.counters['blocked_puts']
+            }
@@ -0,0 +1,122 @@
+"""
+读数时间索引模块
+按时间戳有序保存最近读数，插入时缓存时间戳，按时间范围二分查找并返回切片；
+采集线程写入与接口线程查询通过每个日志的锁互斥
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Optional, Iterator
+
+
+class TimeIndexedLog:
+    """按时间戳有序、定长的记录日志"""
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: 最多保留的记录数，超出后淘汰最旧的记录
+        """
+        self.capacity = capacity
+        self._epochs: List[float] = []
+        self._records: List[Any] = []
+        self._start = 0  # 逻辑起点，淘汰时只移动起点，累计到一定数量再整体压缩
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records) - self._start
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(self._records[self._start:])
+
+    def append(self, epoch: float, record: Any):
+        """
+        追加记录
+
+        时间戳通常单调递增，直接追加；迟到的记录通过二分插入到正确位置
+        """
+        with self._lock:
+            if not self._epochs or epoch >= self._epochs[-1]:
+                self._epochs.append(epoch)
+                self._records.append(record)
+            else:
+                position = max(bisect_right(self._epochs, epoch, self._start), self._start)
+                self._epochs.insert(position, epoch)
+                self._records.insert(position, record)
+
+            if len(self) > self.capacity:
+                self._start += len(self) - self.capacity
+                if self._start > self.capacity:
+                    del self._epochs[:self._start]
+                    del self._records[:self._start]
+                    self._start = 0
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Any]:
+        """
+        获取时间范围内的记录
+
+        Args:
+            start: 起始时间戳（包含），None表示不限
+            end: 结束时间戳（包含），None表示不限
+
+        Returns:
+            记录列表（与日志共享记录对象，不复制）
+        """
+        with self._lock:
+            lo = self._start if start is None else bisect_left(self._epochs, start, self._start)
+            hi = len(self._epochs) if end is None else bisect_right(self._epochs, end, self._start)
+            return self._records[lo:hi]
+
+    def latest(self, n: int) -> List[Any]:
+        """获取最新的n条记录"""
+        with self._lock:
+            return self._records[max(self._start, len(self._records) - n):]
+
+
+class ReadingIndex:
+    """最近读数的全局及按传感器时间索引"""
+
+    def __init__(self, capacity: int = 50000, per_sensor_capacity: Optional[int] = None,
+                 n_sensors: int = 1):
+        """
+        Args:
+            capacity: 全局最多保留的读数数量
+            per_sensor_capacity: 每个传感器最多保留的读数数量，默认按传感器数均分全局容量
+            n_sensors: 传感器数量，用于计算默认的单传感器容量
+        """
+        self.capacity = capacity
+        self.per_sensor_capacity = per_sensor_capacity or max(1, -(-capacity // max(1, n_sensors)))
+        self._all = TimeIndexedLog(capacity)
+        self._by_sensor: Dict[str, TimeIndexedLog] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._all)
+
+    def add(self, sensor_id: str, epoch: float, reading: Dict[str, Any]):
+        """加入一条读数"""
+        self._all.append(epoch, reading)
+        log = self._by_sensor.get(sensor_id)
+        if log is None:
+            log = self._by_sensor[sensor_id] = TimeIndexedLog(self.per_sensor_capacity)
+        log.append(epoch, reading)
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              sensor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围查询读数
+
+        Args:
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+            sensor_id: 只查询该传感器的读数，None表示全部
+        """
+        if sensor_id is None:
+            return self._all.range(start, end)
+        log = self._by_sensor.get(sensor_id)
+        if log is None:
+            return []
+        return log.range(start, end)
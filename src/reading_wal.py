@@ -0,0 +1,326 @@
+"""
+读数预写日志模块
+读数在进入处理队列之前先追加到预写日志，由专用线程成组fsync；
+原始数据和由其生成的事件持久化后推进检查点并删除已覆盖的日志分段，
+重启时重放检查点之后的读数（至少一次语义，崩溃时可能重放少量已持久化的读数）
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+# 日志分段文件名: wal_<首条记录序号>.log
+SEGMENT_PREFIX = 'wal_'
+SEGMENT_SUFFIX = '.log'
+CHECKPOINT_FILE = 'checkpoint'
+
+# 重放的读数: (序号, 传感器ID, 数值, 时间戳, 数据质量, 是否异常)
+WALEntry = Tuple[int, str, float, float, str, bool]
+
+
+def encode_entry(lsn: int, reading) -> bytes:
+    """将一条观测编码为一行制表符分隔的日志记录"""
+    return (f"{lsn}\t{reading.record.id}\t{reading.value!r}\t{reading.epoch!r}\t"
+            f"{reading.quality}\t{int(bool(reading.anomaly))}\n").encode('utf-8')
+
+
+def decode_entry(line: bytes) -> Optional[WALEntry]:
+    """解析一行日志记录，不完整或损坏的行返回None"""
+    if not line.endswith(b'\n'):
+        return None
+    fields = line.decode('utf-8', errors='replace').rstrip('\n').split('\t')
+    if len(fields) != 6:
+        return None
+    try:
+        return int(fields[0]), fields[1], float(fields[2]), float(fields[3]), fields[4], fields[5] == '1'
+    except ValueError:
+        return None
+
+
+class ReadingWAL:
+    """读数预写日志
+
+    追加只写入操作系统缓冲区，fsync由后台线程按sync_interval成组执行，
+    需要确认落盘的调用方通过wait_durable等待覆盖自己序号的那次fsync
+    """
+
+    def __init__(self, directory: str, sync_interval: float = 0.05,
+                 segment_bytes: int = 4 * 1024 * 1024):
+        """
+        Args:
+            directory: 日志目录
+            sync_interval: 两次成组fsync之间的最长间隔（秒）
+            segment_bytes: 单个日志分段的最大字节数，检查点只删除已写满并被完全覆盖的分段
+        """
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._thread = None
+        self._running = False
+
+        self.checkpoint_lsn = self._read_checkpoint()
+        # 已有分段按首条序号排序: [(首条序号, 路径)]
+        self._segments = self._list_segments()
+        self.last_lsn = max(self.checkpoint_lsn, self._scan_last_lsn())
+        self.durable_lsn = self.last_lsn
+
+        self.metrics = {
+            'appended': 0,
+            'bytes': 0,
+            'syncs': 0,
+            'total_sync_ms': 0.0,
+            'max_sync_ms': 0.0,
+            'checkpoints': 0,
+            'segments_deleted': 0,
+            'replayed': 0
+        }
+
+    # ---- 分段与检查点文件 ----
+
+    def _segment_path(self, first_lsn: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{first_lsn:020d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+                try:
+                    first = int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                except ValueError:
+                    continue
+                segments.append((first, os.path.join(self.directory, filename)))
+        segments.sort()
+        return segments
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, lsn: int):
+        """先写临时文件再替换；检查点丢失只会导致多重放，因此不单独fsync"""
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(lsn))
+        os.replace(temp_path, path)
+
+    def _scan_last_lsn(self) -> int:
+        """最后一个分段中最后一条完整记录的序号"""
+        if not self._segments:
+            return 0
+        last = self._segments[-1][0] - 1
+        for entry in self._iter_segment(self._segments[-1][1]):
+            last = entry[0]
+        return last
+
+    @staticmethod
+    def _iter_segment(path: str):
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    entry = decode_entry(line)
+                    if entry is not None:
+                        yield entry
+        except OSError:
+            return
+
+    def _open_segment(self):
+        """为下一条记录打开新分段，避免续写崩溃时可能残留不完整尾行的旧分段"""
+        first = self.last_lsn + 1
+        path = self._segment_path(first)
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+        self._segments.append((first, path))
+
+    # ---- 写入与成组fsync ----
+
+    def append(self, readings: List[Any]) -> int:
+        """
+        追加一批观测
+
+        Args:
+            readings: Observation列表
+
+        Returns:
+            本批最后一条记录的序号，空批次返回当前最大序号
+        """
+        if not readings:
+            return self.last_lsn
+
+        with self._lock:
+            if self._file is None or self._size >= self.segment_bytes:
+                self._rotate()
+            first = self.last_lsn + 1
+            payload = b''.join(encode_entry(first + i, reading) for i, reading in enumerate(readings))
+            self._file.write(payload)
+            self._file.flush()
+            self._size += len(payload)
+            self.last_lsn = first + len(readings) - 1
+
+            self.metrics['appended'] += len(readings)
+            self.metrics['bytes'] += len(payload)
+            return self.last_lsn
+
+    def _rotate(self):
+        """在持有锁的情况下切换到新分段，旧分段先落盘"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._open_segment()
+
+    def sync(self):
+        """将已追加的记录落盘，并唤醒等待者"""
+        with self._sync_lock:
+            with self._lock:
+                target = self.last_lsn
+                file = self._file
+            if target <= self.durable_lsn:
+                return
+            start = time.perf_counter()
+            if file is not None:
+                try:
+                    os.fsync(file.fileno())
+                except (OSError, ValueError):
+                    # 文件已在切换分段时关闭，切换前已经fsync
+                    pass
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.durable_lsn = max(self.durable_lsn, target)
+                self._durable.notify_all()
+            self.metrics['syncs'] += 1
+            self.metrics['total_sync_ms'] += elapsed_ms
+            self.metrics['max_sync_ms'] = max(self.metrics['max_sync_ms'], elapsed_ms)
+
+    def wait_durable(self, lsn: int, timeout: Optional[float] = None) -> bool:
+        """
+        等待序号不超过lsn的记录落盘，同一周期内的多个等待者共享一次fsync
+
+        Args:
+            lsn: 需要落盘的最大序号
+            timeout: 最长等待秒数
+
+        Returns:
+            是否已落盘
+        """
+        if not self._running:
+            self.sync()
+            return self.durable_lsn >= lsn
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self.durable_lsn < lsn and self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._durable.wait(remaining)
+        if self.durable_lsn < lsn:
+            self.sync()
+        return self.durable_lsn >= lsn
+
+    def start(self):
+        """启动成组fsync线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._sync_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _sync_loop(self):
+        while self._running:
+            time.sleep(self.sync_interval)
+            self.sync()
+
+    def stop(self, timeout: float = 5.0):
+        """停止fsync线程并将剩余记录落盘"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.sync()
+        with self._lock:
+            self._durable.notify_all()
+
+    def close(self):
+        """停止并关闭当前分段"""
+        self.stop()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---- 检查点与重放 ----
+
+    def checkpoint(self, lsn: int):
+        """
+        记录序号不超过lsn的读数已持久化，删除被完全覆盖的已写满分段
+
+        Args:
+            lsn: 已持久化的最大序号
+        """
+        with self._lock:
+            lsn = min(lsn, self.last_lsn)
+            if lsn <= self.checkpoint_lsn:
+                return
+            self.checkpoint_lsn = lsn
+            self._write_checkpoint(lsn)
+            self.metrics['checkpoints'] += 1
+
+            # 分段i覆盖[first_i, first_{i+1})，当前写入的分段不删除
+            current = self._segments[-1][1] if self._file is not None else None
+            keep = []
+            for i, (first, path) in enumerate(self._segments):
+                next_first = self._segments[i + 1][0] if i + 1 < len(self._segments) else self.last_lsn + 1
+                if path != current and next_first - 1 <= lsn:
+                    try:
+                        os.remove(path)
+                        self.metrics['segments_deleted'] += 1
+                    except OSError:
+                        pass
+                    continue
+                keep.append((first, path))
+            self._segments = keep
+
+    def pending(self) -> List[WALEntry]:
+        """
+        读取检查点之后的读数，用于重启时重放
+
+        Returns:
+            按序号排列的日志记录
+        """
+        entries = []
+        for _, path in list(self._segments):
+            for entry in self._iter_segment(path):
+                if entry[0] > self.checkpoint_lsn:
+                    entries.append(entry)
+        self.metrics['replayed'] += len(entries)
+        return entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预写日志统计信息"""
+        syncs = self.metrics['syncs']
+        return {
+            "最新序号": self.last_lsn,
+            "已落盘序号": self.durable_lsn,
+            "检查点序号": self.checkpoint_lsn,
+            "未检查点读数": self.last_lsn - self.checkpoint_lsn,
+            "日志分段数": len(self._segments),
+            "追加读数": self.metrics['appended'],
+            "写入MB": round(self.metrics['bytes'] / 1024 / 1024, 2),
+            "fsync次数": syncs,
+            "平均fsync耗时ms": round(self.metrics['total_sync_ms'] / syncs, 3) if syncs else 0.0,
+            "最大fsync耗时ms": round(self.metrics['max_sync_ms'], 3),
+            "检查点次数": self.metrics['checkpoints'],
+            "已删除分段数": self.metrics['segments_deleted'],
+            "重启重放读数": self.metrics['replayed']
+        }
@@ -0,0 +1,223 @@
+"""
+历史回放模块
+将 data/raw 与 data/events 中存储的数据按时间顺序重新送入语义事件生成和事件处理流程，
+支持倍速回放，并统计吞吐量与各阶段延迟，用于复现现场问题和基于真实数据量的性能测试
+"""
+
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import numpy as np
+
+from partition_loader import PartitionLoader
+from semantic_records import Observation
+
+# 回放数据源：数据目录下的子目录、文件名前缀和时间字段
+REPLAY_SOURCES = {
+    'raw': ('raw', 'sensor_data', 'resultTime'),
+    'events': ('events', 'events', 'timestamp')
+}
+
+
+def parse_epoch(text: str) -> Optional[float]:
+    """将ISO时间字符串转换为时间戳，无法解析时返回None"""
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, Any]:
+    """计算延迟样本（秒）的分位数，结果以毫秒表示"""
+    if not samples:
+        return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(samples),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+
+class ReplayEngine:
+    """历史数据回放引擎"""
+
+    def __init__(self, collector, processor, data_dir: str = "data",
+                 speed: float = 0, batch_size: Optional[int] = None,
+                 reorder_window: int = 1000, loader: Optional[PartitionLoader] = None):
+        """
+        初始化回放引擎
+
+        Args:
+            collector: DataCollector实例，用于生成语义事件
+            processor: EventProcessor实例，用于处理语义事件
+            data_dir: 数据根目录
+            speed: 回放倍速，1表示按原始节奏，100表示100倍速，0表示不限速
+            batch_size: 每批送入语义事件生成的读数数量，默认取采集器配置
+            reorder_window: 按时间戳重排的缓冲记录数，用于纠正跨分区的轻微乱序
+            loader: 分区加载器，默认使用采集器的加载器，采集器没有时在当前线程中顺序读取
+        """
+        self.collector = collector
+        self.processor = processor
+        self.data_dir = data_dir
+        self.speed = speed
+        self.batch_size = batch_size or collector.batch_size
+        self.reorder_window = reorder_window
+        self.loader = loader or getattr(collector, 'loader', None) or PartitionLoader(workers=0)
+
+    def iter_stored(self, source: str = 'raw', start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """
+        按时间顺序流式读取存储的记录
+
+        Args:
+            source: 数据源（raw/events）
+            start: 起始时间（包含）
+            end: 结束时间（包含）
+
+        Yields:
+            (时间戳, 记录)
+        """
+        if source not in REPLAY_SOURCES:
+            raise ValueError(f"不支持的回放数据源: {source}")
+        subdir, prefix, time_field = REPLAY_SOURCES[source]
+        start_epoch = start.timestamp() if start else None
+        end_epoch = end.timestamp() if end else None
+
+        heap = []
+        sequence = 0
+        # 各分区并发解析，有稀疏索引的分段（如事件）只读取时间范围内的记录
+        for record in self.loader.iter_records(os.path.join(self.data_dir, subdir), prefix, start, end, time_field):
+            epoch = parse_epoch(record.get(time_field))
+            if epoch is None:
+                continue
+            if start_epoch is not None and epoch < start_epoch:
+                continue
+            if end_epoch is not None and epoch > end_epoch:
+                continue
+            # 序号保证时间戳相同的记录保持原有顺序
+            heapq.heappush(heap, (epoch, sequence, record))
+            sequence += 1
+            if len(heap) > self.reorder_window:
+                epoch, _, record = heapq.heappop(heap)
+                yield epoch, record
+
+        while heap:
+            epoch, _, record = heapq.heappop(heap)
+            yield epoch, record
+
+    def run(self, source: str = 'raw', start: Optional[datetime] = None,
+            end: Optional[datetime] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行回放
+
+        Args:
+            source: 数据源，raw回放传感器读数，events直接回放语义事件
+            start: 起始时间
+            end: 结束时间
+            limit: 最多回放的记录数
+
+        Returns:
+            回放报告
+        """
+        stage_latencies = {'generate': [], 'process': []}
+        end_to_end = []
+        pacing_lag = []
+        counters = {'records': 0, 'semantic_events': 0, 'complex_events': 0}
+
+        pending: List[Tuple[float, float, Dict[str, Any]]] = []
+        wall_start = time.perf_counter()
+        data_start = None
+
+        def flush():
+            if not pending:
+                return
+            if source == 'raw':
+                stage_start = time.perf_counter()
+                registry = self.collector.registry
+                readings = [Observation.from_dict(record, registry, epoch) for epoch, _, record in pending]
+                events = self.collector.generate_semantic_events([r for r in readings if r is not None])
+                stage_latencies['generate'].append(time.perf_counter() - stage_start)
+            else:
+                events = [record for _, _, record in pending]
+
+            for event in events:
+                stage_start = time.perf_counter()
+                complex_events = self.processor.process_semantic_event(event)
+                stage_latencies['process'].append(time.perf_counter() - stage_start)
+                counters['complex_events'] += len(complex_events)
+            counters['semantic_events'] += len(events)
+
+            done = time.perf_counter()
+            end_to_end.extend(done - released for _, released, _ in pending)
+            pending.clear()
+
+        for epoch, record in self.iter_stored(source, start, end):
+            if limit is not None and counters['records'] >= limit:
+                break
+            if data_start is None:
+                data_start = epoch
+
+            # 按倍速控制回放节奏
+            if self.speed and self.speed > 0:
+                scheduled = wall_start + (epoch - data_start) / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    flush()
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                released = time.perf_counter()
+                pacing_lag.append(max(0.0, released - scheduled))
+            else:
+                released = time.perf_counter()
+
+            pending.append((epoch, released, record))
+            counters['records'] += 1
+            if len(pending) >= self.batch_size:
+                flush()
+
+        flush()
+        elapsed = time.perf_counter() - wall_start
+
+        return {
+            'source': source,
+            'speed': self.speed or 'max',
+            'records': counters['records'],
+            'semantic_events': counters['semantic_events'],
+            'complex_events': counters['complex_events'],
+            'elapsed_s': round(elapsed, 3),
+            'records_per_s': round(counters['records'] / elapsed, 1) if elapsed > 0 else None,
+            'events_per_s': round(counters['semantic_events'] / elapsed, 1) if elapsed > 0 else None,
+            'stages': {
+                'generate_semantic_events': summarize_latencies(stage_latencies['generate']),
+                'process_semantic_event': summarize_latencies(stage_latencies['process'])
+            },
+            'end_to_end': summarize_latencies(end_to_end),
+            'pacing_lag': summarize_latencies(pacing_lag)
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """将回放报告格式化为可读文本"""
+    lines = [
+        f"数据源: {report['source']}  倍速: {report['speed']}",
+        f"回放记录数: {report['records']}  语义事件: {report['semantic_events']}  复杂事件: {report['complex_events']}",
+        f"耗时: {report['elapsed_s']}秒  吞吐量: {report['records_per_s']} 记录/秒, {report['events_per_s']} 事件/秒"
+    ]
+    sections = [
+        ('语义事件生成(每批)', report['stages']['generate_semantic_events']),
+        ('事件处理(每事件)', report['stages']['process_semantic_event']),
+        ('端到端(每记录)', report['end_to_end']),
+        ('节奏滞后', report['pacing_lag'])
+    ]
+    for name, stats in sections:
+        if stats['count']:
+            lines.append(f"{name}: p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                         f"p99={stats['p99_ms']}ms max={stats['max_ms']}ms (n={stats['count']})")
+    return "\n".join(lines)
@@ -0,0 +1,343 @@
+"""
+数据保留模块
+按 data_retention_days 删除过期的分区文件，并在删除前将原始读数降采样为
+1分钟和1小时汇总（每个传感器的最小值/最大值/均值/计数），长时间范围的查询读取汇总数据；
+可选地将原始读数压缩为时序块文件，在原始分区删除后仍可按点查询
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+from segment_store import encode_record, list_partitions, iter_partition, parse_partition_name, index_path, HOUR_FORMAT
+from tsblock import TSBlockStore
+from partition_loader import PartitionLoader, concat_columns
+from sqlite_store import SQLiteStore
+
+# 需要按保留期清理的数据流：(子目录, 文件名前缀)
+RETAINED_STREAMS = [
+    ('raw', 'sensor_data'),
+    ('processed', 'processed_data'),
+    ('events', 'events')
+]
+
+# 汇总层级：名称 -> 桶宽（秒）
+ROLLUP_TIERS = {
+    '1m': 60,
+    '1h': 3600
+}
+
+
+def aggregate(sensors: np.ndarray, epochs: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+              mins: np.ndarray, maxs: np.ndarray, bucket_seconds: int) -> List[Dict[str, Any]]:
+    """
+    按(传感器, 时间桶)分组合并
+
+    输入既可以是原始读数（count=1, sum=min=max=数值），也可以是更细粒度的汇总
+
+    Args:
+        sensors: 传感器ID数组
+        epochs: 时间戳数组
+        counts: 计数数组
+        sums: 求和数组
+        mins: 最小值数组
+        maxs: 最大值数组
+        bucket_seconds: 桶宽（秒）
+
+    Returns:
+        按传感器、时间排序的汇总记录列表
+    """
+    if len(sensors) == 0:
+        return []
+
+    sensor_names, sensor_codes = np.unique(sensors, return_inverse=True)
+    buckets = (np.floor(epochs / bucket_seconds) * bucket_seconds).astype(np.int64)
+    order = np.lexsort((buckets, sensor_codes))
+    sensor_codes = sensor_codes[order]
+    buckets = buckets[order]
+
+    starts = np.flatnonzero(np.r_[True, (sensor_codes[1:] != sensor_codes[:-1]) | (buckets[1:] != buckets[:-1])])
+    total_counts = np.add.reduceat(counts[order], starts)
+    total_sums = np.add.reduceat(sums[order], starts)
+    bucket_mins = np.minimum.reduceat(mins[order], starts)
+    bucket_maxs = np.maximum.reduceat(maxs[order], starts)
+
+    rollups = []
+    for i, position in enumerate(starts.tolist()):
+        count = int(total_counts[i])
+        total = float(total_sums[i])
+        bucket = int(buckets[position])
+        rollups.append({
+            'sensor': str(sensor_names[sensor_codes[position]]),
+            'start': datetime.fromtimestamp(bucket).isoformat(),
+            'epoch': bucket,
+            'count': count,
+            'sum': total,
+            'min': float(bucket_mins[i]),
+            'max': float(bucket_maxs[i]),
+            'mean': total / count
+        })
+    return rollups
+
+
+def _rollup_columns(path: str) -> Tuple[np.ndarray, ...]:
+    """读取汇总分区，返回可直接传给aggregate的(传感器, 时间戳, 计数, 和, 最小值, 最大值)列"""
+    records = list(iter_partition(path))
+    return (np.asarray([r['sensor'] for r in records], dtype=object),
+            np.asarray([r['epoch'] for r in records], dtype=np.float64),
+            np.asarray([r['count'] for r in records], dtype=np.int64),
+            np.asarray([r['sum'] for r in records], dtype=np.float64),
+            np.asarray([r['min'] for r in records], dtype=np.float64),
+            np.asarray([r['max'] for r in records], dtype=np.float64))
+
+
+class RetentionManager:
+    """数据保留与分层汇总服务"""
+
+    def __init__(self, data_dir: str = "data", retention_days: float = 30,
+                 rollup_retention_days: Optional[Dict[str, float]] = None,
+                 interval: float = 3600, clock=datetime.now,
+                 block_store: Optional[TSBlockStore] = None, block_retention_days: float = 365,
+                 database: Optional[SQLiteStore] = None, loader: Optional[PartitionLoader] = None):
+        """
+        初始化保留服务
+
+        Args:
+            data_dir: 数据根目录
+            retention_days: 原始、处理后数据及事件分区的保留天数
+            rollup_retention_days: 各汇总层级的保留天数，默认1分钟汇总90天、1小时汇总365天
+            interval: 后台执行间隔（秒）
+            clock: 当前时间函数
+            block_store: 时序块存储，指定时为已结束的小时生成时序块文件
+            block_retention_days: 时序块文件的保留天数
+            database: SQLite存储，指定时按retention_days一并清理其中的过期记录
+            loader: 读取原始读数分区的加载器，默认在当前线程中顺序读取
+        """
+        self.data_dir = data_dir
+        self.retention_days = retention_days
+        self.rollup_retention_days = {'1m': 90, '1h': 365, **(rollup_retention_days or {})}
+        self.interval = interval
+        self.clock = clock
+        self.rollup_dir = os.path.join(data_dir, 'rollups')
+        self.block_store = block_store
+        self.block_retention_days = block_retention_days
+        self.database = database
+        self.loader = loader or PartitionLoader(workers=0)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.metrics = {
+            'runs': 0,
+            'partitions_deleted': 0,
+            'bytes_deleted': 0,
+            'rollups_built': 0,
+            'blocks_built': 0,
+            'block_bytes': 0,
+            'last_run': None
+        }
+
+    def _tier_dir(self, tier: str) -> str:
+        return os.path.join(self.rollup_dir, tier)
+
+    def _rollup_path(self, tier: str, hour: datetime) -> str:
+        return os.path.join(self._tier_dir(tier), f"rollup_{tier}_{hour.strftime(HOUR_FORMAT)}.jsonl")
+
+    @staticmethod
+    def _write_atomic(path: str, records: List[Dict[str, Any]]):
+        """先写临时文件再替换，保证汇总文件要么完整要么不存在"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            for record in records:
+                f.write(encode_record(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def build_rollups(self) -> int:
+        """
+        为已结束的小时构建缺失的1分钟和1小时汇总
+
+        Returns:
+            新构建的汇总文件数
+        """
+        current_hour = self.clock().replace(minute=0, second=0, microsecond=0)
+        raw_dir = os.path.join(self.data_dir, 'raw')
+
+        # 同一小时可能有多个分段，按小时归并
+        hours: Dict[datetime, List[str]] = {}
+        for path in list_partitions(raw_dir, 'sensor_data'):
+            hour = parse_partition_name(path)['hour']
+            if hour < current_hour:
+                hours.setdefault(hour, []).append(path)
+
+        # 缺少1分钟汇总或时序块的小时需要读取原始读数，这些小时的全部分段一次交给加载器，回填时并发解析
+        needs = {}
+        for hour in sorted(hours):
+            need_minutes = not os.path.exists(self._rollup_path('1m', hour))
+            need_blocks = self.block_store is not None and not os.path.exists(self.block_store.path_for(hour))
+            needs[hour] = (need_minutes, need_blocks)
+        loaded = self.loader.iter_columns([path for hour in sorted(hours) if any(needs[hour]) for path in hours[hour]])
+
+        built = 0
+        for hour in sorted(hours):
+            minute_path = self._rollup_path('1m', hour)
+            need_minutes, need_blocks = needs[hour]
+            if need_minutes or need_blocks:
+                sensors, epochs, values, flags = concat_columns([next(loaded) for _ in hours[hour]])
+                if need_minutes:
+                    ones = np.ones(len(values), dtype=np.int64)
+                    self._write_atomic(minute_path, aggregate(sensors, epochs, ones, values, values, values,
+                                                              ROLLUP_TIERS['1m']))
+                    built += 1
+                if need_blocks:
+                    self.metrics['block_bytes'] += self.block_store.write_hour(hour, sensors, epochs, values, flags)
+                    self.metrics['blocks_built'] += 1
+
+            hour_path = self._rollup_path('1h', hour)
+            if not os.path.exists(hour_path):
+                self._write_atomic(hour_path, aggregate(*_rollup_columns(minute_path), ROLLUP_TIERS['1h']))
+                built += 1
+
+        self.metrics['rollups_built'] += built
+        return built
+
+    def _delete(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self.metrics['partitions_deleted'] += 1
+        self.metrics['bytes_deleted'] += size
+
+        # 分段的稀疏索引随分段一并删除
+        try:
+            size = os.path.getsize(index_path(path))
+            os.remove(index_path(path))
+        except OSError:
+            return
+        self.metrics['bytes_deleted'] += size
+
+    def prune(self) -> int:
+        """
+        删除超过保留期的分区
+
+        原始读数分区只有在对应小时的汇总已经生成后才会删除
+
+        Returns:
+            删除的文件数
+        """
+        now = self.clock()
+        deleted_before = self.metrics['partitions_deleted']
+
+        cutoff = now - timedelta(days=self.retention_days)
+        for subdir, prefix in RETAINED_STREAMS:
+            for path in list_partitions(os.path.join(self.data_dir, subdir), prefix):
+                hour = parse_partition_name(path)['hour']
+                # 分区覆盖整个小时，小时结束时间早于截止时间才算过期
+                if hour + timedelta(hours=1) > cutoff:
+                    break
+                if subdir == 'raw' and not self._compacted(hour):
+                    continue
+                self._delete(path)
+
+        for tier, days in self.rollup_retention_days.items():
+            tier_cutoff = now - timedelta(days=days)
+            for path in list_partitions(self._tier_dir(tier), f"rollup_{tier}"):
+                if parse_partition_name(path)['hour'] + timedelta(hours=1) > tier_cutoff:
+                    break
+                self._delete(path)
+
+        if self.block_store is not None:
+            block_cutoff = now - timedelta(days=self.block_retention_days)
+            for path in list_partitions(self.block_store.directory, TSBlockStore.PREFIX):
+                if parse_partition_name(path)['hour'] + timedelta(hours=1) > block_cutoff:
+                    break
+                self._delete(path)
+
+        if self.database is not None:
+            self.database.prune(cutoff.timestamp())
+
+        return self.metrics['partitions_deleted'] - deleted_before
+
+    def _compacted(self, hour: datetime) -> bool:
+        """原始读数是否已生成1小时汇总（以及启用时的时序块），可以删除"""
+        if not os.path.exists(self._rollup_path('1h', hour)):
+            return False
+        return self.block_store is None or os.path.exists(self.block_store.path_for(hour))
+
+    def run_once(self) -> Dict[str, int]:
+        """执行一次汇总和清理"""
+        built = self.build_rollups()
+        deleted = self.prune()
+        self.metrics['runs'] += 1
+        self.metrics['last_run'] = self.clock().isoformat()
+        return {'rollups_built': built, 'partitions_deleted': deleted}
+
+    def query(self, sensor_id: str, start: datetime, end: Optional[datetime] = None,
+              tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        查询传感器在时间范围内的汇总数据
+
+        Args:
+            sensor_id: 传感器ID
+            start: 起始时间
+            end: 结束时间，默认当前时间
+            tier: 汇总层级（1m/1h），默认跨度超过2天时使用1h，否则使用1m
+
+        Returns:
+            包含层级和汇总点列表的字典
+        """
+        end = end or self.clock()
+        if tier is None:
+            tier = '1h' if end - start > timedelta(days=2) else '1m'
+        if tier not in ROLLUP_TIERS:
+            raise ValueError(f"不支持的汇总层级: {tier}")
+
+        start_epoch = start.timestamp()
+        end_epoch = end.timestamp()
+        points = []
+        for path in list_partitions(self._tier_dir(tier), f"rollup_{tier}", start, end):
+            for record in iter_partition(path):
+                if record['sensor'] == sensor_id and start_epoch <= record['epoch'] <= end_epoch:
+                    points.append(record)
+
+        return {'sensor_id': sensor_id, 'tier': tier, 'points': points}
+
+    def start(self):
+        """启动后台线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止后台线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"数据保留任务错误: {e}")
+            self._stop_event.wait(self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取保留服务统计信息"""
+        return {
+            "执行次数": self.metrics['runs'],
+            "已删除分区数": self.metrics['partitions_deleted'],
+            "已释放空间MB": round(self.metrics['bytes_deleted'] / 1024 / 1024, 2),
+            "已构建汇总文件数": self.metrics['rollups_built'],
+            "已构建时序块文件数": self.metrics['blocks_built'],
+            "时序块写入MB": round(self.metrics['block_bytes'] / 1024 / 1024, 2),
+            "上次执行时间": self.metrics['last_run']
+        }
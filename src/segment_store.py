@@ -0,0 +1,642 @@
+"""
+分段存储模块
+实现按行追加的数据分段写入（NDJSON）、按小时/大小滚动、批量fsync，
+可选的按分钟和标签字段的稀疏索引，以及兼容旧版按小时JSON数组文件的读取器
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional, Callable, Sequence, Tuple
+
+# 分区文件名: <prefix>_<YYYYMMDD_HH>[.<seq>].jsonl、旧版 <prefix>_<YYYYMMDD_HH>.json
+# 或时序块文件 <prefix>_<YYYYMMDD_HH>.tsb
+PARTITION_PATTERN = re.compile(
+    r'^(?P<prefix>.+)_(?P<hour>\d{8}_\d{2})(?:\.(?P<seq>\d+))?\.(?P<ext>jsonl|json|tsb)$'
+)
+HOUR_FORMAT = "%Y%m%d_%H"
+
+# 稀疏索引：与分段同名加 .idx 后缀，每行记录一次追加中同一分钟、同一组标签值的记录所在的字节区间，
+# 如 {"m":"2025-06-14T17:03","k":{"eventType":"ThresholdExceeded","severity":"high"},"r":[[0,412]]}
+INDEX_SUFFIX = '.idx'
+MINUTE_FORMAT = "%Y-%m-%dT%H:%M"
+MINUTE_CHARS = 16
+
+
+def _to_jsonable(record: Any) -> Any:
+    """JSON序列化兜底：支持带有to_dict方法的记录对象"""
+    if hasattr(record, 'to_dict'):
+        return record.to_dict()
+    raise TypeError(f"无法序列化的对象类型: {type(record).__name__}")
+
+
+def encode_record(record: Any) -> bytes:
+    """将单条记录编码为一行UTF-8 JSON"""
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':'),
+                       default=_to_jsonable) + '\n').encode('utf-8')
+
+
+class EncodedBatch:
+    """已在其他进程编码好的一批记录（按行拼接的JSON），追加时直接写入，不再逐条序列化"""
+
+    __slots__ = ('payload', 'lengths', 'records')
+
+    def __init__(self, payload: bytes, lengths: Sequence[int], records: Optional[Sequence[Any]] = None):
+        """
+        Args:
+            payload: 逐行编码后拼接的字节
+            lengths: 各行的字节数
+            records: 与各行对应的记录对象，供建立索引和入库使用；None表示不提供
+        """
+        self.payload = payload
+        self.lengths = lengths
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+
+def expand_batches(records: Sequence[Any]) -> List[Any]:
+    """将记录列表中的已编码批次展开为其记录对象，未提供记录对象的批次被跳过"""
+    expanded = []
+    for record in records:
+        if isinstance(record, EncodedBatch):
+            expanded.extend(record.records or ())
+        else:
+            expanded.append(record)
+    return expanded
+
+
+def index_path(path: str) -> str:
+    """分段对应的稀疏索引文件路径"""
+    return path + INDEX_SUFFIX
+
+
+def _minute_key(value: Any) -> Optional[str]:
+    """ISO时间字符串截取到分钟，作为索引键"""
+    if isinstance(value, str) and len(value) >= MINUTE_CHARS:
+        return value[:MINUTE_CHARS]
+    return None
+
+
+def build_index_entries(records: Sequence[Any], lengths: Sequence[int], base: int,
+                        time_field: str, tag_fields: Sequence[str]) -> bytes:
+    """
+    为一批连续写入的记录生成索引行
+
+    Args:
+        records: 记录列表
+        lengths: 各记录编码后的字节数
+        base: 第一条记录在分段中的字节偏移
+        time_field: ISO时间字段名
+        tag_fields: 作为索引标签的字段名
+
+    Returns:
+        编码后的索引行
+    """
+    groups: Dict[Tuple, List[List[int]]] = {}
+    offset = base
+    for record, length in zip(records, lengths):
+        minute = _minute_key(record.get(time_field))
+        if minute is not None:
+            spans = groups.setdefault((minute,) + tuple(record.get(field) for field in tag_fields), [])
+            # 同组相邻的记录合并为一个区间
+            if spans and spans[-1][1] == offset:
+                spans[-1][1] = offset + length
+            else:
+                spans.append([offset, offset + length])
+        offset += length
+
+    return b''.join(
+        encode_record({'m': key[0], 'k': dict(zip(tag_fields, key[1:])), 'r': spans})
+        for key, spans in groups.items()
+    )
+
+
+class _Segment:
+    """一个小时分区中正在追加的分段文件及其索引"""
+
+    __slots__ = ('hour_key', 'seq', 'path', 'file', 'index_file', 'size', 'unsynced')
+
+    def __init__(self, hour_key: str, seq: int):
+        self.hour_key = hour_key
+        self.seq = seq
+        self.path = None
+        self.file = None
+        self.index_file = None
+        self.size = 0
+        self.unsynced = 0
+
+
+def _hour_key(value: Any) -> Optional[str]:
+    """ISO时间字符串转换为小时分区键，如 2025-06-14T17:03:00 -> 20250614_17"""
+    if isinstance(value, str) and len(value) >= 13 and value[4] == '-' and value[10] == 'T':
+        return f"{value[0:4]}{value[5:7]}{value[8:10]}_{value[11:13]}"
+    return None
+
+
+class SegmentWriter:
+    """追加写入的分段日志写入器
+
+    记录按自身的时间字段写入所在小时的分区，迟到、重放或外部上报的读数不会落入写入时刻的分区；
+    没有时间字段的记录按写入时刻分区。最近的几个小时分区保持打开，更早的分区追加后立即关闭
+    """
+
+    def __init__(self, directory: str, prefix: str,
+                 max_segment_bytes: int = 64 * 1024 * 1024,
+                 fsync_interval: float = 1.0,
+                 fsync_bytes: int = 1024 * 1024,
+                 clock: Callable[[], datetime] = datetime.now,
+                 index_fields: Optional[Sequence[str]] = None,
+                 time_field: str = 'timestamp',
+                 max_open_hours: int = 2):
+        """
+        初始化分段写入器
+
+        Args:
+            directory: 分段文件所在目录
+            prefix: 文件名前缀，如 sensor_data
+            max_segment_bytes: 单个分段的最大字节数，超过后滚动到新分段
+            fsync_interval: 两次fsync之间的最长间隔（秒），0表示每次追加都fsync
+            fsync_bytes: 未同步字节数达到该值时立即fsync
+            clock: 当前时间函数，用于确定没有时间字段的记录的小时分区
+            index_fields: 指定时随追加维护稀疏索引，按分钟和这些字段的取值记录字节区间
+            time_field: 记录的ISO时间字段名，决定小时分区，也是索引使用的时间字段
+            max_open_hours: 保持打开的最近小时分区数
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_bytes = fsync_bytes
+        self.clock = clock
+        self.index_fields = tuple(index_fields) if index_fields is not None else None
+        self.time_field = time_field
+        self.max_open_hours = max(1, max_open_hours)
+
+        self._lock = threading.Lock()
+        self._segments: Dict[str, _Segment] = {}
+        self._path = None
+        self._unsynced_bytes = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def current_path(self) -> Optional[str]:
+        """最近一次追加写入的分段路径"""
+        return self._path
+
+    def _segment_path(self, hour_key: str, seq: int) -> str:
+        """构造分段文件路径"""
+        suffix = f".{seq}" if seq else ""
+        return os.path.join(self.directory, f"{self.prefix}_{hour_key}{suffix}.jsonl")
+
+    def _open_segment(self, hour_key: str) -> _Segment:
+        """打开指定小时的分段，续写该小时最后一个未写满的分段"""
+        seq = 0
+        while os.path.exists(self._segment_path(hour_key, seq + 1)):
+            seq += 1
+
+        path = self._segment_path(hour_key, seq)
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+            seq += 1
+            path = self._segment_path(hour_key, seq)
+
+        segment = _Segment(hour_key, seq)
+        self._open_file(segment, path)
+        return segment
+
+    def _open_file(self, segment: _Segment, path: str):
+        """打开分段文件及其索引"""
+        segment.file = open(path, 'ab')
+        segment.path = path
+        segment.size = segment.file.tell()
+
+        # 崩溃残留的不完整尾行单独成行，避免与后续记录拼接
+        if segment.size and not self._ends_with_newline(path):
+            segment.file.write(b'\n')
+            segment.size += 1
+
+        if self.index_fields is not None:
+            self._open_index(segment)
+
+    def _open_index(self, segment: _Segment):
+        """打开分段的索引，并为索引未覆盖的尾部数据（如崩溃前未写入索引的部分）补建索引"""
+        path = segment.path
+        sidecar = index_path(path)
+        segment.index_file = open(sidecar, 'ab')
+        if segment.index_file.tell() and not self._ends_with_newline(sidecar):
+            segment.index_file.write(b'\n')
+
+        covered = max((span[1] for entry in read_index(path) for span in entry['r']), default=0)
+        if covered >= segment.size:
+            return
+        segment.file.flush()
+        records, lengths = [], []
+        with open(path, 'rb') as f:
+            f.seek(covered)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {}
+                records.append(record if isinstance(record, dict) else {})
+                lengths.append(len(line))
+        segment.index_file.write(build_index_entries(records, lengths, covered,
+                                                     self.time_field, self.index_fields))
+        segment.index_file.flush()
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        """检查文件是否以换行符结尾"""
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _segment_for(self, hour_key: str, incoming_bytes: int) -> _Segment:
+        """取得小时分区当前的分段，按分段大小滚动"""
+        segment = self._segments.get(hour_key)
+        if segment is None:
+            segment = self._segments[hour_key] = self._open_segment(hour_key)
+        elif segment.size > 0 and segment.size + incoming_bytes > self.max_segment_bytes:
+            self._close_file(segment)
+            segment.seq += 1
+            self._open_file(segment, self._segment_path(hour_key, segment.seq))
+        return segment
+
+    def _record_hour(self, record: Any) -> Optional[str]:
+        getter = getattr(record, 'get', None)
+        return _hour_key(getter(self.time_field)) if getter is not None else None
+
+    def _route(self, records: List[Any]) -> Dict[str, List[Tuple[bytes, List[Any], List[int]]]]:
+        """
+        按记录时间将一批记录分到各小时分区，同一分区内保持原有顺序
+
+        Returns:
+            小时分区键到(数据, 索引行, 各行字节数)片段列表的映射
+        """
+        default_key = None
+        routed: Dict[str, List[Tuple[bytes, List[Any], List[int]]]] = {}
+        for record in records:
+            if isinstance(record, EncodedBatch):
+                rows = record.records
+                keys = [self._record_hour(row) for row in rows] if rows is not None else [None]
+                if len(set(keys)) == 1:
+                    # 整批位于同一小时时不拆分已编码的数据
+                    pieces = [(keys[0], record.payload, list(rows) if rows is not None else [{}] * len(record),
+                               list(record.lengths))]
+                else:
+                    pieces = []
+                    offset = 0
+                    for key, row, length in zip(keys, rows, record.lengths):
+                        pieces.append((key, record.payload[offset:offset + length], [row], [length]))
+                        offset += length
+            else:
+                line = encode_record(record)
+                pieces = [(self._record_hour(record), line, [record], [len(line)])]
+
+            for key, payload, rows, lengths in pieces:
+                if key is None:
+                    if default_key is None:
+                        default_key = self.clock().strftime(HOUR_FORMAT)
+                    key = default_key
+                routed.setdefault(key, []).append((payload, rows, lengths))
+        return routed
+
+    def append(self, records: List[Any]) -> int:
+        """
+        追加一批记录
+
+        Args:
+            records: 记录列表（字典或带to_dict方法的对象）
+
+        Returns:
+            写入的字节数
+        """
+        if not records:
+            return 0
+
+        routed = self._route(records)
+        written = 0
+        with self._lock:
+            for hour_key, pieces in routed.items():
+                payload = b''.join(piece[0] for piece in pieces)
+                segment = self._segment_for(hour_key, len(payload))
+                base = segment.size
+                segment.file.write(payload)
+                segment.file.flush()
+                segment.size += len(payload)
+                segment.unsynced += len(payload)
+
+                # 索引在数据之后写入，读取时只信任不超过文件大小的区间
+                if segment.index_file is not None:
+                    rows = [row for piece in pieces for row in piece[1]]
+                    lengths = [length for piece in pieces for length in piece[2]]
+                    segment.index_file.write(build_index_entries(
+                        rows, lengths, base, self.time_field, self.index_fields))
+                    segment.index_file.flush()
+                self._path = segment.path
+                written += len(payload)
+            self._unsynced_bytes += written
+
+            # 只保留最近的几个小时分区打开
+            if len(self._segments) > self.max_open_hours:
+                for hour_key in sorted(self._segments)[:-self.max_open_hours]:
+                    self._close_file(self._segments.pop(hour_key))
+
+            if (self._unsynced_bytes >= self.fsync_bytes or
+                    time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+
+        return written
+
+    def _sync_locked(self):
+        """在持有锁的情况下执行fsync"""
+        for segment in self._segments.values():
+            if segment.file is not None and segment.unsynced:
+                os.fsync(segment.file.fileno())
+            segment.unsynced = 0
+        self._unsynced_bytes = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """强制将已写入数据落盘"""
+        with self._lock:
+            self._sync_locked()
+
+    def _close_file(self, segment: _Segment):
+        """同步并关闭分段文件及其索引"""
+        if segment.file is not None:
+            if segment.unsynced:
+                os.fsync(segment.file.fileno())
+                segment.unsynced = 0
+            segment.file.close()
+            segment.file = None
+        if segment.index_file is not None:
+            segment.index_file.close()
+            segment.index_file = None
+
+    def close(self):
+        """关闭写入器，下次追加时会重新打开分段"""
+        with self._lock:
+            for segment in self._segments.values():
+                self._close_file(segment)
+            self._segments = {}
+            self._path = None
+            self._unsynced_bytes = 0
+
+
+def parse_partition_name(filename: str) -> Optional[Dict[str, Any]]:
+    """
+    解析分区文件名
+
+    Returns:
+        包含prefix、hour(datetime)、seq、ext的字典，无法识别时返回None
+    """
+    match = PARTITION_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    try:
+        hour = datetime.strptime(match.group('hour'), HOUR_FORMAT)
+    except ValueError:
+        return None
+    return {
+        'prefix': match.group('prefix'),
+        'hour': hour,
+        'seq': int(match.group('seq') or 0),
+        'ext': match.group('ext')
+    }
+
+
+def list_partitions(directory: str, prefix: str,
+                    start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> List[str]:
+    """
+    列出目录下指定前缀的分区文件，按时间顺序排列
+
+    旧版 .json 文件排在同一小时的 .jsonl 分段之前
+
+    Args:
+        directory: 数据目录
+        prefix: 文件名前缀
+        start: 起始时间（包含），按小时分区过滤
+        end: 结束时间（包含），按小时分区过滤
+
+    Returns:
+        分区文件路径列表
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    start_hour = start.replace(minute=0, second=0, microsecond=0) if start else None
+
+    partitions = []
+    for filename in os.listdir(directory):
+        info = parse_partition_name(filename)
+        if not info or info['prefix'] != prefix:
+            continue
+        if start_hour and info['hour'] < start_hour:
+            continue
+        if end and info['hour'] > end:
+            continue
+        order = 0 if info['ext'] == 'json' else info['seq'] + 1
+        partitions.append((info['hour'], order, os.path.join(directory, filename)))
+
+    partitions.sort()
+    return [path for _, _, path in partitions]
+
+
+def iter_partition(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    逐条读取分区文件中的记录
+
+    兼容旧版整体JSON数组文件；对NDJSON分段，跳过崩溃时可能残留的不完整尾行
+
+    Args:
+        path: 分区文件路径
+    """
+    if path.endswith('.json'):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if isinstance(data, list):
+            yield from data
+        return
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        return
+
+
+def read_partition(path: str) -> List[Dict[str, Any]]:
+    """读取整个分区文件中的记录"""
+    return list(iter_partition(path))
+
+
+def iter_records(directory: str, prefix: str,
+                 start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按分区顺序读取目录下的所有记录
+
+    Args:
+        directory: 数据目录
+        prefix: 文件名前缀
+        start: 起始时间，按小时分区过滤
+        end: 结束时间，按小时分区过滤
+    """
+    for path in list_partitions(directory, prefix, start, end):
+        yield from iter_partition(path)
+
+
+def read_index(path: str) -> List[Dict[str, Any]]:
+    """
+    读取分段的稀疏索引
+
+    Args:
+        path: 分段文件路径
+
+    Returns:
+        索引条目列表，索引不存在时返回空列表
+    """
+    entries = []
+    try:
+        with open(index_path(path), 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'm' in entry and 'r' in entry:
+                    entries.append(entry)
+    except OSError:
+        pass
+    return entries
+
+
+def _record_matches(record: Dict[str, Any], start: Optional[datetime], end: Optional[datetime],
+                    time_field: str, tags: Dict[str, Any]) -> bool:
+    """按时间范围（包含两端）和标签值精确过滤记录"""
+    for field, value in tags.items():
+        if record.get(field) != value:
+            return False
+    if start is None and end is None:
+        return True
+    try:
+        moment = datetime.fromisoformat(record[time_field])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (start is None or moment >= start) and (end is None or moment <= end)
+
+
+def iter_indexed(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 time_field: str = 'timestamp', tags: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按时间范围和标签值读取分段中的记录
+
+    有索引时只读取与查询分钟和标签匹配的字节区间，索引未覆盖的尾部按行扫描；
+    没有索引的分段退化为全量扫描。结果按写入顺序返回，并在记录级别精确过滤
+
+    Args:
+        path: 分段文件路径
+        start: 起始时间（包含）
+        end: 结束时间（包含）
+        time_field: ISO时间字段名
+        tags: 标签字段到取值的映射，例如 {"eventType": "ThresholdExceeded"}
+
+    Yields:
+        匹配的记录
+    """
+    tags = tags or {}
+    entries = read_index(path) if path.endswith('.jsonl') else []
+    if not entries:
+        for record in iter_partition(path):
+            if _record_matches(record, start, end, time_field, tags):
+                yield record
+        return
+
+    start_key = start.strftime(MINUTE_FORMAT) if start else None
+    end_key = end.strftime(MINUTE_FORMAT) if end else None
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+
+    covered = 0
+    spans = []
+    for entry in entries:
+        covered = max(covered, max(span[1] for span in entry['r']))
+        minute = entry['m']
+        if start_key and minute < start_key:
+            continue
+        if end_key and minute > end_key:
+            continue
+        keys = entry.get('k', {})
+        if any(field in keys and keys[field] != value for field, value in tags.items()):
+            continue
+        # 查询范围内部的分钟且标签都已由索引判定时，区间内的记录无需逐条过滤
+        check = minute == start_key or minute == end_key or any(field not in keys for field in tags)
+        spans.extend((span[0], span[1], check) for span in entry['r'])
+    covered = min(covered, size)
+
+    # 合并相邻或重叠的区间，减少seek次数
+    merged = []
+    for span_start, span_end, check in sorted(spans):
+        span_end = min(span_end, size)
+        if span_start >= span_end:
+            continue
+        if merged and span_start <= merged[-1][1] and check == merged[-1][2]:
+            merged[-1][1] = max(merged[-1][1], span_end)
+        else:
+            merged.append([span_start, span_end, check])
+
+    if covered < size:
+        merged.append([covered, size, True])
+
+    with open(path, 'rb') as f:
+        for span_start, span_end, check in merged:
+            f.seek(span_start)
+            for line in f.read(span_end - span_start).splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                if not check or _record_matches(record, start, end, time_field, tags):
+                    yield record
+
+
+def query_records(directory: str, prefix: str,
+                  start: Optional[datetime] = None,
+                  end: Optional[datetime] = None,
+                  time_field: str = 'timestamp',
+                  tags: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按时间范围和标签值读取目录下的记录，有索引的分段只读取匹配的字节区间
+
+    Args:
+        directory: 数据目录
+        prefix: 文件名前缀
+        start: 起始时间（包含）
+        end: 结束时间（包含）
+        time_field: ISO时间字段名
+        tags: 标签字段到取值的映射
+    """
+    for path in list_partitions(directory, prefix, start, end):
+        yield from iter_indexed(path, start, end, time_field, tags)
@@ -0,0 +1,332 @@
+"""
+语义记录模块
+用__slots__定义观测、语义事件和复杂事件，热路径中只保存必要字段并共享传感器记录，
+嵌套结构在访问或序列化时按需生成；保留字典式访问以兼容原有的消费方
+"""
+
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Iterator
+
+_MISSING = object()
+
+
+class MappingRecord:
+    """
+    字典式只读访问的记录基类
+
+    子类通过 _getters 声明"键 -> 取值函数"，取值函数返回_MISSING表示该记录没有这个键
+    """
+
+    __slots__ = ()
+    _getters: Dict[str, Callable[[Any], Any]] = {}
+
+    def _layout(self) -> Iterator[str]:
+        """当前记录包含的键，默认为全部声明的键"""
+        return iter(self._getters)
+
+    def __getitem__(self, key: str) -> Any:
+        getter = self._getters.get(key)
+        value = _MISSING if getter is None else getter(self)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._getters.get(key)
+        value = _MISSING if getter is None else getter(self)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> List[str]:
+        return [key for key in self._layout() if self._getters[key](self) is not _MISSING]
+
+    def items(self) -> List[tuple]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典，仅在序列化边界调用"""
+        result = {}
+        for key in self._layout():
+            value = self._getters[key](self)
+            if value is _MISSING:
+                continue
+            result[key] = value.to_dict() if isinstance(value, MappingRecord) else value
+        return result
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Observation(MappingRecord):
+    """传感器观测（sosa:Observation）"""
+
+    __slots__ = ('record', 'value', 'result_time', 'epoch', 'quality', 'anomaly')
+
+    def __init__(self, record, value: float, result_time: str, epoch: float,
+                 quality: str = 'good', anomaly: bool = False):
+        """
+        Args:
+            record: 传感器注册表中的SensorRecord，提供ID、观测属性和单位
+            value: 观测值
+            result_time: ISO格式的观测时间
+            epoch: 观测时间戳
+            quality: 数据质量
+            anomaly: 是否为异常值
+        """
+        self.record = record
+        self.value = value
+        self.result_time = result_time
+        self.epoch = epoch
+        self.quality = quality
+        self.anomaly = anomaly
+
+    @property
+    def sensor_id(self) -> str:
+        return self.record.id
+
+    @property
+    def id(self) -> str:
+        return f"obs_{self.record.id}_{int(self.epoch)}"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], registry, epoch: Optional[float] = None) -> Optional['Observation']:
+        """
+        由存储的字典形式读数还原观测
+
+        Args:
+            data: 读数字典
+            registry: SensorRegistry实例
+            epoch: 已解析的观测时间戳，None时由resultTime解析
+
+        Returns:
+            观测对象，传感器未登记或字段不完整时返回None
+        """
+        try:
+            record = registry.get(data['madeBySensor'])
+            value = data['hasResult']['value']
+            result_time = data['resultTime']
+            if epoch is None:
+                epoch = datetime.fromisoformat(result_time).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+        if record is None:
+            return None
+        return cls(record, value, result_time, epoch,
+                   data.get('quality', 'good'), data.get('anomaly', False))
+
+    _getters = {
+        'id': lambda o: o.id,
+        'type': lambda o: 'sosa:Observation',
+        'madeBySensor': lambda o: o.record.id,
+        'observedProperty': lambda o: o.record.property_id,
+        'hasResult': lambda o: {'value': o.value, 'unit': o.record.unit},
+        'resultTime': lambda o: o.result_time,
+        'phenomenonTime': lambda o: o.result_time,
+        'quality': lambda o: o.quality,
+        'anomaly': lambda o: o.anomaly,
+        'collected_at': lambda o: o.result_time
+    }
+
+
+class ProcessedObservation(MappingRecord):
+    """附带处理信息的观测，仅用于持久化"""
+
+    __slots__ = ('observation', 'processed_at', 'processing_version')
+
+    def __init__(self, observation: Observation, processed_at: str, processing_version: str = "1.0"):
+        self.observation = observation
+        self.processed_at = processed_at
+        self.processing_version = processing_version
+
+    def _layout(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    _getters = {
+        **{key: (lambda key: lambda p: p.observation.get(key, _MISSING))(key) for key in Observation._getters},
+        'processed_at': lambda p: p.processed_at,
+        'processing_version': lambda p: p.processing_version
+    }
+    _keys = list(_getters)
+
+
+# 各类语义事件包含的键
+_EVENT_LAYOUTS = {
+    'SensorReading': ('id', 'type', 'eventType', 'source', 'timestamp', 'data', 'semantics'),
+    'AnomalyDetected': ('id', 'type', 'eventType', 'source', 'timestamp', 'severity', 'description'),
+    'ThresholdExceeded': ('id', 'type', 'eventType', 'source', 'timestamp', 'threshold_type',
+                          'threshold_value', 'actual_value', 'severity'),
+    'SensorOffline': ('id', 'type', 'eventType', 'source', 'timestamp', 'severity', 'last_seen',
+                      'silence_seconds'),
+    'SensorRecovered': ('id', 'type', 'eventType', 'source', 'timestamp', 'severity', 'offline_since',
+                        'offline_seconds')
+}
+
+_EVENT_ID_PREFIXES = {
+    'SensorReading': 'event',
+    'AnomalyDetected': 'anomaly',
+    'SensorRecovered': 'recovered'
+}
+
+
+class SemanticEvent(MappingRecord):
+    """由观测生成的语义事件，引用而不复制原始观测"""
+
+    __slots__ = ('event_type', 'reading', 'location', 'interpretation',
+                 'severity', 'threshold_type', 'threshold_value', 'offline_at')
+
+    def __init__(self, event_type: str, reading: Observation, location: Optional[str] = None,
+                 interpretation: Optional[str] = None, severity: Optional[str] = None,
+                 threshold_type: Optional[str] = None, threshold_value: Optional[float] = None,
+                 offline_at: Optional[float] = None):
+        """
+        Args:
+            event_type: 事件类型（SensorReading/AnomalyDetected/ThresholdExceeded/SensorOffline/SensorRecovered）
+            reading: 触发事件的观测；离线事件为该传感器最后一次上报的观测
+            location: 传感器位置（SensorReading）
+            interpretation: 数值解释（SensorReading）
+            severity: 严重程度（AnomalyDetected/ThresholdExceeded/SensorOffline/SensorRecovered）
+            threshold_type: 越限方向high/low（ThresholdExceeded）
+            threshold_value: 被突破的阈值（ThresholdExceeded）
+            offline_at: 判定离线的时间戳（SensorOffline/SensorRecovered）
+        """
+        self.event_type = event_type
+        self.reading = reading
+        self.location = location
+        self.interpretation = interpretation
+        self.severity = severity
+        self.threshold_type = threshold_type
+        self.threshold_value = threshold_value
+        self.offline_at = offline_at
+
+    @classmethod
+    def sensor_reading(cls, reading: Observation, location: str, interpretation: str) -> 'SemanticEvent':
+        return cls('SensorReading', reading, location=location, interpretation=interpretation)
+
+    @classmethod
+    def anomaly(cls, reading: Observation, severity: str = 'medium') -> 'SemanticEvent':
+        return cls('AnomalyDetected', reading, severity=severity)
+
+    @classmethod
+    def threshold(cls, reading: Observation, threshold_type: str, threshold_value: Optional[float],
+                  severity: str) -> 'SemanticEvent':
+        return cls('ThresholdExceeded', reading, severity=severity,
+                   threshold_type=threshold_type, threshold_value=threshold_value)
+
+    @classmethod
+    def offline(cls, last_reading: Observation, offline_at: float, severity: str = 'high') -> 'SemanticEvent':
+        return cls('SensorOffline', last_reading, severity=severity, offline_at=offline_at)
+
+    @classmethod
+    def recovered(cls, reading: Observation, offline_at: float, severity: str = 'low') -> 'SemanticEvent':
+        return cls('SensorRecovered', reading, severity=severity, offline_at=offline_at)
+
+    @property
+    def id(self) -> str:
+        if self.event_type == 'ThresholdExceeded':
+            return f"threshold_{self.threshold_type}_{self.reading.record.id}_{int(self.reading.epoch)}"
+        if self.event_type == 'SensorOffline':
+            return f"offline_{self.reading.record.id}_{int(self.offline_at)}"
+        return f"{_EVENT_ID_PREFIXES.get(self.event_type, 'event')}_{self.reading.id}"
+
+    @property
+    def source(self) -> str:
+        return self.reading.record.id
+
+    @property
+    def epoch(self) -> float:
+        """事件时间戳：离线事件为判定离线的时间，其余为观测时间"""
+        if self.event_type == 'SensorOffline':
+            return self.offline_at
+        return self.reading.epoch
+
+    @property
+    def timestamp(self) -> str:
+        if self.event_type == 'SensorOffline':
+            return datetime.fromtimestamp(self.offline_at).isoformat()
+        return self.reading.result_time
+
+    def _layout(self) -> Iterator[str]:
+        return iter(_EVENT_LAYOUTS.get(self.event_type, _EVENT_LAYOUTS['SensorReading']))
+
+    def _field(self, key: str) -> Any:
+        """只有当前事件类型包含的键才可访问"""
+        if key not in _EVENT_LAYOUTS.get(self.event_type, ()):
+            return _MISSING
+        return _EVENT_FIELDS[key](self)
+
+    _getters = {}
+
+
+_EVENT_FIELDS = {
+    'id': lambda e: e.id,
+    'type': lambda e: 'SemanticEvent',
+    'eventType': lambda e: e.event_type,
+    'source': lambda e: e.reading.record.id,
+    'timestamp': lambda e: e.timestamp,
+    'data': lambda e: e.reading,
+    'semantics': lambda e: {
+        'property': e.reading.record.property_id.split(':')[-1],
+        'location': e.location,
+        'value_interpretation': e.interpretation
+    },
+    'severity': lambda e: e.severity,
+    'description': lambda e: f"检测到异常值: {e.reading.value}",
+    'threshold_type': lambda e: e.threshold_type,
+    'threshold_value': lambda e: e.threshold_value,
+    'actual_value': lambda e: e.reading.value,
+    'last_seen': lambda e: e.reading.result_time,
+    'silence_seconds': lambda e: round(e.offline_at - e.reading.epoch, 3),
+    'offline_since': lambda e: datetime.fromtimestamp(e.offline_at).isoformat(),
+    'offline_seconds': lambda e: round(e.reading.epoch - e.offline_at, 3)
+}
+SemanticEvent._getters = {key: (lambda key: lambda e: e._field(key))(key) for key in _EVENT_FIELDS}
+
+
+class ComplexEvent(MappingRecord):
+    """事件处理器生成的原子语义事件、复杂事件和关联事件"""
+
+    __slots__ = ('id', 'type', 'event_type', 'timestamp', 'source', 'severity',
+                 'priority', 'trigger_event', 'details')
+
+    def __init__(self, id: str, type: str, event_type: str, timestamp: str, source: str,
+                 details: Dict[str, Any], severity: Optional[str] = None,
+                 priority: Optional[str] = None, trigger_event: Optional[str] = None):
+        """
+        Args:
+            id: 事件ID
+            type: 事件类别（AtomicSemanticEvent/ComplexEvent/CorrelationEvent）
+            event_type: 事件类型
+            timestamp: ISO格式的事件时间
+            source: 事件来源
+            details: 事件详情
+            severity: 严重程度
+            priority: 优先级
+            trigger_event: 触发该事件的语义事件ID
+        """
+        self.id = id
+        self.type = type
+        self.event_type = event_type
+        self.timestamp = timestamp
+        self.source = source
+        self.details = details
+        self.severity = severity
+        self.priority = priority
+        self.trigger_event = trigger_event
+
+    _getters = {
+        'id': lambda e: e.id,
+        'type': lambda e: e.type,
+        'eventType': lambda e: e.event_type,
+        'priority': lambda e: _MISSING if e.priority is None else e.priority,
+        'severity': lambda e: _MISSING if e.severity is None else e.severity,
+        'timestamp': lambda e: e.timestamp,
+        'source': lambda e: e.source,
+        'trigger_event': lambda e: _MISSING if e.trigger_event is None else e.trigger_event,
+        'details': lambda e: e.details
+    }
+
@@ -0,0 +1,333 @@
+"""
+传感器历史数据模块
+基于NumPy定长数组的按传感器环形缓冲区，支持按时间范围二分切片和向量化统计
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+# 质量标志位：低两位为质量等级，第三位为异常标记
+QUALITY_GOOD = 0
+QUALITY_FAIR = 1
+QUALITY_POOR = 2
+QUALITY_MASK = 0b011
+FLAG_ANOMALY = 0b100
+
+QUALITY_CODES = {'good': QUALITY_GOOD, 'fair': QUALITY_FAIR, 'poor': QUALITY_POOR}
+QUALITY_NAMES = {code: name for name, code in QUALITY_CODES.items()}
+
+
+def empty_series() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回空的(时间戳, 数值, 标志位)数组组"""
+    return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.uint8)
+
+
+def encode_flags(quality: str, anomaly: bool) -> int:
+    """将质量等级和异常标记编码为标志位"""
+    flags = QUALITY_CODES.get(quality, QUALITY_GOOD)
+    if anomaly:
+        flags |= FLAG_ANOMALY
+    return flags
+
+
+def decode_flags(flags: int) -> Tuple[str, bool]:
+    """将标志位还原为(质量等级, 是否异常)"""
+    return QUALITY_NAMES.get(flags & QUALITY_MASK, 'good'), bool(flags & FLAG_ANOMALY)
+
+
+class SensorRingBuffer:
+    """单个传感器的定长环形缓冲区"""
+    
+    INITIAL_ALLOCATION = 1024
+
+    def __init__(self, capacity: int):
+        """
+        初始化环形缓冲区
+
+        Args:
+            capacity: 最多保留的数据点数，写满后覆盖最旧的数据
+        """
+        self.capacity = capacity
+        # 数组按需倍增，直到达到容量上限后才开始环形覆盖
+        initial = min(capacity, self.INITIAL_ALLOCATION)
+        self._timestamps = np.empty(initial, dtype=np.float64)
+        self._values = np.empty(initial, dtype=np.float64)
+        self._flags = np.zeros(initial, dtype=np.uint8)
+        self._head = 0  # 下一个写入位置
+        self._count = 0
+        self.late_inserted = 0  # 早于最新时间戳、按时间顺序插入的数据点数
+        self.rejected = 0  # 缓冲区已满且早于最旧数据点而被拒绝的数据点数
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def _allocated(self) -> int:
+        """当前已分配的数组长度"""
+        return len(self._timestamps)
+
+    def _reserve(self, needed: int):
+        """在尚未环绕前扩容，使数组至少容纳needed个数据点"""
+        allocated = self._allocated
+        if allocated >= self.capacity or needed <= allocated:
+            return
+        size = min(self.capacity, max(needed, allocated * 2))
+        self._timestamps = np.resize(self._timestamps, size)
+        self._values = np.resize(self._values, size)
+        self._flags = np.resize(self._flags, size)
+        # 扩容前数据总是连续存放于[0, count)
+        self._head = self._count
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """最新数据点的时间戳"""
+        if self._count == 0:
+            return None
+        return float(self._timestamps[self._head - 1])
+
+    def _insert(self, timestamp: float, value: float, flags: int) -> bool:
+        """
+        将早于最新时间戳的数据点按时间顺序插入，缓冲区已满时挤出最旧的数据点
+
+        需要重排整个缓冲区，只用于偶尔迟到的数据点
+
+        Returns:
+            是否写入成功，缓冲区已满且数据点早于所有已保留的数据点时拒绝
+        """
+        timestamps, values, all_flags = self.range()
+        position = int(np.searchsorted(timestamps, timestamp, side='right'))
+        if self._count == self.capacity:
+            if position == 0:
+                self.rejected += 1
+                return False
+            timestamps, values, all_flags = timestamps[1:], values[1:], all_flags[1:]
+            position -= 1
+
+        count = len(timestamps) + 1
+        if count > self._allocated:
+            size = min(self.capacity, max(count, self._allocated * 2))
+            self._timestamps = np.empty(size, dtype=np.float64)
+            self._values = np.empty(size, dtype=np.float64)
+            self._flags = np.zeros(size, dtype=np.uint8)
+        self._timestamps[:count] = np.insert(timestamps, position, timestamp)
+        self._values[:count] = np.insert(values, position, value)
+        self._flags[:count] = np.insert(all_flags, position, flags)
+        # 重排后数据连续存放于[0, count)
+        self._count = count
+        self._head = count % self._allocated
+        self.late_inserted += 1
+        return True
+
+    def append(self, timestamp: float, value: float, flags: int = 0) -> bool:
+        """
+        追加单个数据点
+
+        早于最新时间戳的数据点按时间顺序插入，保证按时间二分查找有效
+
+        Returns:
+            是否写入成功
+        """
+        if self._count and timestamp < self._timestamps[self._head - 1]:
+            return self._insert(timestamp, value, flags)
+
+        self._reserve(self._count + 1)
+        self._timestamps[self._head] = timestamp
+        self._values[self._head] = value
+        self._flags[self._head] = flags
+        self._head = (self._head + 1) % self._allocated
+        if self._count < self._allocated:
+            self._count += 1
+        return True
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray,
+               flags: Optional[np.ndarray] = None) -> int:
+        """
+        批量追加数据点
+
+        Args:
+            timestamps: 单调不减的时间戳数组
+            values: 数值数组
+            flags: 标志位数组，默认为0
+
+        Returns:
+            写入的数据点数
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        flags = np.zeros(len(timestamps), dtype=np.uint8) if flags is None else np.asarray(flags, dtype=np.uint8)
+
+        # 早于当前最新时间戳的数据点逐个按时间顺序插入，其余整批追加
+        inserted = 0
+        last = self.last_timestamp
+        if last is not None and len(timestamps):
+            late = timestamps < last
+            if late.any():
+                for timestamp, value, flag in zip(timestamps[late], values[late], flags[late]):
+                    inserted += self._insert(float(timestamp), float(value), int(flag))
+                keep = ~late
+                timestamps, values, flags = timestamps[keep], values[keep], flags[keep]
+
+        n = len(timestamps)
+        if n == 0:
+            return inserted
+        self._reserve(self._count + n)
+        allocated = self._allocated
+        if n >= allocated:
+            self._timestamps[:] = timestamps[-allocated:]
+            self._values[:] = values[-allocated:]
+            self._flags[:] = flags[-allocated:]
+            self._head = 0
+            self._count = allocated
+            return inserted + n
+
+        first = min(n, allocated - self._head)
+        self._timestamps[self._head:self._head + first] = timestamps[:first]
+        self._values[self._head:self._head + first] = values[:first]
+        self._flags[self._head:self._head + first] = flags[:first]
+        rest = n - first
+        if rest:
+            self._timestamps[:rest] = timestamps[first:]
+            self._values[:rest] = values[first:]
+            self._flags[:rest] = flags[first:]
+        self._head = (self._head + n) % allocated
+        self._count = min(allocated, self._count + n)
+        return inserted + n
+
+    def _segments(self) -> List[slice]:
+        """按时间顺序返回有效数据所在的数组区段"""
+        allocated = self._allocated
+        if self._count < allocated or self._head == 0:
+            return [slice(0, self._count)]
+        return [slice(self._head, allocated), slice(0, self._head)]
+
+    def range(self, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        按时间范围切片
+
+        Args:
+            start: 起始时间戳（包含），None表示不限
+            end: 结束时间戳（包含），None表示不限
+
+        Returns:
+            (时间戳数组, 数值数组, 标志位数组)
+        """
+        parts = []
+        for segment in self._segments():
+            ts = self._timestamps[segment]
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='right'))
+            if lo < hi:
+                offset = segment.start
+                parts.append(slice(offset + lo, offset + hi))
+
+        if not parts:
+            return empty_series()
+        if len(parts) == 1:
+            part = parts[0]
+            return self._timestamps[part].copy(), self._values[part].copy(), self._flags[part].copy()
+        return (np.concatenate([self._timestamps[p] for p in parts]),
+                np.concatenate([self._values[p] for p in parts]),
+                np.concatenate([self._flags[p] for p in parts]))
+
+    def latest(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """获取最新的n个数据点"""
+        n = min(n, self._count)
+        if n == 0:
+            return empty_series()
+        indices = np.arange(self._head - n, self._head) % self._allocated
+        return self._timestamps[indices], self._values[indices], self._flags[indices]
+
+    def stats(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """计算时间范围内数据的向量化统计量"""
+        _, values, flags = self.range(start, end)
+        return summarize(values, flags)
+
+    @property
+    def nbytes(self) -> int:
+        """缓冲区占用的内存字节数"""
+        return self._timestamps.nbytes + self._values.nbytes + self._flags.nbytes
+
+
+def summarize(values: np.ndarray, flags: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """计算数值数组的统计量"""
+    if len(values) == 0:
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None, 'anomalies': 0}
+
+    summary = {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'anomalies': 0
+    }
+    if flags is not None:
+        summary['anomalies'] = int(np.count_nonzero(flags & FLAG_ANOMALY))
+    return summary
+
+
+class SensorHistory:
+    """按传感器组织的历史数据存储"""
+
+    def __init__(self, capacity: int = 100000):
+        """
+        初始化历史数据存储
+
+        Args:
+            capacity: 每个传感器保留的最大数据点数
+        """
+        self.capacity = capacity
+        self.buffers: Dict[str, SensorRingBuffer] = {}
+
+    def _buffer(self, sensor_id: str) -> SensorRingBuffer:
+        """获取或创建传感器的环形缓冲区"""
+        buffer = self.buffers.get(sensor_id)
+        if buffer is None:
+            buffer = self.buffers[sensor_id] = SensorRingBuffer(self.capacity)
+        return buffer
+
+    def record(self, sensor_id: str, timestamp: float, value: float, flags: int = 0) -> bool:
+        """记录单个数据点"""
+        return self._buffer(sensor_id).append(timestamp, value, flags)
+
+    def record_batch(self, sensor_id: str, timestamps: np.ndarray, values: np.ndarray,
+                     flags: Optional[np.ndarray] = None) -> int:
+        """批量记录同一传感器的数据点"""
+        return self._buffer(sensor_id).extend(timestamps, values, flags)
+
+    def range(self, sensor_id: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """获取传感器在时间范围内的数据"""
+        buffer = self.buffers.get(sensor_id)
+        if buffer is None:
+            return empty_series()
+        return buffer.range(start, end)
+
+    def latest(self, sensor_id: str, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """获取传感器最新的n个数据点"""
+        buffer = self.buffers.get(sensor_id)
+        if buffer is None:
+            return empty_series()
+        return buffer.latest(n)
+
+    def stats(self, sensor_id: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Dict[str, Any]:
+        """获取传感器在时间范围内的统计量"""
+        _, values, flags = self.range(sensor_id, start, end)
+        return summarize(values, flags)
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self.buffers.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取迟到数据点的插入与拒绝计数"""
+        return {
+            "迟到插入数据点": sum(buffer.late_inserted for buffer in self.buffers.values()),
+            "迟到拒绝数据点": sum(buffer.rejected for buffer in self.buffers.values())
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """所有缓冲区占用的内存字节数"""
+        return sum(buffer.nbytes for buffer in self.buffers.values())
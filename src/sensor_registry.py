@@ -0,0 +1,332 @@
+"""
+传感器注册表模块
+将SSN配置编译为按ID/位置/观测属性索引的传感器记录，提供O(1)元数据查询，
+并在进程内按配置文件共享同一份注册表；观测属性的数值解释区间编译为有序边界，支持整批解释
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# 配置目录按模块位置定位，不依赖当前工作目录
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+DEFAULT_SSN_CONFIG = os.path.join(CONFIG_DIR, 'ssn_model.json')
+
+# 观测属性到传感器类别的映射
+PROPERTY_KINDS = {
+    'Temperature': 'temperature',
+    'Humidity': 'humidity',
+    'SmokeLevel': 'smoke',
+    'Motion': 'motion',
+    'Illuminance': 'light'
+}
+
+# 数值解释区间只在SSN配置的观测属性中声明（interpretation），内置类别的属性缺少声明时编译报错；
+# 其他未声明区间的观测属性统一解释为DEFAULT_LABEL
+DEFAULT_LABEL = '正常'
+
+DURATION_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ms|s|min|h)?\s*$')
+DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'min': 60.0, 'h': 3600.0}
+
+
+def parse_duration(text: Any) -> Optional[float]:
+    """将"5s"、"200ms"等时长描述解析为秒数"""
+    if isinstance(text, (int, float)):
+        return float(text)
+    if not isinstance(text, str):
+        return None
+    match = DURATION_PATTERN.match(text)
+    if not match:
+        return None
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+
+def compile_bands(bands: List[Dict[str, Any]]):
+    """
+    将解释区间编译为有序边界和标签
+
+    Returns:
+        (边界列表, 标签列表)，落在[edges[i-1], edges[i])内的值对应labels[i]
+    """
+    edges = []
+    labels = []
+    for band in bands:
+        labels.append(band['label'])
+        if 'lt' in band:
+            edges.append(float(band['lt']))
+        elif 'le' in band:
+            edges.append(math.nextafter(float(band['le']), math.inf))
+    return edges, labels
+
+
+class InterpretationTable:
+    """一个观测属性的数值解释区间，同一属性的传感器共享"""
+
+    __slots__ = ('edges', 'labels', '_edge_array', '_label_array')
+
+    def __init__(self, bands: List[Dict[str, Any]]):
+        """
+        Args:
+            bands: 按上界递增排列的解释区间，例如 [{"lt": 18, "label": "偏冷"}, {"label": "适宜"}]
+        """
+        self.edges, self.labels = compile_bands(bands)
+        if any(later <= earlier for earlier, later in zip(self.edges, self.edges[1:])):
+            raise ValueError(f"解释区间的上界必须递增: {bands}")
+        if len(self.labels) != len(self.edges) + 1:
+            raise ValueError(f"解释区间只有最后一档可以没有上界: {bands}")
+        self._edge_array = np.asarray(self.edges, dtype=np.float64)
+        self._label_array = np.asarray(self.labels, dtype=object)
+
+    def interpret(self, value: float) -> str:
+        """解释单个数值"""
+        return self.labels[bisect_right(self.edges, value)]
+
+    def bins(self, values: np.ndarray) -> np.ndarray:
+        """整批定位数值所在的区间序号，与interpret中的bisect_right一致"""
+        return np.digitize(values, self._edge_array)
+
+    def interpret_batch(self, values: np.ndarray) -> np.ndarray:
+        """
+        整批解释数值
+
+        Args:
+            values: 数值数组
+
+        Returns:
+            与数值一一对应的标签数组（object类型，元素为共享的标签字符串）
+        """
+        return self._label_array[self.bins(values)]
+
+
+_GENERIC_TABLE = InterpretationTable([{'label': DEFAULT_LABEL}])
+
+
+class SensorRecord:
+    """编译后的传感器元数据记录"""
+
+    __slots__ = ('index', 'id', 'info', 'name', 'location', 'property_id', 'property_type',
+                 'kind', 'unit', 'range_min', 'range_max', 'good_min', 'good_max',
+                 'accuracy', 'resolution', 'response_time', 'platform', 'interpretation')
+
+    def __init__(self, index: int, info: Dict[str, Any], platform: Optional[str] = None,
+                 interpretation: Optional[InterpretationTable] = None):
+        """
+        Args:
+            index: 传感器在注册表中的序号
+            info: 配置文件中的原始传感器定义
+            platform: 托管该传感器的平台ID
+            interpretation: 观测属性的解释区间，未提供时所有数值解释为DEFAULT_LABEL
+        """
+        properties = info.get('properties', {})
+        range_info = properties.get('range', {})
+
+        self.index = index
+        self.id = info['id']
+        self.info = info
+        self.name = info.get('name', '')
+        self.location = info.get('location', '未知')
+        self.property_id = info.get('observes', '')
+        self.property_type = self.property_id.split(':')[-1]
+        self.kind = PROPERTY_KINDS.get(self.property_type, 'generic')
+        self.unit = range_info.get('unit', '')
+        self.accuracy = properties.get('accuracy')
+        self.resolution = properties.get('resolution')
+        self.response_time = parse_duration(properties.get('responseTime'))
+        self.platform = platform
+
+        # 有效范围及“中间80%”的良好质量区间
+        if 'min' in range_info and 'max' in range_info:
+            self.range_min = range_info['min']
+            self.range_max = range_info['max']
+            range_size = self.range_max - self.range_min
+            self.good_min = self.range_min + 0.1 * range_size
+            self.good_max = self.range_max - 0.1 * range_size
+        else:
+            self.range_min = self.range_max = None
+            self.good_min = self.good_max = None
+
+        self.interpretation = interpretation or _GENERIC_TABLE
+
+    def validate(self, value: float) -> bool:
+        """验证数值是否在有效范围内"""
+        if self.range_min is None:
+            return True
+        return self.range_min <= value <= self.range_max
+
+    def assess_quality(self, value: float) -> str:
+        """评估数据质量"""
+        if not self.validate(value):
+            return "poor"
+        if self.good_min is None:
+            return "good"
+        return "good" if self.good_min <= value <= self.good_max else "fair"
+
+    def interpret(self, value: float) -> str:
+        """解释传感器数值"""
+        return self.interpretation.interpret(value)
+
+
+class SensorRegistry:
+    """编译后的传感器注册表"""
+
+    def __init__(self, ssn_config: Dict[str, Any]):
+        """
+        Args:
+            ssn_config: SSN配置内容
+        """
+        self.config = ssn_config
+
+        hosted_by = {}
+        for platform in ssn_config.get('platforms', []):
+            for sensor_id in platform.get('hosts', []):
+                hosted_by[sensor_id] = platform['id']
+
+        self.records: List[SensorRecord] = []
+        self.by_id: Dict[str, SensorRecord] = {}
+        self.by_local_id: Dict[str, SensorRecord] = {}
+        self.by_location: Dict[str, List[SensorRecord]] = {}
+        self.by_property: Dict[str, List[SensorRecord]] = {}
+        self.by_platform: Dict[str, List[SensorRecord]] = {}
+
+        # 观测属性ID -> 配置中声明的解释区间
+        self.interpretations: Dict[str, InterpretationTable] = {
+            prop['id']: InterpretationTable(prop['interpretation'])
+            for prop in ssn_config.get('observableProperties', []) if prop.get('interpretation')
+        }
+        # 各传感器使用的解释区间在_tables中的序号，整批解释时按区间分组
+        self._tables: List[InterpretationTable] = []
+        self._table_positions: Dict[InterpretationTable, int] = {}
+        self._record_tables: List[int] = []
+        # 整批解释使用的数组：各传感器的区间序号、各区间标签在合并标签表中的起始位置、合并标签表
+        self._record_table_array: Optional[np.ndarray] = None
+        self._label_offsets: Optional[np.ndarray] = None
+        self._label_pool: Optional[np.ndarray] = None
+
+        for sensor in ssn_config.get('sensors', []):
+            self.add(sensor, hosted_by.get(sensor['id']))
+
+    def add(self, sensor: Dict[str, Any], platform: Optional[str] = None) -> SensorRecord:
+        """编译并登记一个传感器定义"""
+        observes = sensor.get('observes', '')
+        record = SensorRecord(len(self.records), sensor, platform, self.interpretations.get(observes))
+        if record.kind != 'generic' and observes not in self.interpretations:
+            raise ValueError(f"观测属性 {observes} 未在SSN配置的observableProperties中声明interpretation，"
+                             f"无法解释传感器 {record.id} 的数值")
+        self.records.append(record)
+        position = self._table_positions.get(record.interpretation)
+        if position is None:
+            position = self._table_positions[record.interpretation] = len(self._tables)
+            self._tables.append(record.interpretation)
+        self._record_tables.append(position)
+        self._record_table_array = None
+        self.by_id[record.id] = record
+        self.by_local_id.setdefault(record.id.split(':')[-1], record)
+        self.by_location.setdefault(record.location, []).append(record)
+        self.by_property.setdefault(record.property_type, []).append(record)
+        if platform:
+            self.by_platform.setdefault(platform, []).append(record)
+        return record
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, sensor_id: str) -> bool:
+        return sensor_id in self.by_id
+
+    def get(self, sensor_id: str) -> Optional[SensorRecord]:
+        """按ID获取传感器记录"""
+        return self.by_id.get(sensor_id)
+
+    def resolve(self, sensor_id: str) -> Optional[SensorRecord]:
+        """按完整ID或不带命名空间前缀的ID（如temperatureSensor_001）获取传感器记录"""
+        return self.by_id.get(sensor_id) or self.by_local_id.get(sensor_id)
+
+    def interpret_codes(self, indices: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        整批定位读数所在的解释区间，按传感器所用的解释区间分组后用numpy.digitize定位
+
+        Args:
+            indices: 传感器序号数组
+            values: 与序号一一对应的数值数组
+
+        Returns:
+            (各读数的标签在合并标签表中的位置, 合并标签表)，不同属性的同名标签在表中各占一项
+        """
+        if self._record_table_array is None:
+            self._record_table_array = np.asarray(self._record_tables, dtype=np.int64)
+            self._label_offsets = np.cumsum([0] + [len(table.labels) for table in self._tables])[:-1]
+            self._label_pool = np.asarray([label for table in self._tables for label in table.labels], dtype=object)
+        if len(self._tables) == 1:
+            return self._tables[0].bins(values), self._label_pool
+
+        table_ids = self._record_table_array[indices]
+        codes = np.empty(len(values), dtype=np.int64)
+        for table_id in np.flatnonzero(np.bincount(table_ids, minlength=len(self._tables))).tolist():
+            mask = table_ids == table_id
+            codes[mask] = self._tables[table_id].bins(values[mask]) + self._label_offsets[table_id]
+        return codes, self._label_pool
+
+    def interpret_batch(self, indices: np.ndarray, values: np.ndarray) -> List[str]:
+        """
+        整批解释读数
+
+        Args:
+            indices: 传感器序号数组
+            values: 与序号一一对应的数值数组
+
+        Returns:
+            与读数一一对应的标签列表
+        """
+        if len(indices) == 0:
+            return []
+        codes, labels = self.interpret_codes(indices, values)
+        return labels[codes].tolist()
+
+    def sensors_at(self, location: str) -> List[SensorRecord]:
+        """按位置获取传感器记录"""
+        return self.by_location.get(location, [])
+
+    def sensors_observing(self, property_type: str) -> List[SensorRecord]:
+        """
+        按观测属性获取传感器记录
+
+        支持完整属性ID（home:Temperature）、属性名（Temperature）以及属性名的子串
+        """
+        key = property_type.split(':')[-1]
+        if key in self.by_property:
+            return self.by_property[key]
+
+        matched = []
+        for records in self.by_property.values():
+            matched.extend(record for record in records if property_type in record.property_id)
+        return sorted(matched, key=lambda record: record.index)
+
+
+_registries: Dict[str, SensorRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(config_path: str = DEFAULT_SSN_CONFIG,
+                 ssn_config: Optional[Dict[str, Any]] = None) -> SensorRegistry:
+    """
+    获取配置文件对应的共享注册表，首次调用时编译
+
+    Args:
+        config_path: SSN配置文件路径
+        ssn_config: 已加载的配置内容，未提供时从文件读取
+    """
+    key = os.path.abspath(config_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            if ssn_config is None:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    ssn_config = json.load(f)
+            registry = _registries[key] = SensorRegistry(ssn_config)
+        return registry
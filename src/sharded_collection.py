@@ -0,0 +1,404 @@
+"""
+分片采集模块
+按传感器ID或平台将传感器群划分到多个工作进程，各进程独立完成模拟采样、质量评估、异常检测、语义事件生成
+和持久化记录的序列化，以紧凑的列式批次回传协调进程，由协调进程统一写入索引和存储并分发事件
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional, Tuple
+import numpy as np
+
+from semantic_records import Observation, ProcessedObservation, SemanticEvent
+from sensor_history import encode_flags, decode_flags
+from segment_store import EncodedBatch, encode_record
+
+SHARD_KEYS = ('sensor', 'platform')
+
+# 回传批次: (分片号, 读数列(下标, 数值, 时间戳, 标志位), 紧凑事件列表, 各数据流的(编码字节, 各行字节数), 统计摘要)，
+# 读数列为None表示工作进程已退出
+ShardBatch = Tuple[int, Optional[Tuple[np.ndarray, ...]], List[Tuple],
+                   Dict[str, Tuple[bytes, np.ndarray]], Optional[Dict[str, Dict[str, Any]]]]
+
+
+def shard_assignments(registry, shards: int, key: str = 'sensor') -> np.ndarray:
+    """
+    计算每个传感器所属的分片
+
+    按分片键的CRC32取模，结果与进程和运行次数无关；按平台分片时同一平台的传感器落在同一分片，
+    未挂载到平台的传感器按自身ID分片
+
+    Args:
+        registry: SensorRegistry实例
+        shards: 分片数
+        key: 分片键（sensor/platform）
+
+    Returns:
+        与注册表记录一一对应的分片号数组
+    """
+    if key not in SHARD_KEYS:
+        raise ValueError(f"不支持的分片键: {key}")
+    keys = [record.platform if key == 'platform' and record.platform else record.id
+            for record in registry.records]
+    return np.fromiter((zlib.crc32(text.encode('utf-8')) % shards for text in keys),
+                       dtype=np.int32, count=len(keys))
+
+
+def _encode_stream(records: List[Any]) -> Tuple[bytes, np.ndarray]:
+    """将记录逐行编码为分段存储格式，返回拼接后的字节和各行字节数"""
+    lines = [encode_record(record) for record in records]
+    return b''.join(lines), np.fromiter((len(line) for line in lines), dtype=np.int32, count=len(lines))
+
+
+def encode_batch(shard: int, readings: List[Observation], events: List[SemanticEvent],
+                 processed: Optional[List[Observation]] = None,
+                 stats: Optional[Dict[str, Dict[str, Any]]] = None) -> ShardBatch:
+    """
+    将一批读数和语义事件编码为回传批次
+
+    读数按列存为数组，事件只保留类型、所属读数的位置和事件参数，协调进程据此重建对象；
+    原始数据、处理后数据和事件在工作进程中序列化为分段存储的行格式，协调进程直接写入
+
+    Args:
+        shard: 分片号
+        readings: 读数列表
+        events: 由这些读数生成的语义事件
+        processed: 需要保存为处理后数据的读数，默认全部
+        stats: 可选的统计摘要
+
+    Returns:
+        回传批次
+    """
+    count = len(readings)
+    columns = (
+        np.fromiter((reading.record.index for reading in readings), dtype=np.int32, count=count),
+        np.fromiter((reading.value for reading in readings), dtype=np.float64, count=count),
+        np.fromiter((reading.epoch for reading in readings), dtype=np.float64, count=count),
+        np.fromiter((encode_flags(reading.quality, reading.anomaly) for reading in readings),
+                    dtype=np.uint8, count=count)
+    )
+    positions = {id(reading): position for position, reading in enumerate(readings)}
+    compact_events = [
+        (event.event_type, positions[id(event.reading)], event.interpretation,
+         event.severity, event.threshold_type, event.threshold_value)
+        for event in events
+    ]
+
+    processed_at = datetime.now().isoformat()
+    payloads = {
+        'raw': _encode_stream(readings),
+        'processed': _encode_stream([ProcessedObservation(reading, processed_at)
+                                     for reading in (readings if processed is None else processed)]),
+        'events': _encode_stream(events)
+    }
+    return shard, columns, compact_events, payloads, stats
+
+
+def decode_batch(batch: ShardBatch, registry) -> Tuple[List[Observation], List[SemanticEvent],
+                                                         Dict[str, EncodedBatch]]:
+    """
+    由回传批次重建读数和语义事件
+
+    Args:
+        batch: encode_batch生成的批次
+        registry: 与工作进程一致的SensorRegistry
+
+    Returns:
+        (读数列表, 语义事件列表, 各数据流的已编码批次)
+    """
+    _, columns, compact_events, payloads, _ = batch
+    indices, values, epochs, flags = columns
+    records = registry.records
+    # 同一批读数通常共用一个采样时刻
+    time_texts = {}
+    readings = []
+    for index, value, epoch, flag in zip(indices.tolist(), values.tolist(), epochs.tolist(), flags.tolist()):
+        record = records[index]
+        time_text = time_texts.get(epoch)
+        if time_text is None:
+            time_text = time_texts[epoch] = datetime.fromtimestamp(epoch).isoformat()
+        quality, anomaly = decode_flags(flag)
+        readings.append(Observation(record, int(value) if record.kind == 'motion' else value,
+                                    time_text, epoch, quality, anomaly))
+
+    events = []
+    for event_type, position, interpretation, severity, threshold_type, threshold_value in compact_events:
+        reading = readings[position]
+        location = reading.record.location if event_type == 'SensorReading' else None
+        events.append(SemanticEvent(event_type, reading, location, interpretation, severity,
+                                    threshold_type, threshold_value))
+
+    # 原始数据和事件附带记录对象，供事件索引和SQLite入库使用；处理后数据不入库
+    stream_records = {'raw': readings, 'processed': None, 'events': events}
+    encoded = {stream: EncodedBatch(payload, lengths.tolist(), stream_records[stream])
+               for stream, (payload, lengths) in payloads.items()}
+    return readings, events, encoded
+
+
+class ShardWorker:
+    """在工作进程中运行的单个分片"""
+
+    def __init__(self, shard: int, stage, indices: np.ndarray, outbox,
+                 stats_interval: float = 5.0):
+        """
+        Args:
+            shard: 分片号
+            stage: 本进程的CollectionStage
+            indices: 本分片负责的传感器在注册表中的序号
+            outbox: 回传批次的进程间队列
+            stats_interval: 汇报统计摘要的间隔（秒）
+        """
+        self.shard = shard
+        self.stage = stage
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.outbox = outbox
+        self.stats_interval = stats_interval
+        self._last_stats = time.monotonic()
+        self._stop_event = None
+
+    def collect(self, indices: np.ndarray) -> List[Observation]:
+        """采集指定传感器，生成语义事件后回传"""
+        stage = self.stage
+        readings = stage.collect_sensors(indices)
+        events = stage.generate_semantic_events(readings)
+
+        stats = None
+        now = time.monotonic()
+        if now - self._last_stats >= self.stats_interval:
+            self._last_stats = now
+            stats = stage.sensor_stats.snapshot()
+        self._send(encode_batch(self.shard, readings, events,
+                                stage.processed_readings(readings, events), stats))
+        return readings
+
+    def _collect_due(self, local: np.ndarray):
+        """调度器回调：按分片内下标采集到期的传感器，启用自适应采样时由策略筛选"""
+        indices = self.indices[local]
+        adaptive_sampling = self.stage.adaptive_sampling
+        if adaptive_sampling is not None:
+            indices = adaptive_sampling.due(indices, time.monotonic())
+            if len(indices) == 0:
+                return
+        readings = self.collect(indices)
+        if adaptive_sampling is not None:
+            adaptive_sampling.update(indices, [reading.value for reading in readings],
+                                     [reading.epoch for reading in readings])
+
+    def _send(self, batch: ShardBatch):
+        """队列满时阻塞（协调进程跟不上时反压采集），停止后放弃"""
+        while True:
+            try:
+                self.outbox.put(batch, timeout=0.5)
+                return
+            except queue.Full:
+                if self._stop_event.is_set():
+                    return
+
+    def run(self, stop_event):
+        """
+        按采集阶段的调度模式循环采集，直到stop_event被设置
+
+        Args:
+            stop_event: 进程间停止事件
+        """
+        import asyncio
+        from data_collector import SamplingScheduler
+
+        self._stop_event = stop_event
+        stage = self.stage
+        try:
+            if stage.scheduling_mode == 'per_sensor':
+                periods = (stage.adaptive_sampling.min_periods if stage.adaptive_sampling
+                           else stage.sampling_periods())[self.indices]
+                scheduler = SamplingScheduler(
+                    periods,
+                    self._collect_due,
+                    jitter=stage.scheduler_config.get('jitter', True),
+                    slot=stage.scheduler_config.get('slot', 0.01),
+                    seed=stage.simulation_seed
+                )
+                asyncio.run(scheduler.run(lambda: not stop_event.is_set()))
+            else:
+                while not stop_event.is_set():
+                    self.collect(self.indices)
+                    stop_event.wait(stage.sampling_interval)
+        finally:
+            # 结束标记附带最终的统计摘要
+            self.outbox.put((self.shard, None, [], {}, stage.sensor_stats.snapshot()))
+
+
+def run_shard(shard: int, ssn_config: Dict[str, Any], config: Dict[str, Any], indices: np.ndarray,
+              outbox, stop_event, stats_interval: float = 5.0):
+    """
+    工作进程入口：重建注册表和采集阶段后运行分片
+
+    各分片的模拟器使用不同的随机种子，避免各分片生成相同的数值序列；
+    启用gc_freeze时在采集开始前冻结本进程启动时创建的对象
+    """
+    import gc
+    from data_collector import CollectionStage
+    from sensor_registry import SensorRegistry
+
+    registry = SensorRegistry(ssn_config)
+    seed = config.get('data_collection', {}).get('simulation_seed')
+    stage = CollectionStage(config, registry, None if seed is None else seed + shard + 1)
+    if config.get('data_collection', {}).get('gc_freeze', False):
+        gc.freeze()
+    try:
+        ShardWorker(shard, stage, indices, outbox, stats_interval).run(stop_event)
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedCollection:
+    """分片采集协调器
+
+    启动按分片划分的工作进程，在接收线程中解码回传批次并交给回调；
+    工作进程之间不共享状态，协调进程只做合并、持久化和分发
+    """
+
+    def __init__(self, config: Dict[str, Any],
+                 on_batch: Callable[[List[Observation], List[SemanticEvent], Dict[str, EncodedBatch]], None],
+                 statistics=None, shards: int = 0, key: str = 'sensor',
+                 stats_interval: float = 5.0, queue_capacity: int = 64):
+        """
+        Args:
+            config: 服务配置，原样传给各工作进程
+            on_batch: 批次回调，参数为重建后的读数、语义事件和各数据流的已编码批次
+            statistics: 可选的SensorStatistics，合并各分片汇报的统计摘要
+            shards: 工作进程数，0表示CPU核数
+            key: 分片键（sensor/platform）
+            stats_interval: 工作进程汇报统计摘要的间隔（秒）
+            queue_capacity: 回传队列容量（批次数），满时工作进程阻塞
+        """
+        if key not in SHARD_KEYS:
+            raise ValueError(f"不支持的分片键: {key}")
+        self.config = config
+        self.on_batch = on_batch
+        self.statistics = statistics
+        self.shards = shards or os.cpu_count() or 1
+        self.key = key
+        self.stats_interval = stats_interval
+        self.queue_capacity = queue_capacity
+
+        self.registry = None
+        self.sensor_counts = []
+        self._processes = []
+        self._outbox = None
+        self._stop_event = None
+        self._receiver = None
+
+        self.metrics = {
+            'batches': 0,
+            'readings': 0,
+            'events': 0,
+            'errors': 0,
+            'total_decode_ms': 0.0,
+            'total_merge_ms': 0.0
+        }
+
+    def start(self, registry):
+        """
+        按注册表划分分片并启动工作进程和接收线程
+
+        Args:
+            registry: 采集的SensorRegistry，需要保留其SSN配置以便工作进程重建
+        """
+        if self._processes:
+            return
+        self.registry = registry
+        assignments = shard_assignments(registry, self.shards, self.key)
+        # 协调进程已有接入、持久化等线程，fork可能复制持有中的锁；工作进程从全新解释器启动
+        context = multiprocessing.get_context('spawn')
+        self._outbox = context.Queue(self.queue_capacity)
+        self._stop_event = context.Event()
+        self.sensor_counts = []
+        for shard in range(self.shards):
+            indices = np.flatnonzero(assignments == shard)
+            self.sensor_counts.append(len(indices))
+            process = context.Process(
+                target=run_shard,
+                args=(shard, registry.config, self.config, indices, self._outbox,
+                      self._stop_event, self.stats_interval),
+                name=f"shard-{shard}"
+            )
+            process.daemon = True
+            process.start()
+            self._processes.append(process)
+
+        self._receiver = threading.Thread(target=self._receive_loop)
+        self._receiver.daemon = True
+        self._receiver.start()
+
+    def _receive_loop(self):
+        """接收各分片的批次，直到所有工作进程都已退出且队列取空"""
+        active = set(range(len(self._processes)))
+        while active:
+            try:
+                batch = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                # 异常退出的工作进程不会发送结束标记，进程退出前已发送的批次此时都已取出
+                active = {shard for shard in active if self._processes[shard].is_alive()}
+                continue
+
+            shard, columns, _, _, stats = batch
+            if stats and self.statistics is not None:
+                self.statistics.merge_remote(stats)
+            if columns is None:
+                active.discard(shard)
+                continue
+
+            try:
+                start = time.perf_counter()
+                readings, events, encoded = decode_batch(batch, self.registry)
+                decoded = time.perf_counter()
+                self.on_batch(readings, events, encoded)
+                self.metrics['total_decode_ms'] += (decoded - start) * 1000
+                self.metrics['total_merge_ms'] += (time.perf_counter() - decoded) * 1000
+                self.metrics['batches'] += 1
+                self.metrics['readings'] += len(readings)
+                self.metrics['events'] += len(events)
+            except Exception as e:
+                self.metrics['errors'] += 1
+                print(f"分片批次处理错误: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """通知工作进程停止，处理完已回传的批次后返回"""
+        if not self._processes:
+            return
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        if self._receiver is not None:
+            self._receiver.join(timeout)
+            self._receiver = None
+        self._processes = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._processes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分片采集统计信息"""
+        batches = self.metrics['batches']
+        return {
+            "分片数": self.shards,
+            "分片键": self.key,
+            "各分片传感器数": self.sensor_counts,
+            "运行中工作进程": sum(1 for process in self._processes if process.is_alive()),
+            "接收批次": batches,
+            "接收读数": self.metrics['readings'],
+            "接收事件": self.metrics['events'],
+            "处理错误数": self.metrics['errors'],
+            "平均解码耗时ms": round(self.metrics['total_decode_ms'] / batches, 3) if batches else 0.0,
+            "平均合并耗时ms": round(self.metrics['total_merge_ms'] / batches, 3) if batches else 0.0
+        }
@@ -0,0 +1,467 @@
+"""
+SQLite时序存储模块
+以WAL模式的嵌入式SQLite保存观测、语义事件和复杂事件，按(传感器, 时间)和(位置, 时间)建立索引；
+写入按批次在单个事务中用executemany提交，查询接口提供按索引的范围查询和分桶聚合
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sensors (
+    id TEXT PRIMARY KEY,
+    location TEXT,
+    property TEXT,
+    unit TEXT
+);
+CREATE TABLE IF NOT EXISTS observations (
+    sensor TEXT NOT NULL,
+    location TEXT,
+    epoch REAL NOT NULL,
+    value REAL,
+    quality TEXT,
+    anomaly INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_observations_sensor_time ON observations(sensor, epoch);
+CREATE INDEX IF NOT EXISTS idx_observations_location_time ON observations(location, epoch);
+CREATE TABLE IF NOT EXISTS semantic_events (
+    id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    sensor TEXT,
+    location TEXT,
+    epoch REAL NOT NULL,
+    value REAL,
+    severity TEXT,
+    threshold_type TEXT,
+    threshold_value REAL,
+    interpretation TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_semantic_events_sensor_time ON semantic_events(sensor, epoch);
+CREATE INDEX IF NOT EXISTS idx_semantic_events_location_time ON semantic_events(location, epoch);
+CREATE TABLE IF NOT EXISTS complex_events (
+    id TEXT NOT NULL,
+    type TEXT,
+    event_type TEXT NOT NULL,
+    source TEXT,
+    location TEXT,
+    epoch REAL NOT NULL,
+    severity TEXT,
+    priority TEXT,
+    trigger_event TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_complex_events_type_time ON complex_events(event_type, epoch);
+CREATE INDEX IF NOT EXISTS idx_complex_events_location_time ON complex_events(location, epoch);
+"""
+
+# 条件运算符对应的SQL表达式，与事件处理器的条件语义一致
+CONDITION_SQL = {
+    '>': 'value > ?',
+    '<': 'value < ?',
+    '>=': 'value >= ?',
+    '<=': 'value <= ?',
+    '==': 'abs(value - ?) < 0.01',
+    '!=': 'abs(value - ?) >= 0.01'
+}
+
+# 写后持久化数据流到表的映射，处理后数据是原始观测的子集，不重复入库
+STREAM_TABLES = {
+    'raw': 'observations',
+    'events': 'semantic_events',
+    'complex': 'complex_events'
+}
+
+
+def _parse_epoch(timestamp: Any) -> float:
+    """将ISO时间或数值时间戳转换为秒级时间戳"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _time_filter(column: str, start: Optional[float], end: Optional[float],
+                 clauses: List[str], params: List[Any]):
+    """追加时间范围条件（包含两端）"""
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{column} <= ?")
+        params.append(end)
+
+
+class SQLiteStore:
+    """WAL模式的SQLite时序存储
+
+    写入只通过一个连接并由锁串行化；查询使用各线程自己的只读连接，
+    WAL模式下读取不会阻塞写入，也不会被写入阻塞
+    """
+
+    def __init__(self, path: str, synchronous: str = 'NORMAL', busy_timeout: float = 5.0):
+        """
+        Args:
+            path: 数据库文件路径
+            synchronous: SQLite同步级别，WAL模式下NORMAL只在检查点时fsync
+            busy_timeout: 等待数据库锁的最长秒数
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        # 各线程的查询连接登记在此，close()时统一关闭；代数变化后线程重新建立连接
+        self._readers_lock = threading.Lock()
+        self._readers: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._known_sensors = {row[0] for row in self._writer.execute("SELECT id FROM sensors")}
+
+        self.metrics = {
+            'batches': 0,
+            'observations': 0,
+            'semantic_events': 0,
+            'complex_events': 0,
+            'rows_pruned': 0,
+            'write_errors': 0,
+            'total_write_ms': 0.0,
+            'max_write_ms': 0.0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """当前线程的查询连接"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.generation != self._generation:
+            connection = self._connect()
+            connection.row_factory = sqlite3.Row
+            with self._readers_lock:
+                self._readers.append(connection)
+                self._local.generation = self._generation
+            self._local.connection = connection
+        return connection
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._reader().execute(sql, tuple(params))]
+
+    # ---- 写入 ----
+
+    def _sensor_rows(self, observations: Iterable[Any]) -> List[Tuple]:
+        """本批次中首次出现的传感器"""
+        rows = []
+        for reading in observations:
+            record = reading.record
+            if record.id not in self._known_sensors:
+                self._known_sensors.add(record.id)
+                rows.append((record.id, record.location, record.property_type, record.unit))
+        return rows
+
+    @staticmethod
+    def _observation_row(reading) -> Tuple:
+        return (reading.record.id, reading.record.location, reading.epoch, reading.value,
+                reading.quality, int(bool(reading.anomaly)))
+
+    @staticmethod
+    def _semantic_event_row(event) -> Tuple:
+        reading = event.reading
+        return (event.id, event.event_type, reading.record.id, reading.record.location, event.epoch,
+                reading.value, event.severity, event.threshold_type, event.threshold_value,
+                event.interpretation)
+
+    @staticmethod
+    def _complex_event_row(event) -> Tuple:
+        details = event.get('details') or {}
+        return (event.get('id'), event.get('type'), event.get('eventType'), event.get('source'),
+                details.get('location'), _parse_epoch(event.get('timestamp')),
+                event.get('severity'), event.get('priority'), event.get('trigger_event'),
+                json.dumps(details, ensure_ascii=False, default=str))
+
+    def append(self, batches: Dict[str, List[Any]]):
+        """
+        在一个事务中写入一批记录
+
+        Args:
+            batches: 数据流名称（raw/events/complex）到记录列表的映射；
+                raw为Observation，events为SemanticEvent，complex为复杂事件（对象或字典），
+                其他数据流被忽略
+        """
+        observations = batches.get('raw') or []
+        semantic_events = batches.get('events') or []
+        complex_events = batches.get('complex') or []
+        if not (observations or semantic_events or complex_events):
+            return
+
+        start = time.perf_counter()
+        with self._write_lock:
+            self._ensure_writer()
+            try:
+                with self._writer:
+                    sensors = self._sensor_rows(observations)
+                    if sensors:
+                        self._writer.executemany("INSERT OR IGNORE INTO sensors VALUES (?, ?, ?, ?)", sensors)
+                    if observations:
+                        self._writer.executemany(
+                            "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?)",
+                            [self._observation_row(reading) for reading in observations])
+                    if semantic_events:
+                        self._writer.executemany(
+                            "INSERT INTO semantic_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [self._semantic_event_row(event) for event in semantic_events])
+                    if complex_events:
+                        self._writer.executemany(
+                            "INSERT INTO complex_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [self._complex_event_row(event) for event in complex_events])
+            except sqlite3.Error:
+                # 事务已回滚，本批新登记的传感器需要在下次写入时重新登记
+                self._known_sensors = {row[0] for row in self._writer.execute("SELECT id FROM sensors")}
+                self.metrics['write_errors'] += 1
+                raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.metrics['batches'] += 1
+        self.metrics['observations'] += len(observations)
+        self.metrics['semantic_events'] += len(semantic_events)
+        self.metrics['complex_events'] += len(complex_events)
+        self.metrics['total_write_ms'] += elapsed_ms
+        self.metrics['max_write_ms'] = max(self.metrics['max_write_ms'], elapsed_ms)
+
+    def prune(self, before: float) -> int:
+        """
+        删除时间早于before的记录
+
+        观测和语义事件按传感器逐个删除，以便使用(传感器, 时间)索引
+
+        Returns:
+            删除的行数
+        """
+        with self._write_lock:
+            self._ensure_writer()
+            with self._writer:
+                sensors = [(sensor_id, before) for sensor_id in self._known_sensors]
+                deleted = self._writer.total_changes
+                self._writer.executemany("DELETE FROM observations WHERE sensor = ? AND epoch < ?", sensors)
+                self._writer.executemany("DELETE FROM semantic_events WHERE sensor = ? AND epoch < ?", sensors)
+                self._writer.execute("DELETE FROM complex_events WHERE epoch < ?", (before,))
+                deleted = self._writer.total_changes - deleted
+        self.metrics['rows_pruned'] += deleted
+        return deleted
+
+    def _ensure_writer(self):
+        """在持有写锁的情况下确保写入连接已打开，关闭后再次写入时重新连接"""
+        if self._writer is None:
+            self._writer = self._connect()
+
+    def close(self):
+        """关闭各线程的查询连接，检查点并关闭写入连接；之后的查询和写入会重新打开连接"""
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+            self._generation += 1
+        for connection in readers:
+            connection.close()
+
+        with self._write_lock:
+            if self._writer is None:
+                return
+            try:
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+            self._writer.close()
+            self._writer = None
+
+    # ---- 查询 ----
+
+    def sensors_matching(self, pattern: str) -> List[str]:
+        """ID中包含pattern的传感器，用于解析规则中的传感器简写"""
+        return [row['id'] for row in self._query("SELECT id FROM sensors WHERE instr(id, ?) > 0", (pattern,))]
+
+    def _scope(self, sensor_id: Optional[str], location: Optional[str],
+               clauses: List[str], params: List[Any], sensor_column: str = 'sensor'):
+        """按传感器或位置限定查询范围，使对应的复合索引生效"""
+        if sensor_id is not None:
+            clauses.append(f"{sensor_column} = ?")
+            params.append(sensor_id)
+        elif location is not None:
+            clauses.append("location = ?")
+            params.append(location)
+
+    def query_observations(self, sensor_id: Optional[str] = None, location: Optional[str] = None,
+                           start: Optional[float] = None, end: Optional[float] = None,
+                           limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        按传感器或位置查询时间范围内的观测
+
+        Args:
+            sensor_id: 传感器ID
+            location: 位置，指定sensor_id时忽略
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+            limit: 最多返回的行数，返回时间最近的行
+
+        Returns:
+            按时间升序的观测列表
+        """
+        clauses, params = [], []
+        self._scope(sensor_id, location, clauses, params)
+        _time_filter('epoch', start, end, clauses, params)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(
+            f"SELECT sensor, location, epoch, value, quality, anomaly FROM observations {where} "
+            f"ORDER BY epoch DESC LIMIT ?", params + [limit])
+        for row in rows:
+            row['anomaly'] = bool(row['anomaly'])
+        rows.reverse()
+        return rows
+
+    def aggregate_observations(self, sensor_id: Optional[str] = None, location: Optional[str] = None,
+                               start: Optional[float] = None, end: Optional[float] = None,
+                               bucket_seconds: int = 60) -> List[Dict[str, Any]]:
+        """
+        按(传感器, 时间桶)聚合观测
+
+        Args:
+            sensor_id: 传感器ID
+            location: 位置，指定sensor_id时忽略
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+            bucket_seconds: 桶宽（秒）
+
+        Returns:
+            与汇总数据格式一致的记录列表（sensor/start/epoch/count/min/max/mean）
+        """
+        clauses, params = [], [bucket_seconds, bucket_seconds]
+        self._scope(sensor_id, location, clauses, params)
+        _time_filter('epoch', start, end, clauses, params)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(
+            f"SELECT sensor, CAST(epoch / ? AS INTEGER) * ? AS bucket, COUNT(*) AS count, "
+            f"MIN(value) AS min, MAX(value) AS max, AVG(value) AS mean "
+            f"FROM observations {where} GROUP BY sensor, bucket ORDER BY sensor, bucket", params)
+        return [{
+            'sensor': row['sensor'],
+            'start': datetime.fromtimestamp(row['bucket']).isoformat(),
+            'epoch': row['bucket'],
+            'count': row['count'],
+            'min': row['min'],
+            'max': row['max'],
+            'mean': row['mean']
+        } for row in rows]
+
+    def any_observation(self, sensor_ids: List[str], operator: str, threshold: float,
+                        start: float, end: Optional[float] = None) -> bool:
+        """
+        时间范围内是否存在满足条件的观测
+
+        Args:
+            sensor_ids: 传感器ID列表
+            operator: 比较运算符（>/</>=/<=/==/!=）
+            threshold: 比较阈值
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+        """
+        condition = CONDITION_SQL.get(operator)
+        if condition is None:
+            return False
+        connection = self._reader()
+        for sensor_id in sensor_ids:
+            clauses, params = ["sensor = ?"], [sensor_id]
+            _time_filter('epoch', start, end, clauses, params)
+            sql = f"SELECT 1 FROM observations WHERE {' AND '.join(clauses)} AND {condition} LIMIT 1"
+            if connection.execute(sql, params + [threshold]).fetchone():
+                return True
+        return False
+
+    def query_events(self, kind: str = 'semantic', event_type: Optional[str] = None,
+                     sensor_id: Optional[str] = None, location: Optional[str] = None,
+                     severity: Optional[str] = None, start: Optional[float] = None,
+                     end: Optional[float] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        查询时间范围内的事件
+
+        Args:
+            kind: semantic（语义事件）或complex（复杂事件）
+            event_type: 事件类型
+            sensor_id: 语义事件的传感器ID或复杂事件的来源
+            location: 位置
+            severity: 严重程度
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+            limit: 最多返回的行数，返回时间最近的行
+
+        Returns:
+            按时间升序的事件列表
+        """
+        if kind not in ('semantic', 'complex'):
+            raise ValueError(f"未知的事件类别: {kind}")
+        table = 'semantic_events' if kind == 'semantic' else 'complex_events'
+        clauses, params = [], []
+        if event_type is not None:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        self._scope(sensor_id, location, clauses, params,
+                    sensor_column='sensor' if kind == 'semantic' else 'source')
+        if severity is not None:
+            clauses.append("severity = ?")
+            params.append(severity)
+        _time_filter('epoch', start, end, clauses, params)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT * FROM {table} {where} ORDER BY epoch DESC LIMIT ?", params + [limit])
+        for row in rows:
+            if kind == 'complex' and row['details']:
+                row['details'] = json.loads(row['details'])
+        rows.reverse()
+        return rows
+
+    def count_events(self, kind: str = 'semantic', location: Optional[str] = None,
+                     start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        按事件类型和严重程度统计时间范围内的事件数
+
+        Returns:
+            形如 [{"event_type": ..., "severity": ..., "count": ...}] 的列表
+        """
+        if kind not in ('semantic', 'complex'):
+            raise ValueError(f"未知的事件类别: {kind}")
+        table = 'semantic_events' if kind == 'semantic' else 'complex_events'
+        clauses, params = [], []
+        self._scope(None, location, clauses, params)
+        _time_filter('epoch', start, end, clauses, params)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(
+            f"SELECT event_type, severity, COUNT(*) AS count FROM {table} {where} "
+            f"GROUP BY event_type, severity ORDER BY count DESC", params)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        batches = self.metrics['batches']
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+        return {
+            "数据库文件": self.path,
+            "数据库大小MB": round(size / 1024 / 1024, 2),
+            "写入批次": batches,
+            "写入观测数": self.metrics['observations'],
+            "写入语义事件数": self.metrics['semantic_events'],
+            "写入复杂事件数": self.metrics['complex_events'],
+            "清理行数": self.metrics['rows_pruned'],
+            "写入错误数": self.metrics['write_errors'],
+            "平均写入耗时ms": round(self.metrics['total_write_ms'] / batches, 3) if batches else 0.0,
+            "最大写入耗时ms": round(self.metrics['max_write_ms'], 3)
+        }
@@ -9,6 +9,31 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, XSD
+from sensor_registry import get_registry, DEFAULT_SSN_CONFIG
+
+
+def build_observation(record, value: float, time_text: str, epoch_seconds: int) -> Dict[str, Any]:
+    """
+    根据编译后的传感器记录构造观测记录
+    
+    Args:
+        record: 传感器注册表中的SensorRecord
+        value: 观测值
+        time_text: ISO格式的观测时间
+        epoch_seconds: 观测时间的整秒时间戳
+    """
+    return {
+        "id": f"obs_{record.id}_{epoch_seconds}",
+        "type": "sosa:Observation",
+        "madeBySensor": record.id,
+        "observedProperty": record.property_id,
+        "hasResult": {
+            "value": value,
+            "unit": record.unit
+        },
+        "resultTime": time_text,
+        "phenomenonTime": time_text
+    }
 
 
 class SSNModeling:
@@ -21,8 +46,9 @@ class SSNModeling:
         Args:
             config_path: SSN配置文件路径
         """
-        self.config_path = config_path or "config/ssn_model.json"
+        self.config_path = config_path or DEFAULT_SSN_CONFIG
         self.ssn_config = self._load_config()
+        self.registry = get_registry(self.config_path, self.ssn_config)
         self.graph = Graph()
         self._setup_namespaces()
         self._build_semantic_model()
@@ -126,70 +152,34 @@ class SSNModeling:
     
     def get_sensor_info(self, sensor_id: str) -> Dict[str, Any]:
         """获取传感器信息"""
-        for sensor in self.ssn_config.get('sensors', []):
-            if sensor['id'] == sensor_id:
-                return sensor
-        return {}
+        record = self.registry.get(sensor_id)
+        return record.info if record else {}
     
     def get_sensors_by_location(self, location: str) -> List[Dict[str, Any]]:
         """根据位置获取传感器列表"""
-        sensors = []
-        for sensor in self.ssn_config.get('sensors', []):
-            if sensor.get('location') == location:
-                sensors.append(sensor)
-        return sensors
+        return [record.info for record in self.registry.sensors_at(location)]
     
     def get_sensors_by_property(self, property_type: str) -> List[Dict[str, Any]]:
         """根据观测属性获取传感器列表"""
-        sensors = []
-        for sensor in self.ssn_config.get('sensors', []):
-            if property_type in sensor.get('observes', ''):
-                sensors.append(sensor)
-        return sensors
+        return [record.info for record in self.registry.sensors_observing(property_type)]
     
     def create_observation(self, sensor_id: str, value: float, timestamp: datetime = None) -> Dict[str, Any]:
         """创建观测记录"""
         if timestamp is None:
             timestamp = datetime.now()
         
-        sensor_info = self.get_sensor_info(sensor_id)
-        if not sensor_info:
+        record = self.registry.get(sensor_id)
+        if not record:
             raise ValueError(f"传感器不存在: {sensor_id}")
         
-        observation = {
-            "id": f"obs_{sensor_id}_{int(timestamp.timestamp())}",
-            "type": "sosa:Observation",
-            "madeBySensor": sensor_id,
-            "observedProperty": sensor_info.get('observes'),
-            "hasResult": {
-                "value": value,
-                "unit": self._get_sensor_unit(sensor_info)
-            },
-            "resultTime": timestamp.isoformat(),
-            "phenomenonTime": timestamp.isoformat()
-        }
-        
-        return observation
-    
-    def _get_sensor_unit(self, sensor_info: Dict[str, Any]) -> str:
-        """获取传感器单位"""
-        properties = sensor_info.get('properties', {})
-        range_info = properties.get('range', {})
-        return range_info.get('unit', '')
+        return build_observation(record, value, timestamp.isoformat(), int(timestamp.timestamp()))
     
     def validate_sensor_value(self, sensor_id: str, value: float) -> bool:
         """验证传感器值是否在有效范围内"""
-        sensor_info = self.get_sensor_info(sensor_id)
-        if not sensor_info:
+        record = self.registry.get(sensor_id)
+        if not record:
             return False
-        
-        properties = sensor_info.get('properties', {})
-        range_info = properties.get('range', {})
-        
-        if 'min' in range_info and 'max' in range_info:
-            return range_info['min'] <= value <= range_info['max']
-        
-        return True
+        return record.validate(value)
     
     def export_rdf(self, format: str = 'turtle') -> str:
         """导出RDF格式的语义模型"""
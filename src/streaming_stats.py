@@ -0,0 +1,204 @@
+"""
+流式统计模块
+实现O(1)更新的Welford/EWMA均值方差以及滑动窗口统计，按传感器维护
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class WelfordStats:
+    """Welford累积均值与方差"""
+
+    __slots__ = ('count', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float):
+        """加入一个新值"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """总体方差"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """总体标准差"""
+        return math.sqrt(self.variance)
+
+
+class EWMAStats:
+    """指数加权移动均值与方差"""
+
+    __slots__ = ('alpha', 'count', 'mean', 'variance')
+
+    def __init__(self, alpha: float = 0.1):
+        """
+        Args:
+            alpha: 平滑系数，越大越偏重最新值
+        """
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def update(self, value: float):
+        """加入一个新值"""
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        delta = value - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+
+    @property
+    def std(self) -> float:
+        """标准差"""
+        return math.sqrt(self.variance)
+
+
+class WindowedStats:
+    """固定窗口的滑动均值与方差"""
+
+    __slots__ = ('window', '_values', 'mean', '_m2')
+
+    def __init__(self, window: int = 50):
+        """
+        Args:
+            window: 窗口内保留的最近数值个数
+        """
+        self.window = window
+        self._values = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self._values)
+
+    def update(self, value: float):
+        """加入一个新值，窗口满时移除最旧的值"""
+        if len(self._values) == self.window:
+            old = self._values.popleft()
+            n = len(self._values)
+            if n == 0:
+                self.mean = 0.0
+                self._m2 = 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self._m2 -= delta * (old - self.mean)
+
+        self._values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self._values)
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """窗口内总体方差"""
+        n = len(self._values)
+        return max(self._m2, 0.0) / n if n else 0.0
+
+    @property
+    def std(self) -> float:
+        """窗口内总体标准差"""
+        return math.sqrt(self.variance)
+
+
+STAT_METHODS = {
+    'welford': lambda options: WelfordStats(),
+    'ewma': lambda options: EWMAStats(options.get('alpha', 0.1)),
+    'windowed': lambda options: WindowedStats(options.get('window', 50))
+}
+
+
+class SensorStatistics:
+    """按传感器维护的流式统计与3-sigma异常检测"""
+
+    def __init__(self, method: str = 'windowed', min_samples: int = 5,
+                 sigma: float = 3.0, **options):
+        """
+        初始化传感器统计
+
+        Args:
+            method: 统计方法（welford/ewma/windowed）
+            min_samples: 开始判定异常前所需的最少样本数
+            sigma: 异常判定的标准差倍数
+            options: 统计方法参数，如window、alpha
+        """
+        if method not in STAT_METHODS:
+            raise ValueError(f"不支持的统计方法: {method}")
+        self.method = method
+        self.min_samples = min_samples
+        self.sigma = sigma
+        self.options = options
+        self.sensors: Dict[str, Any] = {}
+        self.anomaly_counts: Dict[str, int] = {}
+        # 其他进程（分片采集的工作进程）汇报的统计摘要，只读
+        self.remote: Dict[str, Dict[str, Any]] = {}
+
+    def _stats(self, sensor_id: str):
+        """获取或创建传感器的统计对象"""
+        stats = self.sensors.get(sensor_id)
+        if stats is None:
+            stats = self.sensors[sensor_id] = STAT_METHODS[self.method](self.options)
+        return stats
+
+    def is_anomaly(self, sensor_id: str, value: float) -> bool:
+        """依据当前统计量判断数值是否异常（不更新统计）"""
+        stats = self.sensors.get(sensor_id)
+        if stats is None or stats.count < self.min_samples:
+            return False
+        return abs(value - stats.mean) > self.sigma * stats.std
+
+    def observe(self, sensor_id: str, value: float) -> bool:
+        """
+        判定异常后将数值计入统计
+
+        Returns:
+            该数值是否异常
+        """
+        anomaly = self.is_anomaly(sensor_id, value)
+        if anomaly:
+            self.anomaly_counts[sensor_id] = self.anomaly_counts.get(sensor_id, 0) + 1
+        self._stats(sensor_id).update(value)
+        return anomaly
+
+    def merge_remote(self, summaries: Dict[str, Dict[str, Any]]):
+        """
+        登记由其他进程维护的传感器统计摘要
+
+        Args:
+            summaries: 传感器ID到统计摘要的映射，格式与get()的返回值一致
+        """
+        self.remote.update(summaries)
+
+    def get(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        """获取单个传感器的统计摘要，本进程未统计的传感器返回其他进程汇报的摘要"""
+        stats = self.sensors.get(sensor_id)
+        if stats is None:
+            return self.remote.get(sensor_id)
+        return {
+            'count': stats.count,
+            'mean': stats.mean,
+            'std': stats.std,
+            'anomalies': self.anomaly_counts.get(sensor_id, 0)
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有传感器的统计摘要"""
+        summaries = dict(self.remote)
+        summaries.update((sensor_id, self.get(sensor_id)) for sensor_id in self.sensors)
+        return summaries
@@ -0,0 +1,167 @@
+"""
+阈值引擎模块
+将配置中按传感器/观测属性/位置声明的阈值编译为数组，
+用NumPy对整批读数做向量化判定，并通过滞回避免数值在阈值附近反复触发事件
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+SEVERITY_LEVELS = ['low', 'medium', 'high', 'critical']
+
+
+def rule_specificity(rule: Dict[str, Any]) -> int:
+    """规则的匹配精确度：传感器 > 位置+属性 > 属性 > 位置"""
+    if 'sensor' in rule:
+        return 4
+    if 'property' in rule and 'location' in rule:
+        return 3
+    if 'property' in rule:
+        return 2
+    if 'location' in rule:
+        return 1
+    return 0
+
+
+def rule_matches(rule: Dict[str, Any], record) -> bool:
+    """判断阈值规则是否适用于传感器"""
+    if 'sensor' in rule:
+        sensor = rule['sensor']
+        return record.id == sensor or record.id.split(':')[-1] == sensor
+    if 'property' in rule and rule['property'].split(':')[-1] != record.property_type:
+        return False
+    if 'location' in rule and rule['location'] != record.location:
+        return False
+    return True
+
+
+def occurrence_rank(indices: np.ndarray) -> np.ndarray:
+    """计算每个元素是同一下标的第几次出现（从0开始），保持原有顺序"""
+    order = np.argsort(indices, kind='stable')
+    sorted_indices = indices[order]
+    starts = np.r_[True, sorted_indices[1:] != sorted_indices[:-1]]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(indices)), 0))
+    ranks = np.empty(len(indices), dtype=np.int64)
+    ranks[order] = np.arange(len(indices)) - group_start
+    return ranks
+
+
+class ThresholdEngine:
+    """向量化阈值判定引擎"""
+
+    def __init__(self, n_sensors: int):
+        """
+        Args:
+            n_sensors: 传感器数量，数组下标与注册表记录序号一致
+        """
+        self.high = np.full(n_sensors, np.nan)
+        self.low = np.full(n_sensors, np.nan)
+        self.hysteresis = np.zeros(n_sensors)
+        self.high_severity = np.full(n_sensors, SEVERITY_LEVELS.index('medium'), dtype=np.int8)
+        self.low_severity = np.full(n_sensors, SEVERITY_LEVELS.index('medium'), dtype=np.int8)
+
+        # 滞回状态：当前是否处于越限状态
+        self.high_active = np.zeros(n_sensors, dtype=bool)
+        self.low_active = np.zeros(n_sensors, dtype=bool)
+
+    @classmethod
+    def from_config(cls, registry, threshold_config: Dict[str, Any]) -> 'ThresholdEngine':
+        """
+        根据阈值配置为注册表中的传感器编译阈值
+
+        Args:
+            registry: SensorRegistry实例
+            threshold_config: 形如 {"default_hysteresis": 0, "rules": [...]} 的配置
+        """
+        engine = cls(len(registry))
+        default_hysteresis = threshold_config.get('default_hysteresis', 0.0)
+        rules = sorted(threshold_config.get('rules', []), key=rule_specificity)
+
+        # 按精确度从低到高覆盖，最精确的规则最终生效
+        for rule in rules:
+            indices = [record.index for record in registry.records if rule_matches(rule, record)]
+            if not indices:
+                continue
+            severity = rule.get('severity', {})
+            if rule.get('high') is not None:
+                engine.high[indices] = rule['high']
+                engine.high_severity[indices] = SEVERITY_LEVELS.index(severity.get('high', 'medium'))
+            if rule.get('low') is not None:
+                engine.low[indices] = rule['low']
+                engine.low_severity[indices] = SEVERITY_LEVELS.index(severity.get('low', 'medium'))
+            engine.hysteresis[indices] = rule.get('hysteresis', default_hysteresis)
+
+        return engine
+
+    def limits(self, index: int) -> Tuple[Optional[float], Optional[float]]:
+        """获取传感器的(下限, 上限)，未配置时为None"""
+        low, high = self.low[index], self.high[index]
+        return (None if np.isnan(low) else float(low), None if np.isnan(high) else float(high))
+
+    def evaluate(self, indices: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        判定一批读数，更新滞回状态
+
+        数值越过阈值且此前未处于越限状态时触发；回落到阈值内侧超过滞回宽度后解除
+
+        Args:
+            indices: 每条读数对应的传感器下标，-1表示未登记的传感器
+            values: 每条读数的数值
+
+        Returns:
+            (触发上限事件的读数位置, 触发下限事件的读数位置)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        known = np.flatnonzero(indices >= 0)
+        if len(known) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        # 同一传感器在一批中出现多次时，按出现顺序分轮判定，保证滞回状态按时间推进
+        ranks = occurrence_rank(indices[known])
+        high_hits = []
+        low_hits = []
+        for rank in range(int(ranks.max()) + 1):
+            positions = known[ranks == rank]
+            high_pos, low_pos = self._evaluate_unique(positions, indices[positions], values[positions])
+            high_hits.append(high_pos)
+            low_hits.append(low_pos)
+
+        return np.sort(np.concatenate(high_hits)), np.sort(np.concatenate(low_hits))
+
+    def _evaluate_unique(self, positions: np.ndarray, sensors: np.ndarray,
+                         values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """判定传感器互不重复的一组读数"""
+        high = self.high[sensors]
+        low = self.low[sensors]
+        hysteresis = self.hysteresis[sensors]
+
+        # NaN阈值参与比较结果恒为False，未配置的阈值自然不会触发
+        with np.errstate(invalid='ignore'):
+            above = values > high
+            below = values < low
+            high_cleared = values <= high - hysteresis
+            low_cleared = values >= low + hysteresis
+
+        high_active = self.high_active[sensors]
+        low_active = self.low_active[sensors]
+        high_trigger = above & ~high_active
+        low_trigger = below & ~low_active
+
+        self.high_active[sensors] = (high_active | above) & ~high_cleared
+        self.low_active[sensors] = (low_active | below) & ~low_cleared
+
+        return positions[high_trigger], positions[low_trigger]
+
+    def severity(self, index: int, threshold_type: str) -> str:
+        """获取传感器越限事件的严重程度"""
+        levels = self.high_severity if threshold_type == 'high' else self.low_severity
+        return SEVERITY_LEVELS[levels[index]]
+
+    def active_counts(self) -> Dict[str, int]:
+        """当前处于越限状态的传感器数量"""
+        return {
+            'high': int(self.high_active.sum()),
+            'low': int(self.low_active.sum())
+        }
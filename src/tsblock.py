@@ -0,0 +1,331 @@
+"""
+时序块存储模块
+将按小时分区的原始读数压缩为按传感器组织的列式时序块：
+时间戳按毫秒做二阶差分，数值按传感器声明的分辨率量化后差分（未声明分辨率时按位异或前值），
+各列用最小整数类型存储后整体zlib压缩；文件尾部的块索引记录每块的时间与数值范围，
+读取时只解压与查询传感器和时间范围重叠的块
+"""
+
+import json
+import os
+import struct
+import zlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Collection
+import numpy as np
+
+from segment_store import list_partitions, HOUR_FORMAT
+from sensor_history import empty_series
+
+MAGIC = b'TSB1'
+# 文件尾：索引长度（8字节小端无符号整数）+ MAGIC
+FOOTER_STRUCT = struct.Struct('<Q4s')
+
+# 每块最多容纳的点数
+DEFAULT_BLOCK_SIZE = 4096
+
+_INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """用能容纳全部数值的最小整数类型表示数组"""
+    if len(values) == 0:
+        return values.astype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def encode_timestamps(epochs: np.ndarray) -> Tuple[int, np.ndarray]:
+    """
+    将时间戳编码为毫秒二阶差分
+
+    Returns:
+        (首个时间戳的毫秒值, 二阶差分数组)
+    """
+    millis = np.round(np.asarray(epochs, dtype=np.float64) * 1000).astype(np.int64)
+    deltas = np.diff(millis)
+    return int(millis[0]), _narrow(np.diff(deltas, prepend=0))
+
+
+def decode_timestamps(first: int, dod: np.ndarray) -> np.ndarray:
+    """由二阶差分还原时间戳（秒）"""
+    deltas = np.cumsum(dod.astype(np.int64))
+    millis = np.concatenate([[0], np.cumsum(deltas)]) + first
+    return millis / 1000.0
+
+
+def encode_values(values: np.ndarray, resolution: Optional[float]) -> Tuple[str, np.ndarray]:
+    """
+    编码数值列
+
+    声明了分辨率时按分辨率量化后做一阶差分（低于分辨率的部分本身不可测，舍去不损失信息）；
+    否则将float64按位与前值异或，数值平稳时高位多为0，便于压缩
+
+    Returns:
+        (编码方式q/x, 编码后的数组)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if resolution and np.all(np.isfinite(values)):
+        quantized = np.round(values / resolution).astype(np.int64)
+        return 'q', _narrow(np.diff(quantized, prepend=0))
+    bits = values.view(np.uint64)
+    xored = bits ^ np.concatenate([[np.uint64(0)], bits[:-1]])
+    # 按字节转置，使各值相同位置的字节相邻
+    return 'x', xored.view(np.uint8).reshape(-1, 8).T.copy()
+
+
+def decode_values(codec: str, encoded: np.ndarray, resolution: Optional[float]) -> np.ndarray:
+    """还原数值列"""
+    if codec == 'q':
+        # 去掉乘法引入的二进制浮点误差，保留比分辨率多一位的小数
+        digits = max(0, int(np.ceil(-np.log10(resolution)))) + 1
+        return np.round(np.cumsum(encoded.astype(np.int64)) * resolution, digits)
+    xored = encoded.T.copy().view(np.uint64).ravel()
+    return np.bitwise_xor.accumulate(xored).view(np.float64)
+
+
+def encode_block(epochs: np.ndarray, values: np.ndarray, flags: np.ndarray,
+                 resolution: Optional[float]) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    编码单个传感器按时间排序的一段数据
+
+    Returns:
+        (压缩后的块数据, 块元数据)
+    """
+    first, dod = encode_timestamps(epochs)
+    codec, encoded = encode_values(values, resolution)
+    flags = np.asarray(flags, dtype=np.uint8)
+    payload = zlib.compress(dod.tobytes() + encoded.tobytes() + flags.tobytes(), 6)
+    meta = {
+        'count': len(epochs),
+        't0': first,
+        't_min': float(epochs[0]),
+        't_max': float(epochs[-1]),
+        'v_min': float(np.min(values)),
+        'v_max': float(np.max(values)),
+        'ts_dtype': dod.dtype.str,
+        'codec': codec,
+        'v_dtype': encoded.dtype.str,
+        'resolution': resolution if codec == 'q' else None
+    }
+    return payload, meta
+
+
+def decode_block(payload: bytes, meta: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """解压并还原块数据，返回(时间戳, 数值, 标志位)"""
+    raw = zlib.decompress(payload)
+    count = meta['count']
+    ts_dtype = np.dtype(meta['ts_dtype'])
+    v_dtype = np.dtype(meta['v_dtype'])
+    ts_bytes = ts_dtype.itemsize * (count - 1)
+    v_bytes = v_dtype.itemsize * count * (8 if meta['codec'] == 'x' else 1)
+
+    dod = np.frombuffer(raw, dtype=ts_dtype, count=count - 1)
+    encoded = np.frombuffer(raw, dtype=v_dtype, offset=ts_bytes, count=v_bytes // v_dtype.itemsize)
+    if meta['codec'] == 'x':
+        encoded = encoded.reshape(8, count)
+    flags = np.frombuffer(raw, dtype=np.uint8, offset=ts_bytes + v_bytes, count=count)
+    return (decode_timestamps(meta['t0'], dod),
+            decode_values(meta['codec'], encoded, meta['resolution']),
+            flags.copy())
+
+
+def write_block_file(path: str, series: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                     resolutions: Optional[Dict[str, float]] = None,
+                     block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """
+    将多个传感器的序列写入一个时序块文件，先写临时文件再替换
+
+    Args:
+        path: 目标文件路径
+        series: 传感器ID到(时间戳, 数值, 标志位)的映射
+        resolutions: 传感器ID到分辨率的映射，未声明的传感器使用无损异或编码
+        block_size: 每块最多的点数
+
+    Returns:
+        写入的字节数
+    """
+    resolutions = resolutions or {}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    index = []
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        for sensor_id in sorted(series):
+            epochs, values, flags = series[sensor_id]
+            order = np.argsort(epochs, kind='stable')
+            epochs, values, flags = epochs[order], values[order], flags[order]
+            for start in range(0, len(epochs), block_size):
+                part = slice(start, start + block_size)
+                payload, meta = encode_block(epochs[part], values[part], flags[part],
+                                             resolutions.get(sensor_id))
+                meta.update({'sensor': sensor_id, 'offset': f.tell(), 'length': len(payload)})
+                f.write(payload)
+                index.append(meta)
+
+        footer = json.dumps({'version': 1, 'blocks': index}, separators=(',', ':')).encode('utf-8')
+        f.write(footer)
+        f.write(FOOTER_STRUCT.pack(len(footer), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(temp_path, path)
+    return size
+
+
+def read_block_index(path: str) -> List[Dict[str, Any]]:
+    """只读取文件尾部的块索引"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(-FOOTER_STRUCT.size, os.SEEK_END)
+            length, magic = FOOTER_STRUCT.unpack(f.read(FOOTER_STRUCT.size))
+            if magic != MAGIC:
+                return []
+            f.seek(-FOOTER_STRUCT.size - length, os.SEEK_END)
+            return json.loads(f.read(length))['blocks']
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def read_series(path: str, sensor_id: str, start: Optional[float] = None,
+                end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    读取单个文件中某传感器在时间范围内的数据，只解压重叠的块
+
+    Args:
+        path: 时序块文件路径
+        sensor_id: 传感器ID
+        start: 起始时间戳（包含）
+        end: 结束时间戳（包含）
+
+    Returns:
+        (时间戳, 数值, 标志位)
+    """
+    blocks = [
+        meta for meta in read_block_index(path)
+        if meta['sensor'] == sensor_id
+        and (start is None or meta['t_max'] >= start)
+        and (end is None or meta['t_min'] <= end)
+    ]
+    if not blocks:
+        return empty_series()
+
+    parts = []
+    with open(path, 'rb') as f:
+        for meta in blocks:
+            f.seek(meta['offset'])
+            timestamps, values, flags = decode_block(f.read(meta['length']), meta)
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+            parts.append((timestamps[mask], values[mask], flags[mask]))
+
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+def read_columns(path: str, start: Optional[float] = None, end: Optional[float] = None,
+                 sensors: Optional[Collection[str]] = None) -> Tuple[np.ndarray, ...]:
+    """
+    读取文件中传感器在时间范围内的数据，只解压与时间范围和传感器集合重叠的块
+
+    Args:
+        path: 时序块文件路径
+        start: 起始时间戳（包含）
+        end: 结束时间戳（包含）
+        sensors: 只读取这些传感器，None表示全部
+
+    Returns:
+        (传感器ID, 时间戳, 数值, 标志位)列，与原始读数分区的列格式一致
+    """
+    blocks = [
+        meta for meta in read_block_index(path)
+        if (start is None or meta['t_max'] >= start) and (end is None or meta['t_min'] <= end)
+        and (sensors is None or meta['sensor'] in sensors)
+    ]
+    if not blocks:
+        return (np.empty(0, dtype=object),) + empty_series()
+
+    sensors, parts = [], []
+    with open(path, 'rb') as f:
+        for meta in blocks:
+            f.seek(meta['offset'])
+            timestamps, values, flags = decode_block(f.read(meta['length']), meta)
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+            sensors.append((meta['sensor'], int(mask.sum())))
+            parts.append((timestamps[mask], values[mask], flags[mask]))
+
+    names = np.asarray([name for name, _ in sensors], dtype=object)
+    return (np.repeat(names, [count for _, count in sensors]),) + \
+        tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+class TSBlockStore:
+    """按小时分区的时序块存储"""
+
+    PREFIX = 'tsblock'
+
+    def __init__(self, directory: str, resolutions: Optional[Dict[str, float]] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            directory: 时序块文件所在目录
+            resolutions: 传感器ID到分辨率的映射
+            block_size: 每块最多的点数
+        """
+        self.directory = directory
+        self.resolutions = resolutions or {}
+        self.block_size = block_size
+
+    def path_for(self, hour: datetime) -> str:
+        """小时分区对应的文件路径"""
+        return os.path.join(self.directory, f"{self.PREFIX}_{hour.strftime(HOUR_FORMAT)}.tsb")
+
+    def write_hour(self, hour: datetime, sensors: np.ndarray, epochs: np.ndarray,
+                   values: np.ndarray, flags: np.ndarray) -> int:
+        """
+        将一个小时的读数列按传感器拆分后写入时序块文件
+
+        Returns:
+            写入的字节数
+        """
+        series = {}
+        if len(sensors):
+            names, codes = np.unique(sensors, return_inverse=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+            for i, name in enumerate(names):
+                positions = order[bounds[i]:bounds[i + 1]]
+                series[str(name)] = (epochs[positions], values[positions], flags[positions])
+        return write_block_file(self.path_for(hour), series, self.resolutions, self.block_size)
+
+    def query(self, sensor_id: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        读取传感器在时间范围内的数据
+
+        Args:
+            sensor_id: 传感器ID
+            start: 起始时间戳（包含）
+            end: 结束时间戳（包含）
+
+        Returns:
+            按时间排序的(时间戳, 数值, 标志位)
+        """
+        start_time = datetime.fromtimestamp(start) if start is not None else None
+        end_time = datetime.fromtimestamp(end) if end is not None else None
+        parts = [read_series(path, sensor_id, start, end)
+                 for path in list_partitions(self.directory, self.PREFIX, start_time, end_time)]
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return empty_series()
+        return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
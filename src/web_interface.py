@@ -4,8 +4,10 @@ Web界面模块
 """
 
 from flask import Flask, render_template, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
+import math
 import threading
 import time
 from datetime import datetime, timedelta
@@ -15,8 +17,19 @@ import os
 # 导入其他模块
 from ssn_modeling import SSNModeling
 from data_collector import DataCollector
+from ingestion_server import IngestionServer, decode_lines
 from event_processor import EventProcessor
 from llm_composer import LLMServiceComposer
+from semantic_records import MappingRecord
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """支持观测和事件记录对象的JSON序列化，记录只在响应时展开为字典"""
+    
+    @staticmethod
+    def default(o: Any) -> Any:
+        if isinstance(o, MappingRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 class WebInterface:
     """Web界面类"""
@@ -53,6 +66,7 @@ class WebInterface:
         self.app = Flask(__name__, 
                         template_folder=template_dir,
                         static_folder=static_dir)
+        self.app.json = RecordJSONProvider(self.app)
         CORS(self.app)
         self.app.config['DEBUG'] = web_config.get('debug', True)
         
@@ -62,6 +76,17 @@ class WebInterface:
         self.event_processor = EventProcessor()
         self.llm_composer = LLMServiceComposer()
         
+        # 真实传感器的网络接入服务，随系统启动
+        ingestion_config = self.config.get('data_collection', {}).get('ingestion', {})
+        self.ingestion_server = None
+        if ingestion_config.get('enabled', False):
+            self.ingestion_server = IngestionServer(
+                self.data_collector,
+                host=ingestion_config.get('host', '127.0.0.1'),
+                tcp_port=ingestion_config.get('tcp_port', 9500),
+                udp_port=ingestion_config.get('udp_port', 9501)
+            )
+        
         # 界面配置
         self.host = web_config.get('host', '0.0.0.0')
         self.port = web_config.get('port', 5000)
@@ -127,17 +152,135 @@ class WebInterface:
                 'uptime': self._calculate_uptime(),
                 'collector_stats': self.data_collector.get_statistics(),
                 'processor_stats': self.event_processor.get_event_statistics(),
-                'composer_stats': self.llm_composer.get_statistics()
+                'composer_stats': self.llm_composer.get_statistics(),
+                'ingestion_stats': self.ingestion_server.get_stats() if self.ingestion_server else None
             }
             return jsonify(status)
         
         @self.app.route('/api/sensors/data')
         def get_sensor_data():
             """获取传感器数据"""
-            recent_data = self.data_collector.get_recent_data(hours=1)
+            hours = request.args.get('hours', 1, type=float)
+            sensor_id = request.args.get('sensor') or None
+            recent_data = self.data_collector.get_recent_data(hours=hours, sensor_id=sensor_id)
             formatted_data = self._format_sensor_data(recent_data)
             return jsonify(formatted_data)
         
+        @self.app.route('/api/sensors/history')
+        def get_sensor_history():
+            """获取单个传感器的数值历史"""
+            sensor_id = request.args.get('sensor', '')
+            hours = request.args.get('hours', 1, type=float)
+            if not sensor_id:
+                return jsonify({'error': '缺少参数: sensor'}), 400
+            return jsonify(self.data_collector.get_sensor_history(sensor_id, hours))
+        
+        @self.app.route('/api/sensors/rollups')
+        def get_sensor_rollups():
+            """获取传感器的降采样汇总数据，用于长时间范围查询"""
+            sensor_id = request.args.get('sensor', '')
+            hours = request.args.get('hours', 24, type=float)
+            tier = request.args.get('tier') or None
+            if not sensor_id:
+                return jsonify({'error': '缺少参数: sensor'}), 400
+            try:
+                return jsonify(self.data_collector.get_sensor_rollups(sensor_id, hours, tier))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/api/analytics/report')
+        def get_analytics_report():
+            """获取按位置的日/小时分析报表：舒适区间占比、烟雾峰值、活动热力图和异常率"""
+            try:
+                start = request.args.get('start')
+                end = request.args.get('end')
+                return jsonify(self.data_collector.get_analytics_report(
+                    days=request.args.get('days', 7, type=float),
+                    granularity=request.args.get('granularity', 'day'),
+                    start=datetime.fromisoformat(start) if start else None,
+                    end=datetime.fromisoformat(end) if end else None
+                ))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/api/sensors/sampling')
+        def get_sampling_rates():
+            """获取各传感器当前的有效采样率"""
+            return jsonify(self.data_collector.get_sampling_rates())
+        
+        @self.app.route('/api/sensors/query')
+        def query_observations():
+            """按传感器或位置从SQLite存储查询观测"""
+            database = self.data_collector.database
+            if database is None:
+                return jsonify({'error': 'SQLite存储未启用'}), 503
+            hours = request.args.get('hours', 1, type=float)
+            return jsonify(database.query_observations(
+                sensor_id=request.args.get('sensor') or None,
+                location=request.args.get('location') or None,
+                start=time.time() - hours * 3600,
+                limit=request.args.get('limit', 1000, type=int)
+            ))
+        
+        @self.app.route('/api/sensors/aggregate')
+        def aggregate_observations():
+            """按传感器或位置从SQLite存储分桶聚合观测"""
+            database = self.data_collector.database
+            if database is None:
+                return jsonify({'error': 'SQLite存储未启用'}), 503
+            sensor_id = request.args.get('sensor') or None
+            location = request.args.get('location') or None
+            if not sensor_id and not location:
+                return jsonify({'error': '缺少参数: sensor 或 location'}), 400
+            hours = request.args.get('hours', 24, type=float)
+            bucket = request.args.get('bucket', 3600, type=int)
+            if bucket <= 0:
+                return jsonify({'error': 'bucket 必须为正整数'}), 400
+            return jsonify(database.aggregate_observations(
+                sensor_id=sensor_id, location=location,
+                start=time.time() - hours * 3600, bucket_seconds=bucket
+            ))
+        
+        @self.app.route('/api/sensors/stats')
+        def get_sensors_stats():
+            """获取传感器流式统计量"""
+            return jsonify(self.data_collector.get_sensor_stats())
+        
+        @self.app.route('/api/ingest', methods=['POST'])
+        def ingest_readings():
+            """批量接收传感器读数
+            
+            请求体为按行分隔的文本（sensor_id,timestamp,value），
+            或JSON数组 [{"sensor": ..., "timestamp": ..., "value": ...}]
+            """
+            if request.is_json:
+                items = request.get_json(silent=True)
+                if not isinstance(items, list):
+                    return jsonify({'error': '请求体应为读数数组'}), 400
+                now = time.time()
+                sensor_ids, values, epochs = [], [], []
+                malformed = 0
+                for item in items:
+                    try:
+                        value = float(item['value'])
+                        timestamp = item.get('timestamp')
+                        epoch = now if timestamp is None else float(timestamp)
+                        sensor_id = str(item['sensor'])
+                    except (KeyError, TypeError, ValueError, AttributeError):
+                        malformed += 1
+                        continue
+                    if not (math.isfinite(value) and math.isfinite(epoch)):
+                        malformed += 1
+                        continue
+                    sensor_ids.append(sensor_id)
+                    values.append(value)
+                    epochs.append(epoch)
+            else:
+                sensor_ids, values, epochs, malformed = decode_lines(request.get_data())
+            
+            accepted, rejected = self.data_collector.ingest_external(sensor_ids, values, epochs)
+            return jsonify({'accepted': accepted, 'rejected': rejected, 'malformed': malformed})
+        
         @self.app.route('/api/sensors/realtime')
         def get_realtime_data():
             """获取实时传感器数据"""
@@ -151,6 +294,52 @@ class WebInterface:
             recent_events = self.all_events[-20:] if self.all_events else []
             return jsonify(recent_events)
         
+        @self.app.route('/api/events/stored')
+        def get_stored_events():
+            """按时间范围、事件类型和严重程度读取已持久化的事件"""
+            return jsonify(self.data_collector.get_stored_events(
+                minutes=request.args.get('minutes', 10, type=float),
+                event_type=request.args.get('type') or None,
+                severity=request.args.get('severity') or None,
+                limit=request.args.get('limit', 1000, type=int)
+            ))
+        
+        @self.app.route('/api/events/query')
+        def query_events():
+            """从SQLite存储查询语义事件或复杂事件"""
+            database = self.data_collector.database
+            if database is None:
+                return jsonify({'error': 'SQLite存储未启用'}), 503
+            hours = request.args.get('hours', 24, type=float)
+            try:
+                return jsonify(database.query_events(
+                    kind=request.args.get('kind', 'semantic'),
+                    event_type=request.args.get('type') or None,
+                    sensor_id=request.args.get('sensor') or None,
+                    location=request.args.get('location') or None,
+                    severity=request.args.get('severity') or None,
+                    start=time.time() - hours * 3600,
+                    limit=request.args.get('limit', 200, type=int)
+                ))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/api/events/counts')
+        def count_events():
+            """按事件类型和严重程度统计SQLite存储中的事件数"""
+            database = self.data_collector.database
+            if database is None:
+                return jsonify({'error': 'SQLite存储未启用'}), 503
+            hours = request.args.get('hours', 24, type=float)
+            try:
+                return jsonify(database.count_events(
+                    kind=request.args.get('kind', 'semantic'),
+                    location=request.args.get('location') or None,
+                    start=time.time() - hours * 3600
+                ))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
         @self.app.route('/api/sensors/status')
         def get_sensors_status():
             """获取传感器状态"""
@@ -202,6 +391,8 @@ class WebInterface:
             try:
                 if not self.system_status['running']:
                     self.data_collector.start_continuous_collection()
+                    if self.ingestion_server:
+                        self.ingestion_server.start()
                     self.system_status['running'] = True
                     self.system_status['start_time'] = datetime.now().isoformat()
                     self.system_status['data_collection_active'] = True
@@ -215,6 +406,8 @@ class WebInterface:
             """停止系统"""
             try:
                 if self.system_status['running']:
+                    if self.ingestion_server:
+                        self.ingestion_server.stop()
                     self.data_collector.stop_continuous_collection()
                     self.system_status['running'] = False
                     self.system_status['data_collection_active'] = False
@@ -255,6 +448,7 @@ class WebInterface:
             
             # 添加复杂事件到事件列表
             self.all_events.extend(complex_events)
+            self.data_collector.save_complex_events(complex_events)
             
             # 限制事件列表大小，避免内存溢出
             if len(self.all_events) > 1000:
@@ -274,6 +468,10 @@ class WebInterface:
         # 订阅事件
         self.data_collector.subscribe_to_events(on_semantic_event)
         self.event_processor.subscribe_to_complex_events(on_complex_event)
+        
+        # 共享传感器流式统计和SQLite存储
+        self.event_processor.attach_sensor_statistics(self.data_collector.sensor_stats)
+        self.event_processor.attach_database(self.data_collector.database)
     
     def _format_sensor_data(self, raw_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """格式化传感器数据用于图表显示"""
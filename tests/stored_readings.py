@@ -0,0 +1,27 @@
+"""
+测试共用的历史数据构造函数：生成与 data/raw 中格式一致的读数字典，并写入指定小时的分区
+"""
+
+import sys
+import os
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from segment_store import SegmentWriter
+
+def make_reading(sensor_id, when, value, quality='good', anomaly=False, unit='°C'):
+    """构造一条存储格式的读数"""
+    return {
+        "madeBySensor": sensor_id,
+        "hasResult": {"value": value, "unit": unit},
+        "resultTime": when.isoformat(),
+        "quality": quality,
+        "anomaly": anomaly
+    }
+
+def write_hour(directory, prefix, hour, records):
+    """将记录写入hour所在小时的分区（记录按写入时刻分区，不读取其时间字段）"""
+    writer = SegmentWriter(directory, prefix, clock=lambda: hour)
+    writer.append(records)
+    writer.close()
@@ -0,0 +1,66 @@
+"""
+自适应采样模块测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from threshold_engine import ThresholdEngine
+from adaptive_sampling import AdaptiveSamplingPolicy
+
+class TestAdaptiveSampling(unittest.TestCase):
+    """自适应采样测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        registry = get_registry()
+        self.smoke = registry.get("home:smokeSensor_001").index
+        engine = ThresholdEngine.from_config(registry, {"rules": [{"sensor": "smokeSensor_001", "high": 200}]})
+        base = np.full(len(registry), 10.0)
+        self.policy = AdaptiveSamplingPolicy.from_config(
+            registry, base, engine,
+            {"min_period_factor": 0.1, "max_period_factor": 4, "proximity_band": 0.1, "change_rate": 0.01,
+             "rules": [{"property": "SmokeLevel", "min_period": 0.5}]}
+        )
+
+    def feed(self, value, epoch):
+        self.policy.update([self.smoke], [value], [epoch])
+        return self.policy.periods[self.smoke]
+
+    def test_bounds(self):
+        """测试周期上下限按系数和规则编译"""
+        self.assertEqual(self.policy.min_periods[self.smoke], 0.5)
+        self.assertEqual(self.policy.max_periods[self.smoke], 40.0)
+
+    def test_speed_up_near_threshold_and_back_off(self):
+        """测试接近阈值时立即加速，稳定后逐步放慢到最长周期"""
+        self.assertEqual(self.feed(10, 0), 15.0)
+        self.assertAlmostEqual(self.feed(195, 10000), 0.5 * (10 / 0.5) ** 0.05, places=6)
+        self.assertEqual(self.feed(250, 10010), 0.5)
+
+        periods = [self.feed(20, 10020 + 100 * i) for i in range(12)]
+        self.assertTrue(all(a <= b for a, b in zip(periods, periods[1:])))
+        self.assertEqual(periods[-1], 40.0)
+
+    def test_fast_change_speeds_up(self):
+        """测试数值快速变化时加速"""
+        self.feed(10, 0)
+        self.assertEqual(self.feed(110, 1), 0.5)
+
+    def test_due_filters_ticks(self):
+        """测试调度器按最短周期触发时，只有当前周期到期的传感器被采样"""
+        indices = np.array([self.smoke])
+        sampled = [len(self.policy.due(indices, now)) for now in np.arange(0, 20, 0.5)]
+
+        # 基准周期10秒，0.5秒触发一次：40次触发中采样2次
+        self.assertEqual(sum(sampled), 2)
+        self.assertEqual(self.policy.get_stats()['跳过触发次数'], 38)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+历史数据分析模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from segment_store import list_partitions
+from sensor_registry import get_registry
+from tsblock import TSBlockStore, read_columns
+from partition_loader import load_columns
+from analytics import ReportService, iter_reading_frames, build_report
+from stored_readings import make_reading, write_hour
+
+TEMPERATURE = 'home:temperatureSensor_001'
+SMOKE = 'home:smokeSensor_001'
+MOTION = 'home:motionSensor_001'
+
+class TestAnalytics(unittest.TestCase):
+    """历史数据分析测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.block_dir = os.path.join(self.data_dir, 'blocks')
+        self.registry = get_registry()
+        self.day = datetime(2025, 6, 20)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _write_hour(self, hour, records):
+        write_hour(os.path.join(self.data_dir, 'raw'), 'sensor_data', hour, records)
+
+    def _populate(self):
+        """10点：温度一半舒适一半偏高、烟雾两次峰值、活动传感器前半小时有人；11点压缩为时序块"""
+        hour = self.day.replace(hour=10)
+        records = []
+        for i in range(60):
+            when = hour + timedelta(minutes=i)
+            records.append(make_reading(TEMPERATURE, when, 22.0 if i < 30 else 30.0, anomaly=i >= 54))
+            smoke = 150.0 if i in (10, 11, 40) else 20.0
+            records.append(make_reading(SMOKE, when, smoke))
+            records.append(make_reading(MOTION, when, 1.0 if i < 30 else 0.0))
+        self._write_hour(hour, records)
+
+        # 11点先写原始分区再压缩为时序块，报表应只读取时序块
+        hour = self.day.replace(hour=11)
+        records = [make_reading(TEMPERATURE, hour + timedelta(minutes=i), 16.0) for i in range(60)]
+        self._write_hour(hour, records)
+        paths = list_partitions(os.path.join(self.data_dir, 'raw'), 'sensor_data', hour, hour)
+        TSBlockStore(self.block_dir).write_hour(hour, *load_columns(paths[0]))
+
+    def test_frames_prefer_blocks(self):
+        """测试分块读取时已压缩的小时读取时序块，且按时间范围过滤"""
+        self._populate()
+        frames = list(iter_reading_frames(self.data_dir, self.day, self.day + timedelta(days=1),
+                                          chunk_hours=1, block_dir=self.block_dir))
+        self.assertEqual([len(frame) for frame in frames], [180, 60])
+        self.assertEqual(list(frames[0].columns), ['sensor', 'epoch', 'value', 'flags'])
+
+        end = self.day.replace(hour=10, minute=29, second=59)
+        frames = list(iter_reading_frames(self.data_dir, self.day, end, block_dir=self.block_dir))
+        self.assertEqual(sum(len(frame) for frame in frames), 90)
+
+        sensors, epochs, _, _ = read_columns(TSBlockStore(self.block_dir).path_for(self.day.replace(hour=11)),
+                                             end=self.day.replace(hour=11, minute=9).timestamp())
+        self.assertEqual(len(epochs), 10)
+        self.assertEqual(set(sensors.tolist()), {TEMPERATURE})
+
+    def test_hourly_report(self):
+        """测试小时报表的异常率、舒适区间占比、烟雾峰值和活动热力图"""
+        self._populate()
+        frames = iter_reading_frames(self.data_dir, self.day, self.day + timedelta(days=1),
+                                     chunk_hours=1, block_dir=self.block_dir)
+        report = build_report(frames, self.registry, 'hour')
+        self.assertEqual(report['readings'], 240)
+
+        summary = {(row['period'], row['location']): row for row in report['summary']}
+        living = summary[('2025-06-20T10:00', '客厅')]
+        self.assertEqual((living['readings'], living['anomalies'], living['anomaly_rate']), (60, 6, 0.1))
+        self.assertEqual(summary[('2025-06-20T11:00', '客厅')]['readings'], 60)
+
+        temperature = self.registry.get(TEMPERATURE)
+        comfort = {(row['period'], row['label']): row['share'] for row in report['comfort']}
+        self.assertEqual(comfort[('2025-06-20T10:00', temperature.interpret(22.0))], 0.5)
+        self.assertEqual(comfort[('2025-06-20T10:00', temperature.interpret(30.0))], 0.5)
+        self.assertEqual(comfort[('2025-06-20T11:00', temperature.interpret(16.0))], 1.0)
+
+        smoke = report['smoke'][0]
+        self.assertEqual((smoke['sensor'], smoke['spike_readings'], smoke['episodes'], smoke['peak']),
+                         (SMOKE, 3, 2, 150.0))
+
+        heatmap = report['motion_heatmap']['玄关']
+        self.assertEqual(heatmap['days'], ['2025-06-20'])
+        self.assertEqual(heatmap['activity'][0][10], 0.5)
+        self.assertIsNone(heatmap['activity'][0][9])
+
+    def test_smoke_episode_spans_chunks(self):
+        """测试跨块持续的峰值只计为一次"""
+        for hour in (10, 11):
+            start = self.day.replace(hour=hour)
+            self._write_hour(start, [make_reading(SMOKE, start + timedelta(minutes=i), 150.0) for i in range(3)])
+        frames = iter_reading_frames(self.data_dir, chunk_hours=1)
+        report = build_report(frames, self.registry, 'day')
+        self.assertEqual(report['smoke'][0]['episodes'], 1)
+        self.assertEqual(report['smoke'][0]['spike_readings'], 6)
+
+    def test_report_cache(self):
+        """测试时间范围结束后生成的报表被缓存复用，非法粒度报错"""
+        self._populate()
+        service = ReportService(self.data_dir, block_dir=self.block_dir, clock=lambda: datetime(2025, 6, 21, 9, 15))
+        report = service.report(self.registry, 'day', start=self.day)
+        self.assertEqual(report['readings'], 240)
+        self.assertEqual(report['end'], datetime(2025, 6, 21, 8, 59, 59, 999999).isoformat())
+        self.assertEqual(len(os.listdir(service.cache_dir)), 1)
+
+        self._write_hour(self.day.replace(hour=12), [make_reading(TEMPERATURE, self.day.replace(hour=12), 22.0)])
+        self.assertEqual(service.report(self.registry, 'day', start=self.day)['readings'], 240)
+        self.assertEqual(service.get_stats()['缓存命中数'], 1)
+        self.assertEqual(service.report(self.registry, 'day', start=self.day, use_cache=False)['readings'], 241)
+
+        with self.assertRaises(ValueError):
+            service.report(self.registry, 'week')
+
+if __name__ == '__main__':
+    unittest.main()
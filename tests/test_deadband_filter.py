@@ -0,0 +1,59 @@
+"""
+死区过滤模块测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from deadband_filter import DeadbandFilter
+
+class TestDeadbandFilter(unittest.TestCase):
+    """死区过滤测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = get_registry()
+        self.temperature = self.registry.get("home:temperatureSensor_001").index
+        self.humidity = self.registry.get("home:humiditySensor_001").index
+        self.smoke = self.registry.get("home:smokeSensor_001").index
+        self.filter = DeadbandFilter.from_config(self.registry, {
+            "max_silence": 60,
+            "rules": [{"property": "SmokeLevel", "delta": 5},
+                      {"sensor": "humiditySensor_001", "delta": 1, "max_silence": None}]
+        })
+
+    def test_compile_deltas(self):
+        """测试默认死区取精度与分辨率的较大值，规则按精确度覆盖"""
+        self.assertAlmostEqual(self.filter.delta[self.temperature], 0.1)
+        self.assertEqual(self.filter.delta[self.humidity], 1)
+        self.assertEqual(self.filter.delta[self.smoke], 5)
+        self.assertEqual(self.filter.max_silence[self.humidity], np.inf)
+
+    def test_suppress_and_heartbeat(self):
+        """测试小于死区的变化被抑制，静默超时后发送心跳"""
+        index = self.temperature
+        forward = [self.filter.evaluate([index], [value], [epoch])[0]
+                   for value, epoch in [(25.0, 0), (25.05, 10), (25.2, 20), (25.25, 30), (25.25, 85)]]
+
+        self.assertEqual(forward, [True, False, True, False, True])
+        stats = self.filter.get_stats()
+        self.assertEqual((stats['转发读数'], stats['抑制读数'], stats['心跳转发']), (3, 2, 1))
+
+    def test_batch_with_repeats_and_force(self):
+        """测试同一批中同一传感器按顺序判定，强制转发与未登记传感器总会转发"""
+        indices = np.array([self.smoke, self.smoke, self.smoke, -1, self.smoke])
+        values = np.array([100.0, 102.0, 106.0, 1.0, 107.0])
+        force = np.array([False, False, False, False, True])
+
+        forward = self.filter.evaluate(indices, values, np.zeros(5), force)
+        self.assertEqual(forward.tolist(), [True, False, True, True, True])
+        self.assertEqual(self.filter.last_value[self.smoke], 107.0)
+
+if __name__ == '__main__':
+    unittest.main()
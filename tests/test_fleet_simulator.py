@@ -0,0 +1,121 @@
+"""
+传感器群仿真模块测试
+"""
+
+import unittest
+import sys
+import os
+import random
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from sensor_registry import SensorRegistry
+from streaming_stats import SensorStatistics
+from fleet_simulator import FleetSimulator, build_synthetic_fleet
+
+def legacy_value(kind, hour, rng):
+    """向量化之前逐条生成读数的逻辑，作为分布的参照"""
+    if kind == 'temperature':
+        variation = rng.uniform(-3.0, 5.0)
+        if 22 <= hour or hour <= 6:
+            variation -= 2.0
+        return round(25.0 + variation, 1)
+    if kind == 'humidity':
+        return max(0, min(100, round(60.0 + rng.uniform(-15.0, 20.0), 1)))
+    if kind == 'smoke':
+        return rng.uniform(150, 300) if rng.random() < 0.05 else rng.uniform(0, 50)
+    if kind == 'motion':
+        probability = 0.3 if 7 <= hour <= 22 else 0.1
+        return 1 if rng.random() < probability else 0
+    if kind == 'light':
+        if 6 <= hour <= 18:
+            return rng.uniform(300, 1000)
+        if 19 <= hour <= 22:
+            return rng.uniform(50, 300)
+        return rng.uniform(1, 50)
+    return rng.uniform(0, 100)
+
+class TestFleetSimulator(unittest.TestCase):
+    """传感器群仿真测试类"""
+
+    def setUp(self):
+        self.registry = SensorRegistry(build_synthetic_fleet(500, seed=5, sensors_per_platform=20))
+        self.kinds = np.array([record.kind for record in self.registry.records])
+
+    def test_synthetic_fleet_shape(self):
+        """测试合成配置的传感器数量、类别和平台托管关系"""
+        config = build_synthetic_fleet(500, seed=5, sensors_per_platform=20)
+        self.assertEqual(len(config['sensors']), 500)
+        self.assertEqual(len(config['platforms']), 25)
+        hosted = [sensor_id for platform in config['platforms'] for sensor_id in platform['hosts']]
+        self.assertEqual(hosted, [sensor['id'] for sensor in config['sensors']])
+        self.assertEqual(set(self.kinds.tolist()), {'temperature', 'humidity', 'smoke', 'motion', 'light'})
+        self.assertEqual(config, build_synthetic_fleet(500, seed=5, sensors_per_platform=20))
+
+    def test_sample_shapes_and_seed(self):
+        """测试整轮与指定下标采样的形状，相同种子结果可复现"""
+        simulator = FleetSimulator.from_registry(self.registry, seed=1)
+        self.assertEqual(len(simulator), 500)
+        self.assertEqual(simulator.sample(hour=12).shape, (500,))
+        indices = np.array([3, 1, 400])
+        subset = simulator.sample(hour=12, indices=indices)
+        self.assertEqual(subset.shape, (3,))
+
+        np.testing.assert_array_equal(FleetSimulator.from_registry(self.registry, seed=1).sample(hour=12),
+                                      FleetSimulator.from_registry(self.registry, seed=1).sample(hour=12))
+        np.testing.assert_array_equal(FleetSimulator(['motion'] * 4, seed=2).sample(hour=12, indices=[0, 2]) % 1, 0)
+
+    def test_value_ranges_by_kind(self):
+        """测试各类传感器在白天、傍晚和夜晚的取值范围"""
+        simulator = FleetSimulator.from_registry(self.registry, seed=1)
+        expected = {
+            12: {'temperature': (22.0, 30.0), 'light': (300, 1000)},
+            20: {'temperature': (22.0, 30.0), 'light': (50, 300)},
+            2: {'temperature': (20.0, 28.0), 'light': (1, 50)}
+        }
+        for hour, bounds in expected.items():
+            values = np.concatenate([simulator.sample(hour=hour) for _ in range(20)])
+            kinds = np.tile(self.kinds, 20)
+            for kind, (low, high) in bounds.items():
+                selected = values[kinds == kind]
+                self.assertTrue(((selected >= low) & (selected <= high)).all(), (hour, kind))
+            humidity = values[kinds == 'humidity']
+            self.assertTrue(((humidity >= 45.0) & (humidity <= 80.0)).all())
+            smoke = values[kinds == 'smoke']
+            self.assertTrue((((smoke >= 0) & (smoke <= 50)) | ((smoke >= 150) & (smoke <= 300))).all())
+            self.assertEqual(set(values[kinds == 'motion'].tolist()), {0.0, 1.0})
+
+    def test_rates_match_legacy_logic(self):
+        """测试峰值、活动、数据质量和异常比例与逐条生成的逻辑一致"""
+        rounds = 40
+        for hour in (12, 2):
+            simulator = FleetSimulator.from_registry(self.registry, seed=11)
+            rng = random.Random(11)
+            vectorized = np.stack([simulator.sample(hour=hour) for _ in range(rounds)])
+            legacy = np.array([[legacy_value(kind, hour, rng) for kind in self.kinds] for _ in range(rounds)])
+
+            for kind, rate in (('smoke', lambda v: v >= 150), ('motion', lambda v: v == 1)):
+                mask = self.kinds == kind
+                self.assertAlmostEqual(rate(vectorized[:, mask]).mean(), rate(legacy[:, mask]).mean(), delta=0.03)
+
+            for kind in ('temperature', 'humidity', 'smoke', 'light'):
+                records = [record for record in self.registry.records if record.kind == kind]
+                columns = [record.index for record in records]
+                for quality in ('good', 'fair', 'poor'):
+                    rates = [np.mean([record.assess_quality(value) == quality
+                                      for row in samples for record, value in zip(records, row[columns])])
+                             for samples in (vectorized, legacy)]
+                    self.assertAlmostEqual(rates[0], rates[1], delta=0.03, msg=(hour, kind, quality))
+
+            anomaly_rates = []
+            for samples in (vectorized, legacy):
+                stats = SensorStatistics()
+                flags = [stats.observe(record.id, float(value))
+                         for row in samples for record, value in zip(self.registry.records, row)]
+                anomaly_rates.append(np.mean(flags))
+            self.assertAlmostEqual(anomaly_rates[0], anomaly_rates[1], delta=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+网络接入服务模块测试
+"""
+
+import unittest
+import sys
+import os
+import socket
+import time
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ingestion_server import IngestionServer, decode_lines, encode_lines
+
+class RecordingCollector:
+    """记录接收读数的采集器替身"""
+
+    def __init__(self):
+        self.readings = []
+
+    def ingest_external(self, sensor_ids, values, epochs):
+        known = [(s, v, e) for s, v, e in zip(sensor_ids, values, epochs) if s != 'unknown']
+        self.readings.extend(known)
+        return len(known), len(sensor_ids) - len(known)
+
+class TestIngestionServer(unittest.TestCase):
+    """网络接入服务测试类"""
+
+    def test_decode_lines(self):
+        """测试整批解码、时间戳留空和格式错误的行"""
+        data = b"temperatureSensor_001,1700000000.5,25.5\nsmokeSensor_001,,12\nbad line\nx,1,abc\n\n"
+        sensor_ids, values, epochs, errors = decode_lines(data, received_at=42.0)
+
+        self.assertEqual(sensor_ids, ['temperatureSensor_001', 'smokeSensor_001'])
+        self.assertEqual(values, [25.5, 12.0])
+        self.assertEqual(epochs, [1700000000.5, 42.0])
+        self.assertEqual(errors, 2)
+
+    def test_non_finite_lines_are_malformed(self):
+        """测试nan/inf数值或时间戳按格式错误计数"""
+        data = b"a,,nan\nb,inf,1\nc,1,-inf\nd,2,3\n"
+        self.assertEqual(decode_lines(data, received_at=1.0), (['d'], [3.0], [2.0], 3))
+
+    def test_encode_roundtrip(self):
+        """测试编码后可以无损解码"""
+        data = encode_lines([('a', 1.5, 2.0), ('b', None, 3.25)])
+        self.assertEqual(decode_lines(data, received_at=9.0)[:3], (['a', 'b'], [2.0, 3.25], [1.5, 9.0]))
+
+    def test_tcp_and_udp(self):
+        """测试TCP分块到达的行被正确拼接，以及UDP数据报接收"""
+        collector = RecordingCollector()
+        server = IngestionServer(collector, tcp_port=0, udp_port=0)
+        server.start()
+        try:
+            lines = encode_lines([(f"sensor_{i}", float(i), i * 0.5) for i in range(500)] + [('unknown', 1.0, 1.0)])
+            with socket.create_connection(server.tcp_address) as sock:
+                # 在行中间切开分两次发送
+                sock.sendall(lines[:1001])
+                time.sleep(0.05)
+                sock.sendall(lines[1001:])
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(encode_lines([('udp_sensor', 1.0, 7.0)]), server.udp_address)
+
+            deadline = time.time() + 5
+            while len(collector.readings) < 501 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            server.stop()
+
+        self.assertEqual(len(collector.readings), 501)
+        self.assertIn(('sensor_499', 249.5, 499.0), collector.readings)
+        self.assertIn(('udp_sensor', 7.0, 1.0), collector.readings)
+        stats = server.get_stats()
+        self.assertEqual(stats['接收读数'], 501)
+        self.assertEqual(stats['拒绝读数'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+传感器在线监测模块测试
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from sensor_registry import SensorRegistry
+from fleet_simulator import build_synthetic_fleet
+from semantic_records import Observation
+from event_processor import EventProcessor
+from liveness_monitor import TimerWheel, LivenessMonitor
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestLivenessMonitor(unittest.TestCase):
+    """在线监测测试类"""
+
+    def setUp(self):
+        self.registry = SensorRegistry(build_synthetic_fleet(50, seed=3, sensors_per_platform=10))
+        self.clock = FakeClock(1750000000.0)
+        self.monitor = LivenessMonitor(np.full(len(self.registry), 1.0), timeout_factor=3.0, min_timeout=2.0,
+                                       tick=0.5, clock=self.clock)
+
+    def report(self, indices):
+        now = self.clock.now
+        readings = [Observation(self.registry.records[i], 1.0, datetime.fromtimestamp(now).isoformat(), now)
+                    for i in indices]
+        self.monitor.observe(readings)
+        return readings
+
+    def run_for(self, seconds, reporting=()):
+        """按1秒周期推进时钟，reporting中的传感器每秒上报一次"""
+        events = []
+        for _ in range(int(seconds)):
+            self.clock.now += 1.0
+            if len(reporting):
+                self.report(reporting)
+            events.extend(self.monitor.poll())
+        return events
+
+    def test_timer_wheel_matches_deadlines(self):
+        """测试跨层下放后的定时器都在截止时间之后一个tick内到期"""
+        wheel = TimerWheel(0.5, slot_bits=3, levels=3, start=100.0)
+        rng = np.random.default_rng(5)
+        deadlines = 100.0 + rng.uniform(0, 150, 500)
+        wheel.schedule(np.arange(500), deadlines)
+        fired = {}
+        now = 100.0
+        while now < 260:
+            now += 0.7
+            for key in wheel.advance(now).tolist():
+                fired[key] = now
+        self.assertEqual(len(fired), 500)
+        self.assertEqual(len(wheel), 0)
+        lateness = np.array([fired[key] - deadlines[key] for key in range(500)])
+        self.assertTrue(np.all(lateness >= 0))
+        self.assertTrue(np.all(lateness < 0.5 + 0.7))
+
+    def test_offline_and_recovered(self):
+        """测试停止上报的传感器到期后离线，重新上报后恢复，持续上报的传感器不产生事件"""
+        everyone = np.arange(len(self.registry))
+        self.report(everyone)
+        silent = everyone[:5]
+        events = self.run_for(10, reporting=everyone[5:])
+
+        offline = [event for event in events if event.event_type == 'SensorOffline']
+        self.assertEqual(len(events), 5)
+        self.assertEqual({event.source for event in offline}, {self.registry.records[i].id for i in silent})
+        self.assertEqual(len(self.monitor.offline_sensors()), 5)
+        event = offline[0].to_dict()
+        self.assertEqual(event['severity'], 'high')
+        self.assertGreaterEqual(event['silence_seconds'], 3.0)
+        self.assertLess(event['silence_seconds'], 4.0)
+
+        self.report(silent[:2])
+        recovered = self.monitor.poll()
+        self.assertEqual([event.event_type for event in recovered], ['SensorRecovered'] * 2)
+        self.assertIn('offline_seconds', recovered[0].to_dict())
+        stats = self.monitor.get_stats()
+        self.assertEqual(stats['离线传感器数'], 3)
+        self.assertEqual(stats['时间轮定时器数'], len(self.registry) - 3)
+
+    def test_reschedules_once_per_timeout(self):
+        """测试持续上报的传感器按超时时长重新排程，而不是每条读数都操作时间轮"""
+        everyone = np.arange(len(self.registry))
+        self.report(everyone)
+        self.assertEqual(self.run_for(30, reporting=everyone), [])
+        # 30次上报、3秒超时，每个传感器约重新排程10次
+        self.assertLessEqual(self.monitor.metrics['rescheduled'], len(self.registry) * 11)
+        self.assertEqual(len(self.monitor.wheel), len(self.registry))
+
+    def test_restart_extends_deadlines(self):
+        """测试重新启动时顺延截止时间，停止期间没有读数不判定离线"""
+        self.report(np.arange(len(self.registry)))
+        self.clock.now += 60
+        self.monitor.start(lambda events: None)
+        self.monitor.stop()
+        self.assertEqual(self.monitor.poll(), [])
+
+    def test_event_processor_tracks_offline_state(self):
+        """测试事件处理器按离线/恢复事件更新传感器状态"""
+        processor = EventProcessor()
+        self.report([0])
+        events = self.run_for(5)
+        sensor_id = self.registry.records[0].id
+
+        processor.process_semantic_event(events[0])
+        self.assertEqual(processor.sensor_states[sensor_id]['status'], 'offline')
+        self.report([0])
+        processor.process_semantic_event(self.monitor.poll()[0])
+        self.assertEqual(processor.sensor_states[sensor_id]['status'], 'normal')
+        self.assertNotIn('offline_since', processor.sensor_states[sensor_id])
+
+if __name__ == '__main__':
+    unittest.main()
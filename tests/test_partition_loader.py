@@ -0,0 +1,109 @@
+"""
+历史分区并行加载模块测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from segment_store import list_partitions, iter_records
+from tsblock import TSBlockStore
+from partition_loader import PartitionLoader, load_columns, concat_columns
+from stored_readings import make_reading, write_hour
+
+SENSORS = ['home:t1', 'home:t2', 'home:t3']
+
+class TestPartitionLoader(unittest.TestCase):
+    """分区加载测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.raw_dir = os.path.join(self.data_dir, 'raw')
+        self.day = datetime(2025, 6, 20)
+        for hour in range(6):
+            start = self.day + timedelta(hours=hour)
+            values = [float(hour * 20 + i % 40) for i in range(360)]
+            write_hour(self.raw_dir, 'sensor_data', start,
+                       [make_reading(SENSORS[i % 3], start + timedelta(seconds=10 * i), value,
+                                     quality='poor' if value > 50 else 'good')
+                        for i, value in enumerate(values)])
+        # 旧版整体JSON数组文件
+        with open(os.path.join(self.raw_dir, 'sensor_data_20250620_06.json'), 'w', encoding='utf-8') as f:
+            json.dump([make_reading('home:t1', self.day + timedelta(hours=6), 1.0)], f)
+        self.parallel = PartitionLoader(workers=2, prefetch=3)
+
+    def tearDown(self):
+        self.parallel.close()
+        shutil.rmtree(self.data_dir)
+
+    def test_parallel_matches_serial(self):
+        """测试并行读取与顺序读取的记录和列按分区顺序一致"""
+        serial = PartitionLoader(workers=0)
+        expected = list(iter_records(self.raw_dir, 'sensor_data'))
+        self.assertEqual(list(self.parallel.iter_records(self.raw_dir, 'sensor_data', time_field='resultTime')),
+                         expected)
+        self.assertEqual(len(expected), 6 * 360 + 1)
+
+        paths = list_partitions(self.raw_dir, 'sensor_data')
+        parallel = self.parallel.read_columns(paths)
+        for left, right in zip(parallel, serial.read_columns(paths)):
+            np.testing.assert_array_equal(left, right)
+        self.assertEqual(int((parallel[3] == 2).sum()), sum(1 for r in expected if r['quality'] == 'poor'))
+        self.assertEqual(self.parallel.get_stats()['并行加载文件数'], 2 * len(paths))
+
+    def test_predicate_pushdown(self):
+        """测试时间条件按小时分区跳过文件，传感器条件只保留目标传感器"""
+        start = self.day + timedelta(hours=2, minutes=30)
+        end = self.day + timedelta(hours=3, minutes=30)
+        records = list(self.parallel.iter_records(self.raw_dir, 'sensor_data', start, end, 'resultTime',
+                                                  sensors=['home:t2']))
+        self.assertEqual({record['madeBySensor'] for record in records}, {'home:t2'})
+        self.assertTrue(all(start <= datetime.fromisoformat(record['resultTime']) <= end for record in records))
+        self.assertEqual(len(records), 120)
+        # 只解析2点和3点两个分区
+        self.assertEqual(self.parallel.metrics['files'], 2)
+
+        paths = list_partitions(self.raw_dir, 'sensor_data', start, end)
+        sensors, epochs, _, _ = self.parallel.read_columns(paths, start.timestamp(), end.timestamp(), ['home:t2'])
+        self.assertEqual(len(epochs), 120)
+        self.assertEqual(set(sensors.tolist()), {'home:t2'})
+
+    def test_tsblock_columns(self):
+        """测试时序块文件按传感器只解压目标块"""
+        hour = self.day + timedelta(hours=1)
+        columns = concat_columns([load_columns(path) for path in list_partitions(self.raw_dir, 'sensor_data', hour, hour)])
+        store = TSBlockStore(os.path.join(self.data_dir, 'blocks'))
+        store.write_hour(hour, *columns)
+
+        sensors, epochs, values, _ = load_columns(store.path_for(hour), sensors={'home:t3'})
+        self.assertEqual(set(sensors.tolist()), {'home:t3'})
+        np.testing.assert_array_equal(values, columns[2][columns[0] == 'home:t3'])
+        self.assertEqual(len(load_columns(store.path_for(hour), sensors={'home:missing'})[1]), 0)
+
+    def test_close_during_read(self):
+        """测试读取进行中关闭加载器时，读取使用原进程池完成，结束后进程池才关闭"""
+        expected = list(iter_records(self.raw_dir, 'sensor_data'))
+        records = self.parallel.iter_records(self.raw_dir, 'sensor_data', time_field='resultTime')
+        first = next(records)
+        pool = self.parallel._pool
+        self.parallel.close()
+        self.assertIsNone(self.parallel._pool)
+        self.assertEqual([first] + list(records), expected)
+        self.assertEqual(self.parallel._users, {})
+        with self.assertRaises(ValueError):
+            pool.apply_async(len, ([],))
+
+        # 关闭后再次读取时重新创建进程池
+        self.assertEqual(len(list(self.parallel.iter_records(self.raw_dir, 'sensor_data'))), len(expected))
+        self.assertEqual(self.parallel.get_stats()['并行加载文件数'], 2 * len(list_partitions(self.raw_dir, 'sensor_data')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+流水线队列模块测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline_queue import BoundedQueue
+
+class TestBoundedQueue(unittest.TestCase):
+    """有界队列测试类"""
+
+    def test_batch_or_timeout(self):
+        """测试攒满一批立即返回，不足一批时超时返回"""
+        queue = BoundedQueue(100)
+        queue.put_many(range(5))
+        self.assertEqual(queue.get_batch(3, timeout=1), [0, 1, 2])
+
+        start = time.monotonic()
+        self.assertEqual(queue.get_batch(3, timeout=0.05), [3, 4])
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(queue.get_batch(3, timeout=0), [])
+
+    def test_blocking_get_wakes_on_put(self):
+        """测试阻塞等待的消费者在数据到达后被唤醒"""
+        queue = BoundedQueue(10)
+        result = []
+        consumer = threading.Thread(target=lambda: result.append(queue.get(timeout=2)))
+        consumer.start()
+        time.sleep(0.05)
+        queue.put('reading')
+        consumer.join(1)
+        self.assertEqual(result, ['reading'])
+
+    def test_drop_oldest(self):
+        """测试丢弃最旧策略"""
+        queue = BoundedQueue(3, policy='drop_oldest')
+        queue.put_many(range(5))
+        self.assertEqual(queue.get_batch(10, timeout=0), [2, 3, 4])
+        self.assertEqual(queue.get_stats()['丢弃总数'], 2)
+
+    def test_drop_low_priority(self):
+        """测试优先丢弃低优先级元素并保持先进先出"""
+        queue = BoundedQueue(3, policy='drop_low_priority', is_important=lambda item: item[0] == 'alarm')
+        for item in [('normal', 1), ('alarm', 2), ('normal', 3), ('alarm', 4), ('normal', 5)]:
+            queue.put(item)
+
+        self.assertEqual(queue.get_batch(10, timeout=0), [('alarm', 2), ('alarm', 4), ('normal', 5)])
+        stats = queue.get_stats()
+        self.assertEqual(stats['丢弃总数'], 2)
+        self.assertEqual(stats['丢弃低优先级数'], 2)
+
+    def test_block_policy_timeout_and_close(self):
+        """测试阻塞策略超时丢弃，以及关闭队列唤醒生产者"""
+        queue = BoundedQueue(1, policy='block', block_timeout=0.05)
+        self.assertTrue(queue.put(1))
+        self.assertFalse(queue.put(2))
+        self.assertEqual(queue.get_stats()['阻塞入队次数'], 1)
+
+        queue.block_timeout = None
+        producer = threading.Thread(target=queue.put, args=(3,))
+        producer.start()
+        time.sleep(0.05)
+        queue.close()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+    def test_invalid_policy(self):
+        """测试不支持的溢出策略"""
+        with self.assertRaises(ValueError):
+            BoundedQueue(10, policy='unknown')
+
+if __name__ == '__main__':
+    unittest.main()
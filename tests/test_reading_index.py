@@ -0,0 +1,87 @@
+"""
+读数时间索引模块测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from reading_index import TimeIndexedLog, ReadingIndex
+
+class TestReadingIndex(unittest.TestCase):
+    """读数时间索引测试类"""
+
+    def test_range_query(self):
+        """测试按时间范围二分查询"""
+        log = TimeIndexedLog(100)
+        for t in range(10):
+            log.append(float(t), {'t': t})
+
+        self.assertEqual([r['t'] for r in log.range(3, 5)], [3, 4, 5])
+        self.assertEqual([r['t'] for r in log.range(start=8)], [8, 9])
+        self.assertEqual(log.range(20, 30), [])
+
+    def test_records_are_not_copied(self):
+        """测试查询结果与日志共享记录对象"""
+        log = TimeIndexedLog(10)
+        record = {'t': 1}
+        log.append(1.0, record)
+        self.assertIs(log.range()[0], record)
+
+    def test_capacity_and_late_arrival(self):
+        """测试容量淘汰与迟到记录的有序插入"""
+        log = TimeIndexedLog(5)
+        for t in [1, 2, 3, 5, 6, 4, 7, 8]:
+            log.append(float(t), t)
+
+        self.assertEqual(len(log), 5)
+        self.assertEqual(log.range(), [4, 5, 6, 7, 8])
+        self.assertEqual(log.latest(2), [7, 8])
+
+    def test_per_sensor_filter(self):
+        """测试按传感器过滤"""
+        index = ReadingIndex(100)
+        index.add('a', 1.0, 'a1')
+        index.add('b', 2.0, 'b1')
+        index.add('a', 3.0, 'a2')
+
+        self.assertEqual(index.range(start=0), ['a1', 'b1', 'a2'])
+        self.assertEqual(index.range(start=2, sensor_id='a'), ['a2'])
+        self.assertEqual(index.range(sensor_id='c'), [])
+
+    def test_default_per_sensor_capacity(self):
+        """测试单传感器容量默认按传感器数均分全局容量"""
+        index = ReadingIndex(100, n_sensors=8)
+        self.assertEqual(index.per_sensor_capacity, 13)
+        for t in range(30):
+            index.add('a', float(t), t)
+        self.assertEqual(index.range(sensor_id='a'), list(range(17, 30)))
+        self.assertEqual(ReadingIndex(100, per_sensor_capacity=40, n_sensors=8).per_sensor_capacity, 40)
+
+    def test_range_during_compaction(self):
+        """测试写入线程淘汰压缩时，查询线程得到的结果始终有序且不超过容量"""
+        log = TimeIndexedLog(50)
+        stop = threading.Event()
+        errors = []
+
+        def query():
+            while not stop.is_set():
+                records = log.range(start=0)
+                if len(records) > 50 or records != sorted(records):
+                    errors.append(records)
+
+        reader = threading.Thread(target=query)
+        reader.start()
+        for t in range(20000):
+            log.append(float(t), t)
+        stop.set()
+        reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(log.range(), list(range(19950, 20000)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+读数预写日志模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from semantic_records import Observation
+from reading_wal import ReadingWAL, encode_entry, decode_entry
+from segment_store import SegmentWriter
+from data_collector import WriteBehindSink
+
+class TestReadingWAL(unittest.TestCase):
+    """读数预写日志测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.record = get_registry().get("home:temperatureSensor_001")
+        self.base = 1750000000.0
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def readings(self, count, offset=0):
+        return [Observation(self.record, 20.0 + i * 0.1, datetime.fromtimestamp(self.base + offset + i).isoformat(),
+                            self.base + offset + i) for i in range(count)]
+
+    def test_entry_roundtrip_and_torn_line(self):
+        """测试日志记录可还原，崩溃时残留的不完整尾行被忽略"""
+        line = encode_entry(7, self.readings(1)[0])
+        self.assertEqual(decode_entry(line), (7, self.record.id, 20.0, self.base, 'good', False))
+        self.assertIsNone(decode_entry(line[:-5]))
+
+    def test_replay_after_crash(self):
+        """测试未正常关闭时，检查点之后的读数在重新打开后可重放，序号继续递增"""
+        wal = ReadingWAL(self.data_dir)
+        self.assertEqual(wal.append(self.readings(10)), 10)
+        self.assertTrue(wal.wait_durable(10))
+        wal.checkpoint(4)
+        with open(wal._segments[-1][1], 'ab') as f:
+            f.write(b'11\thome:temperatureSensor_001\t2')
+
+        reopened = ReadingWAL(self.data_dir)
+        entries = reopened.pending()
+        self.assertEqual([entry[0] for entry in entries], [5, 6, 7, 8, 9, 10])
+        self.assertAlmostEqual(entries[0][2], 20.4)
+        self.assertEqual(reopened.append(self.readings(1, offset=10)), 11)
+        self.assertEqual(reopened.get_stats()['重启重放读数'], 6)
+        reopened.close()
+
+    def test_checkpoint_deletes_covered_segments(self):
+        """测试检查点只删除被完全覆盖且不在写入中的分段"""
+        wal = ReadingWAL(self.data_dir, segment_bytes=100)
+        for i in range(6):
+            wal.append(self.readings(3, offset=i * 3))
+        segments = len(wal._segments)
+        self.assertGreater(segments, 3)
+
+        wal.checkpoint(wal.last_lsn)
+        self.assertEqual(len(wal._segments), 1)
+        self.assertEqual(wal.get_stats()['已删除分段数'], segments - 1)
+        self.assertEqual(wal.pending(), [])
+        wal.close()
+
+    def test_sink_advances_checkpoint_after_flush(self):
+        """测试写后持久化在同批记录落盘后推进检查点"""
+        wal = ReadingWAL(os.path.join(self.data_dir, 'wal'))
+        writer = SegmentWriter(os.path.join(self.data_dir, 'raw'), 'sensor_data')
+        sink = WriteBehindSink({'raw': writer}, wal=wal)
+        readings = self.readings(5)
+        lsn = wal.append(readings)
+
+        sink.submit('raw', [reading.to_dict() for reading in readings])
+        sink.submit('wal', [lsn])
+        sink.flush()
+        self.assertEqual(wal.checkpoint_lsn, 5)
+        self.assertEqual(ReadingWAL(wal.directory).pending(), [])
+        writer.close()
+        wal.close()
+
+    def test_sink_overflow_keeps_wal_entries(self):
+        """测试缓冲溢出丢弃读数后不再推进检查点，丢弃的读数仍可从预写日志重放"""
+        wal = ReadingWAL(os.path.join(self.data_dir, 'wal'))
+        writer = SegmentWriter(os.path.join(self.data_dir, 'raw'), 'sensor_data')
+        sink = WriteBehindSink({'raw': writer}, max_buffer=3, wal=wal)
+        readings = self.readings(5)
+        lsn = wal.append(readings)
+
+        sink.submit('raw', [reading.to_dict() for reading in readings])
+        # 检查点序号不占缓冲容量，也不会被溢出挤掉
+        sink.submit('wal', [lsn])
+        sink.flush()
+        self.assertEqual(sink.get_metrics()['丢弃记录数'], 2)
+        self.assertTrue(sink.get_metrics()['检查点暂停'])
+        self.assertEqual(wal.checkpoint_lsn, 0)
+        self.assertEqual(len(ReadingWAL(wal.directory).pending()), 5)
+        writer.close()
+        wal.close()
+
+    def test_sink_blocks_instead_of_dropping(self):
+        """测试启用预写日志时缓冲满的提交等待刷写，不丢弃读数"""
+        wal = ReadingWAL(os.path.join(self.data_dir, 'wal'))
+        writer = SegmentWriter(os.path.join(self.data_dir, 'raw'), 'sensor_data')
+        sink = WriteBehindSink({'raw': writer}, max_buffer=4, flush_interval=0.05, flush_batch=100, wal=wal)
+        sink.start()
+        for offset in range(0, 20, 2):
+            readings = self.readings(2, offset)
+            lsn = wal.append(readings)
+            sink.submit('raw', [reading.to_dict() for reading in readings])
+            sink.submit('wal', [lsn])
+        sink.stop()
+
+        metrics = sink.get_metrics()
+        self.assertEqual(metrics['丢弃记录数'], 0)
+        self.assertGreater(metrics['阻塞提交数'], 0)
+        self.assertEqual(wal.checkpoint_lsn, 20)
+        self.assertEqual(ReadingWAL(wal.directory).pending(), [])
+        wal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+历史回放模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from semantic_records import Observation, SemanticEvent
+from segment_store import SegmentWriter
+from partition_loader import PartitionLoader
+from replay import ReplayEngine
+
+class FakeCollector:
+    """记录每批送入语义事件生成的读数，每条读数生成一个事件"""
+
+    def __init__(self, batch_size=4):
+        self.registry = get_registry()
+        self.batch_size = batch_size
+        self.batches = []
+
+    def generate_semantic_events(self, readings):
+        self.batches.append(readings)
+        return [SemanticEvent('SensorReading', reading, reading.record.location, 'normal') for reading in readings]
+
+class FakeProcessor:
+    """记录处理过的语义事件"""
+
+    def __init__(self):
+        self.events = []
+
+    def process_semantic_event(self, event):
+        self.events.append(event)
+        return []
+
+class TestReplayEngine(unittest.TestCase):
+    """历史回放测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.record = get_registry().get("home:temperatureSensor_001")
+        # 整点前后各一分钟，跨越两个小时分区
+        self.base = 1749985140.0
+        # 同一分区内有轻微乱序：偏移 0,2,1,3,...
+        self.offsets = [0, 2, 1, 3, 5, 4, 60, 62, 61, 63, 65, 64]
+        readings = [self.observation(offset) for offset in self.offsets]
+
+        raw = SegmentWriter(os.path.join(self.data_dir, 'raw'), 'sensor_data', time_field='resultTime')
+        raw.append(readings)
+        raw.close()
+        events = SegmentWriter(os.path.join(self.data_dir, 'events'), 'events', index_fields=('eventType',))
+        events.append([SemanticEvent('SensorReading', reading, '客厅', 'normal').to_dict() for reading in readings])
+        events.close()
+
+        self.collector = FakeCollector()
+        self.processor = FakeProcessor()
+        self.loader = PartitionLoader(workers=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def observation(self, offset):
+        epoch = self.base + offset
+        return Observation(self.record, 20.0 + offset, datetime.fromtimestamp(epoch).isoformat(), epoch)
+
+    def engine(self, **options):
+        return ReplayEngine(self.collector, self.processor, data_dir=self.data_dir, loader=self.loader, **options)
+
+    def test_raw_replay_in_time_order(self):
+        """测试原始读数跨分区按时间顺序回放，按批送入语义事件生成"""
+        report = self.engine().run('raw')
+        self.assertEqual((report['records'], report['semantic_events']), (12, 12))
+        self.assertEqual(report['speed'], 'max')
+        self.assertEqual([len(batch) for batch in self.collector.batches], [4, 4, 4])
+        epochs = [reading.epoch for batch in self.collector.batches for reading in batch]
+        self.assertEqual(epochs, sorted(self.base + offset for offset in self.offsets))
+        self.assertEqual(report['pacing_lag']['count'], 0)
+
+    def test_reorder_window(self):
+        """测试重排窗口为0时按存储顺序输出，窗口足够时纠正乱序"""
+        stored = [epoch - self.base for epoch, _ in self.engine(reorder_window=0).iter_stored('raw')]
+        self.assertEqual(stored, self.offsets)
+        ordered = [epoch - self.base for epoch, _ in self.engine(reorder_window=1).iter_stored('raw')]
+        self.assertEqual(ordered, sorted(self.offsets))
+
+    def test_limit_and_time_range(self):
+        """测试回放记录数上限与时间范围"""
+        report = self.engine().run('raw', limit=5)
+        self.assertEqual(report['records'], 5)
+        self.assertEqual(len(self.processor.events), 5)
+
+        start = datetime.fromtimestamp(self.base + 60)
+        end = datetime.fromtimestamp(self.base + 63)
+        report = self.engine().run('raw', start=start, end=end)
+        self.assertEqual(report['records'], 4)
+
+    def test_events_replay_with_speed(self):
+        """测试事件直接回放给事件处理器，倍速回放按原始时间间隔控制节奏"""
+        start = datetime.fromtimestamp(self.base)
+        end = datetime.fromtimestamp(self.base + 5)
+        report = self.engine(speed=100).run('events', start=start, end=end)
+        self.assertEqual((report['records'], report['semantic_events']), (6, 6))
+        self.assertEqual(self.collector.batches, [])
+        self.assertEqual([event['data']['hasResult']['value'] for event in self.processor.events],
+                         [20.0, 21.0, 22.0, 23.0, 24.0, 25.0])
+        # 原始时间跨度5秒，100倍速至少需要0.05秒
+        self.assertGreaterEqual(report['elapsed_s'], 0.05)
+        self.assertEqual(report['pacing_lag']['count'], 6)
+
+        with self.assertRaises(ValueError):
+            list(self.engine().iter_stored('processed'))
+
+if __name__ == '__main__':
+    unittest.main()
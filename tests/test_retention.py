@@ -0,0 +1,86 @@
+"""
+数据保留模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from retention import RetentionManager, aggregate
+from stored_readings import make_reading, write_hour
+import numpy as np
+
+class TestRetention(unittest.TestCase):
+    """数据保留测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.now = datetime(2025, 6, 20, 12, 30)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _write_hour(self, subdir, prefix, hour, records):
+        write_hour(os.path.join(self.data_dir, subdir), prefix, hour, records)
+
+    def test_aggregate(self):
+        """测试按传感器和时间桶合并"""
+        rollups = aggregate(np.array(['b', 'a', 'a', 'a'], dtype=object),
+                            np.array([0.0, 10.0, 50.0, 70.0]),
+                            np.ones(4, dtype=np.int64),
+                            np.array([5.0, 1.0, 3.0, 7.0]),
+                            np.array([5.0, 1.0, 3.0, 7.0]),
+                            np.array([5.0, 1.0, 3.0, 7.0]), 60)
+
+        self.assertEqual([(r['sensor'], r['epoch'], r['count']) for r in rollups],
+                         [('a', 0, 2), ('a', 60, 1), ('b', 0, 1)])
+        self.assertEqual((rollups[0]['min'], rollups[0]['max'], rollups[0]['mean']), (1.0, 3.0, 2.0))
+
+    def test_rollups_and_query(self):
+        """测试为已结束的小时构建1分钟和1小时汇总"""
+        hour = datetime(2025, 6, 20, 10)
+        readings = [make_reading('home:t1', hour + timedelta(seconds=15 * i), float(i)) for i in range(240)]
+        self._write_hour('raw', 'sensor_data', hour, readings)
+        # 当前小时尚未结束，不应汇总
+        self._write_hour('raw', 'sensor_data', datetime(2025, 6, 20, 12), [make_reading('home:t1', self.now, 1.0)])
+
+        manager = RetentionManager(self.data_dir, retention_days=30, clock=lambda: self.now)
+        self.assertEqual(manager.build_rollups(), 2)
+        self.assertEqual(manager.build_rollups(), 0)
+
+        minutes = manager.query('home:t1', hour, hour + timedelta(hours=1), tier='1m')['points']
+        self.assertEqual(len(minutes), 60)
+        self.assertEqual(minutes[0]['count'], 4)
+        self.assertEqual((minutes[0]['min'], minutes[0]['max']), (0.0, 3.0))
+
+        result = manager.query('home:t1', self.now - timedelta(days=7))
+        self.assertEqual(result['tier'], '1h')
+        self.assertEqual(len(result['points']), 1)
+        self.assertEqual(result['points'][0]['count'], 240)
+        self.assertAlmostEqual(result['points'][0]['mean'], 119.5)
+
+    def test_prune(self):
+        """测试删除过期分区，原始读数需先完成汇总"""
+        old_hour = datetime(2025, 5, 1, 8)
+        recent_hour = datetime(2025, 6, 19, 8)
+        for hour in (old_hour, recent_hour):
+            self._write_hour('raw', 'sensor_data', hour, [make_reading('home:t1', hour, 1.0)])
+            self._write_hour('events', 'events', hour, [{"eventType": "SensorReading"}])
+
+        manager = RetentionManager(self.data_dir, retention_days=30, clock=lambda: self.now)
+        manager.run_once()
+
+        self.assertEqual(sorted(os.listdir(os.path.join(self.data_dir, 'raw'))), ['sensor_data_20250619_08.jsonl'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.data_dir, 'events'))), ['events_20250619_08.jsonl'])
+        # 汇总比原始数据保留更久
+        self.assertEqual(len(manager.query('home:t1', old_hour, old_hour + timedelta(hours=1), tier='1h')['points']), 1)
+        self.assertEqual(manager.get_stats()['已删除分区数'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+采样调度器测试
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from data_collector import SamplingScheduler
+
+class ManualClock:
+    """手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSamplingScheduler(unittest.TestCase):
+    """采样调度器测试类"""
+
+    def test_per_sensor_periods(self):
+        """测试各传感器按自身周期采样"""
+        clock = ManualClock()
+        counts = np.zeros(3, dtype=int)
+        scheduler = SamplingScheduler(np.array([1.0, 2.0, 5.0]),
+                                      lambda indices: np.add.at(counts, indices, 1),
+                                      jitter=False, clock=clock)
+
+        while clock.now < 10.0:
+            scheduler.poll()
+            clock.now = round(clock.now + 0.01, 2)
+
+        self.assertEqual(counts.tolist(), [10, 5, 2])
+        self.assertEqual(scheduler.get_stats()['错过采样数'], 0)
+
+    def test_jitter_spreads_start_times(self):
+        """测试启动时间在一个周期内错开"""
+        clock = ManualClock()
+        first_seen = {}
+
+        def callback(indices):
+            for index in indices.tolist():
+                first_seen.setdefault(index, clock.now)
+
+        scheduler = SamplingScheduler(np.full(1000, 5.0), callback, seed=1, clock=clock)
+        self.assertGreater(scheduler.group_count, 100)
+
+        while clock.now < 5.0:
+            scheduler.poll()
+            clock.now = round(clock.now + 0.01, 2)
+
+        self.assertEqual(len(first_seen), 1000)
+        self.assertGreater(max(first_seen.values()) - min(first_seen.values()), 4.0)
+
+    def test_missed_samples_are_skipped(self):
+        """测试回调阻塞导致落后时跳过错过的采样"""
+        clock = ManualClock()
+        calls = []
+        scheduler = SamplingScheduler(np.array([1.0]), lambda indices: calls.append(clock.now),
+                                      jitter=False, clock=clock)
+        scheduler.poll()
+        clock.now = 3.5
+        delay = scheduler.poll()
+
+        self.assertEqual(calls, [0.0, 3.5])
+        self.assertEqual(scheduler.get_stats()['错过采样数'], 2)
+        self.assertAlmostEqual(delay, 0.5)
+
+    def test_run_stops(self):
+        """测试事件循环在停止条件满足后退出"""
+        counts = []
+        scheduler = SamplingScheduler(np.full(100, 0.05), lambda indices: counts.append(len(indices)), seed=2)
+
+        async def main():
+            deadline = asyncio.get_running_loop().time() + 0.2
+            await scheduler.run(lambda: asyncio.get_running_loop().time() < deadline)
+
+        asyncio.run(main())
+        self.assertGreaterEqual(sum(counts), 300)
+        self.assertLess(scheduler.get_stats()['调度误差p50ms'], 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+分段存储模块测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import segment_store
+from segment_store import SegmentWriter, list_partitions, iter_records, read_partition, read_index, query_records
+
+class TestSegmentStore(unittest.TestCase):
+    """分段存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.directory = tempfile.mkdtemp()
+        self.now = datetime(2025, 6, 14, 17, 30)
+        self.writer = SegmentWriter(self.directory, 'sensor_data', fsync_interval=0,
+                                    clock=lambda: self.now)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.writer.close()
+        shutil.rmtree(self.directory)
+
+    def test_append_and_read(self):
+        """测试追加写入与读取"""
+        self.writer.append([{'id': 1}, {'id': 2}])
+        self.writer.append([{'id': 3}])
+
+        path = self.writer.current_path
+        self.assertTrue(path.endswith('sensor_data_20250614_17.jsonl'))
+        self.assertEqual([r['id'] for r in read_partition(path)], [1, 2, 3])
+
+    def test_hourly_rotation(self):
+        """测试按小时滚动"""
+        self.writer.append([{'id': 1}])
+        self.now = datetime(2025, 6, 14, 18, 5)
+        self.writer.append([{'id': 2}])
+
+        partitions = list_partitions(self.directory, 'sensor_data')
+        self.assertEqual(len(partitions), 2)
+        self.assertEqual([r['id'] for r in iter_records(self.directory, 'sensor_data')], [1, 2])
+
+        later = list_partitions(self.directory, 'sensor_data', start=datetime(2025, 6, 14, 18, 30))
+        self.assertEqual(len(later), 1)
+
+    def test_size_rotation(self):
+        """测试按大小滚动"""
+        self.writer.max_segment_bytes = 64
+        for i in range(10):
+            self.writer.append([{'id': i, 'payload': 'x' * 20}])
+
+        partitions = list_partitions(self.directory, 'sensor_data')
+        self.assertGreater(len(partitions), 1)
+        ids = [r['id'] for r in iter_records(self.directory, 'sensor_data')]
+        self.assertEqual(ids, list(range(10)))
+
+    def test_legacy_json_compatibility(self):
+        """测试旧版JSON数组文件兼容读取"""
+        legacy_path = os.path.join(self.directory, 'sensor_data_20250614_17.json')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump([{'id': 'old'}], f, ensure_ascii=False, indent=2)
+        self.writer.append([{'id': 'new'}])
+
+        ids = [r['id'] for r in iter_records(self.directory, 'sensor_data')]
+        self.assertEqual(ids, ['old', 'new'])
+
+    def test_torn_tail_is_skipped(self):
+        """测试跳过不完整的尾行"""
+        self.writer.append([{'id': 1}])
+        with open(self.writer.current_path, 'ab') as f:
+            f.write(b'{"id": 2, "trunc')
+
+        self.assertEqual([r['id'] for r in read_partition(self.writer.current_path)], [1])
+
+    def _event(self, i, event_type='SensorReading', severity=None):
+        event = {'id': i, 'eventType': event_type,
+                 'timestamp': (self.now + timedelta(seconds=20 * i)).isoformat()}
+        if severity:
+            event['severity'] = severity
+        return event
+
+    def test_sparse_index_range_and_type_query(self):
+        """测试稀疏索引按分钟和事件类型只读取匹配的字节区间"""
+        writer = SegmentWriter(self.directory, 'events', fsync_interval=0, clock=lambda: self.now,
+                               index_fields=('eventType', 'severity'))
+        for batch in range(6):
+            writer.append([self._event(batch * 30 + i,
+                                       *(('ThresholdExceeded', 'high') if i == 7 else ('SensorReading',)))
+                           for i in range(30)])
+        writer.close()
+        path = list_partitions(self.directory, 'events')[0]
+        self.assertGreater(len(read_index(path)), 0)
+
+        start = self.now + timedelta(minutes=10)
+        end = start + timedelta(minutes=10) - timedelta(seconds=1)
+        with mock.patch('segment_store._record_matches', wraps=segment_store._record_matches) as matches:
+            records = list(query_records(self.directory, 'events', start, end))
+        self.assertEqual([r['id'] for r in records], list(range(30, 60)))
+        # 只读取查询分钟内的记录，且只有首尾两个分钟的记录需要逐条判定时间
+        self.assertEqual(matches.call_count, 6)
+
+        alerts = list(query_records(self.directory, 'events', tags={'eventType': 'ThresholdExceeded'}))
+        self.assertEqual([r['id'] for r in alerts], [7, 37, 67, 97, 127, 157])
+        self.assertEqual(len(list(query_records(self.directory, 'events', tags={'severity': 'high'}))), 6)
+
+    def test_records_partitioned_by_record_time(self):
+        """测试迟到记录写入其时间所在的小时分区，已编码批次按记录时间拆分"""
+        writer = SegmentWriter(self.directory, 'events', fsync_interval=0, clock=lambda: self.now,
+                               index_fields=('eventType', 'severity'))
+        late = self._event(0)
+        late['timestamp'] = (self.now - timedelta(hours=2)).isoformat()
+        writer.append([self._event(1), late, {'id': 2}])
+        lines = [segment_store.encode_record(self._event(3)), segment_store.encode_record(late)]
+        writer.append([segment_store.EncodedBatch(b''.join(lines), [len(line) for line in lines],
+                                                  [self._event(3), late])])
+        writer.close()
+
+        partitions = [os.path.basename(path) for path in list_partitions(self.directory, 'events')]
+        self.assertEqual(partitions, ['events_20250614_15.jsonl', 'events_20250614_17.jsonl'])
+        start = self.now - timedelta(hours=2, minutes=30)
+        earlier = list(query_records(self.directory, 'events', start, start + timedelta(hours=1)))
+        self.assertEqual([r['id'] for r in earlier], [0, 0])
+        self.assertEqual([r['id'] for r in query_records(self.directory, 'events', start=self.now)], [1, 3])
+        # 没有时间字段的记录按写入时刻分区
+        current = list_partitions(self.directory, 'events')[-1]
+        self.assertEqual([r['id'] for r in read_partition(current)], [1, 2, 3])
+
+    def test_index_catches_up_after_crash(self):
+        """测试重启时为索引未覆盖的尾部补建索引"""
+        writer = SegmentWriter(self.directory, 'events', clock=lambda: self.now,
+                               index_fields=('eventType', 'severity'))
+        writer.append([self._event(i) for i in range(3)])
+        writer.close()
+        path = list_partitions(self.directory, 'events')[0]
+        # 模拟数据已写入而索引未写入
+        with open(path, 'ab') as f:
+            f.write(segment_store.encode_record(self._event(3, 'AnomalyDetected', 'medium')))
+
+        self.assertEqual([r['id'] for r in query_records(self.directory, 'events',
+                                                         tags={'eventType': 'AnomalyDetected'})], [3])
+        writer.append([self._event(4)])
+        writer.close()
+        covered = max(span[1] for entry in read_index(path) for span in entry['r'])
+        self.assertEqual(covered, os.path.getsize(path))
+        self.assertEqual(len(list(query_records(self.directory, 'events'))), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+语义记录模块测试
+"""
+
+import unittest
+import sys
+import os
+import json
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from ssn_modeling import build_observation
+from segment_store import encode_record
+from semantic_records import Observation, ProcessedObservation, SemanticEvent, ComplexEvent
+
+class TestSemanticRecords(unittest.TestCase):
+    """语义记录测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = get_registry()
+        self.record = self.registry.get("home:temperatureSensor_001")
+        self.when = datetime(2025, 6, 20, 10, 0, 5)
+        self.reading = Observation(self.record, 31.5, self.when.isoformat(), self.when.timestamp(),
+                                   'good', True)
+
+    def test_observation_matches_dict_layout(self):
+        """测试观测序列化结果与原有字典结构一致"""
+        expected = build_observation(self.record, 31.5, self.when.isoformat(), int(self.when.timestamp()))
+        expected.update({"quality": "good", "anomaly": True, "collected_at": self.when.isoformat()})
+
+        self.assertEqual(self.reading.to_dict(), expected)
+        self.assertEqual(self.reading['hasResult']['value'], 31.5)
+        self.assertEqual(self.reading.get('missing', 'x'), 'x')
+        self.assertNotIn('missing', self.reading)
+        self.assertFalse(hasattr(self.reading, '__dict__'))
+
+    def test_from_dict_roundtrip(self):
+        """测试由存储的字典还原观测"""
+        restored = Observation.from_dict(json.loads(encode_record(self.reading)), self.registry)
+
+        self.assertEqual(restored.to_dict(), self.reading.to_dict())
+        self.assertIs(restored.record, self.record)
+        self.assertIsNone(Observation.from_dict({"madeBySensor": "home:unknown"}, self.registry))
+
+    def test_processed_observation(self):
+        """测试处理后的观测在序列化时追加处理信息"""
+        processed = ProcessedObservation(self.reading, "2025-06-20T10:00:06").to_dict()
+
+        self.assertEqual(processed['processed_at'], "2025-06-20T10:00:06")
+        self.assertEqual(processed['processing_version'], "1.0")
+        self.assertEqual(processed['madeBySensor'], self.record.id)
+
+    def test_semantic_events(self):
+        """测试各类语义事件的键及嵌套读数的展开"""
+        base = SemanticEvent.sensor_reading(self.reading, '客厅', '偏热')
+        anomaly = SemanticEvent.anomaly(self.reading)
+        threshold = SemanticEvent.threshold(self.reading, 'high', 30, 'medium')
+
+        self.assertEqual(base['id'], f"event_{self.reading.id}")
+        self.assertIs(base['data'], self.reading)
+        self.assertEqual(base['semantics'], {'property': 'Temperature', 'location': '客厅',
+                                             'value_interpretation': '偏热'})
+        self.assertEqual(base.to_dict()['data'], self.reading.to_dict())
+        self.assertNotIn('severity', base)
+
+        self.assertEqual(anomaly.to_dict()['description'], "检测到异常值: 31.5")
+        self.assertNotIn('data', anomaly)
+
+        self.assertEqual(threshold['id'], f"threshold_high_{self.record.id}_{int(self.when.timestamp())}")
+        self.assertEqual((threshold['threshold_value'], threshold['actual_value']), (30, 31.5))
+
+    def test_complex_event_omits_unset_fields(self):
+        """测试复杂事件未设置的可选字段不出现在序列化结果中"""
+        event = ComplexEvent(id="temporal_correlation_1", type='CorrelationEvent',
+                             event_type='TemporalCorrelation', timestamp=self.when.isoformat(),
+                             source='EventProcessor', details={'correlation_type': 'temporal'})
+
+        self.assertEqual(set(event.to_dict()), {'id', 'type', 'eventType', 'timestamp', 'source', 'details'})
+        self.assertEqual(event.get('details', {}).get('correlation_type'), 'temporal')
+
+if __name__ == '__main__':
+    unittest.main()
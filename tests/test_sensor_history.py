@@ -0,0 +1,100 @@
+"""
+传感器历史数据模块测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_history import SensorRingBuffer, SensorHistory, encode_flags, FLAG_ANOMALY, QUALITY_FAIR
+
+class TestSensorRingBuffer(unittest.TestCase):
+    """环形缓冲区测试类"""
+
+    def test_wraparound_keeps_latest(self):
+        """测试写满后覆盖最旧数据"""
+        buffer = SensorRingBuffer(5)
+        for t in range(8):
+            buffer.append(float(t), t * 10.0)
+
+        timestamps, values, _ = buffer.range()
+        self.assertEqual(timestamps.tolist(), [3.0, 4.0, 5.0, 6.0, 7.0])
+        self.assertEqual(values.tolist(), [30.0, 40.0, 50.0, 60.0, 70.0])
+
+    def test_range_slicing_across_wrap(self):
+        """测试跨越环绕边界的时间范围切片"""
+        buffer = SensorRingBuffer(6)
+        buffer.extend(np.arange(10, dtype=float), np.arange(10, dtype=float))
+
+        timestamps, _, _ = buffer.range(5, 8)
+        self.assertEqual(timestamps.tolist(), [5.0, 6.0, 7.0, 8.0])
+        self.assertEqual(buffer.latest(2)[0].tolist(), [8.0, 9.0])
+
+    def test_growth_until_capacity(self):
+        """测试按需扩容直到容量上限"""
+        buffer = SensorRingBuffer(5000)
+        buffer.extend(np.arange(3000, dtype=float), np.ones(3000))
+        buffer.append(3000.0, 2.0)
+
+        self.assertEqual(len(buffer), 3001)
+        self.assertEqual(buffer.range(2999, None)[1].tolist(), [1.0, 2.0])
+
+    def test_late_points_inserted_in_order(self):
+        """测试迟到的数据点按时间顺序插入，批量写入中的迟到数据点同样插入"""
+        buffer = SensorRingBuffer(10)
+        buffer.append(5.0, 5.0)
+        self.assertTrue(buffer.append(4.0, 4.0, 1))
+        self.assertEqual(buffer.extend([3.0, 6.0, 7.0], [3.0, 6.0, 7.0]), 3)
+        timestamps, values, flags = buffer.range()
+        self.assertEqual(timestamps.tolist(), [3.0, 4.0, 5.0, 6.0, 7.0])
+        self.assertEqual(values.tolist(), [3.0, 4.0, 5.0, 6.0, 7.0])
+        self.assertEqual(flags.tolist(), [0, 1, 0, 0, 0])
+        self.assertEqual(buffer.range(4.0, 6.0)[1].tolist(), [4.0, 5.0, 6.0])
+        self.assertEqual((buffer.late_inserted, buffer.rejected), (2, 0))
+
+    def test_late_points_when_full(self):
+        """测试缓冲区已满且环绕后，迟到数据点挤出最旧的数据点；早于所有数据点时拒绝"""
+        buffer = SensorRingBuffer(4)
+        for t in range(6):
+            buffer.append(float(t), float(t))
+        self.assertTrue(buffer.append(3.5, 3.5))
+        self.assertEqual(buffer.range()[0].tolist(), [3.0, 3.5, 4.0, 5.0])
+        self.assertFalse(buffer.append(1.0, 1.0))
+        self.assertEqual(buffer.rejected, 1)
+        buffer.append(6.0, 6.0)
+        self.assertEqual(buffer.latest(2)[0].tolist(), [5.0, 6.0])
+        self.assertEqual(buffer.range()[0].tolist(), [3.5, 4.0, 5.0, 6.0])
+
+        history = SensorHistory(4)
+        history.record('s1', 2.0, 1.0)
+        history.record('s1', 1.0, 1.0)
+        self.assertEqual(history.get_stats(), {"迟到插入数据点": 1, "迟到拒绝数据点": 0})
+
+class TestSensorHistory(unittest.TestCase):
+    """历史数据存储测试类"""
+
+    def test_stats(self):
+        """测试向量化统计"""
+        history = SensorHistory(100)
+        history.record('s1', 1.0, 10.0)
+        history.record('s1', 2.0, 20.0, encode_flags('fair', True))
+        history.record('s1', 3.0, 30.0)
+
+        stats = history.stats('s1', start=2.0)
+        self.assertEqual(stats['count'], 2)
+        self.assertAlmostEqual(stats['mean'], 25.0)
+        self.assertEqual(stats['anomalies'], 1)
+        self.assertEqual(history.stats('unknown')['count'], 0)
+
+    def test_encode_flags(self):
+        """测试质量标志位编码"""
+        flags = encode_flags('fair', True)
+        self.assertEqual(flags & FLAG_ANOMALY, FLAG_ANOMALY)
+        self.assertEqual(flags & 0b011, QUALITY_FAIR)
+
+if __name__ == '__main__':
+    unittest.main()
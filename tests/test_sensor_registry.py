@@ -0,0 +1,114 @@
+"""
+传感器注册表模块测试
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import SensorRegistry, InterpretationTable, get_registry, parse_duration
+from ssn_modeling import SSNModeling
+
+class TestSensorRegistry(unittest.TestCase):
+    """传感器注册表测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = get_registry()
+
+    def test_lookup(self):
+        """测试按ID查询及预计算元数据"""
+        record = self.registry.get("home:temperatureSensor_001")
+
+        self.assertIsNotNone(record)
+        self.assertEqual(record.kind, 'temperature')
+        self.assertEqual(record.unit, '°C')
+        self.assertEqual(record.location, '客厅')
+        self.assertEqual(record.platform, 'home:livingRoomPlatform')
+        self.assertEqual(record.response_time, 5.0)
+        self.assertIsNone(self.registry.get("home:unknown"))
+        self.assertIs(self.registry.resolve("temperatureSensor_001"), record)
+        self.assertIsNone(self.registry.resolve("unknown"))
+
+    def test_quality_and_interpretation(self):
+        """测试质量评估与数值解释"""
+        record = self.registry.get("home:temperatureSensor_001")
+
+        self.assertEqual(record.assess_quality(25), 'good')
+        self.assertEqual(record.assess_quality(48), 'fair')
+        self.assertEqual(record.assess_quality(60), 'poor')
+        self.assertEqual(record.interpret(17.9), '偏冷')
+        self.assertEqual(record.interpret(18), '适宜')
+        self.assertEqual(record.interpret(28), '适宜')
+        self.assertEqual(record.interpret(28.1), '偏热')
+
+        smoke = self.registry.get("home:smokeSensor_001")
+        self.assertEqual(smoke.interpret(100), '正常')
+        self.assertEqual(smoke.interpret(200), '中等浓度')
+        self.assertEqual(smoke.interpret(201), '高浓度')
+
+    def test_configured_interpretation(self):
+        """测试观测属性在配置中声明的解释区间，新的观测属性无需修改代码"""
+        registry = SensorRegistry({
+            'sensors': [
+                {'id': 'home:co2Sensor_001', 'observes': 'home:CO2'},
+                {'id': 'home:temperatureSensor_009', 'observes': 'home:Temperature'}
+            ],
+            'observableProperties': [
+                {'id': 'home:CO2', 'interpretation': [{'le': 800, 'label': '清新'}, {'lt': 1500, 'label': '一般'},
+                                                      {'label': '浑浊'}]},
+                {'id': 'home:Temperature', 'interpretation': [{'le': 25, 'label': '凉'}, {'label': '热'}]}
+            ]
+        })
+        co2 = registry.get('home:co2Sensor_001')
+        self.assertEqual(co2.kind, 'generic')
+        self.assertEqual([co2.interpret(value) for value in (800, 1499.9, 1500)], ['清新', '一般', '浑浊'])
+        self.assertEqual(registry.get('home:temperatureSensor_009').interpret(30), '热')
+
+        # 内置类别的属性必须在配置中声明区间，其他属性未声明时统一解释为正常
+        with self.assertRaisesRegex(ValueError, 'home:Humidity'):
+            SensorRegistry({'sensors': [{'id': 'home:humiditySensor_009', 'observes': 'home:Humidity'}]})
+        generic = SensorRegistry({'sensors': [{'id': 'home:noiseSensor_001', 'observes': 'home:Noise'}]})
+        self.assertEqual(generic.get('home:noiseSensor_001').interpret(90), '正常')
+
+        with self.assertRaises(ValueError):
+            InterpretationTable([{'lt': 10, 'label': 'a'}, {'lt': 5, 'label': 'b'}, {'label': 'c'}])
+        with self.assertRaises(ValueError):
+            InterpretationTable([{'lt': 10, 'label': 'a'}, {'label': 'b'}, {'label': 'c'}])
+
+    def test_interpret_batch(self):
+        """测试整批解释与逐条解释一致，包括区间边界"""
+        records = self.registry.records
+        indices = np.repeat(np.arange(len(records)), 8)
+        values = np.tile(np.array([-5.0, 0.0, 18.0, 28.0, 40.0, 100.0, 200.0, 500.0]), len(records))
+        expected = [records[index].interpret(value) for index, value in zip(indices.tolist(), values.tolist())]
+        self.assertEqual(self.registry.interpret_batch(indices, values), expected)
+        self.assertEqual(self.registry.interpret_batch(np.empty(0, dtype=np.int64), np.empty(0)), [])
+
+    def test_indexes(self):
+        """测试位置与观测属性索引"""
+        living_room = [record.id for record in self.registry.sensors_at('客厅')]
+        self.assertIn("home:temperatureSensor_001", living_room)
+        self.assertEqual(self.registry.sensors_at('阁楼'), [])
+
+        self.assertEqual(len(self.registry.sensors_observing('home:Temperature')), 1)
+        self.assertEqual(len(self.registry.sensors_observing('Smoke')), 1)
+
+    def test_shared_instance(self):
+        """测试各模块共享同一注册表"""
+        self.assertIs(SSNModeling().registry, self.registry)
+
+    def test_parse_duration(self):
+        """测试时长解析"""
+        self.assertEqual(parse_duration('5s'), 5.0)
+        self.assertEqual(parse_duration('200ms'), 0.2)
+        self.assertEqual(parse_duration('2min'), 120.0)
+        self.assertIsNone(parse_duration('fast'))
+
+if __name__ == '__main__':
+    unittest.main()
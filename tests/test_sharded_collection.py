@@ -0,0 +1,97 @@
+"""
+分片采集模块测试
+"""
+
+import unittest
+import sys
+import os
+import time
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from sensor_registry import SensorRegistry, get_registry
+from fleet_simulator import build_synthetic_fleet
+from data_collector import CollectionStage
+from segment_store import SegmentWriter, encode_record, query_records
+from streaming_stats import SensorStatistics
+from sharded_collection import ShardedCollection, shard_assignments, encode_batch, decode_batch
+
+class TestShardedCollection(unittest.TestCase):
+    """分片采集测试类"""
+
+    def setUp(self):
+        self.config = {'data_collection': {'scheduling_mode': 'lockstep', 'sampling_interval': 0.1,
+                                           'simulation_seed': 7}}
+        self.registry = SensorRegistry(build_synthetic_fleet(200, seed=3, sensors_per_platform=10))
+
+    def test_assignments_are_stable_and_keep_platforms_together(self):
+        """测试分片划分与运行无关，按平台分片时同一平台的传感器在同一分片"""
+        by_sensor = shard_assignments(self.registry, 4)
+        np.testing.assert_array_equal(by_sensor, shard_assignments(self.registry, 4))
+        self.assertEqual(set(by_sensor.tolist()), {0, 1, 2, 3})
+
+        by_platform = shard_assignments(self.registry, 4, key='platform')
+        for records in self.registry.by_platform.values():
+            self.assertEqual(len({int(by_platform[record.index]) for record in records}), 1)
+        with self.assertRaises(ValueError):
+            shard_assignments(self.registry, 4, key='location')
+
+    def test_batch_roundtrip(self):
+        """测试回传批次可还原读数和事件，预先编码的行与协调进程自行序列化的结果一致"""
+        registry = get_registry()
+        stage = CollectionStage(self.config, registry)
+        indices = np.arange(len(registry))
+        for _ in range(6):
+            stage.collect_sensors(indices)
+        readings = stage.collect_sensors(indices)
+        readings[2].value = 999.0
+        events = stage.generate_semantic_events(readings)
+
+        decoded, decoded_events, encoded = decode_batch(encode_batch(0, readings, events), registry)
+        self.assertEqual([reading.to_dict() for reading in decoded], [reading.to_dict() for reading in readings])
+        self.assertEqual([event.to_dict() for event in decoded_events], [event.to_dict() for event in events])
+        self.assertEqual(encoded['events'].payload, b''.join(encode_record(event) for event in events))
+        self.assertIs(encoded['raw'].records, decoded)
+
+    def test_encoded_batch_is_indexed(self):
+        """测试已编码批次直接写入分段，事件索引仍按记录建立"""
+        data_dir = tempfile.mkdtemp()
+        try:
+            stage = CollectionStage(self.config, self.registry)
+            readings = stage.collect_sensors(np.arange(20))
+            events = stage.generate_semantic_events(readings)
+            _, _, encoded = decode_batch(encode_batch(0, readings, events), self.registry)
+
+            writer = SegmentWriter(data_dir, 'events', index_fields=('eventType', 'severity'))
+            writer.append([encoded['events']])
+            writer.close()
+            stored = list(query_records(data_dir, 'events', tags={'eventType': 'SensorReading'}))
+            self.assertEqual([event['id'] for event in stored],
+                             [event.id for event in events if event.event_type == 'SensorReading'])
+        finally:
+            shutil.rmtree(data_dir)
+
+    def test_worker_processes(self):
+        """测试各工作进程覆盖全部传感器，并汇报统计摘要"""
+        batches = []
+        statistics = SensorStatistics()
+        sharding = ShardedCollection(self.config, lambda readings, events, encoded: batches.append(readings),
+                                     statistics=statistics, shards=2, stats_interval=0)
+        sharding.start(self.registry)
+        deadline = time.monotonic() + 10
+        while len(batches) < 4 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        sharding.stop()
+
+        sensors = {reading.record.id for batch in batches for reading in batch}
+        self.assertEqual(sensors, set(self.registry.by_id))
+        self.assertEqual(sum(sharding.sensor_counts), len(self.registry))
+        self.assertEqual(len(statistics.snapshot()), len(self.registry))
+        self.assertEqual(sharding.get_stats()['运行中工作进程'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
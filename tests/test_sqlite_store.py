@@ -0,0 +1,122 @@
+"""
+SQLite时序存储模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import get_registry
+from semantic_records import Observation, SemanticEvent, ComplexEvent
+from sqlite_store import SQLiteStore
+from event_processor import EventProcessor
+
+class TestSQLiteStore(unittest.TestCase):
+    """SQLite时序存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.data_dir = tempfile.mkdtemp()
+        self.store = SQLiteStore(os.path.join(self.data_dir, 'test.db'))
+        registry = get_registry()
+        self.temperature = registry.get("home:temperatureSensor_001")
+        self.smoke = registry.get("home:smokeSensor_001")
+        self.base = 1749999600.0
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_dir)
+
+    def observation(self, record, value, offset):
+        epoch = self.base + offset
+        return Observation(record, value, datetime.fromtimestamp(epoch).isoformat(), epoch)
+
+    def test_wal_mode_and_indexes(self):
+        """测试数据库使用WAL模式并建立复合索引"""
+        connection = self.store._reader()
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM observations WHERE location = ? AND epoch >= ?",
+            ('客厅', 0)).fetchall()
+        self.assertIn('idx_observations_location_time', str([tuple(row) for row in plan]))
+
+    def test_batch_insert_and_range_queries(self):
+        """测试一批记录在一个事务中入库，并按传感器、位置和时间范围查询"""
+        readings = [self.observation(self.temperature, 20 + i, i * 60) for i in range(10)]
+        readings.append(self.observation(self.smoke, 250, 300))
+        events = [SemanticEvent.threshold(readings[-1], 'high', 200, 'high')]
+        self.store.append({'raw': readings, 'processed': readings, 'events': events})
+
+        rows = self.store.query_observations(sensor_id=self.temperature.id,
+                                             start=self.base + 120, end=self.base + 300)
+        self.assertEqual([row['value'] for row in rows], [22, 23, 24, 25])
+        self.assertEqual([row['sensor'] for row in self.store.query_observations(location='厨房')], [self.smoke.id])
+        self.assertEqual(self.store.query_observations(sensor_id=self.temperature.id, limit=2)[-1]['value'], 29)
+
+        buckets = self.store.aggregate_observations(sensor_id=self.temperature.id, bucket_seconds=300)
+        self.assertEqual([bucket['count'] for bucket in buckets], [5, 5])
+        self.assertEqual(buckets[0]['mean'], 22)
+
+        threshold_events = self.store.query_events(event_type='ThresholdExceeded', severity='high')
+        self.assertEqual(threshold_events[0]['sensor'], self.smoke.id)
+        stats = self.store.get_stats()
+        self.assertEqual((stats['写入批次'], stats['写入观测数'], stats['写入语义事件数']), (1, 11, 1))
+
+    def test_complex_events_and_prune(self):
+        """测试复杂事件入库、按类型计数以及过期记录清理"""
+        self.store.append({
+            'raw': [self.observation(self.temperature, 20, 0), self.observation(self.temperature, 21, 7200)],
+            'complex': [ComplexEvent('fire_1', 'ComplexEvent', 'FireAlarmTriggered',
+                                     datetime.fromtimestamp(self.base).isoformat(), 'EventProcessor',
+                                     {'location': '厨房'}, severity='critical')]
+        })
+        events = self.store.query_events(kind='complex', location='厨房')
+        self.assertEqual(events[0]['details'], {'location': '厨房'})
+        self.assertEqual(self.store.count_events(kind='complex')[0]['count'], 1)
+
+        self.assertEqual(self.store.prune(self.base + 3600), 2)
+        self.assertEqual(len(self.store.query_observations()), 1)
+
+    def test_append_after_close_reopens_writer(self):
+        """测试采集服务停止后再次启动时，关闭过的存储可继续写入"""
+        self.store.append({'raw': [self.observation(self.temperature, 20, 0)]})
+        self.store.close()
+        self.store.append({'raw': [self.observation(self.temperature, 21, 60)]})
+        self.assertEqual(len(self.store.query_observations(sensor_id=self.temperature.id)), 2)
+
+    def test_close_releases_reader_connections(self):
+        """测试关闭时释放各线程的查询连接，之后的查询重新建立连接"""
+        self.store.append({'raw': [self.observation(self.temperature, 20, 0)]})
+        connections = []
+        for _ in range(3):
+            thread = threading.Thread(target=lambda: connections.append(self.store._reader()))
+            thread.start()
+            thread.join()
+        connections.append(self.store._reader())
+        self.store.close()
+        for connection in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                connection.execute("SELECT 1")
+        self.assertEqual(len(self.store.query_observations(sensor_id=self.temperature.id)), 1)
+
+    def test_event_processor_queries_beyond_memory_window(self):
+        """测试事件处理器在内存事件历史未覆盖时间窗口时查询SQLite存储"""
+        self.store.append({'raw': [self.observation(self.smoke, 250, 0)]})
+        processor = EventProcessor()
+        processor.attach_database(self.store)
+        now = datetime.fromtimestamp(self.base + 120)
+
+        self.assertTrue(processor._check_historical_condition('smokeSensor_001', '>', 200, 0, now))
+        self.assertFalse(processor._check_historical_condition('smokeSensor_001', '<', 200, 0, now))
+        self.assertFalse(processor._check_historical_condition('smokeSensor_001', '>', 200, 60, now))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+流式统计模块测试
+"""
+
+import unittest
+import sys
+import os
+import random
+import statistics
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from streaming_stats import WelfordStats, EWMAStats, WindowedStats, SensorStatistics
+
+class TestStreamingStats(unittest.TestCase):
+    """流式统计测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = random.Random(42)
+        self.values = [rng.uniform(0, 100) for _ in range(200)]
+
+    def test_welford_matches_batch(self):
+        """测试Welford结果与批量计算一致"""
+        stats = WelfordStats()
+        for value in self.values:
+            stats.update(value)
+
+        self.assertEqual(stats.count, 200)
+        self.assertAlmostEqual(stats.mean, statistics.fmean(self.values))
+        self.assertAlmostEqual(stats.std, statistics.pstdev(self.values))
+
+    def test_windowed_matches_last_window(self):
+        """测试滑动窗口结果与最近窗口一致"""
+        stats = WindowedStats(window=20)
+        for value in self.values:
+            stats.update(value)
+
+        window = self.values[-20:]
+        self.assertEqual(stats.count, 20)
+        self.assertAlmostEqual(stats.mean, statistics.fmean(window))
+        self.assertAlmostEqual(stats.std, statistics.pstdev(window))
+
+    def test_ewma_tracks_level_shift(self):
+        """测试EWMA跟随水平变化"""
+        stats = EWMAStats(alpha=0.5)
+        for _ in range(50):
+            stats.update(10.0)
+        self.assertAlmostEqual(stats.mean, 10.0)
+        for _ in range(50):
+            stats.update(20.0)
+        self.assertAlmostEqual(stats.mean, 20.0, places=3)
+
+    def test_sensor_anomaly_detection(self):
+        """测试按传感器的3-sigma异常检测"""
+        sensor_stats = SensorStatistics(method='windowed', window=10, min_samples=5)
+        for value in [20.0, 21.0, 20.5, 19.5, 20.0]:
+            self.assertFalse(sensor_stats.observe('s1', value))
+
+        self.assertTrue(sensor_stats.observe('s1', 80.0))
+        self.assertFalse(sensor_stats.observe('s2', 80.0))
+        self.assertEqual(sensor_stats.get('s1')['anomalies'], 1)
+
+    def test_unknown_method(self):
+        """测试不支持的统计方法"""
+        with self.assertRaises(ValueError):
+            SensorStatistics(method='median')
+
+if __name__ == '__main__':
+    unittest.main()
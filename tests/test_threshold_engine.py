@@ -0,0 +1,66 @@
+"""
+阈值引擎模块测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sensor_registry import SensorRegistry, get_registry
+from threshold_engine import ThresholdEngine, occurrence_rank
+
+class TestThresholdEngine(unittest.TestCase):
+    """阈值引擎测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = SensorRegistry({'sensors': [
+            {'id': 'home:temperatureSensor_001', 'location': '客厅', 'observes': 'home:Temperature'},
+            {'id': 'home:temperatureSensor_002', 'location': '卧室', 'observes': 'home:Temperature'},
+            {'id': 'home:smokeSensor_001', 'location': '厨房', 'observes': 'home:SmokeLevel'}
+        ], 'observableProperties': get_registry().config['observableProperties']})
+        self.engine = ThresholdEngine.from_config(self.registry, {'rules': [
+            {'property': 'Temperature', 'high': 30, 'low': 15, 'hysteresis': 1},
+            {'sensor': 'temperatureSensor_002', 'high': 26, 'hysteresis': 1},
+            {'sensor': 'smokeSensor_001', 'high': 200, 'severity': {'high': 'high'}}
+        ]})
+
+    def test_rule_specificity(self):
+        """测试传感器级规则覆盖属性级规则"""
+        self.assertEqual(self.engine.limits(0), (15.0, 30.0))
+        self.assertEqual(self.engine.limits(1), (15.0, 26.0))
+        self.assertEqual(self.engine.limits(2), (None, 200.0))
+        self.assertEqual(self.engine.severity(2, 'high'), 'high')
+        self.assertEqual(self.engine.severity(0, 'high'), 'medium')
+
+    def test_batch_evaluation(self):
+        """测试整批判定"""
+        high, low = self.engine.evaluate(np.array([0, 1, 2, -1]), np.array([31.0, 25.0, 250.0, 999.0]))
+        self.assertEqual(high.tolist(), [0, 2])
+        self.assertEqual(low.tolist(), [])
+
+    def test_hysteresis(self):
+        """测试滞回抑制阈值附近的反复触发"""
+        series = [31.0, 29.5, 30.5, 28.5, 30.5]
+        triggered = []
+        for value in series:
+            high, _ = self.engine.evaluate(np.array([0]), np.array([value]))
+            triggered.append(len(high) > 0)
+        self.assertEqual(triggered, [True, False, False, False, True])
+
+    def test_repeated_sensor_in_batch(self):
+        """测试同一批中同一传感器多次出现时按顺序推进状态"""
+        high, _ = self.engine.evaluate(np.array([0, 0, 0]), np.array([31.0, 28.0, 31.0]))
+        self.assertEqual(high.tolist(), [0, 2])
+
+    def test_occurrence_rank(self):
+        """测试出现次序计算"""
+        ranks = occurrence_rank(np.array([5, 3, 5, 5, 3]))
+        self.assertEqual(ranks.tolist(), [0, 0, 1, 2, 1])
+
+if __name__ == '__main__':
+    unittest.main()
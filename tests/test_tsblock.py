@@ -0,0 +1,93 @@
+"""
+时序块存储模块测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from unittest import mock
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tsblock
+from tsblock import TSBlockStore, encode_block, decode_block, read_block_index, read_series
+from segment_store import SegmentWriter
+from retention import RetentionManager
+
+class TestTSBlock(unittest.TestCase):
+    """时序块存储测试类"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.epochs = 1750000000 + np.arange(1000) * 5.0 + rng.integers(0, 20, 1000) / 1000
+        self.values = np.round(25 + np.cumsum(rng.normal(0, 0.05, 1000)), 2)
+        self.flags = np.zeros(1000, dtype=np.uint8)
+        self.flags[10] = 4
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_quantized_roundtrip(self):
+        """测试按分辨率量化的块可还原到分辨率精度，时间戳精确到毫秒"""
+        payload, meta = encode_block(self.epochs, self.values, self.flags, 0.01)
+        timestamps, values, flags = decode_block(payload, meta)
+
+        self.assertEqual(meta['codec'], 'q')
+        np.testing.assert_allclose(timestamps, self.epochs, atol=5e-4)
+        np.testing.assert_array_equal(values, self.values)
+        np.testing.assert_array_equal(flags, self.flags)
+        # 时间戳带毫秒抖动时每个数据点仍不超过3字节
+        self.assertLess(len(payload), 1000 * 3)
+
+    def test_xor_roundtrip_is_lossless(self):
+        """测试未声明分辨率时按位异或编码无损"""
+        values = np.random.default_rng(1).normal(0, 1, 1000)
+        payload, meta = encode_block(self.epochs, values, self.flags, None)
+
+        self.assertEqual(meta['codec'], 'x')
+        np.testing.assert_array_equal(decode_block(payload, meta)[1], values)
+
+    def test_range_query_decodes_only_overlapping_blocks(self):
+        """测试范围查询只解压与时间范围重叠的块"""
+        path = os.path.join(self.data_dir, 'tsblock_20250615_15.tsb')
+        tsblock.write_block_file(path, {'a': (self.epochs, self.values, self.flags),
+                                        'b': (self.epochs, -self.values, self.flags)},
+                                 {'a': 0.01}, block_size=100)
+        self.assertEqual(len(read_block_index(path)), 20)
+
+        start, end = self.epochs[250], self.epochs[349]
+        with mock.patch('tsblock.decode_block', wraps=decode_block) as decode:
+            timestamps, values, _ = read_series(path, 'a', start, end)
+        self.assertEqual(decode.call_count, 2)
+        self.assertEqual(len(timestamps), 100)
+        np.testing.assert_array_equal(values, self.values[250:350])
+
+    def test_retention_builds_blocks_before_pruning_raw(self):
+        """测试保留服务为已结束的小时生成时序块，原始分区删除后仍可查询"""
+        hour = datetime(2025, 5, 1, 8)
+        writer = SegmentWriter(os.path.join(self.data_dir, 'raw'), 'sensor_data', clock=lambda: hour)
+        writer.append([{"madeBySensor": "home:t1", "hasResult": {"value": 20.0 + i * 0.1},
+                        "resultTime": (hour + timedelta(seconds=10 * i)).isoformat(), "anomaly": i == 3}
+                       for i in range(360)])
+        writer.close()
+
+        store = TSBlockStore(os.path.join(self.data_dir, 'tsblocks'), {'home:t1': 0.1})
+        manager = RetentionManager(self.data_dir, retention_days=30, block_store=store,
+                                   clock=lambda: datetime(2025, 6, 20))
+        manager.run_once()
+
+        self.assertEqual(os.listdir(os.path.join(self.data_dir, 'raw')), [])
+        timestamps, values, flags = store.query('home:t1', hour.timestamp(), (hour + timedelta(minutes=10)).timestamp())
+        self.assertEqual(len(timestamps), 61)
+        self.assertAlmostEqual(values[-1], 26.0)
+        self.assertEqual(int(np.count_nonzero(flags)), 1)
+        self.assertEqual(manager.get_stats()['已构建时序块文件数'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+写后持久化组件测试
+"""
+
+import unittest
+import sys
+import os
+import time
+
+# 添加src目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from data_collector import WriteBehindSink
+
+class FakeWriter:
+    """记录追加内容的写入器，可指定前几次追加失败"""
+
+    def __init__(self, failures=0):
+        self.records = []
+        self.appends = 0
+        self.failures = failures
+        self.closed = False
+
+    def append(self, records):
+        self.appends += 1
+        if self.failures:
+            self.failures -= 1
+            raise OSError("磁盘已满")
+        self.records.extend(records)
+
+    def sync(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestWriteBehindSink(unittest.TestCase):
+    """写后持久化测试类"""
+
+    def setUp(self):
+        self.raw = FakeWriter()
+        self.events = FakeWriter()
+
+    def test_batch_flush(self):
+        """测试缓冲达到批量后立即由刷写线程写入"""
+        sink = WriteBehindSink({'raw': self.raw}, flush_interval=60, flush_batch=10)
+        sink.start()
+        sink.submit('raw', list(range(9)))
+        time.sleep(0.1)
+        self.assertEqual(self.raw.records, [])
+        sink.submit('raw', [9])
+        self.assertTrue(wait_until(lambda: len(self.raw.records) == 10))
+        sink.stop()
+        self.assertTrue(self.raw.closed)
+
+    def test_interval_flush(self):
+        """测试未达到批量时按刷写间隔写入，停止时刷写剩余记录"""
+        sink = WriteBehindSink({'raw': self.raw}, flush_interval=0.05, flush_batch=1000)
+        sink.start()
+        sink.submit('raw', [1, 2, 3])
+        self.assertTrue(wait_until(lambda: self.raw.records == [1, 2, 3]))
+        sink.submit('raw', [4])
+        sink.stop()
+        self.assertEqual(self.raw.records, [1, 2, 3, 4])
+
+    def test_overflow_drops_oldest(self):
+        """测试缓冲溢出时丢弃最旧记录并计数"""
+        sink = WriteBehindSink({'raw': self.raw}, max_buffer=5, flush_batch=100)
+        sink.submit('raw', list(range(8)))
+        sink.flush()
+        self.assertEqual(self.raw.records, [3, 4, 5, 6, 7])
+        metrics = sink.get_metrics()
+        self.assertEqual(metrics['丢弃记录数'], 3)
+        self.assertEqual(metrics['缓冲区峰值'], 5)
+
+    def test_failed_flush_is_retried(self):
+        """测试刷写失败的批次保留重试，已写入的数据流不重复写入"""
+        self.events.failures = 1
+        sink = WriteBehindSink({'raw': self.raw, 'events': self.events}, flush_batch=100)
+        sink.submit('raw', [1, 2])
+        sink.submit('events', ['a'])
+        self.assertFalse(sink.flush())
+        self.assertEqual(self.raw.records, [1, 2])
+        self.assertEqual(sink.get_metrics()['待重试记录数'], 3)
+
+        sink.submit('raw', [3])
+        self.assertTrue(sink.flush())
+        self.assertEqual((self.raw.records, self.events.records), ([1, 2], ['a']))
+        self.assertTrue(sink.flush())
+        self.assertEqual(self.raw.records, [1, 2, 3])
+
+        metrics = sink.get_metrics()
+        self.assertEqual((metrics['刷写错误数'], metrics['重试记录数'], metrics['丢弃记录数']), (1, 3, 0))
+        self.assertEqual((metrics['刷写次数'], metrics['已刷写记录数']), (2, 4))
+
+    def test_retry_backoff_and_stop(self):
+        """测试刷写线程按退避间隔重试，停止时仍失败的批次计入丢弃"""
+        self.raw.failures = 2
+        sink = WriteBehindSink({'raw': self.raw}, flush_interval=0.02, flush_batch=1000)
+        sink.start()
+        sink.submit('raw', [1])
+        self.assertTrue(wait_until(lambda: self.raw.records == [1]))
+        self.assertEqual(self.raw.appends, 3)
+
+        self.raw.failures = 100
+        sink.submit('raw', [2])
+        self.assertTrue(wait_until(lambda: sink.metrics['flush_errors'] >= 3))
+        sink.stop()
+        self.assertEqual(sink.get_metrics()['丢弃记录数'], 1)
+
+if __name__ == '__main__':
+    unittest.main()